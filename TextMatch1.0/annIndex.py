@@ -0,0 +1,446 @@
+import json
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+
+def top_k(scores, ids, k):
+    """
+    Selects the k highest scores. Equal scores are ranked by document id, so the first best document in corpus
+    order always comes first, whichever candidates tie at the cutoff.
+
+    Args:
+        scores (numpy.ndarray): The scores of the candidates.
+        ids (numpy.ndarray): The document ids of the candidates.
+        k (int): The number of results.
+
+    Returns:
+        tuple: The ids and scores of the best candidates, sorted by decreasing score and then by id.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+    if k < len(scores):
+        # Every candidate tied with the k-th best score is kept, so the ids decide between them
+        cutoff = np.partition(scores, len(scores) - k)[len(scores) - k]
+        candidates = np.flatnonzero(scores >= cutoff)
+    else:
+        candidates = np.arange(len(scores))
+    best = candidates[np.lexsort((ids[candidates], -scores[candidates]))][:k]
+    return ids[best], scores[best]
+
+
+def dot_scores(matrix, vector):
+    """
+    Multiplies a dense or sparse matrix by a query vector.
+
+    Args:
+        matrix (numpy.ndarray or scipy.sparse.csr_matrix): The indexed vectors, one per row.
+        vector (numpy.ndarray or scipy.sparse.csr_matrix): The query, as returned by prepare_query.
+
+    Returns:
+        numpy.ndarray: The flat dense array of scores, one per row.
+    """
+    result = matrix @ vector.T if sparse.issparse(vector) else matrix @ np.ravel(vector)
+    if sparse.issparse(result):
+        result = result.toarray()
+    return np.asarray(result).ravel()
+
+
+def prepare_query(vector, like):
+    """
+    Normalizes a query vector, keeping it sparse if the indexed vectors are sparse.
+
+    Args:
+        vector (numpy.ndarray or scipy.sparse.csr_matrix): The query vector.
+        like (numpy.ndarray or scipy.sparse.csr_matrix): The indexed vectors.
+
+    Returns:
+        numpy.ndarray or scipy.sparse.csr_matrix: The normalized query, as a single row.
+    """
+    if sparse.issparse(like):
+        vector = sparse.csr_matrix(vector, dtype=np.float32)
+    else:
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+    return normalize(vector)
+
+
+def splice_csr(matrix, start, stop, rows=None):
+    """
+    Replaces the rows start:stop of a CSR matrix, returning a new matrix of the same type. The arrays of the
+    matrix are copied around the replaced rows, without the conversions and checks of sparse.vstack.
+
+    Args:
+        matrix (scipy.sparse.csr_matrix): The matrix. It is not modified.
+        start (int): The first replaced row.
+        stop (int): The row after the last replaced one. start inserts the rows.
+        rows (scipy.sparse.csr_matrix, optional): The new rows. None removes the replaced ones.
+
+    Returns:
+        scipy.sparse.csr_matrix: The spliced matrix.
+    """
+    rows = sparse.csr_matrix((0, matrix.shape[1]), dtype=matrix.dtype) if rows is None else sparse.csr_matrix(rows, dtype=matrix.dtype)
+    first, last = matrix.indptr[start], matrix.indptr[stop]
+    data = np.concatenate([matrix.data[:first], rows.data, matrix.data[last:]])
+    indices = np.concatenate([matrix.indices[:first], rows.indices, matrix.indices[last:]]).astype(matrix.indices.dtype, copy=False)
+    indptr = np.concatenate([matrix.indptr[:start + 1], first + rows.indptr[1:], matrix.indptr[stop + 1:] - last + first + rows.nnz])
+    shape = (matrix.shape[0] - (stop - start) + rows.shape[0], matrix.shape[1])
+    return sparse.csr_matrix((data, indices, indptr.astype(matrix.indptr.dtype, copy=False)), shape=shape, copy=False)
+
+
+def _splice(vectors, start, stop, rows=None):
+    """
+    Replaces the rows start:stop of a dense or sparse matrix, returning a new matrix.
+    """
+    if sparse.issparse(vectors):
+        return splice_csr(sparse.csr_matrix(vectors, dtype=np.float32), start, stop, rows)
+    parts = [vectors[:start]] + ([rows] if rows is not None else []) + [vectors[stop:]]
+    return np.vstack(parts).astype(np.float32, copy=False)
+
+
+class FlatIndex:
+    """
+    An exact candidate index that scores the query against every vector. It is the reference the
+    approximate indexes are measured against and the best choice for small corpora.
+
+    Vectors can be dense NumPy arrays or SciPy sparse matrices. They are L2-normalized on build, so
+    scores are cosine similarities.
+    """
+
+    kind = "flat"
+
+    def __init__(self):
+        """
+        Initializes an empty FlatIndex.
+        """
+        self.vectors = None
+
+    def __len__(self):
+        return 0 if self.vectors is None else self.vectors.shape[0]
+
+    def build(self, vectors):
+        """
+        Indexes a matrix of document vectors.
+
+        Args:
+            vectors (numpy.ndarray or scipy.sparse matrix): One row per document.
+
+        Returns:
+            FlatIndex: The index itself.
+        """
+        self.vectors = normalize(sparse.csr_matrix(vectors, dtype=np.float32) if sparse.issparse(vectors) else np.asarray(vectors, dtype=np.float32))
+        return self
+
+    def query(self, vector, k):
+        """
+        Finds the k vectors most similar to a query.
+
+        Args:
+            vector (numpy.ndarray or scipy.sparse matrix): The query vector.
+            k (int): The number of results.
+
+        Returns:
+            tuple: The document ids and cosine similarities of the results, sorted by decreasing similarity.
+        """
+        scores = dot_scores(self.vectors, prepare_query(vector, self.vectors))
+        return top_k(scores, np.arange(len(scores)), k)
+
+    def upsert(self, doc_id, vector):
+        """
+        Sets the vector of a document, appending it when doc_id is the number of indexed documents.
+        The index itself is not modified, so it can keep serving queries while the copy is built.
+
+        Args:
+            doc_id (int): The id of the document, at most the number of indexed documents.
+            vector (numpy.ndarray or scipy.sparse matrix): The new vector of the document.
+
+        Returns:
+            FlatIndex: A new index with the document updated.
+        """
+        index = FlatIndex()
+        index.vectors = _splice(self.vectors, doc_id, min(doc_id + 1, len(self)), prepare_query(vector, self.vectors))
+        return index
+
+    def delete(self, doc_id):
+        """
+        Removes a document. The ids of the following documents are shifted down by one, like the rows of the corpus.
+
+        Args:
+            doc_id (int): The id of the document.
+
+        Returns:
+            FlatIndex: A new index without the document.
+        """
+        index = FlatIndex()
+        index.vectors = _splice(self.vectors, doc_id, doc_id + 1)
+        return index
+
+    def save(self, path):
+        """
+        Saves the index to a .npz file.
+
+        Args:
+            path (str): The destination file.
+        """
+        save_index_arrays(path, self.kind, {}, self.vectors)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index saved with save.
+
+        Args:
+            path (str): The .npz file.
+
+        Returns:
+            FlatIndex: The loaded index.
+        """
+        _, vectors, _ = load_index_arrays(path)
+        index = cls()
+        index.vectors = vectors
+        return index
+
+
+class IVFIndex:
+    """
+    An inverted-file (IVF) approximate candidate index built with NumPy.
+
+    The vectors are clustered with spherical k-means into n_lists lists. A query is only scored against
+    the vectors of the n_probe lists whose centroids are closest to it, so n_probe is the accuracy-vs-speed
+    knob: n_probe equal to n_lists gives exact results, smaller values scan a fraction of the corpus.
+
+    Vectors can be dense NumPy arrays or SciPy sparse matrices and are L2-normalized on build.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, seed=0):
+        """
+        Initializes an empty IVFIndex.
+
+        Args:
+            n_lists (int, optional): The number of clusters. Defaults to the square root of the number of vectors.
+            n_probe (int): The number of clusters scanned per query.
+            n_iter (int): The number of k-means iterations used to build the clusters.
+            seed (int): The seed of the random centroid initialization, for reproducible builds.
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids = None
+        self.vectors = None
+        self.ids = None
+        self.offsets = None
+
+    def __len__(self):
+        return 0 if self.ids is None else len(self.ids)
+
+    def build(self, vectors):
+        """
+        Clusters and indexes a matrix of document vectors.
+
+        Args:
+            vectors (numpy.ndarray or scipy.sparse matrix): One row per document.
+
+        Returns:
+            IVFIndex: The index itself.
+        """
+        is_sparse = sparse.issparse(vectors)
+        vectors = normalize(sparse.csr_matrix(vectors, dtype=np.float32) if is_sparse else np.asarray(vectors, dtype=np.float32))
+        n_vectors = vectors.shape[0]
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_vectors)))
+        n_lists = max(1, min(n_lists, n_vectors))
+
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(n_vectors, n_lists, replace=False)] if n_vectors else vectors[:0]
+        centroids = centroids.toarray() if is_sparse else np.array(centroids)
+
+        assignments = np.zeros(n_vectors, dtype=np.int64)
+        for _ in range(self.n_iter):
+            assignments = self._assign(vectors, centroids)
+            membership = sparse.csr_matrix((np.ones(n_vectors, dtype=np.float32), (assignments, np.arange(n_vectors))), shape=(n_lists, n_vectors))
+            sums = membership @ vectors
+            sums = sums.toarray() if sparse.issparse(sums) else np.asarray(sums)
+            empty = np.asarray(membership.sum(axis=1)).ravel() == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize(sums).astype(np.float32)
+        if n_vectors:
+            assignments = self._assign(vectors, centroids)
+
+        order = np.argsort(assignments, kind="stable")
+        self.n_lists = n_lists
+        self.centroids = centroids
+        self.ids = order
+        self.vectors = vectors[order]
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=n_lists))))
+        return self
+
+    @staticmethod
+    def _assign(vectors, centroids):
+        scores = vectors @ centroids.T
+        if sparse.issparse(scores):
+            scores = scores.toarray()
+        return np.asarray(scores).argmax(axis=1)
+
+    def query(self, vector, k, n_probe=None):
+        """
+        Finds approximately the k vectors most similar to a query.
+
+        Args:
+            vector (numpy.ndarray or scipy.sparse matrix): The query vector.
+            k (int): The number of results.
+            n_probe (int, optional): Overrides the number of clusters scanned for this query.
+
+        Returns:
+            tuple: The document ids and cosine similarities of the results, sorted by decreasing similarity.
+        """
+        query = prepare_query(vector, self.vectors)
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        centroid_scores = dot_scores(self.centroids, query)
+        probed = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in probed])
+        scores = dot_scores(self.vectors[rows], query)
+        return top_k(scores, self.ids[rows], k)
+
+    def _with_arrays(self, vectors, ids, offsets):
+        index = IVFIndex(self.n_lists, self.n_probe, self.n_iter, self.seed)
+        index.centroids = self.centroids
+        index.vectors = vectors
+        index.ids = ids
+        index.offsets = offsets
+        return index
+
+    def upsert(self, doc_id, vector):
+        """
+        Sets the vector of a document, appending it when doc_id is the number of indexed documents.
+        The vector is assigned to the list of its closest centroid; the centroids are only recomputed by
+        building the index again. The index itself is not modified.
+
+        Args:
+            doc_id (int): The id of the document, at most the number of indexed documents.
+            vector (numpy.ndarray or scipy.sparse matrix): The new vector of the document.
+
+        Returns:
+            IVFIndex: A new index with the document updated.
+        """
+        index = self._remove(doc_id, shift=False) if doc_id < len(self) else self
+        row = prepare_query(vector, self.vectors)
+        list_id = int(np.argmax(dot_scores(self.centroids, row)))
+        position = index.offsets[list_id + 1]
+        offsets = index.offsets.copy()
+        offsets[list_id + 1:] += 1
+        return self._with_arrays(_splice(index.vectors, position, position, row), np.insert(index.ids, position, doc_id), offsets)
+
+    def delete(self, doc_id):
+        """
+        Removes a document. The ids of the following documents are shifted down by one, like the rows of the corpus.
+
+        Args:
+            doc_id (int): The id of the document.
+
+        Returns:
+            IVFIndex: A new index without the document.
+        """
+        return self._remove(doc_id, shift=True)
+
+    def _remove(self, doc_id, shift):
+        position = int(np.flatnonzero(self.ids == doc_id)[0])
+        ids = np.delete(self.ids, position)
+        if shift:
+            ids[ids > doc_id] -= 1
+        offsets = self.offsets.copy()
+        offsets[1:][offsets[1:] > position] -= 1
+        return self._with_arrays(_splice(self.vectors, position, position + 1), ids, offsets)
+
+    def save(self, path):
+        """
+        Saves the index to a .npz file.
+
+        Args:
+            path (str): The destination file.
+        """
+        params = {"n_lists": self.n_lists, "n_probe": self.n_probe, "n_iter": self.n_iter, "seed": self.seed}
+        save_index_arrays(path, self.kind, params, self.vectors, centroids=self.centroids, ids=self.ids, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index saved with save.
+
+        Args:
+            path (str): The .npz file.
+
+        Returns:
+            IVFIndex: The loaded index.
+        """
+        params, vectors, arrays = load_index_arrays(path)
+        index = cls(**params)
+        index.vectors = vectors
+        index.centroids = arrays["centroids"]
+        index.ids = arrays["ids"]
+        index.offsets = arrays["offsets"]
+        return index
+
+
+INDEX_TYPES = {FlatIndex.kind: FlatIndex, IVFIndex.kind: IVFIndex}
+
+
+def create_index(kind, **params):
+    """
+    Creates an empty candidate index of the given kind.
+
+    Args:
+        kind (str): "flat" or "ivf".
+        **params: The constructor parameters of the index.
+
+    Returns:
+        FlatIndex or IVFIndex: The new index.
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {kind}")
+    return INDEX_TYPES[kind](**params)
+
+
+def load_index(path):
+    """
+    Loads a candidate index of any kind saved with its save method.
+
+    Args:
+        path (str): The .npz file.
+
+    Returns:
+        FlatIndex or IVFIndex: The loaded index.
+    """
+    with np.load(path) as data:
+        kind = str(data["kind"])
+    return INDEX_TYPES[kind].load(path)
+
+
+def save_index_arrays(path, kind, params, vectors, **arrays):
+    """
+    Writes the arrays of an index to a .npz file, storing sparse vectors as their CSR components.
+    """
+    if sparse.issparse(vectors):
+        arrays.update(data=vectors.data, indices=vectors.indices, indptr=vectors.indptr, shape=np.array(vectors.shape))
+    else:
+        arrays["vectors"] = vectors
+    np.savez(path, kind=np.array(kind), params=np.array(json.dumps(params)), **arrays)
+
+
+def load_index_arrays(path):
+    """
+    Reads the arrays written by save_index_arrays.
+
+    Returns:
+        tuple: The constructor parameters, the vectors and a dictionary with the remaining arrays.
+    """
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    if "vectors" in arrays:
+        vectors = arrays.pop("vectors")
+    else:
+        vectors = sparse.csr_matrix((arrays.pop("data"), arrays.pop("indices"), arrays.pop("indptr")), shape=tuple(arrays.pop("shape")))
+    arrays.pop("kind")
+    params = json.loads(str(arrays.pop("params")))
+    return params, vectors, arrays
@@ -19,7 +19,7 @@ class App:
   \_/\___/_/\_\\__\_|  |_/\__,_|\__\___|_| |_|\___|_|   
                                                         
                                                         """
-        self.text_similarity_detector = TextSimilarityDetector('dataset/files')
+        self.text_similarity_detector = TextSimilarityDetector('dataset/files', cache_dir='cache')
         self.setup_curses()
 
     def setup_curses(self):
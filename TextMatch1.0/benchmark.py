@@ -0,0 +1,130 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+from textSimilarityDetector import TextSimilarityDetector
+
+STAGES = ('preprocess_text', 'rank_similar', 'check_similarity')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measures the latency, throughput and memory of the detector on a synthetic corpus.")
+    parser.add_argument('--dataset', required=True,
+                        help="Directory of a synthetic corpus generated with TextMatch2.0/backend/generate_corpus.py.")
+    parser.add_argument('--cache-dir', help="Directory of the preprocessing cache. None disables it.")
+    parser.add_argument('--index-type', default='flat', help="Candidate retrieval index, 'flat' or 'ivf'.")
+    parser.add_argument('--candidate-count', type=int, help="Number of candidate texts scored per query.")
+    parser.add_argument('--output', help="JSON file of the results. Defaults to benchmark_results/detection-<commit>.json.")
+    parser.add_argument('--compare', help="JSON results of a previous run to compare with.")
+    return parser.parse_args(argv)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident memory of the process in megabytes, or None without the resource module.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(latencies):
+    """
+    Summarizes the latencies of a stage.
+
+    Args:
+        latencies (list): Seconds of every call.
+
+    Returns:
+        dict: Count, mean and percentiles in milliseconds and sequential calls per second.
+    """
+    milliseconds = np.asarray(latencies) * 1000
+    p50, p90, p95, p99 = np.percentile(milliseconds, [50, 90, 95, 99])
+    return {'count': len(latencies), 'mean_ms': float(milliseconds.mean()), 'p50_ms': float(p50), 'p90_ms': float(p90), 'p95_ms': float(p95),
+            'p99_ms': float(p99), 'max_ms': float(milliseconds.max()), 'throughput_per_s': len(latencies) / float(np.sum(latencies))}
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with open(os.path.join(args.dataset, 'queries.jsonl'), 'r', encoding='utf-8') as file:
+        queries = [json.loads(line) for line in file if line.strip()]
+
+    detector, build_seconds = timed(TextSimilarityDetector, os.path.join(args.dataset, 'files'), cache_dir=args.cache_dir,
+                                    index_type=args.index_type, candidate_count=args.candidate_count)
+    after_build = peak_rss_mb()
+
+    latencies = {stage: [] for stage in STAGES}
+    matches = []
+    for query in queries:
+        latencies['preprocess_text'].append(timed(detector.preprocessor.preprocess_text, query['text'])[1])
+        latencies['rank_similar'].append(timed(detector.rank_similar, query['text'])[1])
+        (filename, _), seconds = timed(detector.check_similarity, query['text'])
+        latencies['check_similarity'].append(seconds)
+        matches.append(filename)
+
+    detection = {}
+    for kind in sorted({query['kind'] for query in queries}):
+        pairs = [(query, filename) for query, filename in zip(queries, matches) if query['kind'] == kind]
+        if kind == 'clean':
+            detection['clean_false_positive_rate'] = sum(filename in detector.file_names for _, filename in pairs) / len(pairs)
+        else:
+            detection[f"{kind}_top1_accuracy"] = sum(query['source'] == filename for query, filename in pairs) / len(pairs)
+
+    results = {
+        'meta': {'commit': git_commit(), 'date': datetime.datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'parameters': vars(args)},
+        'corpus': {'documents': len(detector.file_names), 'queries': len(queries)},
+        'build_seconds': build_seconds,
+        'stages': {stage: summarize(values) for stage, values in latencies.items() if values},
+        'memory': {'after_build_mb': after_build, 'peak_mb': peak_rss_mb()},
+        'detection': detection,
+    }
+    output = args.output or os.path.join('benchmark_results', f"detection-{results['meta']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+
+    print(f"Detector construido con {len(detector.file_names)} textos en {build_seconds:.2f} s")
+    for stage, stats in results['stages'].items():
+        print(f"{stage}: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, {stats['throughput_per_s']:.1f}/s")
+    peak = results['memory']['peak_mb']
+    print(f"Memoria máxima: {peak:.1f} MB" if peak is not None else "Memoria máxima: no disponible")
+    print("Detección: " + ", ".join(f"{name} {value:.0%}" for name, value in detection.items()))
+    print(f"Resultados guardados en {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        print(f"Comparación con {baseline['meta'].get('commit')} ({baseline['meta'].get('date')}):")
+        for stage, stats in results['stages'].items():
+            previous = baseline.get('stages', {}).get(stage)
+            if previous:
+                print(f"  {stage}: " + ", ".join(f"{name} {previous[name]:.2f} -> {stats[name]:.2f} ({stats[name] / previous[name] - 1:+.0%})"
+                                                for name in ('p50_ms', 'p95_ms', 'throughput_per_s') if previous[name]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
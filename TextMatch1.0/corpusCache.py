@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+
+
+class CorpusCache:
+    """
+    A persistent on-disk cache of preprocessed texts.
+
+    Entries are keyed by the SHA-256 of the file content and belong to a preprocessing configuration:
+    if the configuration changes (different SpaCy model, stop words, ...) the stored entries are discarded.
+    Everything is kept in a single manifest.json file inside the cache directory.
+
+    Attributes:
+        directory (str): Directory where the manifest is stored.
+        config (dict): Preprocessing configuration the entries depend on.
+        entries (dict): Mapping from content hash to preprocessed text.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, directory, config):
+        """
+        Initializes the CorpusCache and loads the manifest if it matches the configuration.
+
+        Args:
+            directory (str): Directory where the cache is stored.
+            config (dict): JSON serializable preprocessing configuration.
+        """
+        self.directory = directory
+        self.config = config
+        self.entries = {}
+        self._dirty = False
+        self._load_manifest()
+
+    @staticmethod
+    def content_hash(text):
+        """
+        Computes the key of a text.
+
+        Args:
+            text (str): Raw text.
+
+        Returns:
+            str: Hexadecimal SHA-256 digest of the text.
+        """
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, 'manifest.json')
+
+    def _load_manifest(self):
+        """
+        Loads the entries, ignoring a manifest written with another format or configuration.
+        """
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return
+        if manifest.get('format') != self.FORMAT_VERSION or manifest.get('config') != self.config:
+            return
+        self.entries = manifest.get('entries', {})
+
+    def get(self, key):
+        """
+        Returns the cached preprocessed text.
+
+        Args:
+            key (str): Content hash of the text.
+
+        Returns:
+            str: Preprocessed text, or None if it is not cached.
+        """
+        return self.entries.get(key)
+
+    def put(self, key, preprocessed_text):
+        """
+        Stores a preprocessed text. It is written to disk on the next call to save.
+
+        Args:
+            key (str): Content hash of the text.
+            preprocessed_text (str): Preprocessed text.
+        """
+        self.entries[key] = preprocessed_text
+        self._dirty = True
+
+    def prune(self, keep_keys):
+        """
+        Removes the entries of texts that no longer exist.
+
+        Args:
+            keep_keys (iterable): Content hashes to keep.
+        """
+        keep_keys = set(keep_keys)
+        stale = [key for key in self.entries if key not in keep_keys]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._dirty = True
+
+    def save(self):
+        """
+        Writes the manifest to disk atomically if it changed.
+        """
+        if not self._dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = {'format': self.FORMAT_VERSION, 'config': self.config, 'entries': self.entries}
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, ensure_ascii=False)
+        os.replace(tmp_path, self._manifest_path())
+        self._dirty = False
@@ -0,0 +1,136 @@
+import os
+import json
+import tarfile
+import zipfile
+from itertools import islice
+
+TEXT_EXTENSIONS = (".txt",)
+TAR_EXTENSIONS = (".tar.gz", ".tgz", ".tar")
+ZIP_EXTENSIONS = (".zip",)
+JSONL_EXTENSIONS = (".jsonl",)
+
+
+class ReadOnlyDocumentError(Exception):
+    """
+    Raised when a document cannot be written or deleted, because it is inside an archive or a dump, or the
+    collection is not a directory.
+    """
+
+
+def read_documents(path):
+    """
+    Reads the documents of a collection one at a time, so the whole collection is never held in memory.
+
+    A collection is a directory, read recursively, a .txt file, a .tar.gz, .tgz, .tar or .zip archive of
+    .txt files, or a JSONL dump with one {"filename" or "id": ..., "text": ...} object per line. Directories
+    may contain archives and dumps as well. Documents are named by their path relative to the collection;
+    the ones inside an archive or a dump are prefixed with its name, e.g. "dump.jsonl/42".
+
+    Args:
+        path (str): Directory or file of the collection.
+
+    Returns:
+        generator: Tuples with the name and the text of each document, in sorted order.
+
+    Raises:
+        ValueError: If a JSONL line is not an object with a text.
+    """
+    if os.path.isdir(path):
+        for root, directories, filenames in os.walk(path):
+            directories.sort()
+            for filename in sorted(filenames):
+                filepath = os.path.join(root, filename)
+                yield from _read_file(filepath, os.path.relpath(filepath, path).replace(os.sep, "/"))
+    else:
+        yield from _read_file(path, os.path.basename(path))
+
+
+def _read_file(filepath, name):
+    lowered = name.lower()
+    if lowered.endswith(TEXT_EXTENSIONS):
+        with open(filepath, "r", encoding="utf-8") as file:
+            yield name, file.read()
+    elif lowered.endswith(TAR_EXTENSIONS):
+        yield from _read_tar(filepath, name)
+    elif lowered.endswith(ZIP_EXTENSIONS):
+        yield from _read_zip(filepath, name)
+    elif lowered.endswith(JSONL_EXTENSIONS):
+        with open(filepath, "r", encoding="utf-8") as file:
+            yield from _read_jsonl(file, name)
+
+
+def _read_tar(filepath, name):
+    # Streaming mode reads the members in order without seeking, so compressed archives are decompressed once
+    with tarfile.open(filepath, "r|*") as archive:
+        for member in archive:
+            if member.isfile() and member.name.lower().endswith(TEXT_EXTENSIONS):
+                yield f"{name}/{member.name}", archive.extractfile(member).read().decode("utf-8")
+
+
+def _read_zip(filepath, name):
+    with zipfile.ZipFile(filepath) as archive:
+        for member in sorted(archive.namelist()):
+            if not member.endswith("/") and member.lower().endswith(TEXT_EXTENSIONS):
+                with archive.open(member) as file:
+                    yield f"{name}/{member}", file.read().decode("utf-8")
+
+
+def _read_jsonl(file, name):
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+            raise ValueError(f"Line {line_number} of {name} has no text")
+        document_id = record.get("filename", record.get("id", line_number))
+        yield f"{name}/{document_id}", record["text"]
+
+
+def document_path(path, name):
+    """
+    Finds the file of a document that can be written or deleted: a .txt file of a directory collection,
+    outside any archive or dump.
+
+    Args:
+        path (str): Directory or file of the collection.
+        name (str): Name of the document relative to the collection, with "/" separators, e.g. "nested/a.txt".
+
+    Returns:
+        str: Path of the file, which may not exist yet.
+
+    Raises:
+        ValueError: If the name is not a relative .txt path without hidden or parent directories.
+        ReadOnlyDocumentError: If the collection is not a directory or the document is inside an archive or a dump.
+    """
+    parts = name.split("/")
+    if "\\" in name or any(not part or part.startswith(".") for part in parts):
+        raise ValueError(f"Invalid document name: {name}")
+    if os.path.exists(path) and not os.path.isdir(path):
+        raise ReadOnlyDocumentError(f"{path} is not a directory, so its documents cannot be changed")
+    parent = path
+    for part in parts[:-1]:
+        parent = os.path.join(parent, part)
+        if os.path.exists(parent) and not os.path.isdir(parent):
+            raise ReadOnlyDocumentError(f"{name} is inside {part}, so it cannot be changed")
+    if not name.lower().endswith(TEXT_EXTENSIONS):
+        raise ValueError(f"Invalid document name: {name}")
+    return os.path.join(path, *parts)
+
+
+def batched(iterable, size):
+    """
+    Groups the items of an iterable into lists, reading only one list at a time.
+
+    Args:
+        iterable (iterable): The items.
+        size (int): Maximum number of items per list.
+
+    Returns:
+        generator: Lists of at most size items.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
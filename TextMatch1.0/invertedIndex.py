@@ -0,0 +1,185 @@
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from annIndex import top_k, dot_scores, prepare_query, splice_csr
+
+
+class InvertedIndex:
+    """
+    An exact scorer of sparse TF-IDF vectors that only touches the documents sharing terms with the query.
+
+    The postings of every term are the columns of a CSC copy of the matrix, with the largest weight of each
+    term kept as an upper bound of its contribution to a score. Queries are pruned with MaxScore
+    (Turtle and Flood, 1995): the query terms with the smallest bounds whose bounds add up to at most the
+    score to beat are non-essential, since a document containing only those terms cannot beat it. Only
+    the documents in the postings of the other terms are scored, with their full rows. For top-k queries the
+    score to beat is raised first with the documents that weigh the most in the term with the largest bound.
+
+    Rows are L2-normalized on build, so scores are cosine similarities and the results are the same as
+    scoring every document.
+    """
+
+    # Bounds are compared in float64 with float32 scores, so they are loosened by this much
+    TOLERANCE = 1e-6
+
+    def __init__(self):
+        """
+        Initializes an empty InvertedIndex.
+        """
+        self.rows = None
+        self.postings = None
+        self.max_weights = None
+
+    def __len__(self):
+        return 0 if self.rows is None else self.rows.shape[0]
+
+    def build(self, vectors):
+        """
+        Indexes a sparse matrix of document vectors.
+
+        Args:
+            vectors (scipy.sparse matrix): One TF-IDF row per document.
+
+        Returns:
+            InvertedIndex: The index itself.
+        """
+        self.rows = normalize(sparse.csr_matrix(vectors, dtype=np.float32))
+        self.postings = self.rows.tocsc()
+        self.postings.sort_indices()
+        self.max_weights = self.postings.max(axis=0).toarray().ravel().astype(np.float64)
+        return self
+
+    def _posting(self, term):
+        start, stop = self.postings.indptr[term], self.postings.indptr[term + 1]
+        return self.postings.indices[start:stop], self.postings.data[start:stop]
+
+    def candidates(self, vector, k=None, threshold=0.0):
+        """
+        Selects the documents that can score above the threshold or among the k best.
+
+        Args:
+            vector (scipy.sparse matrix): The query vector.
+            k (int): The number of results, or None for every document above the threshold.
+            threshold (float): The score results must exceed.
+
+        Returns:
+            tuple: The sorted ids of the candidate documents and the normalized query vector.
+        """
+        query = prepare_query(vector, self.rows)
+        empty = np.array([], dtype=np.int64)
+        if len(self) == 0 or query.nnz == 0:
+            return empty, query
+        terms, weights = query.indices, query.data.astype(np.float64)
+        bounds = weights * self.max_weights[terms]
+        order = np.argsort(bounds, kind="stable")
+
+        to_beat = threshold
+        seeds = empty
+        if k is not None and k > 0:
+            # The k-th best score among a few documents is a lower bound of the k-th best score overall
+            docs, doc_weights = self._posting(terms[order[-1]])
+            seeds = docs[np.argsort(-doc_weights, kind="stable")[:k]]
+            if len(seeds) == k:
+                to_beat = max(to_beat, float(np.min(dot_scores(self.rows[seeds], query))))
+
+        essential = order[np.cumsum(bounds[order]) > to_beat - self.TOLERANCE]
+        postings = [self._posting(term)[0] for term in terms[essential]]
+        return np.unique(np.concatenate(postings + [seeds])).astype(np.int64), query
+
+    def query(self, vector, k=None, threshold=0.0):
+        """
+        Finds the documents most similar to a query.
+
+        Args:
+            vector (scipy.sparse matrix): The query vector.
+            k (int): The number of results, or None for every document above the threshold.
+            threshold (float): The score results must exceed.
+
+        Returns:
+            tuple: The document ids and cosine similarities of the results, sorted by decreasing similarity.
+        """
+        candidates, query = self.candidates(vector, k, threshold)
+        scores = dot_scores(self.rows[candidates], query) if len(candidates) else np.array([], dtype=np.float32)
+        above = scores > threshold
+        candidates, scores = candidates[above], scores[above]
+        return top_k(scores, candidates, len(scores) if k is None else k)
+
+    def upsert(self, doc_id, vector):
+        """
+        Sets the vector of a document, appending it when doc_id is the number of indexed documents.
+        Only the postings and bounds of the terms of the old and new vectors change, and the index itself
+        is not modified, so it can keep serving queries while the copy is built.
+
+        Args:
+            doc_id (int): The id of the document, at most the number of indexed documents.
+            vector (scipy.sparse matrix): The new vector of the document.
+
+        Returns:
+            InvertedIndex: A new index with the document updated.
+        """
+        row = prepare_query(vector, self.rows)
+        stop = min(doc_id + 1, len(self))
+        postings = self._remove_postings(doc_id, shift=False) if doc_id < len(self) else self.postings
+        postings = self._insert_postings(postings, doc_id, row)
+        return self._with(splice_csr(self.rows, doc_id, stop, row), postings, np.union1d(self.rows[doc_id:stop].indices, row.indices))
+
+    def delete(self, doc_id):
+        """
+        Removes a document. The ids of the following documents are shifted down by one, like the rows of the corpus.
+
+        Args:
+            doc_id (int): The id of the document.
+
+        Returns:
+            InvertedIndex: A new index without the document.
+        """
+        postings = self._remove_postings(doc_id, shift=True)
+        return self._with(splice_csr(self.rows, doc_id, doc_id + 1), postings, self.rows[doc_id].indices)
+
+    def _positions(self, postings, terms, doc_id):
+        # The position of doc_id in the sorted posting of every term, or where it would be inserted
+        return np.array([postings.indptr[term] + np.searchsorted(postings.indices[postings.indptr[term]:postings.indptr[term + 1]], doc_id)
+                         for term in terms], dtype=np.int64)
+
+    def _remove_postings(self, doc_id, shift):
+        """
+        Removes the entries of a document from the postings of its terms, and optionally shifts the ids of the
+        following documents down by one.
+        """
+        terms = self.rows[doc_id].indices
+        positions = self._positions(self.postings, terms, doc_id)
+        indices = np.delete(self.postings.indices, positions)
+        if shift:
+            indices[indices > doc_id] -= 1
+        indptr = self.postings.indptr - np.concatenate(([0], np.cumsum(np.bincount(terms, minlength=self.postings.shape[1]))))
+        n_documents = self.postings.shape[0] - 1 if shift else self.postings.shape[0]
+        return self._csc(np.delete(self.postings.data, positions), indices, indptr, n_documents)
+
+    def _insert_postings(self, postings, doc_id, row):
+        """
+        Inserts the entries of a document vector into the postings of its terms, keeping every posting sorted.
+        """
+        terms = row.indices
+        positions = self._positions(postings, terms, doc_id)
+        indices = np.insert(postings.indices, positions, doc_id)
+        data = np.insert(postings.data, positions, row.data)
+        indptr = postings.indptr + np.concatenate(([0], np.cumsum(np.bincount(terms, minlength=postings.shape[1]))))
+        return self._csc(data, indices, indptr, max(postings.shape[0], doc_id + 1))
+
+    def _csc(self, data, indices, indptr, n_documents):
+        postings = sparse.csc_matrix((data, indices.astype(self.postings.indices.dtype, copy=False), indptr.astype(self.postings.indptr.dtype, copy=False)),
+                                     shape=(n_documents, self.postings.shape[1]), copy=False)
+        postings.has_sorted_indices = True
+        return postings
+
+    def _with(self, rows, postings, terms):
+        """
+        Creates an index with new rows and postings, recomputing the bounds of the given terms only.
+        """
+        index = InvertedIndex()
+        index.rows, index.postings = rows, postings
+        index.max_weights = self.max_weights.copy()
+        for term in terms:
+            weights = postings.data[postings.indptr[term]:postings.indptr[term + 1]]
+            index.max_weights[term] = weights.max() if len(weights) else 0.0
+        return index
@@ -0,0 +1,124 @@
+import os
+import json
+import hashlib
+from functools import lru_cache
+from nltk.stem import SnowballStemmer
+
+
+class LemmaTable:
+    """
+    A lookup table from the words of the texts to their SpaCy lemmas, so queries can be lemmatized without
+    running SpaCy. Words missing from the table are stemmed with the SnowballStemmer instead.
+
+    Words are lemmatized by SpaCy one at a time, without their sentence, so the few words whose lemma depends
+    on the context may differ from the full pipeline.
+
+    Attributes:
+        lemmas (dict): Lemmas of every word, separated by spaces when SpaCy splits the word.
+        stemmer (SnowballStemmer): Stemmer for the unknown words.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, lemmas=None):
+        """
+        Initializes the LemmaTable.
+
+        Args:
+            lemmas (dict): Lemmas of every word, separated by spaces.
+        """
+        self.lemmas = dict(lemmas or {})
+        self.stemmer = SnowballStemmer('english')
+        self._stem = lru_cache(maxsize=100000)(self.stemmer.stem)
+
+    def __len__(self):
+        return len(self.lemmas)
+
+    def __contains__(self, word):
+        return word in self.lemmas
+
+    def lemmatize_tokens(self, tokens):
+        """
+        Lemmatizes the tokens with the table, stemming the ones it does not have.
+
+        Args:
+            tokens (list): List of word tokens without stop words.
+
+        Returns:
+            list: List of lemmatized tokens.
+        """
+        lemmas = []
+        for token in tokens:
+            lemma = self.lemmas.get(token)
+            if lemma is None:
+                lemmas.append(self._stem(token))
+            elif ' ' in lemma:
+                lemmas.extend(lemma.split())
+            else:
+                lemmas.append(lemma)
+        return lemmas
+
+    def update(self, preprocessor, words, batch_size=1024):
+        """
+        Adds the SpaCy lemmas of the words that are not in the table yet.
+
+        Args:
+            preprocessor (TextPreprocessor): Preprocessor whose SpaCy model lemmatizes the words.
+            words (iterable): Words, e.g. the vocabulary of the texts.
+            batch_size (int): Number of words SpaCy processes per batch.
+
+        Returns:
+            int: Number of words added.
+        """
+        missing = sorted({word for word in words if word not in self.lemmas})
+        docs = preprocessor.nlp.pipe(missing, disable=preprocessor._disabled_components(), batch_size=batch_size)
+        for word, doc in zip(missing, docs):
+            self.lemmas[word] = " ".join(token.lemma_ for token in doc)
+        return len(missing)
+
+    @staticmethod
+    def path(directory, config):
+        """
+        Returns the file of the table of a preprocessing configuration.
+
+        Args:
+            directory (str): Directory of the tables.
+            config (dict): Preprocessing configuration, from TextPreprocessor.get_config.
+
+        Returns:
+            str: Path of the JSON file.
+        """
+        digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+        return os.path.join(directory, f"lemmas-{digest[:12]}.json")
+
+    def save(self, path):
+        """
+        Writes the table to a JSON file, replacing it atomically.
+
+        Args:
+            path (str): Path of the file.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump({'format': self.FORMAT_VERSION, 'lemmas': self.lemmas}, file, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a table written by save.
+
+        Args:
+            path (str): Path of the file.
+
+        Returns:
+            LemmaTable: The table, empty if the file does not exist or has another format.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                contents = json.load(file)
+        except (OSError, ValueError):
+            return cls()
+        if contents.get('format') != cls.FORMAT_VERSION:
+            return cls()
+        return cls(contents['lemmas'])
@@ -1,4 +1,5 @@
 import curses
+import logging
 from app import App
 
 def main(stdscr):
@@ -11,5 +12,7 @@ def main(stdscr):
 
 
 if __name__ == '__main__':
+    # Log messages go to a file, since writing them to the terminal would corrupt the curses screen
+    logging.basicConfig(filename='textmatch.log', level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
     curses.wrapper(main)
     main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import numpy as np
+from scipy import sparse
+from annIndex import FlatIndex, IVFIndex, load_index
+
+class TestAnnIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(5, 8))
+        self.vectors = centers[rng.integers(0, 5, 200)] + 0.05 * rng.normal(size=(200, 8))
+        self.path = "dataset/test_index.npz"
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_flat_index_finds_itself(self):
+        index = FlatIndex().build(self.vectors)
+        ids, scores = index.query(self.vectors[7], 3)
+        self.assertEqual(ids[0], 7)
+        self.assertAlmostEqual(float(scores[0]), 1.0, places=5)
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_ivf_with_all_lists_is_exact(self):
+        flat = FlatIndex().build(self.vectors)
+        ivf = IVFIndex(n_lists=5, n_probe=5).build(self.vectors)
+        for row in range(0, 200, 25):
+            self.assertEqual(set(ivf.query(self.vectors[row], 5)[0]), set(flat.query(self.vectors[row], 5)[0]))
+
+    def test_save_and_load(self):
+        index = IVFIndex(n_lists=4, n_probe=2).build(self.vectors)
+        index.save(self.path)
+        loaded = load_index(self.path)
+        self.assertIsInstance(loaded, IVFIndex)
+        self.assertEqual(loaded.n_probe, 2)
+        self.assertTrue(np.array_equal(loaded.query(self.vectors[3], 5)[0], index.query(self.vectors[3], 5)[0]))
+
+    def test_sparse_vectors(self):
+        matrix = sparse.random(50, 100, density=0.1, format='csr', random_state=0)
+        index = IVFIndex(n_lists=3, n_probe=3).build(matrix)
+        ids, _ = index.query(matrix[10], 1)
+        self.assertEqual(ids[0], 10)
+        index.save(self.path)
+        self.assertEqual(load_index(self.path).query(matrix[10], 1)[0][0], 10)
+
+    def test_sparse_upsert_and_delete_match_rebuild(self):
+        vectors = sparse.random(100, 30, density=0.2, format='csr', random_state=0)
+        vector = sparse.random(1, 30, density=0.3, format='csr', random_state=1)
+        expected = sparse.vstack([vectors[:3], vector, vectors[4:10], vectors[11:], vector], format='csr')
+        reference = FlatIndex().build(expected)
+        for index in (FlatIndex().build(vectors), IVFIndex(n_lists=4, n_probe=4).build(vectors)):
+            updated = index.upsert(100, vector).upsert(3, vector).delete(10)
+            self.assertEqual(len(updated), 100)
+            ids, scores = updated.query(vector, 5)
+            expected_ids, expected_scores = reference.query(vector, 5)
+            self.assertEqual(sorted(ids.tolist()), sorted(expected_ids.tolist()))
+            self.assertTrue(np.allclose(scores, expected_scores, atol=1e-5))
+
+    def test_ties_are_ranked_by_id(self):
+        vectors = np.tile(np.eye(8)[:2], (50, 1))
+        for index in (FlatIndex().build(vectors), IVFIndex(n_lists=3, n_probe=3).build(vectors)):
+            self.assertEqual(index.query(vectors[1], 1)[0].tolist(), [1])
+            self.assertEqual(index.query(vectors[0], 3)[0].tolist(), [0, 2, 4])
+            self.assertEqual(index.query(vectors[0], 60)[0][:51].tolist(), list(range(0, 100, 2)) + [1])
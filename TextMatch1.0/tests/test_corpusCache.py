@@ -0,0 +1,32 @@
+import unittest
+import os
+import shutil
+from corpusCache import CorpusCache
+
+class TestCorpusCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = "dataset/test_cache"
+        self.config = {'spacy_model': 'test-1.0', 'stop_words': 'abc'}
+        self.cache = CorpusCache(self.directory, self.config)
+        self.key = CorpusCache.content_hash("This is a test document.")
+
+    def tearDown(self):
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+
+    def test_entries_survive_reload(self):
+        self.cache.put(self.key, "test document")
+        self.cache.save()
+        self.assertEqual(CorpusCache(self.directory, self.config).get(self.key), "test document")
+
+    def test_config_change_invalidates_entries(self):
+        self.cache.put(self.key, "test document")
+        self.cache.save()
+        other = CorpusCache(self.directory, {'spacy_model': 'test-2.0', 'stop_words': 'abc'})
+        self.assertIsNone(other.get(self.key))
+
+    def test_prune_removes_stale_entries(self):
+        self.cache.put(self.key, "test document")
+        self.cache.prune([])
+        self.assertIsNone(self.cache.get(self.key))
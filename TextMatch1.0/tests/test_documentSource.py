@@ -0,0 +1,40 @@
+import os
+import json
+import zipfile
+import tempfile
+import unittest
+from documentSource import ReadOnlyDocumentError, batched, document_path, read_documents
+
+class TestDocumentSource(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read_documents(self):
+        os.makedirs(os.path.join(self.root, "nested"))
+        with open(os.path.join(self.root, "nested", "a.txt"), "w", encoding="utf-8") as file:
+            file.write("First.")
+        with zipfile.ZipFile(os.path.join(self.root, "b.zip"), "w") as archive:
+            archive.writestr("b.txt", "Zipped.")
+        with open(os.path.join(self.root, "c.jsonl"), "w", encoding="utf-8") as file:
+            file.write(json.dumps({"id": "c", "text": "Dumped."}) + "\n")
+        self.assertEqual(list(read_documents(self.root)), [("b.zip/b.txt", "Zipped."), ("c.jsonl/c", "Dumped."), ("nested/a.txt", "First.")])
+
+    def test_document_path(self):
+        with zipfile.ZipFile(os.path.join(self.root, "b.zip"), "w") as archive:
+            archive.writestr("b.txt", "Zipped.")
+        self.assertEqual(document_path(self.root, "nested/a.txt"), os.path.join(self.root, "nested", "a.txt"))
+        for name in ("../a.txt", "/a.txt", "nested//a.txt", ".hidden.txt", "a.md"):
+            with self.assertRaises(ValueError):
+                document_path(self.root, name)
+        with self.assertRaises(ReadOnlyDocumentError):
+            document_path(self.root, "b.zip/b.txt")
+        with self.assertRaises(ReadOnlyDocumentError):
+            document_path(os.path.join(self.root, "b.zip"), "c.txt")
+
+    def test_batched(self):
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
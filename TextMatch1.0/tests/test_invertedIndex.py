@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+from invertedIndex import InvertedIndex
+
+class TestInvertedIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Zipf-like term frequencies, like a TF-IDF matrix of real texts
+        self.vectors = sparse.random(500, 2000, density=0.01, format="csr", random_state=0, data_rvs=lambda n: rng.random(n) + 0.1)
+        self.vectors = normalize(self.vectors)
+        self.index = InvertedIndex().build(self.vectors)
+        self.queries = [self.vectors[i] + 0.5 * normalize(sparse.random(1, 2000, density=0.005, random_state=i)) for i in range(0, 500, 50)]
+
+    def brute_force(self, query):
+        return (normalize(self.vectors).astype(np.float32) @ normalize(query).astype(np.float32).T).toarray().ravel()
+
+    def test_top_k_matches_brute_force(self):
+        for query in self.queries:
+            ids, scores = self.index.query(query, 5)
+            expected = self.brute_force(query)
+            self.assertEqual(ids.tolist(), np.argsort(-expected, kind="stable")[:5].tolist())
+            self.assertTrue(np.allclose(scores, np.sort(expected)[::-1][:5], atol=1e-5))
+
+    def test_threshold_matches_brute_force(self):
+        for query in self.queries:
+            ids, scores = self.index.query(query, threshold=0.1)
+            expected = self.brute_force(query)
+            self.assertEqual(sorted(ids.tolist()), np.nonzero(expected > 0.1)[0].tolist())
+            self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_pruning_skips_documents(self):
+        candidates, _ = self.index.candidates(self.queries[0], 1)
+        self.assertLess(len(candidates), len(self.index))
+        self.assertIn(0, candidates.tolist())
+
+    def test_query_without_known_terms(self):
+        ids, scores = self.index.query(sparse.csr_matrix((1, 2000)), 5)
+        self.assertEqual(len(ids), 0)
+        self.assertEqual(len(scores), 0)
+
+    def test_upsert_and_delete_match_rebuild(self):
+        row = self.vectors[3]
+        updated = self.index.upsert(10, row).delete(0)
+        reference = InvertedIndex().build(sparse.vstack([self.vectors[1:10], row, self.vectors[11:]]))
+        self.assertEqual(len(updated), 499)
+        for query in self.queries:
+            ids, scores = updated.query(query, 5)
+            expected_ids, expected_scores = reference.query(query, 5)
+            self.assertEqual(ids.tolist(), expected_ids.tolist())
+            self.assertTrue(np.allclose(scores, expected_scores))
+
+    def test_upsert_and_delete_match_rebuilt_postings(self):
+        row = self.vectors[3]
+        updated = self.index.upsert(500, row).upsert(10, self.vectors[20]).delete(0)
+        reference = InvertedIndex().build(sparse.vstack([self.vectors[1:10], self.vectors[20], self.vectors[11:], row]))
+        self.assertEqual(updated.postings.shape, reference.postings.shape)
+        self.assertTrue(np.array_equal(updated.postings.indptr, reference.postings.indptr))
+        self.assertTrue(np.array_equal(updated.postings.indices, reference.postings.indices))
+        self.assertTrue(np.allclose(updated.postings.data, reference.postings.data))
+        self.assertTrue(np.allclose(updated.max_weights, reference.max_weights))
+        self.assertEqual(abs(updated.rows - reference.rows).max(), 0)
+        self.assertEqual(len(self.index), 500)
@@ -0,0 +1,30 @@
+import os
+import shutil
+import tempfile
+import unittest
+from lemmaTable import LemmaTable
+from textPreprocessor import TextPreprocessor
+
+class TestLemmaTable(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.preprocessor = TextPreprocessor()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_lemmatize_tokens(self):
+        table = LemmaTable({'cats': 'cat', 'gonna': 'go to'})
+        self.assertEqual(table.lemmatize_tokens(['cats', 'gonna', 'running']), ['cat', 'go', 'to', 'run'])
+
+    def test_update(self):
+        table = LemmaTable()
+        self.assertEqual(table.update(self.preprocessor, ['cats', 'dogs', 'cats']), 2)
+        self.assertEqual(table.update(self.preprocessor, ['cats']), 0)
+        self.assertIn('dogs', table)
+
+    def test_save_and_load(self):
+        path = LemmaTable.path(self.directory, self.preprocessor.get_config())
+        LemmaTable({'cats': 'cat'}).save(path)
+        self.assertEqual(LemmaTable.load(path).lemmas, {'cats': 'cat'})
+        self.assertEqual(len(LemmaTable.load(os.path.join(self.directory, 'missing.json'))), 0)
@@ -1,4 +1,5 @@
 import unittest
+from lemmaTable import LemmaTable
 from textPreprocessor import TextPreprocessor
 
 class TestTextPreprocessor(unittest.TestCase):
@@ -28,4 +29,21 @@ class TestTextPreprocessor(unittest.TestCase):
     def test_preprocess_text(self):
         text = "Hello, World! This is a test."
         expected_output = "hello world test"
-        self.assertEqual(self.preprocessor.preprocess_text(text), expected_output)
\ No newline at end of file
+        self.assertEqual(self.preprocessor.preprocess_text(text), expected_output)
+
+    def test_preprocess_texts(self):
+        texts = ["Hello, World! This is a test.", "Cats are running in the garden.", ""]
+        expected_output = [self.preprocessor.preprocess_text(text) for text in texts]
+        self.assertEqual(self.preprocessor.preprocess_texts(texts, batch_size=2), expected_output)
+
+    def test_fast_tokenize(self):
+        text = "Hello, World! This is a test 42 of ab1cd words."
+        self.assertEqual(self.preprocessor.fast_tokenize(text), self.preprocessor._tokenize(text))
+
+    def test_preprocess_text_with_lemma_table(self):
+        preprocessor = TextPreprocessor(lemmatizer='table')
+        with self.assertRaises(ValueError):
+            preprocessor.preprocess_text("Cats", fast=True)
+        preprocessor.lemma_table = LemmaTable({'cats': 'cat'})
+        self.assertEqual(preprocessor.preprocess_text("Cats barking"), "cat bark")
+        self.assertEqual(preprocessor.preprocess_texts(["Cats", "barking"]), ["cat", "bark"])
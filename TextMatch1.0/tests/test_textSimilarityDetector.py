@@ -1,5 +1,8 @@
 import unittest
 import os
+import json
+import tempfile
+from documentSource import ReadOnlyDocumentError
 from textSimilarityDetector import TextSimilarityDetector
 
 class TestTextSimilarityDetector(unittest.TestCase):
@@ -48,3 +51,80 @@ class TestTextSimilarityDetector(unittest.TestCase):
         result = self.detector.check_similarity(input_text)
         self.assertEqual(result[0], "No se encontraron textos similares")
         self.assertEqual(result[1], 0.0)
+
+    def test_check_similarity_returns_best_match(self):
+        self.detector.upsert_text("test_3.txt", "A fourth test document about coral reefs and marine biology.")
+        self.detector.refit()
+        for query, expected in (("A third test document for testing purposes.", "test_2.txt"),
+                                ("A test document about coral reefs and marine biology.", "test_3.txt")):
+            ranking = self.detector.rank_similar(query, k=2, similarity_threshold=0.0)
+            self.assertEqual(ranking[0][0], expected)
+            self.assertGreater(ranking[0][1], ranking[1][1])
+            self.assertEqual(self.detector.check_similarity(query)[0], expected)
+
+    def test_rank_similar(self):
+        ranking = self.detector.rank_similar("A third test document for testing purposes.", k=None, similarity_threshold=0.0)
+        self.assertEqual(ranking[0][0], "test_2.txt")
+        self.assertEqual(sorted(name for name, _ in ranking), sorted(self.detector.file_names))
+        self.assertEqual([similarity for _, similarity in ranking], sorted((similarity for _, similarity in ranking), reverse=True))
+        self.assertEqual(len(self.detector.rank_similar("A third test document for testing purposes.", k=2, similarity_threshold=0.0)), 2)
+
+    def test_check_similarity_with_candidate_index(self):
+        detector = TextSimilarityDetector(self.test_directory, index_type='ivf', index_params={'n_lists': 2, 'n_probe': 2}, candidate_count=2)
+        self.assertIsNotNone(detector.index)
+        filename, similarity = detector.check_similarity("A third test document for testing purposes.")
+        self.assertEqual(filename, "test_2.txt")
+        self.assertGreater(similarity, 0.3)
+
+    def test_upsert_and_remove_text(self):
+        self.assertTrue(self.detector.upsert_text("test_3.txt", "Quantum chromodynamics describes gluons and quarks."))
+        self.assertTrue(os.path.exists(os.path.join(self.test_directory, "test_3.txt")))
+        self.assertEqual(self.detector.X.shape[0], 4)
+        self.assertFalse(self.detector.upsert_text("test_0.txt", "Completely different words about cooking pasta."))
+        self.assertEqual(self.detector.file_names[-1], "test_3.txt")
+        self.assertTrue(self.detector.remove_text("test_1.txt"))
+        self.assertFalse(self.detector.remove_text("test_1.txt"))
+        self.assertEqual(len(self.detector.texts), 3)
+        self.assertEqual(self.detector.X.shape[0], 3)
+        self.assertEqual(self.detector.pending_changes, 3)
+
+    def test_refit_matches_full_rebuild(self):
+        self.detector.upsert_text("test_3.txt", "Quantum chromodynamics describes gluons and quarks.")
+        # Words outside the fitted vocabulary are only indexed after the refit
+        self.assertEqual(self.detector.check_similarity("Quantum chromodynamics describes gluons and quarks.")[1], 0.0)
+        self.detector.refit()
+        self.assertEqual(self.detector.check_similarity("Quantum chromodynamics describes gluons and quarks.")[0], "test_3.txt")
+        rebuilt = TextSimilarityDetector(self.test_directory)
+        order = [rebuilt.file_names.index(name) for name in self.detector.file_names]
+        self.assertEqual((self.detector.X - rebuilt.X[order]).nnz, 0)
+        self.assertEqual(self.detector.pending_changes, 0)
+
+    def test_invalid_filename(self):
+        with self.assertRaises(ValueError):
+            self.detector.upsert_text("../outside.txt", "text")
+
+    def test_nested_filename(self):
+        self.assertTrue(self.detector.upsert_text("nested/test_3.txt", "Quantum chromodynamics describes gluons and quarks."))
+        self.assertTrue(os.path.exists(os.path.join(self.test_directory, "nested", "test_3.txt")))
+        self.assertTrue(self.detector.remove_text("nested/test_3.txt"))
+        os.rmdir(os.path.join(self.test_directory, "nested"))
+
+    def test_dump_is_read_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dump.jsonl")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(json.dumps({"id": 1, "text": "This is a test document."}) + "\n")
+            detector = TextSimilarityDetector(path)
+            with self.assertRaises(ReadOnlyDocumentError):
+                detector.upsert_text("new.txt", "Another test document.")
+            with self.assertRaises(ReadOnlyDocumentError):
+                detector.remove_text("dump.jsonl/1")
+            self.assertEqual(detector.file_names, ["dump.jsonl/1"])
+
+    def test_lemma_table(self):
+        detector = TextSimilarityDetector(self.test_directory, lemmatizer='table')
+        self.assertIn("document", detector.preprocessor.lemma_table)
+        self.assertEqual(detector.texts, self.detector.texts)
+        self.assertEqual(detector.check_similarity("A third test document for testing purposes.")[0], "test_2.txt")
+        detector.upsert_text("test_3.txt", "Quantum chromodynamics describes gluons.")
+        self.assertIn("gluons", detector.preprocessor.lemma_table)
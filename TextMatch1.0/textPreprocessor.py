@@ -1,13 +1,44 @@
+import os
 import spacy
 import re
+import hashlib
 import nltk
 from nltk.stem import SnowballStemmer
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
+# NLTK resources the preprocessor uses, by package name and path in the NLTK data directories
+NLTK_RESOURCES = {'punkt': 'tokenizers/punkt', 'stopwords': 'corpora/stopwords'}
+
+# Missing NLTK data is only downloaded when allowed, so hosts without network access do not hang
+NLTK_DOWNLOAD = os.environ.get('TEXTMATCH_NLTK_DOWNLOAD', '0') == '1'
+
+
+def require_nltk_data(download=None):
+    """
+    Checks that the NLTK resources are installed locally, without touching the network.
+
+    Args:
+        download (bool): Whether to download the missing resources. Defaults to TEXTMATCH_NLTK_DOWNLOAD.
+
+    Raises:
+        LookupError: If some resources are missing and cannot be downloaded.
+    """
+    missing = []
+    for name, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(name)
+    if missing and (NLTK_DOWNLOAD if download is None else download):
+        for name in missing:
+            nltk.download(name, quiet=True)
+        return require_nltk_data(download=False)
+    if missing:
+        raise LookupError(f"Missing NLTK data: {', '.join(missing)}. Install it with: python -m nltk.downloader {' '.join(missing)}")
+
+_DIGITS = re.compile(r'\d+')
+_WORDS = re.compile(r'\w+')
 
 class TextPreprocessor:
     """
@@ -17,15 +48,29 @@ class TextPreprocessor:
         nlp (spacy.Language): SpaCy language model for text processing.
         stop_words (set): Set of stop words to be removed from text.
         stemmer (SnowballStemmer): Stemmer for stemming tokens.
+        lemmatizer (str): 'spacy' or 'table', which lemmatizes with lemma_table once it is set.
+        lemma_table (LemmaTable): Lemmas of the known words, or None.
     """
 
-    def __init__(self):
+    # Lemmatization only needs the tagger, attribute ruler and lemmatizer
+    LEMMATIZE_DISABLED = ['parser', 'ner', 'senter']
+
+    def __init__(self, lemmatizer='spacy'):
         """
         Initializes the TextPreprocessor.
+
+        Args:
+            lemmatizer (str): 'spacy' lemmatizes every text with SpaCy, 'table' looks the words up in the
+                lemma_table once it is set, stemming the unknown ones.
         """
+        if lemmatizer not in ('spacy', 'table'):
+            raise ValueError(f"Unknown lemmatizer: {lemmatizer}")
+        require_nltk_data()
         self.nlp = spacy.load('en_core_web_sm')
         self.stop_words = set(stopwords.words('english'))
         self.stemmer = SnowballStemmer('english')
+        self.lemmatizer = lemmatizer
+        self.lemma_table = None
 
     def clean_text(self, text):
         """
@@ -64,9 +109,15 @@ class TextPreprocessor:
         Returns:
             list: List of lemmatized tokens.
         """
-        doc = self.nlp(" ".join(tokens))
+        doc = self.nlp(" ".join(tokens), disable=self._disabled_components())
         return [token.lemma_ for token in doc]
 
+    def _disabled_components(self):
+        """
+        Returns the components of the SpaCy pipeline that lemmatization does not need.
+        """
+        return [name for name in self.LEMMATIZE_DISABLED if name in self.nlp.pipe_names]
+
     def stem_tokens(self, tokens):
         """
         Stems the tokens using the SnowballStemmer.
@@ -79,18 +130,100 @@ class TextPreprocessor:
         """
         return [self.stemmer.stem(word) for word in tokens]
 
-    def preprocess_text(self, text):
+    def get_config(self):
+        """
+        Describes the preprocessing configuration, so cached results can be invalidated when it changes.
+
+        Returns:
+            dict: SpaCy model name and version, pipeline components and a hash of the stop words.
+        """
+        stop_words_hash = hashlib.sha1(" ".join(sorted(self.stop_words)).encode('utf-8')).hexdigest()
+        return {
+            'spacy_model': f"{self.nlp.meta.get('name')}-{self.nlp.meta.get('version')}",
+            'pipeline': list(self.nlp.pipe_names),
+            'stop_words': stop_words_hash,
+        }
+
+    def preprocess_text(self, text, fast=None):
         """
         Preprocesses the input text by cleaning, tokenizing, removing stop words, and lemmatizing.
 
         Args:
             text (str): Input text to be preprocessed.
+            fast (bool): Whether to skip SpaCy, see use_fast_path. None uses the lemma table if it is in use.
 
         Returns:
             str: Preprocessed text.
         """
+        if self.use_fast_path(fast):
+            lemmatized_tokens = self.lemma_table.lemmatize_tokens(self.fast_tokenize(text))
+        else:
+            lemmatized_tokens = self.lemmatize_tokens(self._tokenize(text))
+        return " ".join(lemmatized_tokens)
+
+    def preprocess_texts(self, texts, batch_size=64, n_process=1, fast=None):
+        """
+        Preprocesses many texts at once, streaming them through SpaCy in batches.
+
+        Args:
+            texts (iterable): Input texts to be preprocessed.
+            batch_size (int): Number of texts SpaCy processes per batch.
+            n_process (int): Number of processes SpaCy uses. -1 uses every CPU.
+            fast (bool): Whether to skip SpaCy, see use_fast_path. None uses the lemma table if it is in use.
+
+        Returns:
+            list: Preprocessed texts, the same as calling preprocess_text on each one.
+        """
+        if self.use_fast_path(fast):
+            return [self.preprocess_text(text, fast=True) for text in texts]
+        joined_tokens = (" ".join(self._tokenize(text)) for text in texts)
+        docs = self.nlp.pipe(joined_tokens, disable=self._disabled_components(), batch_size=batch_size, n_process=n_process)
+        return [" ".join(token.lemma_ for token in doc) for doc in docs]
+
+    def use_fast_path(self, fast=None):
+        """
+        Decides whether texts are lemmatized with the lemma table instead of SpaCy.
+
+        Args:
+            fast (bool): True to use the table, False to use SpaCy. None uses the table when the lemmatizer
+                is 'table' and the table is set.
+
+        Returns:
+            bool: Whether to use the table.
+
+        Raises:
+            ValueError: If the table is requested but not set.
+        """
+        if fast is None:
+            return self.lemmatizer == 'table' and self.lemma_table is not None
+        if fast and self.lemma_table is None:
+            raise ValueError("The lemma table is not loaded")
+        return fast
+
+    def fast_tokenize(self, text):
+        """
+        Tokenizes the text like _tokenize in a single pass of precompiled regular expressions, without NLTK.
+        It only differs for the few words NLTK splits further, like "cannot".
+
+        Args:
+            text (str): Input text.
+
+        Returns:
+            list: Tokens ready to be lemmatized.
+        """
+        stop_words = self.stop_words
+        return [word for word in _WORDS.findall(_DIGITS.sub('', text.lower())) if word not in stop_words]
+
+    def _tokenize(self, text):
+        """
+        Cleans and tokenizes the text and removes its stop words.
+
+        Args:
+            text (str): Input text.
+
+        Returns:
+            list: Tokens ready to be lemmatized.
+        """
         text = self.clean_text(text)
         tokens = word_tokenize(text)
-        tokens = self.remove_stopwords(tokens)
-        lemmatized_tokens = self.lemmatize_tokens(tokens)
-        return " ".join(lemmatized_tokens)
+        return self.remove_stopwords(tokens)
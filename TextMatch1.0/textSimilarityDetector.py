@@ -1,12 +1,30 @@
 import os
+import logging
+import threading
+import time
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from textPreprocessor import TextPreprocessor
+from corpusCache import CorpusCache
+from lemmaTable import LemmaTable
+from documentSource import batched, document_path, read_documents
+from annIndex import create_index, splice_csr
+from invertedIndex import InvertedIndex
+
+logger = logging.getLogger(__name__)
 
 class TextSimilarityDetector:
     """
     A class to detect text similarity using TF-IDF and cosine similarity.
 
+    Queries are scored with an inverted index over the TF-IDF vocabulary, which only touches the texts
+    sharing terms with the query, or with the candidates of an approximate index when candidate_count is set.
+
+    Texts can be added, updated and removed without rebuilding everything: new rows are vectorized with
+    the current vocabulary and IDF weights, and refit recomputes them over every text, either on demand
+    or periodically in a background thread.
+
     Attributes:
         preprocessor (TextPreprocessor): TextPreprocessor instance for text preprocessing.
         directory (str): Directory containing text files to be processed.
@@ -14,43 +32,272 @@ class TextSimilarityDetector:
         file_names (list): List of filenames corresponding to the texts.
         tfidf_vectorizer (TfidfVectorizer): TF-IDF vectorizer for text vectorization.
         X (scipy.sparse.csr.csr_matrix): TF-IDF matrix for the preprocessed texts.
+        cache (CorpusCache): Persistent cache of preprocessed texts, or None if disabled.
+        index (FlatIndex or IVFIndex): Candidate retrieval index over the TF-IDF matrix.
+        inverted_index (InvertedIndex): Postings of the TF-IDF vocabulary used to score queries exactly.
+        candidate_count (int): Number of candidates retrieved from the index per query, or None to score every text.
+        pending_changes (int): Number of texts changed since the IDF weights were last fitted.
     """
 
-    def __init__(self, directory):
+    # Number of raw texts read and preprocessed at a time
+    CHUNK_SIZE = 1024
+
+    def __init__(self, directory, cache_dir=None, index_type='flat', index_params=None, candidate_count=None, batch_size=64, n_process=1, lemmatizer='spacy'):
         """
         Initializes the TextSimilarityDetector with the directory of text files.
 
         Args:
-            directory (str): Path to the directory containing text files.
+            directory (str): Path to the directory or file of the texts: .txt files, read recursively,
+                .tar.gz and .zip archives or JSONL dumps.
+            cache_dir (str): Directory of the persistent preprocessing cache. None disables it.
+            index_type (str): Candidate retrieval index, 'flat' (exact) or 'ivf' (approximate).
+            index_params (dict): Constructor parameters of the index, e.g. {'n_probe': 4} for 'ivf'.
+            candidate_count (int): Number of candidate texts scored per query. None scores every text.
+            batch_size (int): Number of texts SpaCy preprocesses per batch.
+            n_process (int): Number of processes SpaCy uses to preprocess the texts. -1 uses every CPU.
+            lemmatizer (str): How queries are lemmatized, 'spacy' or 'table', which looks the words up in a table
+                of the SpaCy lemmas of the texts' vocabulary and stems the unknown ones. The texts themselves are
+                always lemmatized with SpaCy.
         """
-        self.preprocessor = TextPreprocessor()
+        self.preprocessor = TextPreprocessor(lemmatizer)
+        self.cache_dir = cache_dir
         self.directory = directory
+        self.cache = CorpusCache(cache_dir, self.preprocessor.get_config()) if cache_dir else None
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.candidate_count = candidate_count
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.index = None
+        self.inverted_index = None
         self.texts = []
         self.file_names = []
+        self.pending_changes = 0
+        self._state_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._refit_thread = None
         self._load_and_preprocess_texts()
         self._vectorize_texts()
 
     def _load_and_preprocess_texts(self):
         """
-        Loads and preprocesses all text files in the specified directory.
+        Loads and preprocesses all the texts of the specified directory. The texts are streamed in chunks
+        of CHUNK_SIZE, so only one chunk of raw texts is in memory at a time. Texts found in the cache
+        are not preprocessed again, and the rest are sent to SpaCy in batches.
         """
-        for filename in os.listdir(self.directory):
-            if filename.endswith('.txt'):
-                with open(os.path.join(self.directory, filename), 'r', encoding='utf-8') as file:
-                    text = file.read()
-                    preprocessed_text = self.preprocessor.preprocess_text(text)
-                    self.texts.append(preprocessed_text)
-                    self.file_names.append(filename)
+        keys = []
+        vocabulary = set() if self.preprocessor.lemmatizer == 'table' else None
+        for chunk in batched(read_documents(self.directory), self.CHUNK_SIZE):
+            missing = []
+            for filename, text in chunk:
+                if vocabulary is not None:
+                    vocabulary.update(self.preprocessor.fast_tokenize(text))
+                key = CorpusCache.content_hash(text)
+                self.texts.append(self.cache.get(key) if self.cache else None)
+                self.file_names.append(filename)
+                keys.append(key)
+                if self.texts[-1] is None:
+                    missing.append((len(self.texts) - 1, text))
+
+            preprocessed_texts = self.preprocessor.preprocess_texts([text for _, text in missing], batch_size=self.batch_size, n_process=self.n_process, fast=False)
+            for (i, _), preprocessed_text in zip(missing, preprocessed_texts):
+                self.texts[i] = preprocessed_text
+                if self.cache:
+                    self.cache.put(keys[i], preprocessed_text)
+
+        if self.cache:
+            self.cache.prune(keys)
+            self.cache.save()
+        if vocabulary is not None:
+            self._build_lemma_table(vocabulary)
         print("Número de archivos procesados:", len(self.texts))
 
+    def _lemma_table_path(self):
+        return LemmaTable.path(self.cache_dir, self.preprocessor.get_config()) if self.cache_dir else None
+
+    def _build_lemma_table(self, vocabulary):
+        """
+        Sets the table of the SpaCy lemmas of the vocabulary, loading the one saved in the cache directory and
+        only lemmatizing the words it does not have.
+
+        Args:
+            vocabulary (set): Words of the texts.
+        """
+        path = self._lemma_table_path()
+        table = LemmaTable.load(path) if path else LemmaTable()
+        if table.update(self.preprocessor, vocabulary, batch_size=self.batch_size * 16) and path:
+            table.save(path)
+        self.preprocessor.lemma_table = table
+
     def _vectorize_texts(self):
         """
         Vectorizes the preprocessed texts using TF-IDF.
         """
-        self.tfidf_vectorizer = TfidfVectorizer()
-        self.X = self.tfidf_vectorizer.fit_transform(self.texts)
+        self.tfidf_vectorizer, self.X, self.index, self.inverted_index = self._fit(self.texts)
         print("Dimensión de la matriz TF-IDF:", self.X.shape)
 
+    def _fit(self, texts):
+        """
+        Fits a TF-IDF vectorizer and builds the candidate and inverted indexes.
+
+        Args:
+            texts (list): Preprocessed texts.
+
+        Returns:
+            tuple: The fitted vectorizer, the TF-IDF matrix, the candidate index, or None without candidate_count,
+            and the inverted index.
+        """
+        tfidf_vectorizer = TfidfVectorizer()
+        X = tfidf_vectorizer.fit_transform(texts)
+        index = None
+        if self.candidate_count is not None:
+            index = create_index(self.index_type, **self.index_params).build(X)
+        return tfidf_vectorizer, X, index, InvertedIndex().build(X)
+
+    def _snapshot(self):
+        with self._state_lock:
+            return self.tfidf_vectorizer, self.X, self.index, self.inverted_index, self.texts, self.file_names
+
+    def _publish(self, tfidf_vectorizer, X, index, inverted_index, texts, file_names):
+        with self._state_lock:
+            self.tfidf_vectorizer, self.X, self.index, self.inverted_index = tfidf_vectorizer, X, index, inverted_index
+            self.texts, self.file_names = texts, file_names
+
+    def upsert_text(self, filename, text):
+        """
+        Adds a text, or replaces the one with the same filename, and writes it to the directory.
+        The new row uses the current vocabulary and IDF weights until the next refit.
+
+        Args:
+            filename (str): Name of the .txt file relative to the directory, e.g. "nested/a.txt".
+            text (str): Raw text.
+
+        Returns:
+            bool: True if the text was added, False if it replaced an existing one.
+
+        Raises:
+            ValueError: If the filename is not a relative .txt path.
+            ReadOnlyDocumentError: If the texts are read from an archive or a dump, or the file would be inside one.
+        """
+        path = document_path(self.directory, filename)
+        preprocessed_text = self.preprocessor.preprocess_text(text, fast=False)
+        with self._update_lock:
+            if self.preprocessor.lemma_table is not None:
+                # New words are lemmatized now; the table is saved on the next refit
+                self.preprocessor.lemma_table.update(self.preprocessor, self.preprocessor.fast_tokenize(text))
+            tfidf_vectorizer, X, index, inverted_index, texts, file_names = self._snapshot()
+            created = filename not in file_names
+            i = len(file_names) if created else file_names.index(filename)
+            stop = min(i + 1, len(file_names))
+            row = tfidf_vectorizer.transform([preprocessed_text])
+            X = splice_csr(X, i, stop, row)
+            if index is not None:
+                index = index.upsert(i, row)
+            inverted_index = inverted_index.upsert(i, row)
+            texts = texts[:i] + [preprocessed_text] + texts[stop:]
+            file_names = file_names[:i] + [filename] + file_names[stop:]
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as file:
+                file.write(text)
+            os.replace(path + '.tmp', path)
+            if self.cache:
+                self.cache.put(CorpusCache.content_hash(text), preprocessed_text)
+            self._publish(tfidf_vectorizer, X, index, inverted_index, texts, file_names)
+            self.pending_changes += 1
+        return created
+
+    def remove_text(self, filename):
+        """
+        Removes a text and deletes its file from the directory.
+
+        Args:
+            filename (str): Name of the file.
+
+        Returns:
+            bool: True if the text was removed, False if it does not exist.
+
+        Raises:
+            ReadOnlyDocumentError: If the text is read from an archive or a dump, which would bring it back on restart.
+        """
+        with self._update_lock:
+            tfidf_vectorizer, X, index, inverted_index, texts, file_names = self._snapshot()
+            if filename not in file_names:
+                return False
+            path = document_path(self.directory, filename)
+            i = file_names.index(filename)
+            X = splice_csr(X, i, i + 1)
+            if index is not None:
+                index = index.delete(i)
+            inverted_index = inverted_index.delete(i)
+            if os.path.exists(path):
+                os.remove(path)
+            self._publish(tfidf_vectorizer, X, index, inverted_index, texts[:i] + texts[i + 1:], file_names[:i] + file_names[i + 1:])
+            self.pending_changes += 1
+        return True
+
+    def refit(self):
+        """
+        Fits the vocabulary and IDF weights again over every text and rebuilds the candidate index.
+        Queries keep using the previous vectorizer until the new one is ready.
+        """
+        with self._update_lock:
+            _, _, _, _, texts, file_names = self._snapshot()
+            tfidf_vectorizer, X, index, inverted_index = self._fit(texts)
+            self._publish(tfidf_vectorizer, X, index, inverted_index, texts, file_names)
+            if self.cache:
+                self.cache.save()
+            if self.preprocessor.lemma_table is not None and self.cache_dir:
+                self.preprocessor.lemma_table.save(self._lemma_table_path())
+            self.pending_changes = 0
+
+    def start_background_refit(self, interval):
+        """
+        Starts a daemon thread that calls refit every interval seconds if any text changed.
+
+        Args:
+            interval (float): Seconds between checks.
+        """
+        if self._refit_thread is not None:
+            return
+        self._refit_thread = threading.Thread(target=self._refit_periodically, args=(interval,), daemon=True)
+        self._refit_thread.start()
+
+    def _refit_periodically(self, interval):
+        while True:
+            time.sleep(interval)
+            if self.pending_changes:
+                try:
+                    self.refit()
+                except Exception:
+                    # Printing would corrupt the curses screen; the texts keep their current vectors until the next refit
+                    logger.exception("Background TF-IDF refit failed")
+
+    def rank_similar(self, input_text, k=10, similarity_threshold=0.3):
+        """
+        Ranks the preprocessed texts in the directory by their similarity with the input text.
+
+        Args:
+            input_text (str): Input text to be checked for similarity.
+            k (int): Maximum number of results. None returns every text above the threshold.
+            similarity_threshold (float): Threshold above which texts are considered similar.
+
+        Returns:
+            list: Tuples (filename, similarity) sorted by decreasing similarity.
+        """
+        tfidf_vectorizer, X, index, inverted_index, _, file_names = self._snapshot()
+        preprocessed_input_text = self.preprocessor.preprocess_text(input_text)
+        input_vector = tfidf_vectorizer.transform([preprocessed_input_text])
+        if index is not None:
+            candidates = np.sort(index.query(input_vector, self.candidate_count)[0])
+            cosine_similarities = cosine_similarity(input_vector, X[candidates]).flatten()
+            above = cosine_similarities > similarity_threshold
+            order = np.argsort(-cosine_similarities[above], kind='stable')[:k]
+            ids, similarities = candidates[above][order], cosine_similarities[above][order]
+        else:
+            ids, similarities = inverted_index.query(input_vector, k, similarity_threshold)
+        return [(file_names[i], float(similarity)) for i, similarity in zip(ids, similarities)]
+
     def check_similarity(self, input_text, similarity_threshold=0.3):
         """
         Checks the similarity of the input text with the preprocessed texts in the directory.
@@ -58,17 +305,11 @@ class TextSimilarityDetector:
         Args:
             input_text (str): Input text to be checked for similarity.
             similarity_threshold (float): Threshold above which texts are considered similar.
+
+        Returns:
+            tuple: The filename and similarity of the most similar text, or a message and 0.0 if no text is similar.
         """
-        preprocessed_input_text = self.preprocessor.preprocess_text(input_text)
-        input_vector = self.tfidf_vectorizer.transform([preprocessed_input_text])
-        cosine_similarities = cosine_similarity(input_vector, self.X).flatten()
-
-        similar_texts_found = False
-        for i, similarity in enumerate(cosine_similarities):
-            if similarity > similarity_threshold:
-                # print(f"Archivo: {self.file_names[i]}, Similitud: {similarity:.4f}")
-                similar_texts_found = True
-                return self.file_names[i], similarity
-
-        if not similar_texts_found:
-            return "No se encontraron textos similares", 0.0
\ No newline at end of file
+        ranking = self.rank_similar(input_text, k=1, similarity_threshold=similarity_threshold)
+        if ranking:
+            return ranking[0]
+        return "No se encontraron textos similares", 0.0
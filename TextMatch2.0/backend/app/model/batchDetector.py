@@ -0,0 +1,157 @@
+from bisect import bisect_right
+from itertools import islice
+from app.model.detectorEngine import DetectorEngine
+from app.model.plagarsimDetector import PlagiarismDetector
+
+
+class BatchDetector:
+    """
+    A class to check many texts for plagiarism at once, e.g. a whole class cohort.
+
+    Texts are processed in chunks that share the work a single check would repeat: the chunk is preprocessed
+    and split into sentences in Spacy batches, scored against the document vectors with one matrix product,
+    each corpus document is compared once with the sentences of every text of the chunk, the sentences of the
+    chunk are embedded together for the paraphrase search, and the sentences the tense and voice checks need
+    are tagged together. Every text of a run is checked against the same snapshot of the corpus, and its
+    results are the same as those of PlagiarismDetector.
+    """
+
+    def __init__(self, engine=None, batch_size=32):
+        """
+        Initializes the BatchDetector on top of a warmed-up engine.
+
+        Parameters:
+        - engine (DetectorEngine, optional): The engine holding the shared models and corpus. Defaults to the
+          process-wide engine, which is warmed up on first use.
+        - batch_size (int): The number of texts processed together. Results are produced once per chunk.
+        """
+        self.engine = engine if engine is not None else DetectorEngine.get_instance()
+        self.engine.warm_up()
+        self.batch_size = batch_size
+
+    def detect(self, documents):
+        """
+        Checks texts for plagiarism.
+
+        Parameters:
+        - documents (iterable): Tuples (id, text). The id is only used to label the results.
+
+        Returns:
+        - generator: Yields, in input order, tuples with the id of each text and its results, as returned
+          by PlagiarismDetector.get_results.
+        """
+        state = self.engine.snapshot()
+        documents = iter(documents)
+        while True:
+            chunk = list(islice(documents, self.batch_size))
+            if not chunk:
+                return
+            yield from self.detect_chunk(chunk, state)
+
+    def detect_chunk(self, chunk, state):
+        """
+        Checks a chunk of texts together.
+
+        Parameters:
+        - chunk (list): Tuples (id, text).
+        - state (EngineState): The engine snapshot the texts are checked against.
+
+        Returns:
+        - list: Tuples with the id of each text and its results.
+        """
+        model = self.engine.model
+        preprocessor = self.engine.preprocessor
+        texts = [text for _, text in chunk]
+        preprocessed = preprocessor.preprocess_texts(texts, batch_size=self.batch_size)
+        sentences = preprocessor.split_texts_into_sentences(texts, batch_size=self.batch_size)
+
+        detectors = []
+        for text, doc_sentences, (_, tokens) in zip(texts, sentences, preprocessed):
+            detector = PlagiarismDetector(self.engine)
+            detector.set_user_input(text, state=state, sentences=doc_sentences, tokens=tokens)
+            detector.model = model
+            detectors.append(detector)
+
+        # Without a candidate index every text is scored against every document, so the whole chunk is one product
+        similar_documents = [None] * len(detectors)
+        if self.engine.candidate_count is None:
+            document_vectors = self.engine.get_document_vectors(model, state)
+            vectors = [detector.get_user_input_vector(model) for detector in detectors]
+            similar_documents = document_vectors.batch_above_threshold(vectors, PlagiarismDetector.SIMILARITY_THRESHOLD)
+
+        matches = self.find_similar_sentences(detectors, state)
+        # Tag at once the user sentences whose tense or voice may be compared
+        pending = {
+            detector.get_user_sentences()[idx2]
+            for detector, detector_matches in zip(detectors, matches)
+            for _, similar_sentences in detector_matches
+            for _, idx2, _, _, similarity in similar_sentences
+            if similarity < 1
+        }
+        if pending:
+            self.engine.parse_cache.signatures(sorted(pending), batch_size=self.batch_size * 16)
+
+        results = []
+        for (document_id, _), detector, detector_matches, detector_similar in zip(chunk, detectors, matches, similar_documents):
+            plagiarism_results = detector.classify_plagiarism(detector_matches)
+            results.append((document_id, detector.evaluate_similarity(model, plagiarism_results, detector_similar)))
+        return results
+
+    def find_similar_sentences(self, detectors, state):
+        """
+        Finds the similar sentence pairs of several texts, comparing each corpus document once with the
+        sentences of all the texts that must be compared with it. The character counts and masks of the
+        document sentences are computed once per chunk instead of once per text. When the engine has sentence
+        embeddings, the sentences of every text are embedded in one batch and their paraphrases are added.
+
+        Parameters:
+        - detectors (list of PlagiarismDetector): The detectors holding the texts.
+        - state (EngineState): The engine snapshot the texts are checked against.
+
+        Returns:
+        - list: For each detector, the same as PlagiarismDetector.find_similar_sentences.
+        """
+        plans = [detector.comparison_plan() for detector in detectors]
+        texts_by_document = {}
+        for position, plan in enumerate(plans):
+            for index, candidate_pairs in plan:
+                texts_by_document.setdefault(index, []).append((position, candidate_pairs))
+
+        similar_by_text = [{} for _ in detectors]
+        for index, texts in texts_by_document.items():
+            sentences_dataset = state.corpus.sentences[index]
+            sentences_user = []
+            offsets = []
+            for position, _ in texts:
+                offsets.append(len(sentences_user))
+                sentences_user.extend(detectors[position].get_user_sentences())
+
+            candidate_pairs = None
+            if any(pairs is not None for _, pairs in texts):
+                candidate_pairs = set()
+                for (position, pairs), offset in zip(texts, offsets):
+                    if pairs is None:
+                        user_count = len(detectors[position].get_user_sentences())
+                        pairs = ((i, j) for i in range(len(sentences_dataset)) for j in range(user_count))
+                    candidate_pairs.update((i, j + offset) for i, j in pairs)
+
+            # The pairs come sorted by document sentence and then by position in the concatenated sentences,
+            # so the pairs of each text keep the order a separate comparison would give
+            for idx1, idx2, sent1, sent2, similarity in detectors[0].compare_sentences(sentences_dataset, sentences_user, candidate_pairs):
+                text = bisect_right(offsets, idx2) - 1
+                position = texts[text][0]
+                similar_by_text[position].setdefault(index, []).append((idx1, idx2 - offsets[text], sent1, sent2, similarity))
+
+        embeddings = [None] * len(detectors)
+        if state.sentence_vectors is not None:
+            sentences_user = [sentence for detector in detectors for sentence in detector.get_user_sentences()]
+            if sentences_user:
+                encoded = self.engine.encode_sentences(sentences_user, state)
+                offset = 0
+                for position, detector in enumerate(detectors):
+                    count = len(detector.get_user_sentences())
+                    embeddings[position] = encoded[offset:offset + count]
+                    offset += count
+
+        return [detector.add_paraphrases(similar_by_text[position], detector.find_paraphrases(embeddings=embeddings[position]))
+                for position, detector in enumerate(detectors)]
@@ -0,0 +1,118 @@
+import time
+import numpy as np
+from app.model.detectorEngine import DetectorEngine
+from app.model.plagarsimDetector import PlagiarismDetector
+from app.model.sentenceMatcher import SentenceMatcher
+
+
+class CascadeDetector:
+    """
+    A class to check a text for plagiarism with stages ordered from the cheapest to the most expensive:
+
+    1. fingerprint: the documents sharing at least a number of hashed word n-grams with the text.
+    2. document_score: the cosine similarity of the Word2Vec document vectors.
+    3. sentence_alignment: the similar sentence pairs between the text and each document, and the paraphrases
+       found with the sentence embeddings if the engine has them, like PlagiarismDetector.
+    4. classification: the tense and voice checks that decide the type of plagiarism.
+
+    Each stage only sees the documents that survived the previous one, and the check stops as soon as none
+    survives, so most original texts finish after the first or second stage. Unlike PlagiarismDetector, the
+    type of plagiarism is only decided from the documents that are reported.
+    """
+
+    def __init__(self, engine=None, min_shared_fingerprints=1, document_threshold=PlagiarismDetector.SIMILARITY_THRESHOLD, sentence_threshold=0.7):
+        """
+        Initializes the CascadeDetector on top of a warmed-up engine.
+
+        Parameters:
+        - engine (DetectorEngine, optional): The engine holding the shared models and corpus. Defaults to the
+          process-wide engine, which is warmed up on first use.
+        - min_shared_fingerprints (int): The minimum number of n-grams a document must share with the text to
+          survive the fingerprint stage. The stage is skipped if the engine has no fingerprint index.
+        - document_threshold (float): The document vector similarity above which a document survives and is reported.
+        - sentence_threshold (float): The similarity above which two sentences are considered similar.
+        """
+        self.engine = engine if engine is not None else DetectorEngine.get_instance()
+        self.engine.warm_up()
+        self.min_shared_fingerprints = min_shared_fingerprints
+        self.document_threshold = document_threshold
+        self.sentence_threshold = sentence_threshold
+        if sentence_threshold == self.engine.sentence_matcher.threshold:
+            self.sentence_matcher = self.engine.sentence_matcher
+        else:
+            self.sentence_matcher = SentenceMatcher(sentence_threshold)
+
+    @staticmethod
+    def _record(report, stage, threshold, candidates, survivors, start):
+        report["stages"].append({
+            "stage": stage,
+            "threshold": threshold,
+            "candidates": int(candidates),
+            "survivors": int(survivors),
+            "seconds": round(time.perf_counter() - start, 6),
+        })
+        if survivors == 0 and report["exit_stage"] is None:
+            report["exit_stage"] = stage
+
+    def detect(self, text):
+        """
+        Checks a text for plagiarism.
+
+        Parameters:
+        - text (str): The text to check.
+
+        Returns:
+        - tuple: The results, in the format of PlagiarismDetector.get_results, and a report with the threshold,
+          the number of candidate and surviving documents and the seconds of every stage that ran, and the
+          stage the cascade exited at (None if every stage ran).
+        """
+        detector = PlagiarismDetector(self.engine)
+        detector.set_user_input(text)
+        detector.model = self.engine.model
+        state = detector.state
+        report = {"stages": [], "exit_stage": None}
+
+        start = time.perf_counter()
+        candidates = np.arange(len(state.corpus))
+        if state.fingerprint_index is not None:
+            counts = state.fingerprint_index.shared_counts(text)
+            candidates = np.nonzero(counts >= self.min_shared_fingerprints)[0]
+            self._record(report, "fingerprint", self.min_shared_fingerprints, len(state.corpus), len(candidates), start)
+            if len(candidates) == 0:
+                return {}, report
+
+        start = time.perf_counter()
+        document_vectors = self.engine.get_document_vectors(detector.model, state)
+        similarities = document_vectors.exact_similarities(detector.get_user_input_vector(detector.model), candidates)
+        above = similarities > self.document_threshold
+        similar_documents = (candidates[above], similarities[above])
+        self._record(report, "document_score", self.document_threshold, len(candidates), len(similar_documents[0]), start)
+        if len(similar_documents[0]) == 0:
+            return {}, report
+
+        start = time.perf_counter()
+        sentences_user = detector.get_user_sentences()
+        prefiltered = None
+        if state.shingle_index is not None:
+            prefiltered = state.shingle_index.candidates(text, sentences_user)
+        matches = {}
+        for index in similar_documents[0].tolist():
+            if prefiltered is not None and index not in prefiltered:
+                continue
+            candidate_pairs = prefiltered[index] if prefiltered is not None else None
+            similar_sentences = self.sentence_matcher.match(state.corpus.sentences[index], sentences_user, candidate_pairs)
+            if similar_sentences:
+                matches[index] = similar_sentences
+        # Only the paraphrases in the documents that survived the document score are kept
+        surviving = set(similar_documents[0].tolist())
+        paraphrases = [[paraphrase for paraphrase in sentence_paraphrases if paraphrase[0] in surviving]
+                       for sentence_paraphrases in detector.find_paraphrases()]
+        matches = detector.add_paraphrases(matches, paraphrases)
+        self._record(report, "sentence_alignment", self.sentence_threshold, len(similar_documents[0]), len(matches), start)
+        if not matches:
+            return detector.evaluate_similarity(detector.model, {}, similar_documents), report
+
+        start = time.perf_counter()
+        results = detector.classify_plagiarism(matches)
+        self._record(report, "classification", None, len(matches), len(matches), start)
+        return detector.evaluate_similarity(detector.model, results, similar_documents), report
@@ -0,0 +1,346 @@
+import os
+import hashlib
+from app.model.corpusCache import CorpusCache
+from app.model.documentSource import batched
+from app.model.parseCache import SentenceSignature, parse_signatures
+from app.model.rawTextStore import RawTextStore
+from app.model.sharedArrays import NestedTextArray, SplicedArray, TextArray, load_arrays, save_arrays
+from app.model.tokenArray import JoinedTokens, TokenArray
+
+
+def _encode_signature(signature):
+    verbs, pronouns = signature
+    return " ".join(verbs) + "|" + " ".join(pronouns)
+
+
+def _decode_signature(text):
+    verbs, pronouns = text.split("|")
+    return SentenceSignature(tuple(verbs.split()), tuple(pronouns.split()))
+
+
+class Corpus:
+    """
+    An immutable, precomputed view of the reference documents used for plagiarism detection.
+
+    All per-document data is stored in tuples or read-only arrays and never modified after construction, so a
+    single instance can be shared between request threads without copying or locking.
+
+    The lemmatized tokens are interned into a TokenArray, a stream of uint32 word ids, instead of a tuple of
+    strings per document, and the preprocessed texts are derived from them rather than stored again.
+
+    A corpus saved with save and opened with load keeps its texts, tokens, sentences and signatures in
+    memory-mapped arrays instead, so every worker process of the web server shares a single copy of them.
+    Corpora built with a store directory keep their raw texts in a RawTextStore on disk from the start.
+    Updated corpora keep them there too: upsert and delete splice the texts, sentences and signatures with
+    SplicedArray, so only the changed documents are held in memory until the corpus is shared again.
+    """
+
+    # The layout of the saved arrays, part of the shared directory name so older layouts are never opened
+    FORMAT_VERSION = 2
+
+    def __init__(self, original_texts, filenames, preprocessed_texts, token_lists, sentences, signatures=None, document_keys=None):
+        """
+        Initializes the Corpus with the already preprocessed documents.
+
+        Parameters:
+        - original_texts (list of str or TextArray): The raw text of each document. A TextArray, such as a
+          RawTextStore, is kept as it is instead of being read into memory.
+        - filenames (list of str): The filename of each document.
+        - preprocessed_texts (list of str, optional): The preprocessed text of each document. It is always the
+          lemmatized tokens joined with spaces, so it is not stored: the corpus derives it from token_lists.
+        - token_lists (list of list of str or TokenArray): The lemmatized tokens of each document.
+        - sentences (list of list of str): The sentences of each document.
+        - signatures (list of list of SentenceSignature, optional): The tense and voice signature of each sentence
+          of each document. Without them, signatures are parsed on demand.
+        - document_keys (list of str, optional): The content hash of each document. Computed when omitted.
+        """
+        self.original_texts = original_texts if isinstance(original_texts, TextArray) else tuple(original_texts)
+        self.filenames = tuple(filenames)
+        self.token_lists = token_lists if isinstance(token_lists, TokenArray) else TokenArray.from_lists(token_lists)
+        self.preprocessed_texts = JoinedTokens(self.token_lists)
+        self.sentences = tuple(tuple(doc_sentences) for doc_sentences in sentences)
+        self.signatures = None
+        if signatures is not None:
+            self.signatures = tuple(
+                tuple(SentenceSignature(tuple(verbs), tuple(pronouns)) for verbs, pronouns in doc_signatures)
+                for doc_signatures in signatures
+            )
+        if document_keys is None:
+            document_keys = [CorpusCache.content_hash(text) for text in self.original_texts]
+        self.document_keys = tuple(document_keys)
+        self.version = self._compute_version(self.filenames, self.document_keys)
+
+    def __len__(self):
+        return len(self.filenames)
+
+    @staticmethod
+    def _compute_version(filenames, document_keys):
+        """
+        Computes a content hash identifying this exact set of documents.
+
+        Parameters:
+        - filenames (tuple of str): The filenames of the documents.
+        - document_keys (tuple of str): The content hashes of the documents.
+
+        Returns:
+        - str: A hexadecimal digest that changes whenever a document is added, removed or edited.
+        """
+        digest = hashlib.sha1()
+        for filename, key in zip(filenames, document_keys):
+            digest.update(filename.encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(key.encode("ascii"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, preprocessor, cache=None, batch_size=64, n_process=1, shared_dir=None, store_dir=None, chunk_size=1024):
+        """
+        Loads, preprocesses and splits into sentences every document in the preprocessor's directory.
+
+        Documents are streamed from the directory and processed in chunks, so only one chunk of raw texts is in
+        memory at a time when a store directory is given.
+
+        Parameters:
+        - preprocessor (Preprocessor): The preprocessor used to load and process the files.
+        - cache (CorpusCache, optional): A cache of preprocessed documents. Only new or changed files are
+          processed; the cache is updated and saved afterwards.
+        - batch_size (int): The number of documents Spacy processes per batch.
+        - n_process (int): The number of processes Spacy uses. -1 uses every CPU.
+        - shared_dir (str, optional): A directory where the corpus is saved for every version of the documents.
+          When given, the corpus is opened from there, memory-mapped, and only built if it was not saved yet.
+        - store_dir (str, optional): A directory where the raw texts are written as they are read, in a
+          RawTextStore. Without one, they are kept in memory.
+        - chunk_size (int): The number of documents preprocessed at a time.
+
+        Returns:
+        - Corpus: The precomputed corpus.
+        """
+        filenames = []
+        keys = []
+
+        def read_texts():
+            for filename, text in preprocessor.load_files():
+                filenames.append(filename)
+                keys.append(CorpusCache.content_hash(text))
+                yield text
+
+        original_texts = RawTextStore.write(store_dir, read_texts()) if store_dir is not None else list(read_texts())
+
+        if shared_dir is not None and os.path.exists(cls.shared_path(shared_dir, cls._compute_version(filenames, keys))):
+            # Another worker already built this version, so the cache does not even need to be read
+            return cls.load(cls.shared_path(shared_dir, cls._compute_version(filenames, keys)))
+
+        entries = [cache.get(key) if cache is not None else None for key in keys]
+
+        missing = [row for row, entry in enumerate(entries) if entry is None]
+        for rows in batched(missing, chunk_size):
+            processed = cls.process_texts(preprocessor, [original_texts[row] for row in rows], batch_size=batch_size, n_process=n_process)
+            for row, entry in zip(rows, processed):
+                entries[row] = entry
+                if cache is not None:
+                    cache.put(keys[row], entry["preprocessed_text"], entry["tokens"], entry["sentences"], entry["signatures"])
+
+        if cache is not None:
+            cache.prune(keys)
+            cache.save()
+
+        corpus = cls(
+            original_texts,
+            filenames,
+            [entry["preprocessed_text"] for entry in entries],
+            [entry["tokens"] for entry in entries],
+            [entry["sentences"] for entry in entries],
+            [entry["signatures"] for entry in entries],
+            keys,
+        )
+        return corpus.share(shared_dir) if shared_dir is not None else corpus
+
+    @staticmethod
+    def shared_path(shared_dir, version):
+        """
+        Gets the directory where a version of the corpus is saved for the worker processes.
+
+        Parameters:
+        - shared_dir (str): The directory of the shared corpora.
+        - version (str): The version of the corpus.
+
+        Returns:
+        - str: The directory of the corpus.
+        """
+        return os.path.join(shared_dir, f"corpus-{Corpus.FORMAT_VERSION}-{version}")
+
+    def share(self, shared_dir, store_dir=None):
+        """
+        Saves the corpus for the worker processes, unless another one already did, and opens it memory-mapped.
+
+        Parameters:
+        - shared_dir (str): The directory of the shared corpora.
+        - store_dir (str, optional): A directory where raw texts that are not in a RawTextStore yet, such as the
+          ones of an updated corpus, are written into one, so the saved corpus points to it instead of copying them.
+
+        Returns:
+        - Corpus: An equal corpus backed by memory-mapped arrays.
+        """
+        path = self.shared_path(shared_dir, self.version)
+        corpus = self
+        if store_dir is not None and not isinstance(self.original_texts, RawTextStore) and not os.path.exists(path):
+            corpus = self._assemble(RawTextStore.write(store_dir, iter(self.original_texts)), self.filenames, self.token_lists, self.sentences,
+                                    self.signatures, self.document_keys)
+        corpus.save(path)
+        return Corpus.load(path)
+
+    def save(self, directory):
+        """
+        Saves the corpus as arrays that load memory-maps. An existing directory is left as it is.
+
+        Parameters:
+        - directory (str): The directory to write.
+        """
+        arrays = {}
+        meta = {"filenames": list(self.filenames), "document_keys": list(self.document_keys)}
+        if isinstance(self.original_texts, RawTextStore):
+            # The raw texts are already on disk, so the saved corpus points to them instead of copying them
+            meta["raw_texts"] = os.path.abspath(self.original_texts.directory)
+        else:
+            arrays.update(TextArray.from_strings(self.original_texts).arrays("original_texts"))
+        arrays.update(self.token_lists.arrays("token_lists"))
+        arrays.update(NestedTextArray.from_lists(self.sentences).arrays("sentences"))
+        if self.signatures is not None:
+            arrays.update(NestedTextArray.from_lists(self.signatures, encode=_encode_signature).arrays("signatures"))
+        os.makedirs(os.path.dirname(directory) or ".", exist_ok=True)
+        save_arrays(directory, arrays, meta)
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Opens a corpus written by save. Its documents are read from memory-mapped arrays on access.
+
+        Parameters:
+        - directory (str): The directory of the corpus.
+
+        Returns:
+        - Corpus: The corpus.
+        """
+        arrays, meta = load_arrays(directory)
+        if "raw_texts" in meta:
+            original_texts = RawTextStore(meta["raw_texts"])
+        else:
+            original_texts = TextArray.from_arrays(arrays, "original_texts")
+        signatures = None
+        if "signatures_data" in arrays:
+            signatures = NestedTextArray.from_arrays(arrays, "signatures", decode=_decode_signature)
+        return cls._assemble(original_texts, meta["filenames"], TokenArray.from_arrays(arrays, "token_lists"),
+                             NestedTextArray.from_arrays(arrays, "sentences"), signatures, meta["document_keys"])
+
+    @classmethod
+    def _assemble(cls, original_texts, filenames, token_lists, sentences, signatures, document_keys):
+        """
+        Creates a corpus from sequences that are already in their final form, without converting or copying them
+        like the constructor does.
+        """
+        corpus = cls.__new__(cls)
+        corpus.original_texts = original_texts
+        corpus.filenames = tuple(filenames)
+        corpus.token_lists = token_lists
+        corpus.preprocessed_texts = JoinedTokens(token_lists)
+        corpus.sentences = sentences
+        corpus.signatures = signatures
+        corpus.document_keys = tuple(document_keys)
+        corpus.version = cls._compute_version(corpus.filenames, corpus.document_keys)
+        return corpus
+
+    @staticmethod
+    def process_texts(preprocessor, texts, batch_size=64, n_process=1):
+        """
+        Preprocesses documents, splits them into sentences and computes the signature of every sentence.
+
+        Parameters:
+        - preprocessor (Preprocessor): The preprocessor used to process the texts.
+        - texts (list of str): The raw texts.
+        - batch_size (int): The number of documents Spacy processes per batch.
+        - n_process (int): The number of processes Spacy uses. -1 uses every CPU.
+
+        Returns:
+        - list of dict: One dictionary per text with "preprocessed_text", "tokens", "sentences" and "signatures".
+        """
+        preprocessed = preprocessor.preprocess_texts(texts, batch_size=batch_size, n_process=n_process, fast=False)
+        sentences = preprocessor.split_texts_into_sentences(texts, batch_size=batch_size, n_process=n_process)
+        flat_signatures = iter(parse_signatures(preprocessor, (sentence for doc_sentences in sentences for sentence in doc_sentences), batch_size=batch_size * 16, n_process=n_process))
+        entries = []
+        for (preprocessed_text, tokens), doc_sentences in zip(preprocessed, sentences):
+            signatures = [next(flat_signatures) for _ in doc_sentences]
+            entries.append({"preprocessed_text": preprocessed_text, "tokens": tokens, "sentences": doc_sentences, "signatures": signatures})
+        return entries
+
+    def index_of(self, filename):
+        """
+        Finds the position of a document.
+
+        Parameters:
+        - filename (str): The filename of the document.
+
+        Returns:
+        - int or None: The index of the document, or None if it is not part of the corpus.
+        """
+        try:
+            return self.filenames.index(filename)
+        except ValueError:
+            return None
+
+    def upsert(self, filename, text, entry):
+        """
+        Adds a document, or replaces the one with the same filename. The corpus itself is not modified, and the
+        other documents are neither copied nor decoded.
+
+        Parameters:
+        - filename (str): The filename of the document.
+        - text (str): The raw text of the document.
+        - entry (dict): The processed document, as returned by process_texts.
+
+        Returns:
+        - tuple: The new Corpus and the index of the document in it. New documents are appended at the end.
+        """
+        index = self.index_of(filename)
+        if index is None:
+            index = len(self)
+        stop = min(index + 1, len(self))
+
+        signatures = None
+        if self.signatures is not None:
+            doc_signatures = tuple(SentenceSignature(tuple(verbs), tuple(pronouns)) for verbs, pronouns in entry["signatures"])
+            signatures = SplicedArray.splice(self.signatures, index, stop, [doc_signatures])
+        corpus = self._assemble(
+            SplicedArray.splice(self.original_texts, index, stop, [text]),
+            self.filenames[:index] + (filename,) + self.filenames[stop:],
+            self.token_lists.splice(index, stop, [entry["tokens"]]),
+            SplicedArray.splice(self.sentences, index, stop, [tuple(entry["sentences"])]),
+            signatures,
+            self.document_keys[:index] + (CorpusCache.content_hash(text),) + self.document_keys[stop:],
+        )
+        return corpus, index
+
+    def delete(self, filename):
+        """
+        Removes a document. The corpus itself is not modified, and the other documents are neither copied nor decoded.
+
+        Parameters:
+        - filename (str): The filename of the document.
+
+        Returns:
+        - tuple: The new Corpus and the index the document had, or None and None if it is not part of the corpus.
+        """
+        index = self.index_of(filename)
+        if index is None:
+            return None, None
+
+        signatures = SplicedArray.splice(self.signatures, index, index + 1, []) if self.signatures is not None else None
+        corpus = self._assemble(
+            SplicedArray.splice(self.original_texts, index, index + 1, []),
+            self.filenames[:index] + self.filenames[index + 1:],
+            self.token_lists.splice(index, index + 1, []),
+            SplicedArray.splice(self.sentences, index, index + 1, []),
+            signatures,
+            self.document_keys[:index] + self.document_keys[index + 1:],
+        )
+        return corpus, index
@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+
+class CorpusCache:
+    """
+    A persistent on-disk cache of preprocessed reference documents.
+
+    Entries are keyed by the SHA-256 of the document content and store the preprocessed text, the
+    lemmatized tokens, the sentence splits and the tense/voice signature of every sentence. The whole
+    cache is tied to a preprocessing configuration: if the configuration changes (different Spacy model,
+    stopwords, ...) the stored entries are discarded.
+    Document vectors are stored separately in one .npz file per vector model, since they also depend on it.
+    The manifest is only read when an entry is first needed.
+
+    Layout of the cache directory:
+    - manifest.json: format version, preprocessing configuration and the entries.
+    - vectors-<model_key>.npz: the content hashes and the matrix of document vectors for a model.
+    """
+
+    FORMAT_VERSION = 2
+
+    def __init__(self, directory, config):
+        """
+        Initializes the CorpusCache. The manifest is loaded on first use if it exists and matches the configuration.
+
+        Parameters:
+        - directory (str): The directory where the cache files are stored.
+        - config (dict): The preprocessing configuration the entries depend on. Must be JSON serializable.
+        """
+        self.directory = directory
+        self.config = config
+        self._entries = None
+        self._dirty = False
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self._load_manifest()
+        return self._entries
+
+    @staticmethod
+    def content_hash(text):
+        """
+        Computes the key of a document.
+
+        Parameters:
+        - text (str): The raw document text.
+
+        Returns:
+        - str: The hexadecimal SHA-256 digest of the text.
+        """
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def _vectors_path(self, model_key):
+        return os.path.join(self.directory, f"vectors-{model_key}.npz")
+
+    def _load_manifest(self):
+        """
+        Loads the entries from the manifest, ignoring it if it was written with another format or configuration.
+
+        Returns:
+        - dict: The entries, empty if there is no valid manifest.
+        """
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("format") != self.FORMAT_VERSION or manifest.get("config") != self.config:
+            return {}
+        return manifest.get("entries", {})
+
+    def get(self, key):
+        """
+        Returns the cached artifacts of a document.
+
+        Parameters:
+        - key (str): The content hash of the document.
+
+        Returns:
+        - dict or None: A dictionary with "preprocessed_text", "tokens", "sentences" and "signatures", or None on a miss.
+        """
+        return self.entries.get(key)
+
+    def put(self, key, preprocessed_text, tokens, sentences, signatures):
+        """
+        Stores the artifacts of a document. They are written to disk on the next call to save.
+
+        Parameters:
+        - key (str): The content hash of the document.
+        - preprocessed_text (str): The preprocessed text.
+        - tokens (list of str): The lemmatized tokens.
+        - sentences (list of str): The sentences of the original text.
+        - signatures (list of SentenceSignature): The verb and pronoun tags of each sentence.
+        """
+        self.entries[key] = {
+            "preprocessed_text": preprocessed_text,
+            "tokens": list(tokens),
+            "sentences": list(sentences),
+            "signatures": [[list(verbs), list(pronouns)] for verbs, pronouns in signatures],
+        }
+        self._dirty = True
+
+    def prune(self, keep_keys):
+        """
+        Removes the entries of documents that are no longer part of the corpus.
+
+        Parameters:
+        - keep_keys (iterable of str): The content hashes to keep.
+        """
+        keep_keys = set(keep_keys)
+        stale = [key for key in self.entries if key not in keep_keys]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._dirty = True
+
+    def save(self):
+        """
+        Writes the manifest to disk if it changed. The file is replaced atomically.
+        """
+        if not self._dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = {"format": self.FORMAT_VERSION, "config": self.config, "entries": self.entries}
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False)
+        os.replace(tmp_path, self._manifest_path())
+        self._dirty = False
+
+    def load_vectors(self, model_key, keys):
+        """
+        Loads the cached document vectors of a model for the given documents.
+
+        Parameters:
+        - model_key (str): An identifier of the vector model.
+        - keys (list of str): The content hashes of the documents, in the desired order.
+
+        Returns:
+        - numpy.ndarray or None: A matrix with one row per key, or None if any of the keys is missing.
+        """
+        path = self._vectors_path(model_key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            stored_keys = data["keys"]
+            vectors = data["vectors"]
+        rows = {key: row for row, key in enumerate(stored_keys.tolist())}
+        if any(key not in rows for key in keys):
+            return None
+        return vectors[[rows[key] for key in keys]]
+
+    def save_vectors(self, model_key, keys, vectors):
+        """
+        Stores the document vectors of a model, replacing any previous ones for that model.
+
+        Parameters:
+        - model_key (str): An identifier of the vector model.
+        - keys (list of str): The content hashes of the documents.
+        - vectors (numpy.ndarray): A matrix with one row per key.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._vectors_path(model_key)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, keys=np.array(keys), vectors=vectors)
+        os.replace(tmp_path, path)
@@ -0,0 +1,171 @@
+import os
+import json
+import uuid
+import numpy as np
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock; the development server there runs a single process, which needs no lock
+    fcntl = None
+
+
+class CorpusJournal:
+    """
+    Publishes the version of the corpus served from a shared directory, so every worker process of the machine
+    serves the same documents.
+
+    A pointer file holds the version of the last refit, its base, whose corpus and vectors are saved in the shared
+    directory, the version of the refit before it, and the changes made since then. Every change keeps the
+    processed document and its vectors in a payload file next to the pointer, so it is applied without processing
+    it again. Payload files have unique names and are never overwritten, so a worker still replaying an older
+    pointer never reads another change. The pointer is replaced atomically after its payload is written, so
+    readers never see a partial change.
+
+    Writers take an exclusive file lock, so changes made by several processes are appended one after another.
+    """
+
+    POINTER_FILE = "current.json"
+    LOCK_FILE = "current.lock"
+
+    def __init__(self, directory):
+        """
+        Initializes the CorpusJournal of a shared directory.
+
+        Parameters:
+        - directory (str): The shared directory of the corpus.
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, self.POINTER_FILE)
+
+    @contextmanager
+    def lock(self):
+        """
+        Holds the exclusive lock of the journal, across processes, while the block runs.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, self.LOCK_FILE), "a") as file:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+    def stamp(self):
+        """
+        Identifies the current pointer file without reading it, to tell cheaply whether it changed.
+
+        Returns:
+        - tuple or None: The modification time and the inode of the pointer file, or None if there is none.
+        """
+        try:
+            status = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return status.st_mtime_ns, status.st_ino
+
+    def read(self):
+        """
+        Reads the pointer file.
+
+        Returns:
+        - dict or None: The "base", "previous" and current "version" of the corpus and the list of "changes" since
+          the base, or None if nothing was published yet.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, pointer):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(pointer, file)
+        os.replace(tmp_path, self.path)
+
+    def reset(self, version):
+        """
+        Publishes a version whose corpus and vectors are saved in the shared directory, without changes. The
+        previous base is kept in the pointer, since workers may still be reading its files.
+
+        Parameters:
+        - version (str): The version of the corpus.
+
+        Returns:
+        - dict: The new pointer.
+        """
+        current = self.read()
+        previous = current["base"] if current is not None and current["base"] != version else (current or {}).get("previous")
+        pointer = {"base": version, "previous": previous, "version": version, "changes": []}
+        self._write(pointer)
+        return pointer
+
+    def append_upsert(self, filename, text, entry, vector, sentence_vectors, version):
+        """
+        Publishes an added or replaced document.
+
+        Parameters:
+        - filename (str): The filename of the document.
+        - text (str): The raw text of the document.
+        - entry (dict): The processed document, as returned by Corpus.process_texts.
+        - vector (numpy.ndarray): The document vector.
+        - sentence_vectors (numpy.ndarray, optional): The embeddings of its sentences, if they are enabled.
+        - version (str): The version of the corpus with the document.
+
+        Returns:
+        - dict: The new pointer.
+        """
+        pointer = self.read()
+        payload = f"change-{uuid.uuid4().hex}.npz"
+        document = {"text": text, "tokens": list(entry["tokens"]), "sentences": list(entry["sentences"]),
+                    "signatures": [[list(verbs), list(pronouns)] for verbs, pronouns in entry["signatures"]],
+                    "preprocessed_text": entry["preprocessed_text"]}
+        arrays = {"document": np.array(json.dumps(document)), "vector": np.asarray(vector)}
+        if sentence_vectors is not None:
+            arrays["sentence_vectors"] = np.asarray(sentence_vectors)
+        tmp_path = os.path.join(self.directory, f"{payload}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(tmp_path, os.path.join(self.directory, payload))
+        return self._append(pointer, {"operation": "upsert", "filename": filename, "version": version, "payload": payload})
+
+    def append_delete(self, filename, version):
+        """
+        Publishes a removed document.
+
+        Parameters:
+        - filename (str): The filename of the document.
+        - version (str): The version of the corpus without the document.
+
+        Returns:
+        - dict: The new pointer.
+        """
+        return self._append(self.read(), {"operation": "delete", "filename": filename, "version": version})
+
+    def _append(self, pointer, change):
+        pointer = dict(pointer, version=change["version"], changes=pointer["changes"] + [change])
+        self._write(pointer)
+        return pointer
+
+    def load_payload(self, change):
+        """
+        Reads what an upsert change needs to be applied.
+
+        Parameters:
+        - change (dict): The change, from the pointer.
+
+        Returns:
+        - tuple: The raw text, the processed document as returned by Corpus.process_texts, the document vector and
+          the sentence embeddings, or None if they are disabled.
+        """
+        with np.load(os.path.join(self.directory, change["payload"])) as data:
+            document = json.loads(str(data["document"]))
+            vector = data["vector"]
+            sentence_vectors = data["sentence_vectors"] if "sentence_vectors" in data.files else None
+        text = document.pop("text")
+        document["signatures"] = [tuple(map(tuple, signature)) for signature in document["signatures"]]
+        return text, document, vector, sentence_vectors
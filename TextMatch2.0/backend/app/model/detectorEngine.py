@@ -0,0 +1,859 @@
+import os
+import json
+import hashlib
+import logging
+import shutil
+import threading
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+import numpy as np
+from app.model.annIndex import create_index, load_index
+from app.model.corpus import Corpus
+from app.model.corpusCache import CorpusCache
+from app.model.corpusJournal import CorpusJournal
+from app.model.documentSource import document_path
+from app.model.documentVectors import DocumentVectors
+from app.model.fingerprintIndex import FingerprintIndex
+from app.model.lemmaTable import LemmaTable
+from app.model.metrics import metrics
+from app.model.minHash import ShingleIndex
+from app.model.parseCache import ParseCache
+from app.model.preprocessor import Preprocessor
+from app.model.resources import lazy_import
+from app.model.sentenceMatcher import SentenceMatcher
+from app.model.sentenceVectors import SentenceVectors
+from app.model.shardedIndex import ShardedIndex
+from app.model.vectorizer import Vectorizer
+from app.model.wordVectors import DEFAULT_VECTORS_PATH, LEGACY_MODEL_PATH, load_word_vectors, read_metadata
+
+spacy = lazy_import("spacy")
+gensim_models = lazy_import("gensim.models")
+
+logger = logging.getLogger(__name__)
+
+# The corpus-dependent state of the engine. Updates replace it as a whole, so a request that takes a
+# snapshot keeps seeing consistent documents, vectors and indexes until it finishes.
+EngineState = namedtuple("EngineState", ["corpus", "document_vectors", "index", "shingle_index", "fingerprint_index", "sentence_vectors"])
+
+
+def _optional(parse):
+    # "none" sets an optional setting to None, e.g. TEXTMATCH_CACHE_DIR=none disables the cache
+    return lambda value: None if value.lower() == "none" else parse(value)
+
+
+# The constructor parameters read by DetectorEngine.from_environment, with their variable and how the value is parsed
+ENVIRONMENT_SETTINGS = {
+    "model_path": ("TEXTMATCH_MODEL_PATH", str),
+    "cache_dir": ("TEXTMATCH_CACHE_DIR", _optional(str)),
+    "directory": ("TEXTMATCH_DIRECTORY", str),
+    "index_type": ("TEXTMATCH_INDEX_TYPE", str),
+    "index_params": ("TEXTMATCH_INDEX_PARAMS", json.loads),
+    "candidate_count": ("TEXTMATCH_CANDIDATE_COUNT", _optional(int)),
+    "prefilter_threshold": ("TEXTMATCH_PREFILTER_THRESHOLD", _optional(float)),
+    "n_process": ("TEXTMATCH_N_PROCESS", int),
+    "fingerprint_size": ("TEXTMATCH_FINGERPRINT_SIZE", _optional(int)),
+    "fingerprint_window": ("TEXTMATCH_FINGERPRINT_WINDOW", int),
+    "sentence_weighting": ("TEXTMATCH_SENTENCE_WEIGHTING", _optional(str)),
+    "paraphrase_threshold": ("TEXTMATCH_PARAPHRASE_THRESHOLD", float),
+    "paraphrase_count": ("TEXTMATCH_PARAPHRASE_COUNT", int),
+    "lemmatizer": ("TEXTMATCH_LEMMATIZER", str),
+    "refit_interval": ("TEXTMATCH_REFIT_INTERVAL", _optional(float)),
+}
+
+
+class DetectorEngine:
+    """
+    A process-wide engine that owns the expensive state shared by every plagiarism check:
+    the Spacy model, the preprocessor, the vectorizer, the precomputed corpus and the word vectors.
+
+    The engine is created once per process and warmed up before serving traffic. Per-request
+    state lives in PlagiarismDetector, which only keeps the user's text.
+
+    Reference documents can be added, updated and deleted at runtime. Each change is applied
+    incrementally to copies of the corpus, the document vectors and the indexes, which then replace
+    the current ones at once. A periodic refit rebuilds the indexes from scratch and persists the cache.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, model_path=None, cache_dir="cache/corpus", index_type="flat", index_params=None, candidate_count=None,
+                 prefilter_threshold=None, batch_size=64, n_process=1, parse_cache_size=10000, refit_interval=None, fingerprint_size=3,
+                 fingerprint_window=4, sentence_weighting=None, paraphrase_threshold=0.9, paraphrase_count=5, lemmatizer="spacy", directory=None):
+        """
+        Initializes the DetectorEngine without loading anything yet.
+
+        Parameters:
+        - model_path (str, optional): The path of the word vectors exported by train_word2vec.py, or of a full
+          Word2Vec model. Defaults to models/word_vectors.kv in the backend directory, falling back to the
+          legacy word2vec_model.bin.
+        - cache_dir (str, optional): The directory of the persistent corpus cache. None disables the cache.
+        - index_type (str): The candidate retrieval index over the document vectors, "flat" (exact), "ivf" (approximate)
+          or "sharded" (exact, scattered across one worker process per shard).
+        - index_params (dict, optional): The constructor parameters of the index, e.g. {"n_probe": 4} for "ivf" or
+          {"n_shards": 4} for "sharded".
+        - candidate_count (int, optional): The number of candidate documents retrieved from the index for the
+          expensive checks. None checks every document.
+        - prefilter_threshold (float, optional): The minimum estimated Jaccard similarity of word shingles for a
+          document or sentence pair to be compared in detail. None compares every sentence pair.
+        - batch_size (int): The number of corpus documents Spacy processes per batch during warm-up.
+        - n_process (int): The number of processes Spacy uses to preprocess the corpus. -1 uses every CPU.
+        - parse_cache_size (int): The maximum number of query sentence signatures kept in the LRU parse cache.
+        - refit_interval (float, optional): The number of seconds between background refits when documents
+          changed. None only refits when refit is called.
+        - fingerprint_size (int, optional): The number of words of the hashed n-grams the cascade checks for exact
+          matches first. None disables the fingerprint index.
+        - fingerprint_window (int): The number of consecutive n-grams each winnowed fingerprint is selected from.
+          Passages of at least fingerprint_size + fingerprint_window - 1 words are always found.
+        - sentence_weighting (str, optional): How every corpus sentence is embedded for paraphrase search, "mean" or
+          "sif" Word2Vec averaging. None disables the sentence embeddings.
+        - paraphrase_threshold (float): The cosine similarity of sentence embeddings above which two sentences
+          are paraphrases.
+        - paraphrase_count (int): The number of corpus sentences matched against each query sentence.
+        - lemmatizer (str): How query texts are lemmatized, "spacy" or "table", which looks the words up in a table
+          of the Spacy lemmas of the corpus vocabulary and stems the unknown ones. The corpus is always lemmatized
+          with Spacy.
+        - directory (str, optional): The directory of the reference documents. Defaults to the preprocessor's.
+        """
+        self.model_path = model_path
+        self.cache_dir = cache_dir
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.candidate_count = candidate_count
+        self.prefilter_threshold = prefilter_threshold
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.parse_cache_size = parse_cache_size
+        self.parse_cache = None
+        self.cache = None
+        self.index = None
+        self.shingle_index = None
+        self.fingerprint_size = fingerprint_size
+        self.fingerprint_window = fingerprint_window
+        self.fingerprint_index = None
+        self.sentence_weighting = sentence_weighting
+        self.paraphrase_threshold = paraphrase_threshold
+        self.paraphrase_count = paraphrase_count
+        self.sentence_vectors = None
+        self.lemmatizer = lemmatizer
+        self.directory = directory
+        self.sentence_matcher = SentenceMatcher()
+        self.nlp = None
+        self.preprocessor = None
+        self.vectorizer = None
+        self.corpus = None
+        self.model = None
+        self.document_vectors = None
+        self._document_vectors_by_model = {}
+        self._document_vectors_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self.refit_interval = refit_interval
+        self.pending_changes = 0
+        self.journal = None
+        self._journal_base = None
+        self._journal_applied = 0
+        self._journal_stamp = None
+        self._refit_thread = None
+        self._warm_up_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._warm_up_thread = None
+        self._ready = threading.Event()
+        self.error = None
+
+    @classmethod
+    def get_instance(cls):
+        """
+        Returns the engine shared by the whole process, creating it on first use.
+
+        Returns:
+        - DetectorEngine: The shared engine.
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls.from_environment()
+        return cls._instance
+
+    @classmethod
+    def from_environment(cls, environ=None):
+        """
+        Creates an engine with the TEXTMATCH_* settings of ENVIRONMENT_SETTINGS, so the service and its job
+        workers can be configured without editing code. Unset or empty variables keep the default of the parameter.
+
+        Parameters:
+        - environ (dict, optional): The variables to read. Defaults to os.environ.
+
+        Returns:
+        - DetectorEngine: The new engine, not warmed up yet.
+
+        Raises:
+        - ValueError: If a variable cannot be parsed.
+        """
+        environ = os.environ if environ is None else environ
+        settings = {}
+        for name, (variable, parse) in ENVIRONMENT_SETTINGS.items():
+            value = environ.get(variable, "").strip()
+            if value:
+                try:
+                    settings[name] = parse(value)
+                except ValueError as e:
+                    raise ValueError(f"Invalid value for {variable}: {value}") from e
+        return cls(**settings)
+
+    def warm_up(self):
+        """
+        Loads the models and precomputes the corpus. Calling it again once the engine is ready does nothing,
+        and concurrent callers wait for the first one to finish.
+
+        Returns:
+        - DetectorEngine: The engine itself, ready to serve requests.
+        """
+        if self._ready.is_set():
+            return self
+        with self._warm_up_lock:
+            if self._ready.is_set():
+                return self
+            try:
+                with metrics.stage("load_spacy"):
+                    self.nlp = spacy.load('en_core_web_sm')
+                self.preprocessor = Preprocessor(nlp=self.nlp, lemmatizer=self.lemmatizer)
+                if self.directory is not None:
+                    self.preprocessor.directory = self.directory
+                self.vectorizer = Vectorizer(preprocessor=self.preprocessor)
+                self.parse_cache = ParseCache(self.preprocessor, max_size=self.parse_cache_size)
+                if self.cache_dir is not None:
+                    self.cache = CorpusCache(self.cache_dir, self.preprocessor.get_config())
+                self.model = self._load_model()
+                shared_dir = self._shared_dir()
+                if shared_dir is not None:
+                    self.journal = CorpusJournal(shared_dir)
+                started = time.time()
+                with metrics.stage("build_corpus"):
+                    corpus = Corpus.build(self.preprocessor, self.cache, batch_size=self.batch_size, n_process=self.n_process, shared_dir=shared_dir,
+                                          store_dir=self._store_dir())
+                if self.lemmatizer == "table":
+                    self.preprocessor.lemma_table = self._build_lemma_table(corpus)
+                with metrics.stage("build_document_vectors"):
+                    document_vectors = DocumentVectors.build(corpus, self.model, self.vectorizer, cache=self.cache, shared_dir=shared_dir)
+                self._document_vectors_by_model[document_vectors.model_key] = document_vectors
+                self._publish(EngineState(corpus, document_vectors, self._load_index(corpus, document_vectors), self._build_shingle_index(corpus),
+                                          self._build_fingerprint_index(corpus), self._build_sentence_vectors(corpus, document_vectors.model_key)))
+                if self.journal is not None:
+                    self._join_journal(corpus.version, started)
+                self.error = None
+            except Exception as e:
+                self.error = e
+                raise
+            self._ready.set()
+        if self.refit_interval is not None:
+            self._start_refit_thread()
+        return self
+
+    def get_config(self):
+        """
+        Describes the settings that change the results of a check, so cached results can be invalidated when they change.
+
+        Returns:
+        - dict: The preprocessing configuration and the detection settings of the engine.
+        """
+        return {
+            "preprocessor": self.preprocessor.get_config() if self.preprocessor is not None else None,
+            "index_type": self.index_type,
+            "index_params": self.index_params,
+            "candidate_count": self.candidate_count,
+            "prefilter_threshold": self.prefilter_threshold,
+            "fingerprint_size": self.fingerprint_size,
+            "fingerprint_window": self.fingerprint_window,
+            "sentence_weighting": self.sentence_weighting,
+            "paraphrase_threshold": self.paraphrase_threshold,
+            "paraphrase_count": self.paraphrase_count,
+            "lemmatizer": self.lemmatizer,
+            "sentence_threshold": self.sentence_matcher.threshold,
+        }
+
+    def snapshot(self):
+        """
+        Returns the current corpus-dependent state. It never changes, so a request can keep using it while
+        documents are updated.
+
+        Returns:
+        - EngineState: The corpus, the document vectors of the engine's model and the indexes.
+        """
+        with self._state_lock:
+            return EngineState(self.corpus, self.document_vectors, self.index, self.shingle_index, self.fingerprint_index, self.sentence_vectors)
+
+    def _publish(self, state):
+        with self._state_lock:
+            self.corpus, self.document_vectors, self.index, self.shingle_index, self.fingerprint_index, self.sentence_vectors = state
+
+    def _shared_dir(self):
+        """
+        Gets the directory where the corpus and the document vectors are saved once and memory-mapped by every
+        worker process, so adding workers does not add copies of them.
+
+        Returns:
+        - str or None: The directory, or None without a cache directory.
+        """
+        return os.path.join(self.cache_dir, "shared") if self.cache_dir is not None else None
+
+    def _store_dir(self):
+        """
+        Gets the directory where the raw texts of the corpus are kept on disk while it is built, so they are not
+        held in memory and are only read when a match is shown.
+
+        Returns:
+        - str or None: The directory, or None without a cache directory.
+        """
+        return os.path.join(self.cache_dir, "texts") if self.cache_dir is not None else None
+
+    @metrics.instrument("build_shingle_index")
+    def _build_shingle_index(self, corpus):
+        if self.prefilter_threshold is None:
+            return None
+        return ShingleIndex(self.prefilter_threshold, tokenize=lambda text: self.preprocessor.clean_text(text).split()).build(corpus)
+
+    @metrics.instrument("build_fingerprint_index")
+    def _build_fingerprint_index(self, corpus):
+        """
+        Builds the winnowed fingerprint index of the corpus, memory-mapping the copy saved in the cache directory
+        for the same corpus and configuration.
+
+        Parameters:
+        - corpus (Corpus): The corpus to index.
+
+        Returns:
+        - FingerprintIndex or None: The fingerprint index, or None if it is disabled.
+        """
+        if self.fingerprint_size is None:
+            return None
+        path = None
+        if self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, f"fingerprints-{self.fingerprint_size}-{self.fingerprint_window}-{corpus.version[:12]}")
+            if os.path.exists(os.path.join(path, "meta.json")):
+                return FingerprintIndex.load(path, tokenize=self.preprocessor.clean_tokens)
+
+        index = FingerprintIndex(self.fingerprint_size, self.fingerprint_window, tokenize=self.preprocessor.clean_tokens).build(corpus)
+        if path is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            index.save(path)
+        return index
+
+    @metrics.instrument("build_lemma_table")
+    def _build_lemma_table(self, corpus):
+        """
+        Builds the table of the Spacy lemmas of every word of the corpus, loading the one saved in the cache
+        directory and only lemmatizing the words it does not have.
+
+        Parameters:
+        - corpus (Corpus): The corpus whose vocabulary is lemmatized.
+
+        Returns:
+        - LemmaTable: The lemma table.
+        """
+        path = LemmaTable.path(self.cache_dir, self.preprocessor.get_config()) if self.cache_dir is not None else None
+        table = LemmaTable.load(path) if path is not None else LemmaTable()
+        vocabulary = set()
+        for text in corpus.original_texts:
+            vocabulary.update(self.preprocessor.fast_tokenize(text))
+        if table.update(self.preprocessor, vocabulary, batch_size=self.batch_size * 16) and path is not None:
+            table.save(path)
+        return table
+
+    @metrics.instrument("build_sentence_vectors")
+    def _build_sentence_vectors(self, corpus, model_key):
+        """
+        Embeds every corpus sentence with the engine's model, memory-mapping the copy saved in the shared directory
+        for the same weighting, model and corpus.
+
+        Parameters:
+        - corpus (Corpus): The corpus to embed.
+        - model_key (str): The fingerprint of the engine's model.
+
+        Returns:
+        - SentenceVectors or None: The sentence embeddings, or None if they are disabled.
+        """
+        if self.sentence_weighting is None:
+            return None
+        return SentenceVectors.build(corpus, self.model, self.preprocessor, self.vectorizer, self.sentence_weighting, model_key=model_key,
+                                     batch_size=self.batch_size, n_process=self.n_process, shared_dir=self._shared_dir())
+
+    def encode_sentences(self, sentences, state, fast=None):
+        """
+        Embeds sentences like the corpus sentences of a snapshot.
+
+        Parameters:
+        - sentences (list of str): The sentences.
+        - state (EngineState): The snapshot whose sentence embeddings are queried.
+        - fast (bool, optional): Whether to lemmatize them with the lemma table, see Preprocessor.use_fast_path.
+
+        Returns:
+        - numpy.ndarray: The normalized embeddings.
+        """
+        token_lists = [tokens for _, tokens in self.preprocessor.preprocess_texts(sentences, batch_size=self.batch_size, fast=fast)]
+        return state.sentence_vectors.encode(token_lists, self.model, self.vectorizer)
+
+    def upsert_document(self, filename, text):
+        """
+        Adds a reference document, or replaces the one with the same filename, without rebuilding the corpus.
+        The file is written to the corpus directory, so the change survives a restart.
+
+        Parameters:
+        - filename (str): The filename of the document relative to the corpus directory, e.g. "org-100.txt" or "nested/a.txt".
+        - text (str): The text of the document.
+
+        Returns:
+        - bool: True if the document was added, False if it replaced an existing one.
+
+        Raises:
+        - ValueError: If the filename is not a relative .txt path.
+        - ReadOnlyDocumentError: If the corpus is read from an archive or a dump, or the file would be inside one.
+        """
+        self.warm_up()
+        path = document_path(self.preprocessor.directory, filename)
+        with self._journal_lock(), self._update_lock:
+            self._sync_locked()
+            state = self.snapshot()
+            entry = Corpus.process_texts(self.preprocessor, [text], batch_size=self.batch_size)[0]
+            vector = self.vectorizer.get_tokens_vector(entry["tokens"], self.model)
+            sentence_embeddings = self.encode_sentences(entry["sentences"], state, fast=False) if state.sentence_vectors is not None else None
+            updated, row = self._apply_upsert(state, filename, text, entry, vector, sentence_embeddings)
+
+            self._write_file(path, text)
+            if self.cache is not None:
+                self.cache.put(updated.corpus.document_keys[row], entry["preprocessed_text"], entry["tokens"], entry["sentences"], entry["signatures"])
+            self._publish(updated)
+            if self.journal is not None:
+                self._follow(self.journal.append_upsert(filename, text, entry, vector, sentence_embeddings, updated.corpus.version))
+            self.pending_changes += 1
+        return row == len(state.corpus)
+
+    def _apply_upsert(self, state, filename, text, entry, vector, sentence_embeddings):
+        """
+        Adds or replaces a processed document in a snapshot.
+
+        Parameters:
+        - state (EngineState): The snapshot to update. It is not modified.
+        - filename (str): The filename of the document.
+        - text (str): The raw text of the document.
+        - entry (dict): The processed document, as returned by Corpus.process_texts.
+        - vector (numpy.ndarray): The document vector.
+        - sentence_embeddings (numpy.ndarray, optional): The embeddings of its sentences, if they are enabled.
+
+        Returns:
+        - tuple: The updated EngineState and the row of the document.
+        """
+        corpus, row = state.corpus.upsert(filename, text, entry)
+        document_vectors = state.document_vectors.upsert(row, vector, corpus.version)
+        index = state.index.upsert(row, document_vectors.matrix[row]) if state.index is not None else None
+        shingle_index = state.shingle_index.upsert(row, text, corpus.sentences[row]) if state.shingle_index is not None else None
+        fingerprint_index = state.fingerprint_index.upsert(row, text) if state.fingerprint_index is not None else None
+        sentence_vectors = state.sentence_vectors.upsert(row, sentence_embeddings, corpus.version) if state.sentence_vectors is not None else None
+        if self.preprocessor.lemma_table is not None:
+            # New words are lemmatized now; the table is saved on the next refit
+            self.preprocessor.lemma_table.update(self.preprocessor, self.preprocessor.fast_tokenize(text))
+        return EngineState(corpus, document_vectors, index, shingle_index, fingerprint_index, sentence_vectors), row
+
+    def delete_document(self, filename):
+        """
+        Removes a reference document without rebuilding the corpus, and deletes its file.
+
+        Parameters:
+        - filename (str): The filename of the document.
+
+        Returns:
+        - bool: True if the document was removed, False if it is not part of the corpus.
+
+        Raises:
+        - ReadOnlyDocumentError: If the document is read from an archive or a dump, which would bring it back on restart.
+        """
+        self.warm_up()
+        with self._journal_lock(), self._update_lock:
+            self._sync_locked()
+            state = self.snapshot()
+            if state.corpus.index_of(filename) is None:
+                return False
+            path = document_path(self.preprocessor.directory, filename)
+            updated = self._apply_delete(state, filename)
+
+            if os.path.exists(path):
+                os.remove(path)
+            self._publish(updated)
+            if self.journal is not None:
+                self._follow(self.journal.append_delete(filename, updated.corpus.version))
+            self.pending_changes += 1
+        return True
+
+    def _apply_delete(self, state, filename):
+        """
+        Removes a document from a snapshot.
+
+        Parameters:
+        - state (EngineState): The snapshot to update. It is not modified.
+        - filename (str): The filename of the document.
+
+        Returns:
+        - EngineState: The updated snapshot, or the same one if it has no such document.
+        """
+        corpus, row = state.corpus.delete(filename)
+        if corpus is None:
+            return state
+        document_vectors = state.document_vectors.delete(row, corpus.version)
+        index = state.index.delete(row) if state.index is not None else None
+        shingle_index = state.shingle_index.delete(row) if state.shingle_index is not None else None
+        fingerprint_index = state.fingerprint_index.delete(row) if state.fingerprint_index is not None else None
+        sentence_vectors = state.sentence_vectors.delete(row, corpus.version) if state.sentence_vectors is not None else None
+        return EngineState(corpus, document_vectors, index, shingle_index, fingerprint_index, sentence_vectors)
+
+    def refit(self):
+        """
+        Rebuilds the candidate, shingle and fingerprint indexes from the current corpus, which reclusters the IVF
+        lists and drops the signatures of changed documents, and saves the corpus cache and the indexes. Queries
+        keep being served with the previous state meanwhile. The sentence embeddings are saved as they are, keeping
+        the SIF weights fitted on warm-up. The saved corpus is published as the new base of the journal, so the
+        other worker processes load it instead of replaying the changes.
+        """
+        self.warm_up()
+        with self._journal_lock(), self._update_lock:
+            self._sync_locked()
+            state = self.snapshot()
+            if self.cache is not None:
+                self.cache.prune(state.corpus.document_keys)
+                self.cache.save()
+                self.cache.save_vectors(state.document_vectors.model_key, state.corpus.document_keys, state.document_vectors.vectors)
+                if self.preprocessor.lemma_table is not None:
+                    self.preprocessor.lemma_table.save(LemmaTable.path(self.cache_dir, self.preprocessor.get_config()))
+            corpus, document_vectors, sentence_vectors = state.corpus, state.document_vectors, state.sentence_vectors
+            if self._shared_dir() is not None:
+                # Incremental changes are kept in memory; the refit saves them for the other workers
+                corpus = corpus.share(self._shared_dir(), self._store_dir())
+                document_vectors = document_vectors.share(self._shared_dir())
+                if sentence_vectors is not None:
+                    sentence_vectors = sentence_vectors.share(self._shared_dir())
+            index = self._load_index(corpus, document_vectors)
+            self._publish(EngineState(corpus, document_vectors, index, self._build_shingle_index(corpus), self._build_fingerprint_index(corpus),
+                                      sentence_vectors))
+            with self._document_vectors_lock:
+                self._document_vectors_by_model = {document_vectors.model_key: document_vectors}
+            self.pending_changes = 0
+            if self.journal is not None:
+                pointer = self.journal.reset(corpus.version)
+                self._follow(pointer)
+                self._remove_old_versions(pointer)
+
+    def _remove_old_versions(self, pointer):
+        """
+        Deletes the saved corpora, vectors, indexes, raw texts and journal payloads of every version but the
+        current base and the previous one, which workers that have not synced yet may still be reading.
+
+        Parameters:
+        - pointer (dict): The pointer just published by the refit.
+        """
+        keep = [version for version in (pointer["base"], pointer["previous"]) if version is not None]
+        shared_dir, store_dir = self._shared_dir(), self._store_dir()
+        stores = set()
+        for version in keep:
+            try:
+                with open(os.path.join(Corpus.shared_path(shared_dir, version), "meta.json"), "r", encoding="utf-8") as file:
+                    raw_texts = json.load(file)["meta"].get("raw_texts")
+            except OSError:
+                continue
+            if raw_texts is not None:
+                stores.add(os.path.basename(raw_texts))
+
+        stale = []
+        for directory, prefixes in ((shared_dir, ("corpus-", "vectors-", "sentences-")), (self.cache_dir, ("index-", "fingerprints-"))):
+            for name in os.listdir(directory):
+                # Temporary names are being written by another process
+                if not name.startswith(prefixes) or ".tmp" in name:
+                    continue
+                # The version, or its prefix, is the last part of every name
+                tag = name[:-len(".npz")] if name.endswith(".npz") else name
+                if not any(version.startswith(tag.rsplit("-", 1)[1]) for version in keep):
+                    stale.append(os.path.join(directory, name))
+        # The changes of older bases are part of the current one
+        payloads = {change["payload"] for change in pointer["changes"] if "payload" in change}
+        stale += [os.path.join(shared_dir, name) for name in os.listdir(shared_dir)
+                  if name.startswith("change-") and ".tmp" not in name and name not in payloads]
+        if os.path.isdir(store_dir):
+            stale += [os.path.join(store_dir, name) for name in os.listdir(store_dir) if name.startswith("texts-") and name not in stores]
+
+        for path in stale:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    def sync(self):
+        """
+        Catches up with the changes other worker processes published in the journal, so every worker serves the
+        same corpus. Checking is a single stat of the pointer file, so it can be called on every request. Without
+        a cache directory there is no journal, and every worker must be the only one.
+
+        Returns:
+        - bool: True if the corpus changed.
+        """
+        if self.journal is None or not self.is_ready() or self.journal.stamp() == self._journal_stamp:
+            return False
+        if not self._update_lock.acquire(blocking=False):
+            # Another thread is updating the corpus, and syncs first
+            return False
+        try:
+            version = self.snapshot().corpus.version
+            self._sync_locked()
+            return self.snapshot().corpus.version != version
+        except Exception:
+            # The current state keeps being served; the next call retries
+            logger.exception("Corpus sync failed")
+            return False
+        finally:
+            self._update_lock.release()
+
+    def _journal_lock(self):
+        return self.journal.lock() if self.journal is not None else nullcontext()
+
+    def _follow(self, pointer):
+        """
+        Records that the state of the engine is the one published by a pointer of the journal.
+        """
+        self._journal_base, self._journal_applied, self._journal_stamp = pointer["base"], len(pointer["changes"]), self.journal.stamp()
+
+    def _join_journal(self, version, started):
+        """
+        Takes part in the journal after a warm-up. A pointer written before the warm-up started is from an older
+        run, and the corpus directory is the truth, so the version just built is published; a newer one was
+        written by another worker meanwhile and is caught up with.
+
+        Parameters:
+        - version (str): The version of the corpus built by the warm-up.
+        - started (float): The time the warm-up started reading the corpus.
+        """
+        with self.journal.lock(), self._update_lock:
+            pointer = self.journal.read()
+            if pointer is None or (pointer["version"] != version and os.path.getmtime(self.journal.path) < started):
+                pointer = self.journal.reset(version)
+            if pointer["version"] == version:
+                self._follow(pointer)
+            else:
+                self._sync_locked()
+
+    def _sync_locked(self):
+        """
+        Applies the changes of the journal the engine has not applied yet, loading the saved base first if another
+        worker refitted since. The caller holds the update lock.
+        """
+        if self.journal is None:
+            return
+        stamp = self.journal.stamp()
+        if stamp == self._journal_stamp:
+            return
+        pointer = self.journal.read()
+        if pointer is None:
+            return
+        state = self.snapshot()
+        applied = self._journal_applied
+        if pointer["base"] != self._journal_base:
+            state = self._load_base(pointer["base"])
+            applied = 0
+            # The refit that published the base saved the changes of this worker as well
+            self.pending_changes = 0
+        for change in pointer["changes"][applied:]:
+            if change["operation"] == "upsert":
+                text, entry, vector, sentence_embeddings = self.journal.load_payload(change)
+                state, _ = self._apply_upsert(state, change["filename"], text, entry, vector, sentence_embeddings)
+            else:
+                state = self._apply_delete(state, change["filename"])
+        self._publish(state)
+        self._journal_base, self._journal_applied, self._journal_stamp = pointer["base"], len(pointer["changes"]), stamp
+
+    def _load_base(self, version):
+        """
+        Opens a version of the corpus saved in the shared directory by a refit, with its vectors and indexes.
+
+        Parameters:
+        - version (str): The version of the corpus.
+
+        Returns:
+        - EngineState: The state of the saved corpus.
+        """
+        shared_dir = self._shared_dir()
+        corpus = Corpus.load(Corpus.shared_path(shared_dir, version))
+        model_key = self.snapshot().document_vectors.model_key
+        document_vectors = DocumentVectors.build(corpus, self.model, self.vectorizer, model_key=model_key, cache=self.cache, shared_dir=shared_dir)
+        if self.preprocessor.lemma_table is not None:
+            lemma_table = LemmaTable.load(LemmaTable.path(self.cache_dir, self.preprocessor.get_config()))
+            if len(lemma_table):
+                self.preprocessor.lemma_table = lemma_table
+        with self._document_vectors_lock:
+            self._document_vectors_by_model = {model_key: document_vectors}
+        return EngineState(corpus, document_vectors, self._load_index(corpus, document_vectors), self._build_shingle_index(corpus),
+                           self._build_fingerprint_index(corpus), self._build_sentence_vectors(corpus, model_key))
+
+    def _start_refit_thread(self):
+        with self._start_lock:
+            if self._refit_thread is None:
+                self._refit_thread = threading.Thread(target=self._refit_periodically, daemon=True)
+                self._refit_thread.start()
+
+    def _refit_periodically(self):
+        while True:
+            time.sleep(self.refit_interval)
+            if self.pending_changes:
+                try:
+                    self.refit()
+                except Exception:
+                    # A failed refit leaves the incrementally updated state in place; the next one retries.
+                    logger.exception("Background refit failed")
+
+    def _write_file(self, path, text):
+        """
+        Writes a document to the corpus directory, replacing any previous version atomically.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(tmp_path, path)
+
+    def start(self):
+        """
+        Starts warming up the engine in a background thread if it is not ready or already warming up.
+        """
+        with self._start_lock:
+            if self._ready.is_set():
+                return
+            if self._warm_up_thread is not None and self._warm_up_thread.is_alive():
+                return
+            self._warm_up_thread = threading.Thread(target=self._warm_up_in_background, daemon=True)
+            self._warm_up_thread.start()
+
+    def _warm_up_in_background(self):
+        try:
+            self.warm_up()
+        except Exception:
+            # The error is kept in self.error and reported by the readiness endpoint.
+            pass
+
+    def is_ready(self):
+        """
+        Tells whether the corpus is warm and the engine can serve requests.
+
+        Returns:
+        - bool: True once warm_up has completed successfully.
+        """
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Blocks until the engine is ready or the timeout expires.
+
+        Parameters:
+        - timeout (float, optional): Maximum number of seconds to wait.
+
+        Returns:
+        - bool: True if the engine is ready.
+        """
+        return self._ready.wait(timeout)
+
+    def get_document_vectors(self, model, state=None):
+        """
+        Returns the precomputed document vectors of the corpus for a model. Vectors for the engine's own model
+        are built during warm-up; those of any other model are built on first use and kept for later calls.
+
+        Parameters:
+        - model: The Word2Vec model or KeyedVectors.
+        - state (EngineState, optional): The snapshot whose corpus the vectors must match. Defaults to the current one.
+
+        Returns:
+        - DocumentVectors: The document vectors of the corpus for the model.
+        """
+        state = state or self.snapshot()
+        document_vectors = state.document_vectors
+        if model is self.model and document_vectors is not None and document_vectors.corpus_version == state.corpus.version:
+            return document_vectors
+        model_key = DocumentVectors.model_fingerprint(model)
+        with self._document_vectors_lock:
+            document_vectors = self._document_vectors_by_model.get(model_key)
+            if document_vectors is None or document_vectors.corpus_version != state.corpus.version:
+                document_vectors = DocumentVectors.build(state.corpus, model, self.vectorizer, model_key=model_key, cache=self.cache)
+                self._document_vectors_by_model[model_key] = document_vectors
+        return document_vectors
+
+    def candidate_documents(self, vector, model, state=None):
+        """
+        Retrieves the documents worth checking in detail for a query vector.
+
+        Parameters:
+        - vector (numpy.ndarray): The document vector of the query.
+        - model: The vector model the query vector was computed with.
+        - state (EngineState, optional): The snapshot whose index is queried. Defaults to the current one.
+
+        Returns:
+        - numpy.ndarray or None: The sorted indices of the candidate documents, or None when every document
+          must be checked (no candidate_count configured, or a model other than the indexed one).
+        """
+        index = (state or self.snapshot()).index
+        if self.candidate_count is None or model is not self.model or index is None:
+            return None
+        indices, _ = index.query(vector, self.candidate_count)
+        return np.sort(indices)
+
+    @metrics.instrument("build_index")
+    def _load_index(self, corpus, document_vectors):
+        """
+        Builds the candidate index over the normalized document vectors, reusing the copy saved in the cache
+        directory for the same model, corpus and index configuration.
+
+        Parameters:
+        - corpus (Corpus): The corpus the vectors belong to.
+        - document_vectors (DocumentVectors): The vectors to index.
+
+        Returns:
+        - FlatIndex, IVFIndex, ShardedIndex or None: The candidate index, or None without candidate_count, since
+          every document is checked then.
+        """
+        if self.candidate_count is None:
+            return None
+        path = None
+        if self.cache_dir is not None:
+            params_key = hashlib.sha1(json.dumps(self.index_params, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+            path = os.path.join(self.cache_dir, f"index-{self.index_type}-{params_key}-{document_vectors.model_key[:12]}-{corpus.version[:12]}.npz")
+            if self.index_type == ShardedIndex.kind:
+                path = path[:-len(".npz")]
+                if os.path.exists(os.path.join(path, ShardedIndex.MAP_FILE)):
+                    return ShardedIndex.load(path, self.index_params.get("executor", "process"))
+            elif os.path.exists(path):
+                return load_index(path)
+
+        if self.index_type == ShardedIndex.kind:
+            # The shards are written while building, and sent to the workers directly without a cache
+            return ShardedIndex(directory=path, **self.index_params).build(document_vectors.matrix)
+
+        index = create_index(self.index_type, **self.index_params).build(document_vectors.matrix)
+        if path is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            index.save(path)
+        return index
+
+    @metrics.instrument("load_model")
+    def _load_model(self):
+        """
+        Loads the word vectors. Exported KeyedVectors are memory-mapped read-only, so every worker process
+        shares them through the OS page cache; a full Word2Vec model is read and only its vectors are kept.
+        Models are never trained here: train_word2vec.py trains and exports them offline.
+
+        Returns:
+        - KeyedVectors: The word vectors.
+
+        Raises:
+        - FileNotFoundError: If there is no model to load.
+        """
+        path = self.model_path
+        if path is None:
+            path = DEFAULT_VECTORS_PATH if os.path.exists(DEFAULT_VECTORS_PATH) else LEGACY_MODEL_PATH
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Word vectors not found at {path}. Train them with: python train_word2vec.py")
+        if read_metadata(path) is not None:
+            return load_word_vectors(path, mmap="r")
+        return gensim_models.Word2Vec.load(path).wv
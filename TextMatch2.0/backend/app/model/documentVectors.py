@@ -0,0 +1,271 @@
+import os
+import hashlib
+import numpy as np
+from app.model.resources import lazy_import
+from app.model.sharedArrays import load_arrays, save_arrays
+
+pairwise = lazy_import("sklearn.metrics.pairwise")
+
+
+class DocumentVectors:
+    """
+    An L2-normalized float32 matrix with the mean word vector of every corpus document.
+
+    The matrix is built once per vector model and corpus version, so scoring a query against the whole
+    corpus is a single matrix-vector product instead of one preprocessing and cosine call per document.
+    The raw vectors are kept as well so the documents that pass a threshold can be rescored exactly as
+    sklearn's cosine_similarity would, keeping the reported scores identical to a per-document comparison.
+    Saved vectors are memory-mapped when loaded, so worker processes share them.
+    """
+
+    def __init__(self, vectors, model_key, corpus_version, matrix=None):
+        """
+        Initializes the DocumentVectors from the raw document vectors.
+
+        Parameters:
+        - vectors (numpy.ndarray): A (documents x dimensions) matrix with the mean word vector of each document.
+        - model_key (str): The fingerprint of the vector model the matrix was built with.
+        - corpus_version (str): The version of the corpus the matrix was built from.
+        - matrix (numpy.ndarray, optional): The already normalized vectors. Computed when omitted.
+        """
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.matrix = self.normalize(self.vectors) if matrix is None else matrix
+        self.model_key = model_key
+        self.corpus_version = corpus_version
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def model_fingerprint(model):
+        """
+        Computes a fingerprint of the word vectors of a model.
+
+        Parameters:
+        - model: A Word2Vec model or KeyedVectors.
+
+        Returns:
+        - str: A hexadecimal digest of the vectors and vocabulary.
+        """
+        wv = getattr(model, "wv", model)
+        digest = hashlib.sha1()
+        digest.update(np.ascontiguousarray(wv.vectors).tobytes())
+        digest.update("\0".join(wv.index_to_key).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def normalize(matrix):
+        """
+        Scales every row of a matrix to unit length, leaving zero rows untouched.
+
+        Parameters:
+        - matrix (numpy.ndarray): A two-dimensional array.
+
+        Returns:
+        - numpy.ndarray: The normalized float32 matrix.
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    @classmethod
+    def build(cls, corpus, model, vectorizer, model_key=None, cache=None, shared_dir=None):
+        """
+        Builds the matrix from the preprocessed tokens of the corpus, reusing cached vectors when available.
+
+        Parameters:
+        - corpus (Corpus): The precomputed corpus.
+        - model: The Word2Vec model or KeyedVectors.
+        - vectorizer (Vectorizer): The vectorizer used to average word vectors.
+        - model_key (str, optional): The fingerprint of the model. Computed when omitted.
+        - cache (CorpusCache, optional): A cache where the raw document vectors are loaded from and saved to.
+        - shared_dir (str, optional): A directory where the vectors are saved for every model and corpus version.
+          When given, they are opened from there, memory-mapped, and only built if they were not saved yet.
+
+        Returns:
+        - DocumentVectors: The normalized document vectors.
+        """
+        if model_key is None:
+            model_key = cls.model_fingerprint(model)
+        if shared_dir is not None and os.path.exists(cls.shared_path(shared_dir, model_key, corpus.version)):
+            return cls.load(cls.shared_path(shared_dir, model_key, corpus.version))
+
+        vectors = cache.load_vectors(model_key, corpus.document_keys) if cache is not None else None
+        if vectors is None:
+            vectors = vectorizer.get_token_array_vectors(corpus.token_lists, model)
+            if cache is not None:
+                cache.save_vectors(model_key, corpus.document_keys, vectors)
+
+        document_vectors = cls(vectors, model_key, corpus.version)
+        return document_vectors.share(shared_dir) if shared_dir is not None else document_vectors
+
+    @staticmethod
+    def shared_path(shared_dir, model_key, corpus_version):
+        """
+        Gets the directory where the vectors of a model and corpus version are saved for the worker processes.
+
+        Parameters:
+        - shared_dir (str): The directory of the shared vectors.
+        - model_key (str): The fingerprint of the vector model.
+        - corpus_version (str): The version of the corpus.
+
+        Returns:
+        - str: The directory of the vectors.
+        """
+        return os.path.join(shared_dir, f"vectors-{model_key[:16]}-{corpus_version[:16]}")
+
+    def share(self, shared_dir):
+        """
+        Saves the vectors for the worker processes, unless another one already did, and opens them memory-mapped.
+
+        Parameters:
+        - shared_dir (str): The directory of the shared vectors.
+
+        Returns:
+        - DocumentVectors: Equal vectors backed by memory-mapped arrays.
+        """
+        path = self.shared_path(shared_dir, self.model_key, self.corpus_version)
+        self.save(path)
+        return DocumentVectors.load(path)
+
+    def save(self, directory):
+        """
+        Saves the raw and normalized vectors as arrays that load memory-maps. An existing directory is left as it is.
+
+        Parameters:
+        - directory (str): The directory to write.
+        """
+        os.makedirs(os.path.dirname(directory) or ".", exist_ok=True)
+        save_arrays(directory, {"vectors": self.vectors, "matrix": self.matrix}, {"model_key": self.model_key, "corpus_version": self.corpus_version})
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Opens the vectors written by save, memory-mapped read-only.
+
+        Parameters:
+        - directory (str): The directory of the vectors.
+
+        Returns:
+        - DocumentVectors: The document vectors.
+        """
+        arrays, meta = load_arrays(directory)
+        return cls(arrays["vectors"], meta["model_key"], meta["corpus_version"], matrix=arrays["matrix"])
+
+    def upsert(self, row, vector, corpus_version):
+        """
+        Sets the vector of a document, appending it when row is the number of documents. Only the new row is
+        normalized, and the DocumentVectors itself is not modified.
+
+        Parameters:
+        - row (int): The index of the document, at most the number of documents.
+        - vector (numpy.ndarray): The mean word vector of the document.
+        - corpus_version (str): The version of the corpus after the change.
+
+        Returns:
+        - DocumentVectors: The updated document vectors.
+        """
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        stop = min(row + 1, len(self))
+        vectors = np.vstack([self.vectors[:row], vector, self.vectors[stop:]])
+        matrix = np.vstack([self.matrix[:row], self.normalize(vector), self.matrix[stop:]])
+        return DocumentVectors(vectors, self.model_key, corpus_version, matrix=matrix)
+
+    def delete(self, row, corpus_version):
+        """
+        Removes the vector of a document. The DocumentVectors itself is not modified.
+
+        Parameters:
+        - row (int): The index of the document.
+        - corpus_version (str): The version of the corpus after the change.
+
+        Returns:
+        - DocumentVectors: The document vectors without the document.
+        """
+        return DocumentVectors(np.delete(self.vectors, row, axis=0), self.model_key, corpus_version, matrix=np.delete(self.matrix, row, axis=0))
+
+    def similarities(self, vector):
+        """
+        Computes the cosine similarity of a vector with every document.
+
+        Parameters:
+        - vector (numpy.ndarray): The query vector.
+
+        Returns:
+        - numpy.ndarray: A float32 array with one similarity per document.
+        """
+        query = self.normalize(np.asarray(vector).reshape(1, -1))[0]
+        return self.matrix @ query
+
+    def exact_similarities(self, vector, indices):
+        """
+        Computes the cosine similarity of a vector with some documents using sklearn's cosine_similarity.
+
+        Parameters:
+        - vector (numpy.ndarray): The query vector.
+        - indices (numpy.ndarray): The indices of the documents.
+
+        Returns:
+        - numpy.ndarray: One similarity per index.
+        """
+        if len(indices) == 0:
+            return np.array([], dtype=np.float32)
+        return pairwise.cosine_similarity([vector], self.vectors[indices])[0]
+
+    def above_threshold(self, vector, threshold):
+        """
+        Finds the documents whose cosine similarity with a vector is above a threshold.
+
+        Parameters:
+        - vector (numpy.ndarray): The query vector.
+        - threshold (float): The minimum similarity, exclusive.
+
+        Returns:
+        - tuple: An array of document indices in corpus order and an array with their exact similarities.
+        """
+        return self._rescore(vector, self.similarities(vector), threshold)
+
+    def batch_above_threshold(self, vectors, threshold):
+        """
+        Finds the documents above a threshold for many query vectors, scoring them all with a single
+        matrix product.
+
+        Parameters:
+        - vectors (list of numpy.ndarray): The query vectors.
+        - threshold (float): The minimum similarity, exclusive.
+
+        Returns:
+        - list of tuple: For each query, the same as above_threshold.
+        """
+        if len(vectors) == 0:
+            return []
+        queries = self.normalize(np.asarray(vectors).reshape(len(vectors), -1))
+        scores = queries @ self.matrix.T
+        return [self._rescore(vector, row, threshold) for vector, row in zip(vectors, scores)]
+
+    def _rescore(self, vector, scores, threshold):
+        # A small margin keeps documents whose float32 score rounds just below the threshold
+        indices = np.flatnonzero(scores > threshold - 1e-5)
+        similarities = self.exact_similarities(vector, indices)
+        keep = similarities > threshold
+        return indices[keep], similarities[keep]
+
+    def top_k(self, vector, k):
+        """
+        Finds the k documents most similar to a vector.
+
+        Parameters:
+        - vector (numpy.ndarray): The query vector.
+        - k (int): The number of documents to return.
+
+        Returns:
+        - tuple: An array of document indices sorted by decreasing similarity and an array with their similarities.
+        """
+        scores = self.similarities(vector)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        indices = np.argpartition(-scores, k - 1)[:k]
+        indices = indices[np.argsort(-scores[indices], kind="stable")]
+        return indices, scores[indices]
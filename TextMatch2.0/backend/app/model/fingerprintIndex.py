@@ -0,0 +1,279 @@
+import os
+import re
+import json
+import shutil
+import zlib
+from collections import namedtuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# The fingerprints of a text: the hash of each selected word n-gram, its position in words and its character offsets
+Fingerprints = namedtuple("Fingerprints", ["hashes", "positions", "starts", "ends"])
+
+
+def _words(text):
+    return [(match.group().lower(), match.start(), match.end()) for match in re.finditer(r'\w+', text)]
+
+
+class FingerprintIndex:
+    """
+    An inverted index of winnowed word n-gram fingerprints (Schleimer et al., 2003, the algorithm of MOSS)
+    to find verbatim and near-verbatim copies.
+
+    Every word n-gram of a document is hashed, and in each window of consecutive hashes only the smallest one
+    is kept. Two texts sharing a passage of at least window + ngram_size - 1 words are guaranteed to share a
+    fingerprint, while only about 2 / (window + 1) of the n-grams are stored.
+
+    The table maps every fingerprint hash to the document, word position and character offsets it comes from.
+    It is kept in parallel arrays sorted by hash, so a lookup is a binary search per query fingerprint, and
+    it can be saved as .npy files that are memory-mapped when loaded.
+    """
+
+    FORMAT_VERSION = 1
+    ARRAYS = ("hashes", "doc_ids", "positions", "starts", "ends")
+
+    def __init__(self, ngram_size=3, window=4, tokenize=None):
+        """
+        Initializes an empty FingerprintIndex.
+
+        Parameters:
+        - ngram_size (int): The number of consecutive words per fingerprint.
+        - window (int): The number of consecutive n-grams each fingerprint is selected from. 1 keeps every n-gram.
+        - tokenize (callable, optional): Turns a text into (word, start, end) tuples of normalized words and their
+          character offsets, like Preprocessor.clean_tokens. Defaults to lowercase words.
+        """
+        self.ngram_size = ngram_size
+        self.window = window
+        self.tokenize = tokenize or _words
+        self.hashes = np.zeros(0, dtype=np.uint32)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.positions = np.zeros(0, dtype=np.int32)
+        self.starts = np.zeros(0, dtype=np.int32)
+        self.ends = np.zeros(0, dtype=np.int32)
+        self.n_documents = 0
+
+    def winnow(self, hashes):
+        """
+        Selects the fingerprints among the hashes of the n-grams of a text.
+
+        Parameters:
+        - hashes (numpy.ndarray): The hash of every n-gram, in text order.
+
+        Returns:
+        - numpy.ndarray: The sorted positions of the smallest hash of every window, the rightmost one on ties.
+        """
+        if self.window <= 1 or len(hashes) <= 1:
+            return np.arange(len(hashes))
+        if len(hashes) <= self.window:
+            return np.array([len(hashes) - 1 - np.argmin(hashes[::-1])])
+        windows = sliding_window_view(hashes, self.window)
+        rightmost = self.window - 1 - np.argmin(windows[:, ::-1], axis=1)
+        return np.unique(rightmost + np.arange(len(windows)))
+
+    def fingerprints(self, text):
+        """
+        Computes the fingerprints of a text.
+
+        Parameters:
+        - text (str): The text.
+
+        Returns:
+        - Fingerprints: The selected hashes with their word positions and character offsets. Texts shorter than
+          an n-gram produce a single n-gram with all their words, and empty texts produce none.
+        """
+        tokens = self.tokenize(text)
+        if not tokens:
+            empty = np.zeros(0, dtype=np.int32)
+            return Fingerprints(np.zeros(0, dtype=np.uint32), empty, empty, empty)
+        n = min(self.ngram_size, len(tokens))
+        words = [word for word, _, _ in tokens]
+        hashes = np.array([zlib.crc32(" ".join(words[i:i + n]).encode("utf-8")) for i in range(len(tokens) - n + 1)], dtype=np.uint32)
+        selected = self.winnow(hashes)
+        starts = np.array([start for _, start, _ in tokens], dtype=np.int32)
+        ends = np.array([end for _, _, end in tokens], dtype=np.int32)
+        return Fingerprints(hashes[selected], selected.astype(np.int32), starts[selected], ends[selected + n - 1])
+
+    def build(self, corpus):
+        """
+        Indexes the documents of a corpus.
+
+        Parameters:
+        - corpus (Corpus): The precomputed corpus.
+
+        Returns:
+        - FingerprintIndex: The index itself.
+        """
+        fingerprints = [self.fingerprints(text) for text in corpus.original_texts]
+        doc_ids = [np.full(len(document.hashes), doc_id, dtype=np.int32) for doc_id, document in enumerate(fingerprints)]
+        self._set_table(fingerprints, doc_ids, len(fingerprints))
+        return self
+
+    def _set_table(self, fingerprints, doc_ids, n_documents):
+        """
+        Sorts the concatenated fingerprints of several documents by hash and keeps them as the table.
+        """
+        # The fingerprints of an empty text keep the columns typed when there are no documents
+        fingerprints = [self.fingerprints("")] + list(fingerprints)
+        columns = [np.concatenate([getattr(document, field) for document in fingerprints]) for field in Fingerprints._fields]
+        doc_ids = np.concatenate([np.zeros(0, dtype=np.int32)] + list(doc_ids))
+        order = np.argsort(columns[0], kind="stable")
+        self.hashes, self.positions, self.starts, self.ends = (column[order] for column in columns)
+        self.doc_ids = doc_ids[order]
+        self.n_documents = n_documents
+
+    def _table(self, rows=slice(None)):
+        return Fingerprints(self.hashes[rows], self.positions[rows], self.starts[rows], self.ends[rows])
+
+    def lookup(self, text):
+        """
+        Finds the table entries of every fingerprint of a text.
+
+        Parameters:
+        - text (str): The query text.
+
+        Returns:
+        - tuple: The Fingerprints of the text, and two aligned arrays with the query fingerprint and the table row
+          of every match.
+        """
+        query = self.fingerprints(text)
+        starts = np.searchsorted(self.hashes, query.hashes, side="left")
+        lengths = np.searchsorted(self.hashes, query.hashes, side="right") - starts
+        query_rows = np.repeat(np.arange(len(query.hashes)), lengths)
+        # Expand every [start, start + length) range into the rows of the matching entries
+        table_rows = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+        return query, query_rows, table_rows
+
+    def shared_counts(self, text):
+        """
+        Counts the distinct fingerprints a text shares with every document.
+
+        Parameters:
+        - text (str): The query text.
+
+        Returns:
+        - numpy.ndarray: The number of shared fingerprints per document.
+        """
+        query, query_rows, table_rows = self.lookup(text)
+        pairs = np.unique(self.doc_ids[table_rows].astype(np.int64) << 32 | query.hashes[query_rows].astype(np.int64))
+        return np.bincount(pairs >> 32, minlength=self.n_documents)
+
+    def spans(self, text, doc_ids=None):
+        """
+        Finds the passages a text shares verbatim with the documents. Matching fingerprints at the same shift
+        between the text and a document, at most a window apart, are merged into a single passage.
+
+        Parameters:
+        - text (str): The query text.
+        - doc_ids (iterable of int, optional): The documents to look at. Defaults to every document.
+
+        Returns:
+        - dict: Maps the index of every document sharing a passage to a list of (start, end, document start,
+          document end) character offsets of the passages in the text and in the document, sorted by start.
+        """
+        query, query_rows, table_rows = self.lookup(text)
+        docs = self.doc_ids[table_rows]
+        if doc_ids is not None:
+            keep = np.isin(docs, np.fromiter(doc_ids, dtype=np.int64))
+            query_rows, table_rows, docs = query_rows[keep], table_rows[keep], docs[keep]
+        query_positions = query.positions[query_rows].astype(np.int64)
+        shifts = self.positions[table_rows] - query_positions
+        order = np.lexsort((query_positions, shifts, docs))
+
+        spans = {}
+        current = None
+        for row in order.tolist():
+            doc, shift, position = int(docs[row]), int(shifts[row]), int(query_positions[row])
+            query_row, table_row = query_rows[row], table_rows[row]
+            if current is not None and current[0] == (doc, shift) and position - current[1] <= self.window:
+                current[1] = position
+                span = current[2]
+                span[1] = max(span[1], int(query.ends[query_row]))
+                span[3] = max(span[3], int(self.ends[table_row]))
+                continue
+            span = [int(query.starts[query_row]), int(query.ends[query_row]), int(self.starts[table_row]), int(self.ends[table_row])]
+            spans.setdefault(doc, []).append(span)
+            current = [(doc, shift), position, span]
+        return {doc: sorted(tuple(span) for span in doc_spans) for doc, doc_spans in spans.items()}
+
+    def upsert(self, doc_index, text):
+        """
+        Indexes a new or changed document. The index itself is not modified.
+
+        Parameters:
+        - doc_index (int): The index of the document in the corpus, at most the number of documents.
+        - text (str): The text of the document.
+
+        Returns:
+        - FingerprintIndex: A new index with the document updated.
+        """
+        keep = self.doc_ids != doc_index
+        fingerprints = self.fingerprints(text)
+        index = FingerprintIndex(self.ngram_size, self.window, self.tokenize)
+        index._set_table(
+            [self._table(keep), fingerprints],
+            [self.doc_ids[keep], np.full(len(fingerprints.hashes), doc_index, dtype=np.int32)],
+            max(self.n_documents, doc_index + 1),
+        )
+        return index
+
+    def delete(self, doc_index):
+        """
+        Removes a document. The indices of the following documents are shifted down by one, like the rows of the corpus.
+
+        Parameters:
+        - doc_index (int): The index of the document in the corpus.
+
+        Returns:
+        - FingerprintIndex: A new index without the document.
+        """
+        keep = self.doc_ids != doc_index
+        doc_ids = self.doc_ids[keep]
+        index = FingerprintIndex(self.ngram_size, self.window, self.tokenize)
+        index.hashes, index.positions, index.starts, index.ends = self._table(keep)
+        index.doc_ids = np.where(doc_ids > doc_index, doc_ids - 1, doc_ids).astype(np.int32)
+        index.n_documents = self.n_documents - 1
+        return index
+
+    def save(self, directory):
+        """
+        Saves the index as one .npy file per array and a meta.json file. The directory is replaced atomically.
+
+        Parameters:
+        - directory (str): The directory to write.
+        """
+        tmp_directory = directory + ".tmp"
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+        for name in self.ARRAYS:
+            np.save(os.path.join(tmp_directory, f"{name}.npy"), np.asarray(getattr(self, name)))
+        meta = {"format": self.FORMAT_VERSION, "ngram_size": self.ngram_size, "window": self.window, "n_documents": self.n_documents}
+        with open(os.path.join(tmp_directory, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_directory, directory)
+
+    @classmethod
+    def load(cls, directory, tokenize=None, mmap=True):
+        """
+        Loads an index saved with save.
+
+        Parameters:
+        - directory (str): The directory of the index.
+        - tokenize (callable, optional): The tokenizer the index was built with.
+        - mmap (bool): Whether the arrays are memory-mapped read-only instead of read into memory.
+
+        Returns:
+        - FingerprintIndex: The loaded index.
+
+        Raises:
+        - ValueError: If the index was saved with another format.
+        """
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        if meta.get("format") != cls.FORMAT_VERSION:
+            raise ValueError(f"Unsupported fingerprint index format: {meta.get('format')}")
+        index = cls(meta["ngram_size"], meta["window"], tokenize)
+        for name in cls.ARRAYS:
+            setattr(index, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None))
+        index.n_documents = meta["n_documents"]
+        return index
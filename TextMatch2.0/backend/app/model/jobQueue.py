@@ -0,0 +1,330 @@
+import json
+import multiprocessing
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app.model.batchDetector import BatchDetector
+from app.model.detectorEngine import DetectorEngine
+from app.model.plagarsimDetector import PlagiarismDetector
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue already holds the maximum number of unfinished jobs.
+    """
+
+
+def _init_worker():
+    """
+    Warms up the engine of a worker process once, before it runs any job.
+    """
+    DetectorEngine.get_instance().warm_up()
+
+
+def run_job(payload):
+    """
+    Runs a plagiarism check. It is the function executed by the workers, so it only takes and returns
+    JSON-serializable values. The engine first catches up with the corpus changes published by other processes.
+
+    Parameters:
+    - payload (dict): {"text": ...} for a single text, or {"documents": [[id, text], ...]} for a batch.
+
+    Returns:
+    - dict or list: The results of PlagiarismDetector.get_results, or a list of [id, results] for a batch.
+    """
+    engine = DetectorEngine.get_instance()
+    engine.sync()
+    if "documents" in payload:
+        return [[document_id, results] for document_id, results in BatchDetector(engine).detect(payload["documents"])]
+    detector = PlagiarismDetector(engine)
+    detector.set_user_input(payload["text"])
+    return detector.get_results()
+
+
+class MemoryJobStore:
+    """
+    Keeps the state of the jobs in a dictionary. It is lost when the process exits.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty MemoryJobStore.
+        """
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id, kind):
+        """
+        Stores a new queued job.
+
+        Parameters:
+        - job_id (str): The id of the job.
+        - kind (str): "check" or "batch".
+        """
+        with self._lock:
+            self._jobs[job_id] = {"id": job_id, "kind": kind, "status": QUEUED, "submitted": time.time(), "started": None, "finished": None, "result": None, "error": None}
+
+    def update(self, job_id, **fields):
+        """
+        Updates some fields of a job.
+
+        Parameters:
+        - job_id (str): The id of the job.
+        - **fields: The new values, e.g. status="running".
+        """
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        """
+        Gets a job.
+
+        Parameters:
+        - job_id (str): The id of the job.
+
+        Returns:
+        - dict or None: A copy of the job, or None if it does not exist.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def purge(self, finished_before):
+        """
+        Removes the finished jobs that finished before a time.
+
+        Parameters:
+        - finished_before (float): A UNIX timestamp.
+        """
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job["finished"] is not None and job["finished"] < finished_before]:
+                del self._jobs[job_id]
+
+
+class SQLiteJobStore:
+    """
+    Keeps the state of the jobs in a SQLite database, so finished results survive a restart.
+    Jobs that were unfinished when the process stopped are marked as failed when it starts again.
+    """
+
+    def __init__(self, path):
+        """
+        Opens or creates the database.
+
+        Parameters:
+        - path (str): The database file.
+        """
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, status TEXT, submitted REAL, started REAL, finished REAL, result TEXT, error TEXT)"
+            )
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE status IN (?, ?)",
+                (FAILED, "Interrumpido por un reinicio del servicio", time.time(), QUEUED, RUNNING),
+            )
+
+    def create(self, job_id, kind):
+        """
+        Stores a new queued job. See MemoryJobStore.create.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("INSERT INTO jobs (id, kind, status, submitted) VALUES (?, ?, ?, ?)", (job_id, kind, QUEUED, time.time()))
+
+    def update(self, job_id, **fields):
+        """
+        Updates some fields of a job. See MemoryJobStore.update.
+        """
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connection:
+            self._connection.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        """
+        Gets a job. See MemoryJobStore.get.
+        """
+        with self._lock:
+            cursor = self._connection.execute("SELECT id, kind, status, submitted, started, finished, result, error FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "kind", "status", "submitted", "started", "finished", "result", "error"), row))
+        if job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def purge(self, finished_before):
+        """
+        Removes the jobs that finished before a time. See MemoryJobStore.purge.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?", (finished_before,))
+
+
+class JobQueue:
+    """
+    Runs plagiarism checks in the background on a pool of workers, so requests only submit and poll.
+
+    With the "process" executor every worker process holds its own warmed-up engine, so checks run in
+    parallel across cores. The "thread" executor shares the engine of the web process instead, which uses
+    less memory but runs the Python parts of the checks one at a time.
+
+    The number of unfinished jobs is bounded: submitting beyond max_pending raises QueueFullError.
+    Queued jobs can be cancelled; a running job finishes, but its result is discarded.
+    """
+
+    def __init__(self, max_workers=None, max_pending=100, store=None, executor="process", result_ttl=3600):
+        """
+        Initializes the JobQueue. The workers are started on the first submission.
+
+        Parameters:
+        - max_workers (int, optional): The number of workers. Defaults to the number of CPUs.
+        - max_pending (int): The maximum number of queued and running jobs.
+        - store (MemoryJobStore or SQLiteJobStore, optional): Where the jobs are kept. Defaults to memory.
+        - executor (str): "process" or "thread".
+        - result_ttl (float): The number of seconds finished jobs are kept.
+        """
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Unknown executor: {executor}")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.store = store if store is not None else MemoryJobStore()
+        self.executor_type = executor
+        self.result_ttl = result_ttl
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.executor_type == "process":
+                # Spawned workers start clean instead of inheriting the locks and threads of the web process
+                context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context, initializer=_init_worker)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+        return self._executor
+
+    def pending(self):
+        """
+        Counts the unfinished jobs.
+
+        Returns:
+        - int: The number of queued and running jobs.
+        """
+        with self._lock:
+            return len(self._futures)
+
+    def submit(self, payload):
+        """
+        Queues a plagiarism check.
+
+        Parameters:
+        - payload (dict): The input of run_job.
+
+        Returns:
+        - str: The id of the job.
+
+        Raises:
+        - QueueFullError: If max_pending jobs are already unfinished.
+        """
+        self.store.purge(time.time() - self.result_ttl)
+        kind = "batch" if "documents" in payload else "check"
+        with self._lock:
+            if len(self._futures) >= self.max_pending:
+                raise QueueFullError(f"There are already {len(self._futures)} unfinished jobs")
+            job_id = uuid.uuid4().hex
+            self.store.create(job_id, kind)
+            future = self._get_executor().submit(run_job, payload)
+            self._futures[job_id] = future
+        # Workers cannot report when they start, so a job counts as running once the executor picks it up
+        future.add_done_callback(lambda done: self._finish(job_id, done))
+        return job_id
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+        job = self.store.get(job_id)
+        if job is None or job["status"] == CANCELLED:
+            return
+        if future.cancelled():
+            self.store.update(job_id, status=CANCELLED, finished=time.time())
+        elif future.exception() is not None:
+            self.store.update(job_id, status=FAILED, error=str(future.exception()), finished=time.time())
+        else:
+            self.store.update(job_id, status=DONE, result=future.result(), finished=time.time())
+
+    def status(self, job_id):
+        """
+        Gets a job, refreshing whether it started running.
+
+        Parameters:
+        - job_id (str): The id of the job.
+
+        Returns:
+        - dict or None: The job, or None if it does not exist or expired.
+        """
+        with self._lock:
+            future = self._futures.get(job_id)
+        job = self.store.get(job_id)
+        if job is not None and job["status"] == QUEUED and future is not None and future.running():
+            job["status"], job["started"] = RUNNING, time.time()
+            self.store.update(job_id, status=RUNNING, started=job["started"])
+        return job
+
+    def cancel(self, job_id):
+        """
+        Cancels a job.
+
+        Parameters:
+        - job_id (str): The id of the job.
+
+        Returns:
+        - bool or None: True if the job was cancelled, False if it had already finished, None if it does not exist.
+        """
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        if job["status"] in FINISHED:
+            return job["status"] == CANCELLED
+        self.store.update(job_id, status=CANCELLED, finished=time.time())
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return True
+
+    def restart(self):
+        """
+        Replaces the worker processes, e.g. after the reference documents changed, so new jobs run on a freshly
+        loaded engine. Jobs already submitted finish on the previous workers. Thread workers share the engine
+        of the web process and are kept.
+        """
+        if self.executor_type != "process":
+            return
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def shutdown(self):
+        """
+        Stops the workers, cancelling the queued jobs and waiting for the running ones.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
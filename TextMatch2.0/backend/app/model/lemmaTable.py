@@ -0,0 +1,124 @@
+import os
+import json
+import hashlib
+from functools import lru_cache
+from app.model.resources import lazy_import
+
+nltk_stem = lazy_import("nltk.stem")
+
+
+class LemmaTable:
+    """
+    A lookup table from the words of a corpus to the lemmas Spacy gives them, so queries can be lemmatized
+    without running Spacy. Words missing from the table are stemmed with the SnowballStemmer instead, which
+    does not always agree with Spacy but is much faster.
+
+    Words are lemmatized by Spacy one at a time, without the sentence they appear in, so the few words whose
+    lemma depends on their part of speech in context may differ from the full pipeline. A word Spacy splits
+    into several tokens maps to all of their lemmas.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, lemmas=None):
+        """
+        Initializes the LemmaTable.
+
+        Parameters:
+        - lemmas (dict, optional): Maps every word to its lemmas, separated by spaces.
+        """
+        self.lemmas = dict(lemmas or {})
+        self.stemmer = nltk_stem.SnowballStemmer("english")
+        self._stem = lru_cache(maxsize=100000)(self.stemmer.stem)
+
+    def __len__(self):
+        return len(self.lemmas)
+
+    def __contains__(self, word):
+        return word in self.lemmas
+
+    def lemmatize_tokens(self, tokens):
+        """
+        Lemmatizes tokens with the table, stemming the ones it does not have.
+
+        Parameters:
+        - tokens (list of str): The cleaned tokens without stopwords.
+
+        Returns:
+        - list of str: The lemmatized tokens.
+        """
+        lemmas = []
+        for token in tokens:
+            lemma = self.lemmas.get(token)
+            if lemma is None:
+                lemmas.append(self._stem(token))
+            elif " " in lemma:
+                lemmas.extend(lemma.split())
+            else:
+                lemmas.append(lemma)
+        return lemmas
+
+    def update(self, preprocessor, words, batch_size=1024):
+        """
+        Adds the Spacy lemmas of the words that are not in the table yet. The table itself is modified.
+
+        Parameters:
+        - preprocessor (Preprocessor): The preprocessor whose Spacy model lemmatizes the words.
+        - words (iterable of str): The words, e.g. the vocabulary of a corpus.
+        - batch_size (int): The number of words Spacy processes per batch.
+
+        Returns:
+        - int: The number of words added.
+        """
+        missing = sorted({word for word in words if word not in self.lemmas})
+        docs = preprocessor.nlp.pipe(missing, disable=preprocessor.disabled_components(preprocessor.LEMMATIZE_DISABLED), batch_size=batch_size)
+        for word, doc in zip(missing, docs):
+            self.lemmas[word] = " ".join(token.lemma_ for token in doc)
+        return len(missing)
+
+    @staticmethod
+    def path(directory, config):
+        """
+        Gets the file of the table of a preprocessing configuration.
+
+        Parameters:
+        - directory (str): The directory of the tables.
+        - config (dict): The preprocessing configuration, from Preprocessor.get_config.
+
+        Returns:
+        - str: The path of the JSON file.
+        """
+        digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+        return os.path.join(directory, f"lemmas-{digest[:12]}.json")
+
+    def save(self, path):
+        """
+        Writes the table to a JSON file. The file is replaced atomically.
+
+        Parameters:
+        - path (str): The path of the file.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump({"format": self.FORMAT_VERSION, "lemmas": self.lemmas}, file, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a table written by save.
+
+        Parameters:
+        - path (str): The path of the file.
+
+        Returns:
+        - LemmaTable: The table, empty if the file does not exist or has another format.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                contents = json.load(file)
+        except (OSError, ValueError):
+            return cls()
+        if contents.get("format") != cls.FORMAT_VERSION:
+            return cls()
+        return cls(contents["lemmas"])
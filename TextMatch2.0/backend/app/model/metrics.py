@@ -0,0 +1,248 @@
+import time
+import threading
+import contextvars
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# The upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# The help text of the metrics, shown by /metrics
+DESCRIPTIONS = {
+    "stage_seconds": "Time spent in each stage of the detection pipeline. Stages can be nested in others.",
+    "request_seconds": "Time spent serving each endpoint.",
+    "requests": "Requests served, by endpoint and status.",
+    "spacy_docs_parsed": "Texts processed by a Spacy pipeline.",
+    "sentence_pairs_considered": "Sentence pairs considered by the sentence matcher.",
+    "sentence_pairs_bounded": "Sentence pairs that passed both upper bounds of the sentence matcher.",
+    "sequence_matcher_calls": "Sentence pairs verified with SequenceMatcher.",
+    "parse_cache_hits": "Sentence signatures found in the parse cache.",
+    "parse_cache_misses": "Sentence signatures parsed with Spacy on a parse cache miss.",
+    "result_cache_hits": "Checks answered from the result cache.",
+    "result_cache_misses": "Checks not found in the result cache.",
+}
+
+_current_request = contextvars.ContextVar("current_request", default=None)
+
+
+class RequestTimings:
+    """
+    The time spent in every stage and the counters of a single request.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+
+    def add_stage(self, name, seconds):
+        total, calls = self.stages.get(name, (0.0, 0))
+        self.stages[name] = (total + seconds, calls + 1)
+
+    def add_count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        """
+        Describes the request so far.
+
+        Returns:
+        - dict: The milliseconds since the request started, the milliseconds and calls of every stage and the counters.
+        """
+        return {
+            "total_ms": (time.perf_counter() - self.start) * 1000,
+            "stages": {name: {"ms": seconds * 1000, "calls": calls} for name, (seconds, calls) in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+class Metrics:
+    """
+    A registry of counters, gauges and latency histograms of the service, exported in the Prometheus text format.
+
+    Every stage and counter is also added to the RequestTimings of the current request, if one was begun in the
+    current context, so a response can report where its own time went.
+    """
+
+    def __init__(self, prefix="textmatch", buckets=BUCKETS):
+        """
+        Initializes an empty registry.
+
+        Parameters:
+        - prefix (str): The prefix of every exported metric name.
+        - buckets (tuple of float): The upper bounds of the histogram buckets, in seconds.
+        """
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def count(self, name, value=1, **labels):
+        """
+        Increments a counter.
+
+        Parameters:
+        - name (str): The name of the counter, exported with a _total suffix.
+        - value (int): The increment.
+        - labels (str): The labels of the counter.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        timings = _current_request.get()
+        if timings is not None and not labels:
+            timings.add_count(name, value)
+
+    def observe(self, name, seconds, **labels):
+        """
+        Records a duration in a histogram.
+
+        Parameters:
+        - name (str): The name of the histogram.
+        - seconds (float): The duration.
+        - labels (str): The labels of the histogram.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][bisect_left(self.buckets, seconds)] += 1
+            histogram[1] += seconds
+
+    def gauge(self, name, function):
+        """
+        Registers a gauge, whose value is read when the metrics are exported.
+
+        Parameters:
+        - name (str): The name of the gauge.
+        - function (callable): Returns the current value.
+        """
+        self._gauges[name] = function
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times a stage of the pipeline, in the stage_seconds histogram and in the current request.
+
+        Parameters:
+        - name (str): The name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe("stage_seconds", seconds, stage=name)
+            timings = _current_request.get()
+            if timings is not None:
+                timings.add_stage(name, seconds)
+
+    def instrument(self, name):
+        """
+        Decorates a function so every call is timed as a stage.
+
+        Parameters:
+        - name (str): The name of the stage.
+
+        Returns:
+        - callable: The decorator.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def begin_request(self):
+        """
+        Starts collecting the timings of a request in the current context.
+
+        Returns:
+        - contextvars.Token: The token that end_request needs.
+        """
+        return _current_request.set(RequestTimings())
+
+    def end_request(self, token):
+        """
+        Stops collecting the timings of the request begun with the token.
+
+        Parameters:
+        - token (contextvars.Token): The token returned by begin_request.
+        """
+        _current_request.reset(token)
+
+    def current_request(self):
+        """
+        Gets the timings of the request of the current context.
+
+        Returns:
+        - RequestTimings or None: The timings, or None outside a request.
+        """
+        return _current_request.get()
+
+    def _name(self, name):
+        return f"{self.prefix}_{name}"
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def _header(self, lines, name, kind):
+        if name in DESCRIPTIONS:
+            lines.append(f"# HELP {self._name(name)} {DESCRIPTIONS[name]}")
+        lines.append(f"# TYPE {self._name(name)} {kind}")
+
+    def export(self):
+        """
+        Exports every metric in the Prometheus text exposition format.
+
+        Returns:
+        - str: The metrics.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(counts), total) for key, (counts, total) in self._histograms.items()}
+        lines = []
+
+        for name in sorted({name for name, _ in counters}):
+            self._header(lines, name, "counter")
+            for (_, labels), value in sorted((key, value) for key, value in counters.items() if key[0] == name):
+                lines.append(f"{self._name(name)}_total{self._labels(labels)} {value}")
+
+        for name in sorted({name for name, _ in histograms}):
+            self._header(lines, name, "histogram")
+            for (_, labels), (counts, total) in sorted((key, value) for key, value in histograms.items() if key[0] == name):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self._name(name)}_bucket{self._labels(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{self._name(name)}_sum{self._labels(labels)} {total}")
+                lines.append(f"{self._name(name)}_count{self._labels(labels)} {cumulative}")
+
+        for name, function in sorted(self._gauges.items()):
+            try:
+                value = function()
+            except Exception:
+                continue
+            self._header(lines, name, "gauge")
+            lines.append(f"{self._name(name)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# The registry of the process
+metrics = Metrics()
@@ -0,0 +1,316 @@
+import copy
+import zlib
+import numpy as np
+from collections import defaultdict
+
+# Largest prime below 2**32, so (a * x + b) % _PRIME never overflows uint64
+_PRIME = np.uint64(4294967291)
+
+
+class MinHasher:
+    """
+    A class to compute MinHash signatures of word n-gram shingles.
+
+    The estimated Jaccard similarity of two texts is the fraction of positions where their signatures agree.
+    """
+
+    def __init__(self, num_perm=128, shingle_size=3, seed=1):
+        """
+        Initializes the MinHasher with a fixed family of hash permutations.
+
+        Parameters:
+        - num_perm (int): The number of hash permutations, i.e. the length of a signature.
+        - shingle_size (int): The number of consecutive words per shingle.
+        - seed (int): The seed of the permutations. Signatures are only comparable with the same seed.
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+
+    def shingles(self, words):
+        """
+        Hashes the word n-grams of a text.
+
+        Parameters:
+        - words (list of str): The normalized words of the text.
+
+        Returns:
+        - numpy.ndarray: The unique 32-bit hashes of the shingles. Texts shorter than a shingle produce a single
+          shingle with all their words, and empty texts produce none.
+        """
+        n = self.shingle_size
+        grams = [" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))] if words else []
+        return np.unique(np.array([zlib.crc32(gram.encode("utf-8")) for gram in grams], dtype=np.uint64))
+
+    def signature(self, shingles):
+        """
+        Computes the MinHash signature of a set of shingle hashes.
+
+        Parameters:
+        - shingles (numpy.ndarray): The shingle hashes.
+
+        Returns:
+        - numpy.ndarray: A uint32 array of length num_perm. Empty sets get the maximum value everywhere.
+        """
+        if len(shingles) == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        hashes = (np.outer(self.a, shingles % _PRIME) + self.b[:, None]) % _PRIME
+        return hashes.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def jaccard(signature, signatures):
+        """
+        Estimates the Jaccard similarity of a signature with one or many others.
+
+        Parameters:
+        - signature (numpy.ndarray): A signature.
+        - signatures (numpy.ndarray): A signature or a matrix with one signature per row.
+
+        Returns:
+        - float or numpy.ndarray: The estimated similarities.
+        """
+        return np.mean(signatures == signature, axis=-1)
+
+
+class MinHashLSH:
+    """
+    A locality-sensitive hashing index over MinHash signatures.
+
+    Signatures are split into bands; two signatures become candidates if all the rows of at least one band
+    are equal. The number of bands is chosen so the S-curve threshold is below the requested bound,
+    favouring recall, and candidates are then checked against the bound with the full signatures.
+    """
+
+    def __init__(self, threshold, num_perm=128):
+        """
+        Initializes an empty MinHashLSH.
+
+        Parameters:
+        - threshold (float): The minimum estimated Jaccard similarity of a match.
+        - num_perm (int): The length of the signatures.
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = self.optimal_bands(threshold, num_perm)
+        self.tables = [defaultdict(list) for _ in range(self.bands)]
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint32)
+
+    @staticmethod
+    def optimal_bands(threshold, num_perm):
+        """
+        Chooses the band layout whose S-curve threshold (1/bands)^(1/rows) is the highest one not above the bound.
+
+        Parameters:
+        - threshold (float): The minimum estimated Jaccard similarity of a match.
+        - num_perm (int): The length of the signatures.
+
+        Returns:
+        - tuple: The number of bands and the number of rows per band.
+        """
+        best = (num_perm, 1)
+        best_curve = 0.0
+        for rows in range(1, num_perm + 1):
+            if num_perm % rows:
+                continue
+            bands = num_perm // rows
+            curve = (1.0 / bands) ** (1.0 / rows)
+            if curve <= threshold and curve > best_curve:
+                best, best_curve = (bands, rows), curve
+        return best
+
+    def build(self, signatures):
+        """
+        Indexes a matrix of signatures. The row number of each signature is its id.
+
+        Parameters:
+        - signatures (numpy.ndarray): One signature per row.
+
+        Returns:
+        - MinHashLSH: The index itself.
+        """
+        self.signatures = np.asarray(signatures, dtype=np.uint32).reshape(-1, self.num_perm)
+        for band, table in enumerate(self.tables):
+            band_rows = self.signatures[:, band * self.rows:(band + 1) * self.rows]
+            for item, key in enumerate(map(bytes, band_rows)):
+                table[key].append(item)
+        return self
+
+    def extend(self, signatures):
+        """
+        Indexes more signatures, numbered after the existing ones. The index itself is not modified: the
+        tables are copied shallowly and only the buckets the new signatures fall into are replaced.
+
+        Parameters:
+        - signatures (numpy.ndarray): One signature per row.
+
+        Returns:
+        - MinHashLSH: A new index with every signature.
+        """
+        signatures = np.asarray(signatures, dtype=np.uint32).reshape(-1, self.num_perm)
+        lsh = copy.copy(self)
+        lsh.tables = [table.copy() for table in self.tables]
+        lsh.signatures = np.vstack([self.signatures, signatures])
+        for band, table in enumerate(lsh.tables):
+            band_rows = signatures[:, band * self.rows:(band + 1) * self.rows]
+            for item, key in enumerate(map(bytes, band_rows), start=len(self.signatures)):
+                table[key] = table.get(key, []) + [item]
+        return lsh
+
+    def query(self, signature):
+        """
+        Finds the indexed signatures whose estimated Jaccard similarity with a signature reaches the threshold.
+
+        Parameters:
+        - signature (numpy.ndarray): The query signature.
+
+        Returns:
+        - tuple: The sorted ids of the matches and their estimated similarities.
+        """
+        candidates = set()
+        for band, table in enumerate(self.tables):
+            candidates.update(table.get(bytes(signature[band * self.rows:(band + 1) * self.rows]), ()))
+        if not candidates:
+            return np.array([], dtype=np.int64), np.array([])
+        candidates = np.array(sorted(candidates))
+        similarities = MinHasher.jaccard(signature, self.signatures[candidates])
+        keep = similarities >= self.threshold
+        return candidates[keep], similarities[keep]
+
+
+class ShingleIndex:
+    """
+    MinHash-LSH indexes over the word shingles of every corpus document and every corpus sentence.
+
+    It prefilters the sentence comparison: only documents and sentence pairs whose estimated Jaccard
+    similarity reaches the threshold are compared in detail.
+
+    Every indexed signature maps to a document index, or to -1 once its document was updated or deleted.
+    Updates append signatures instead of rebuilding the tables; building the index again drops the
+    stale ones.
+    """
+
+    def __init__(self, threshold=0.3, num_perm=128, shingle_size=3, tokenize=None):
+        """
+        Initializes an empty ShingleIndex.
+
+        Parameters:
+        - threshold (float): The minimum estimated Jaccard similarity for documents and sentence pairs.
+        - num_perm (int): The length of the MinHash signatures.
+        - shingle_size (int): The number of consecutive words per shingle.
+        - tokenize (callable, optional): Turns a text into normalized words. Defaults to lowercase whitespace splitting.
+        """
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        self.tokenize = tokenize or (lambda text: text.lower().split())
+        self.document_lsh = MinHashLSH(threshold, num_perm)
+        self.sentence_lsh = MinHashLSH(threshold, num_perm)
+        self.document_ids = np.zeros(0, dtype=np.int64)
+        self.sentence_ids = np.zeros((0, 2), dtype=np.int64)
+
+    def signature(self, text):
+        """
+        Computes the MinHash signature of a text.
+
+        Parameters:
+        - text (str): The text.
+
+        Returns:
+        - numpy.ndarray: The signature of its word shingles.
+        """
+        return self.hasher.signature(self.hasher.shingles(self.tokenize(text)))
+
+    def build(self, corpus):
+        """
+        Indexes the documents and sentences of a corpus.
+
+        Parameters:
+        - corpus (Corpus): The precomputed corpus.
+
+        Returns:
+        - ShingleIndex: The index itself.
+        """
+        self.document_lsh.build([self.signature(text) for text in corpus.original_texts])
+        self.document_ids = np.arange(len(corpus.original_texts), dtype=np.int64)
+        sentence_signatures = []
+        sentence_ids = []
+        for doc_index, doc_sentences in enumerate(corpus.sentences):
+            for sent_index, sentence in enumerate(doc_sentences):
+                sentence_signatures.append(self.signature(sentence))
+                sentence_ids.append((doc_index, sent_index))
+        self.sentence_lsh.build(np.array(sentence_signatures, dtype=np.uint32).reshape(-1, self.hasher.num_perm))
+        self.sentence_ids = np.array(sentence_ids, dtype=np.int64).reshape(-1, 2)
+        return self
+
+    def upsert(self, doc_index, text, sentences):
+        """
+        Indexes a new or changed document. The index itself is not modified.
+
+        Parameters:
+        - doc_index (int): The index of the document in the corpus.
+        - text (str): The full text of the document.
+        - sentences (list of str): The sentences of the document.
+
+        Returns:
+        - ShingleIndex: A new index where the previous signatures of the document, if any, are discarded.
+        """
+        index = self._without(doc_index, shift=False)
+        signatures = np.array([self.signature(sentence) for sentence in sentences], dtype=np.uint32).reshape(-1, self.hasher.num_perm)
+        index.document_lsh = self.document_lsh.extend([self.signature(text)])
+        index.document_ids = np.append(index.document_ids, doc_index)
+        index.sentence_lsh = self.sentence_lsh.extend(signatures)
+        new_ids = np.column_stack([np.full(len(sentences), doc_index, dtype=np.int64), np.arange(len(sentences), dtype=np.int64)])
+        index.sentence_ids = np.vstack([index.sentence_ids, new_ids])
+        return index
+
+    def delete(self, doc_index):
+        """
+        Removes a document. The indices of the following documents are shifted down by one, like the rows of the corpus.
+
+        Parameters:
+        - doc_index (int): The index of the document in the corpus.
+
+        Returns:
+        - ShingleIndex: A new index without the document.
+        """
+        return self._without(doc_index, shift=True)
+
+    def _without(self, doc_index, shift):
+        index = copy.copy(self)
+        index.document_ids = self._remap(self.document_ids, doc_index, shift)
+        sentence_ids = self.sentence_ids.copy()
+        sentence_ids[:, 0] = self._remap(self.sentence_ids[:, 0], doc_index, shift)
+        index.sentence_ids = sentence_ids
+        return index
+
+    @staticmethod
+    def _remap(doc_ids, doc_index, shift):
+        doc_ids = np.where(doc_ids == doc_index, -1, doc_ids)
+        if shift:
+            doc_ids[doc_ids > doc_index] -= 1
+        return doc_ids
+
+    def candidates(self, text, sentences):
+        """
+        Finds the documents and sentence pairs worth comparing with a query.
+
+        Parameters:
+        - text (str): The full query text.
+        - sentences (list of str): The sentences of the query.
+
+        Returns:
+        - dict: Maps the index of each candidate document to the set of (document sentence, query sentence)
+          index pairs to compare, or to None when the whole document is similar and every pair must be compared.
+        """
+        result = {}
+        for sent_index, sentence in enumerate(sentences):
+            matches, _ = self.sentence_lsh.query(self.signature(sentence))
+            for doc_index, doc_sent_index in self.sentence_ids[matches]:
+                if doc_index >= 0:
+                    result.setdefault(int(doc_index), set()).add((int(doc_sent_index), sent_index))
+        documents, _ = self.document_lsh.query(self.signature(text))
+        for doc_index in self.document_ids[documents]:
+            if doc_index >= 0:
+                result[int(doc_index)] = None
+        return result
@@ -0,0 +1,144 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from app.model.metrics import metrics
+
+# The part-of-speech tags the tense and voice checks compare: the tags of the verbs and of the pronouns
+SentenceSignature = namedtuple("SentenceSignature", ["verbs", "pronouns"])
+
+
+def signature_from_doc(doc):
+    """
+    Extracts the tense and voice signature of a parsed sentence.
+
+    Parameters:
+    - doc (spacy.tokens.Doc): The parsed sentence.
+
+    Returns:
+    - SentenceSignature: The tags of its verbs and of its pronouns.
+    """
+    verbs = tuple(token.tag_ for token in doc if token.pos_ == 'VERB')
+    pronouns = tuple(token.tag_ for token in doc if token.pos_ == 'PRON')
+    return SentenceSignature(verbs, pronouns)
+
+
+@metrics.instrument("parse_signatures")
+def parse_signatures(preprocessor, sentences, batch_size=64, n_process=1):
+    """
+    Parses many sentences in batches, running only the Spacy components that assign tags.
+
+    Parameters:
+    - preprocessor (Preprocessor): The preprocessor holding the Spacy model.
+    - sentences (iterable of str): The sentences, each parsed on its own.
+    - batch_size (int): The number of sentences Spacy processes per batch.
+    - n_process (int): The number of processes Spacy uses.
+
+    Returns:
+    - list of SentenceSignature: The signature of each sentence.
+    """
+    disabled = preprocessor.disabled_components(preprocessor.TAGS_DISABLED)
+    docs = preprocessor.nlp.pipe(sentences, disable=disabled, batch_size=batch_size, n_process=n_process)
+    signatures = [signature_from_doc(doc) for doc in docs]
+    metrics.count("spacy_docs_parsed", len(signatures))
+    return signatures
+
+
+class ParseCache:
+    """
+    A bounded, thread-safe LRU cache of sentence signatures keyed by a hash of the sentence.
+
+    It avoids parsing the same sentence again with Spacy when it is compared several times, within a
+    request or across requests.
+    """
+
+    def __init__(self, preprocessor, max_size=10000):
+        """
+        Initializes an empty ParseCache.
+
+        Parameters:
+        - preprocessor (Preprocessor): The preprocessor holding the Spacy model used on cache misses.
+        - max_size (int): The maximum number of signatures kept. The least recently used ones are evicted.
+        """
+        self.preprocessor = preprocessor
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(sentence):
+        """
+        Computes the cache key of a sentence.
+
+        Parameters:
+        - sentence (str): The sentence.
+
+        Returns:
+        - bytes: A 16-byte BLAKE2 digest of the sentence.
+        """
+        return hashlib.blake2b(sentence.encode("utf-8"), digest_size=16).digest()
+
+    def _get(self, key):
+        with self._lock:
+            signature = self._entries.get(key)
+            if signature is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        metrics.count("parse_cache_misses" if signature is None else "parse_cache_hits")
+        return signature
+
+    def put(self, sentence, signature):
+        """
+        Stores the signature of a sentence, evicting the least recently used one if the cache is full.
+
+        Parameters:
+        - sentence (str): The sentence.
+        - signature (SentenceSignature): Its signature.
+        """
+        key = self.key(sentence)
+        with self._lock:
+            self._entries[key] = signature
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def signature(self, sentence):
+        """
+        Gets the signature of a sentence, parsing it on a cache miss.
+
+        Parameters:
+        - sentence (str): The sentence.
+
+        Returns:
+        - SentenceSignature: The signature of the sentence.
+        """
+        signature = self._get(self.key(sentence))
+        if signature is None:
+            signature = parse_signatures(self.preprocessor, [sentence])[0]
+            self.put(sentence, signature)
+        return signature
+
+    def signatures(self, sentences, batch_size=64):
+        """
+        Gets the signatures of many sentences, parsing the cache misses together in batches.
+
+        Parameters:
+        - sentences (list of str): The sentences.
+        - batch_size (int): The number of sentences Spacy processes per batch.
+
+        Returns:
+        - list of SentenceSignature: The signature of each sentence.
+        """
+        result = [self._get(self.key(sentence)) for sentence in sentences]
+        missing = [row for row, signature in enumerate(result) if signature is None]
+        parsed = parse_signatures(self.preprocessor, [sentences[row] for row in missing], batch_size=batch_size)
+        for row, signature in zip(missing, parsed):
+            result[row] = signature
+            self.put(sentences[row], signature)
+        return result
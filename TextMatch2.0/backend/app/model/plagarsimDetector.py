@@ -1,63 +1,142 @@
-from gensim.models import Word2Vec
-from difflib import SequenceMatcher
-from sklearn.metrics.pairwise import cosine_similarity
-from app.model.preprocessor import Preprocessor
-from app.model.vectorizer import Vectorizer
+from app.model.detectorEngine import DetectorEngine
 from collections import deque
-import spacy
-import os
+from app.model.metrics import metrics
 
 class PlagiarismDetector:
     """
     A class to detect plagiarism in text documents using various linguistic features and similarity measures.
+
+    Instances are cheap and hold only the user's text and a snapshot of the engine state; the models
+    and the precomputed corpus are shared through a DetectorEngine.
     """
+
+    # The cosine similarity of document vectors above which a document is reported
+    SIMILARITY_THRESHOLD = 0.7
     
-    def __init__(self) -> None:
+    def __init__(self, engine=None) -> None:
         """
-        Initializes the PlagiarismDetector with necessary models and preprocessors.
+        Initializes the PlagiarismDetector on top of a warmed-up engine.
+
+        Parameters:
+        - engine (DetectorEngine, optional): The engine holding the shared models and corpus. Defaults to the
+          process-wide engine, which is warmed up on first use.
         """
-        self.nlp = spacy.load('en_core_web_sm')
-        self.preprocessor = Preprocessor()
-        self.vectorizer = Vectorizer()
-        self.original_texts, self.filenames, self.preprocessed_texts, self.token_lists = self.preprocessor.load_and_preprocess_files()
+        self.engine = engine if engine is not None else DetectorEngine.get_instance()
+        self.engine.warm_up()
+        self.state = self.engine.snapshot()
         self.model = None
         self.user_input_text = None
         self.user_input_preprocessed = None
+        self._user_input_sentences = None
+        self._user_input_tokens = None
+        self._user_input_vectors = {}
+
+    @property
+    def nlp(self):
+        return self.engine.nlp
+
+    @property
+    def preprocessor(self):
+        return self.engine.preprocessor
+
+    @property
+    def vectorizer(self):
+        return self.engine.vectorizer
 
-    def set_user_input(self, user_input_text):
+    @property
+    def original_texts(self):
+        return self.state.corpus.original_texts
+
+    @property
+    def filenames(self):
+        return self.state.corpus.filenames
+
+    @property
+    def preprocessed_texts(self):
+        return self.state.corpus.preprocessed_texts
+
+    @property
+    def token_lists(self):
+        return self.state.corpus.token_lists
+
+    def set_user_input(self, user_input_text, state=None, sentences=None, tokens=None):
         """
-        Sets the user input text for plagiarism detection.
+        Sets the user input text for plagiarism detection. The text is checked against the reference
+        documents as they are at this moment, even if they are updated during the check.
         
         Parameters:
         - user_input_text (str): The text input by the user to check for plagiarism.
+        - state (EngineState, optional): The engine snapshot to check against. Defaults to the current one.
+        - sentences (list of str, optional): The sentences of the text, if they were already split.
+        - tokens (list of str, optional): The lemmatized tokens of the text, if it was already preprocessed.
         """
         self.user_input_text = user_input_text
+        self._user_input_sentences = (user_input_text, sentences) if sentences is not None else None
+        self._user_input_tokens = (user_input_text, tokens) if tokens is not None else None
+        self._user_input_vectors = {}
+        self.state = state if state is not None else self.engine.snapshot()
+
+    def get_user_sentences(self):
+        """
+        Splits the user input text into sentences, only once per text.
+
+        Returns:
+        - list of str: The sentences of the user input text.
+        """
+        if self._user_input_sentences is None or self._user_input_sentences[0] != self.user_input_text:
+            self._user_input_sentences = (self.user_input_text, self.preprocessor.split_into_sentences(self.user_input_text))
+        return self._user_input_sentences[1]
+
+    @metrics.instrument("vectorize_input")
+    def get_user_input_vector(self, model):
+        """
+        Vectorizes the user input text, reusing the vector if it was already computed for the model.
+
+        Parameters:
+        - model: The vector model used for vectorization.
+
+        Returns:
+        - numpy.ndarray: The mean word vector of the user input text.
+        """
+        key = (id(model), self.user_input_text)
+        if key not in self._user_input_vectors:
+            if self._user_input_tokens is not None and self._user_input_tokens[0] == self.user_input_text:
+                self._user_input_vectors[key] = self.vectorizer.get_tokens_vector(self._user_input_tokens[1], model)
+            else:
+                self._user_input_vectors[key] = self.vectorizer.get_sentence_vector(self.user_input_text, model)
+        return self._user_input_vectors[key]
+
+    def candidate_documents(self, model):
+        """
+        Gets the documents the expensive checks are run against.
+
+        Parameters:
+        - model: The vector model used to retrieve the candidates.
 
-    def compare_sentences(self, sentences1, sentences2):
+        Returns:
+        - list of int: The indices of the candidate documents, in corpus order.
+        """
+        candidates = None
+        if model is not None:
+            candidates = self.engine.candidate_documents(self.get_user_input_vector(model), model, self.state)
+        if candidates is None:
+            return list(range(len(self.filenames)))
+        return candidates.tolist()
+
+    def compare_sentences(self, sentences1, sentences2, candidate_pairs=None):
         """
         Compares sentences between two documents to find similar sentences.
         
         Parameters:
         - sentences1 (list): A list of sentences from the first document.
         - sentences2 (list): A list of sentences from the second document.
+        - candidate_pairs (set, optional): The (index in sentences1, index in sentences2) pairs to compare.
+          Every pair is compared when omitted.
         
         Returns:
         - list: A list of tuples containing indices and sentences from both documents that are considered similar.
         """
-        similar_sentences = []
-        sentence_pairs = {}
-        
-        for i, sent1 in enumerate(sentences1):
-            for j, sent2 in enumerate(sentences2):
-                if (sent1, sent2) in sentence_pairs:
-                    similarity = sentence_pairs[(sent1, sent2)]
-                else:
-                    similarity = SequenceMatcher(None, sent1, sent2).ratio()
-                    sentence_pairs[(sent1, sent2)] = similarity
-
-                if similarity > 0.7:  # Threshold for considering a sentence as similar
-                    similar_sentences.append((i, j, sent1, sent2, similarity))
-        return similar_sentences
+        return self.engine.sentence_matcher.match(sentences1, sentences2, candidate_pairs)
 
     def detect_reordering(self, similar_sentences):
         """
@@ -88,11 +167,7 @@ class PlagiarismDetector:
         Returns:
         - bool: True if there is a change in tense between the sentences, False otherwise.
         """
-        doc1 = self.nlp(sent1)
-        doc2 = self.nlp(sent2)
-        tenses1 = [token.tag_ for token in doc1 if token.pos_ == 'VERB']
-        tenses2 = [token.tag_ for token in doc2 if token.pos_ == 'VERB']
-        return tenses1 != tenses2
+        return self.engine.parse_cache.signature(sent1).verbs != self.engine.parse_cache.signature(sent2).verbs
     
     def detect_voice_change(self, sent1, sent2):
         """
@@ -105,81 +180,233 @@ class PlagiarismDetector:
         Returns:
         - bool: True if there is a change in voice between the sentences, False otherwise.
         """
-        doc1 = self.nlp(sent1)
-        doc2 = self.nlp(sent2)
-        persons1 = [token.tag_ for token in doc1 if token.pos_ == 'PRON']
-        persons2 = [token.tag_ for token in doc2 if token.pos_ == 'PRON']
-        return persons1 != persons2
-    
-    def plagiarism_type(self):
+        return self.engine.parse_cache.signature(sent1).pronouns != self.engine.parse_cache.signature(sent2).pronouns
+
+    def corpus_signature(self, doc_index, sent_index):
         """
-        Determines the type of plagiarism present in the user input text compared to original documents.
+        Gets the precomputed tense and voice signature of a corpus sentence.
+        
+        Parameters:
+        - doc_index (int): The index of the document.
+        - sent_index (int): The index of the sentence in the document.
         
         Returns:
-        - dict: A dictionary containing the type of plagiarism detected and the original documents involved.
+        - SentenceSignature: The verb and pronoun tags of the sentence.
         """
-        plagiarism_results = {}
+        signatures = self.state.corpus.signatures
+        if signatures is None:
+            return self.engine.parse_cache.signature(self.state.corpus.sentences[doc_index][sent_index])
+        return signatures[doc_index][sent_index]
+    
+    @metrics.instrument("candidate_retrieval")
+    def comparison_plan(self):
+        """
+        Lists the documents whose sentences must be compared with the user input text.
+
+        Returns:
+        - list: Tuples (document index, candidate pairs) in corpus order, where the candidate pairs are the
+          (document sentence, user sentence) index pairs to compare, or None to compare every pair.
+        """
+        prefiltered = None
+        if self.state.shingle_index is not None:
+            prefiltered = self.state.shingle_index.candidates(self.user_input_text, self.get_user_sentences())
+
+        plan = []
+        for index in self.candidate_documents(self.model):
+            if prefiltered is not None and index not in prefiltered:
+                continue
+            plan.append((index, prefiltered[index] if prefiltered is not None else None))
+        return plan
+
+    @metrics.instrument("find_paraphrases")
+    def find_paraphrases(self, k=None, threshold=None, embeddings=None):
+        """
+        Finds the corpus sentences whose embedding is similar to the embedding of each sentence of the user input
+        text, scoring every query sentence against every corpus sentence at once.
 
+        Parameters:
+        - k (int, optional): The maximum number of corpus sentences per query sentence. Defaults to the engine's paraphrase_count.
+        - threshold (float, optional): The minimum similarity, exclusive. Defaults to the engine's paraphrase_threshold.
+        - embeddings (numpy.ndarray, optional): The embeddings of the user sentences, as returned by
+          DetectorEngine.encode_sentences. Computed when omitted; BatchDetector encodes a whole chunk at once.
+
+        Returns:
+        - list: For each user sentence, the tuples (document index, sentence index, similarity) of its paraphrases,
+          sorted by decreasing similarity. Empty lists if the engine has no sentence embeddings.
+        """
+        sentences_user = self.get_user_sentences()
+        sentence_vectors = self.state.sentence_vectors
+        if sentence_vectors is None or not sentences_user:
+            return [[] for _ in sentences_user]
+        k = self.engine.paraphrase_count if k is None else k
+        threshold = self.engine.paraphrase_threshold if threshold is None else threshold
+
+        if embeddings is None:
+            embeddings = self.engine.encode_sentences(sentences_user, self.state)
+        rows, scores = sentence_vectors.query(embeddings, k)
+        paraphrases = []
+        for query_rows, query_scores in zip(rows, scores):
+            above = query_scores > threshold
+            paraphrases.append([(int(sentence_vectors.doc_ids[row]), int(sentence_vectors.sentence_ids[row]), float(score))
+                                for row, score in zip(query_rows[above], query_scores[above])])
+        return paraphrases
+
+    @metrics.instrument("find_similar_sentences")
+    def find_similar_sentences(self):
+        """
+        Finds the similar sentence pairs between the user input text and every candidate document. When the
+        engine has sentence embeddings, the paraphrases found with them are added as well.
+
+        Returns:
+        - list: Tuples (document index, similar sentences) for the documents with at least one similar pair,
+          in corpus order. The similar sentences are the tuples returned by compare_sentences.
+        """
         # Split texts into sentences
-        sentences_user = self.preprocessor.split_into_sentences(self.user_input_text)
-        for original_dataset_text, dataset_filename in zip(self.original_texts, self.filenames):
-            sentences_dataset = self.preprocessor.split_into_sentences(original_dataset_text)
+        sentences_user = self.get_user_sentences()
+
+        matches = {}
+        plan = self.comparison_plan()
+        with metrics.stage("compare_sentences"):
+            for index, candidate_pairs in plan:
+                sentences_dataset = self.state.corpus.sentences[index]
+                # Compare sentences
+                similar_sentences = self.compare_sentences(sentences_dataset, sentences_user, candidate_pairs)
+                if similar_sentences:
+                    matches[index] = similar_sentences
+        return self.add_paraphrases(matches, self.find_paraphrases())
+
+    def add_paraphrases(self, matches, paraphrases):
+        """
+        Adds the paraphrases found with the sentence embeddings to the similar sentence pairs, unless the pair
+        was already found.
+
+        Parameters:
+        - matches (dict): Maps every document index to its similar sentences, the tuples returned by
+          compare_sentences. It is modified.
+        - paraphrases (list): The paraphrases of every user sentence, as returned by find_paraphrases.
+
+        Returns:
+        - list: Tuples (document index, similar sentences) in corpus order, with the pairs sorted by document
+          sentence and then by user sentence.
+        """
+        sentences_user = self.get_user_sentences()
+        for idx2, sentence_paraphrases in enumerate(paraphrases):
+            for index, idx1, similarity in sentence_paraphrases:
+                similar_sentences = matches.setdefault(index, [])
+                if not any(pair[0] == idx1 and pair[1] == idx2 for pair in similar_sentences):
+                    similar_sentences.append((idx1, idx2, self.state.corpus.sentences[index][idx1], sentences_user[idx2], similarity))
+        return [(index, sorted(matches[index], key=lambda pair: (pair[0], pair[1]))) for index in sorted(matches)]
+
+    @metrics.instrument("classify_plagiarism")
+    def classify_plagiarism(self, matches):
+        """
+        Determines the type of plagiarism from the similar sentences of each document.
+
+        Parameters:
+        - matches (list): The tuples returned by find_similar_sentences.
+
+        Returns:
+        - dict: A dictionary containing the type of plagiarism detected and the original documents involved.
+        """
+        plagiarism_results = {}
+        sentences_user = self.get_user_sentences()
+        user_signatures = {}
 
-            # Compare sentences
-            similar_sentences = self.compare_sentences(sentences_dataset, sentences_user)
+        for index, similar_sentences in matches:
+            dataset_filename = self.filenames[index]
             reordered_sentences = self.detect_reordering(similar_sentences)
 
-            if similar_sentences:
-                plagiarism_type = None
-                for idx1, idx2, sent1, sent2, similarity in similar_sentences:
-                    if similarity < 1:
-                        if self.detect_voice_change(sentences_user[idx2], sentences_dataset[idx1]):
-                            plagiarism_type = "Voice change"
-                            break
-                        elif self.detect_tense_change(sentences_user[idx2], sentences_dataset[idx1]):
-                            plagiarism_type = "Tense change"
-                            break
-                if not plagiarism_type:
-                    if reordered_sentences:
-                        plagiarism_type = "Sentence reordering"
-                    else:
-                        plagiarism_type = "Sentence modification"
-
-                if "original_files" not in plagiarism_results:
-                    plagiarism_results["original_files"] = {}
-                if dataset_filename not in plagiarism_results["original_files"]:
-                    plagiarism_results["original_files"][dataset_filename] = 0.0
-                plagiarism_results["plagiarism_type"] = plagiarism_type
+            plagiarism_type = None
+            for idx1, idx2, sent1, sent2, similarity in similar_sentences:
+                if similarity < 1:
+                    # Each query sentence is parsed at most once per request; corpus sentences never are
+                    if idx2 not in user_signatures:
+                        user_signatures[idx2] = self.engine.parse_cache.signature(sentences_user[idx2])
+                    user_signature = user_signatures[idx2]
+                    dataset_signature = self.corpus_signature(index, idx1)
+                    if user_signature.pronouns != dataset_signature.pronouns:
+                        plagiarism_type = "Voice change"
+                        break
+                    elif user_signature.verbs != dataset_signature.verbs:
+                        plagiarism_type = "Tense change"
+                        break
+            if not plagiarism_type:
+                if reordered_sentences:
+                    plagiarism_type = "Sentence reordering"
+                else:
+                    plagiarism_type = "Sentence modification"
+
+            if "original_files" not in plagiarism_results:
+                plagiarism_results["original_files"] = {}
+            if dataset_filename not in plagiarism_results["original_files"]:
+                plagiarism_results["original_files"][dataset_filename] = 0.0
+            plagiarism_results["plagiarism_type"] = plagiarism_type
 
         return plagiarism_results
+
+    def plagiarism_type(self):
+        """
+        Determines the type of plagiarism present in the user input text compared to original documents.
+        
+        Returns:
+        - dict: A dictionary containing the type of plagiarism detected and the original documents involved.
+        """
+        return self.classify_plagiarism(self.find_similar_sentences())
     
-    def evaluate_similarity(self, model, plagiarism_results):
+    def similar_documents(self, model):
+        """
+        Finds the documents whose vector is similar to the vector of the user input text.
+
+        Parameters:
+        - model: The vector model used for calculating similarity.
+
+        Returns:
+        - tuple: An array of document indices in corpus order and an array with their similarities.
+        """
+        input_vector = self.get_user_input_vector(model)
+        document_vectors = self.engine.get_document_vectors(model, self.state)
+        candidates = self.engine.candidate_documents(input_vector, model, self.state)
+        if candidates is None:
+            return document_vectors.above_threshold(input_vector, self.SIMILARITY_THRESHOLD)
+        similarities = document_vectors.exact_similarities(input_vector, candidates)
+        above = similarities > self.SIMILARITY_THRESHOLD
+        return candidates[above], similarities[above]
+
+    @metrics.instrument("evaluate_similarity")
+    def evaluate_similarity(self, model, plagiarism_results, similar_documents=None):
         """
         Evaluates the similarity of the user input text with original documents using a vector model.
         
         Parameters:
         - model: The vector model used for calculating similarity.
         - plagiarism_results (dict): The current plagiarism results to be updated with similarity scores.
+        - similar_documents (tuple, optional): The indices and similarities of the documents above the threshold,
+          if they were already scored, e.g. for a whole batch at once.
         
         Returns:
         - dict: Updated plagiarism results including similarity scores.
         """
-        similarity_threshold = 0.7
-        input_vector = self.vectorizer.get_sentence_vector(self.user_input_text, model)
-        for dataset_text, dataset_filename in zip(self.original_texts, self.filenames):
-            dataset_vector = self.vectorizer.get_sentence_vector(dataset_text, model)
-            similarity = cosine_similarity([input_vector], [dataset_vector])[0][0]
+        if similar_documents is not None:
+            indices, similarities = similar_documents
+        else:
+            indices, similarities = self.similar_documents(model)
 
-            if similarity > similarity_threshold:
-                if "original_files" not in plagiarism_results:
-                    plagiarism_results["original_files"] = {}
-                plagiarism_results["original_files"][dataset_filename] = str(similarity)
-            else:
-                if "original_files" in plagiarism_results and dataset_filename in plagiarism_results["original_files"]:
+        similar_files = set()
+        for index, similarity in zip(indices, similarities):
+            dataset_filename = self.filenames[index]
+            similar_files.add(dataset_filename)
+            if "original_files" not in plagiarism_results:
+                plagiarism_results["original_files"] = {}
+            plagiarism_results["original_files"][dataset_filename] = str(similarity)
+
+        if "original_files" in plagiarism_results:
+            for dataset_filename in list(plagiarism_results["original_files"]):
+                if dataset_filename not in similar_files:
                     del plagiarism_results["original_files"][dataset_filename]
 
         return plagiarism_results
     
+    @metrics.instrument("get_results")
     def get_results(self):
         """
         Gets the final plagiarism detection results after evaluating all aspects of plagiarism.
@@ -187,12 +414,7 @@ class PlagiarismDetector:
         Returns:
         - dict: The final results of plagiarism detection including types and similarity scores.
         """
-        if os.path.exists("word2vec_model.bin"):
-            self.model = Word2Vec.load("word2vec_model.bin")
-        else:
-            self.model = Word2Vec(sentences=self.token_lists, vector_size=150, window=2, min_count=2, workers=4,epochs=5000)
-            self.model.save("word2vec_model.bin")
-
+        self.model = self.engine.model
 
         plagarism_results = self.plagiarism_type()
         similarity_results = self.evaluate_similarity(self.model, plagarism_results)
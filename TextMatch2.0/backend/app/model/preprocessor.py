@@ -1,26 +1,72 @@
-import os
 import re
-import nltk
-import spacy
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+import hashlib
+from app.model.documentSource import read_documents
+from app.model.metrics import metrics
+from app.model.resources import lazy_import, require_nltk_data
+
+spacy = lazy_import("spacy")
+nltk_corpus = lazy_import("nltk.corpus")
+nltk_tokenize = lazy_import("nltk.tokenize")
+
+_DIGITS = re.compile(r'\d+')
+_WORDS = re.compile(r'\w+')
 
 class Preprocessor:
     """
     A class for preprocessing text data including cleaning text, removing stopwords,
     lemmatizing tokens, and loading and preprocessing files from a directory.
+
+    Each stage only runs the Spacy components it needs: lemmatization skips the parser and the
+    named entity recognizer, and sentence splitting skips the tagger, lemmatizer and recognizer.
+
+    With the "table" lemmatizer and a LemmaTable loaded, texts are preprocessed without Spacy: a single
+    regular expression pass tokenizes them and the table lemmatizes the tokens. Corpora are still lemmatized
+    with Spacy, so their lemmas do not depend on the table, see Corpus.process_texts.
     """
-    def __init__(self):
+
+    LEMMATIZE_DISABLED = ["parser", "ner", "senter"]
+    SENTENCES_DISABLED = ["tagger", "attribute_ruler", "lemmatizer", "ner"]
+    TAGS_DISABLED = ["parser", "lemmatizer", "ner", "senter"]
+
+    def __init__(self, nlp=None, sentence_splitter="parser", lemmatizer="spacy"):
         """
-        Initializes the Preprocessor class by downloading necessary NLTK data and loading the Spacy model.
+        Initializes the Preprocessor class by checking that the NLTK data is installed and loading the Spacy model.
         It also sets the directory from which text files will be loaded and preprocessed.
+
+        Parameters:
+        - nlp (spacy.Language, optional): An already loaded Spacy model to share instead of loading a new one.
+        - sentence_splitter (str): "parser" splits sentences with the dependency parser, "sentencizer" with
+          Spacy's lightweight rule-based sentencizer, which is much faster but splits less accurately.
+        - lemmatizer (str): "spacy" lemmatizes every text with Spacy, "table" looks the words up in the
+          lemma_table once it is set, stemming the unknown ones.
         """
-        nltk.download('punkt')
-        nltk.download('stopwords')
-        nltk.download('wordnet')
-        self.nlp = spacy.load('en_core_web_sm')
-        self.stop_words = set(stopwords.words('english'))
+        require_nltk_data()
+        self.nlp = nlp if nlp is not None else spacy.load('en_core_web_sm')
+        self.stop_words = set(nltk_corpus.stopwords.words('english'))
         self.directory = "dataset/files"
+        self.sentence_splitter = sentence_splitter
+        self.sentencizer = None
+        if sentence_splitter == "sentencizer":
+            self.sentencizer = spacy.blank(self.nlp.lang)
+            self.sentencizer.add_pipe("sentencizer")
+        elif sentence_splitter != "parser":
+            raise ValueError(f"Unknown sentence splitter: {sentence_splitter}")
+        if lemmatizer not in ("spacy", "table"):
+            raise ValueError(f"Unknown lemmatizer: {lemmatizer}")
+        self.lemmatizer = lemmatizer
+        self.lemma_table = None
+
+    def disabled_components(self, names):
+        """
+        Filters a list of component names to the ones present in the Spacy pipeline.
+
+        Parameters:
+        - names (list of str): The components to disable.
+
+        Returns:
+        - list of str: The components of the pipeline that can be disabled.
+        """
+        return [name for name in names if name in self.nlp.pipe_names]
 
     def clean_text(self, text):
         """
@@ -37,6 +83,19 @@ class Preprocessor:
         text = re.sub(r'\W+', ' ', text)
         return text
 
+    def clean_tokens(self, text):
+        """
+        Splits a text into the words of clean_text, keeping where each word is in the original text.
+
+        Parameters:
+        - text (str): The text to be cleaned.
+
+        Returns:
+        - list of tuple: The (word, start, end) of each word of clean_text(text).split(), where text[start:end]
+          is the original word.
+        """
+        return [(word, match.start(), match.end()) for match in re.finditer(r'\w+', text) for word in self.clean_text(match.group()).split()]
+
     def remove_stopwords(self, tokens):
         """
         Removes stopwords from a list of tokens.
@@ -59,25 +118,103 @@ class Preprocessor:
         Returns:
         - list of str: The lemmatized tokens.
         """
-        doc = self.nlp(" ".join(tokens))
+        doc = self.nlp(" ".join(tokens), disable=self.disabled_components(self.LEMMATIZE_DISABLED))
+        metrics.count("spacy_docs_parsed")
         return [token.lemma_ for token in doc]
 
-    def preprocess_text(self, text):
+    @metrics.instrument("preprocess_text")
+    def preprocess_text(self, text, fast=None):
         """
         Preprocesses the input text by cleaning, tokenizing, removing stopwords, and lemmatizing.
 
         Parameters:
         - text (str): The text to be preprocessed.
+        - fast (bool, optional): Whether to skip Spacy, see use_fast_path. Defaults to whether the lemma table is in use.
 
         Returns:
         - tuple: A tuple containing the preprocessed text as a string and a list of lemmatized tokens.
         """
-        text = self.clean_text(text)
-        tokens = word_tokenize(text)
-        tokens = self.remove_stopwords(tokens)
-        lemmatized_tokens = self.lemmatize_tokens(tokens)
+        if self.use_fast_path(fast):
+            lemmatized_tokens = self.lemma_table.lemmatize_tokens(self.fast_tokenize(text))
+        else:
+            lemmatized_tokens = self.lemmatize_tokens(self.tokenize(text))
         return " ".join(lemmatized_tokens), lemmatized_tokens
 
+    def use_fast_path(self, fast=None):
+        """
+        Decides whether texts are lemmatized with the lemma table instead of Spacy.
+
+        Parameters:
+        - fast (bool, optional): True to use the table, False to use Spacy. Defaults to the table when the
+          lemmatizer is "table" and the table is set.
+
+        Returns:
+        - bool: Whether to use the table.
+
+        Raises:
+        - ValueError: If the table is requested but not set.
+        """
+        if fast is None:
+            return self.lemmatizer == "table" and self.lemma_table is not None
+        if fast and self.lemma_table is None:
+            raise ValueError("The lemma table is not loaded")
+        return fast
+
+    def fast_tokenize(self, text):
+        """
+        Tokenizes a text like tokenize in a single pass of precompiled regular expressions, without NLTK.
+        It only differs from tokenize for the few words NLTK splits further, like "cannot".
+
+        Parameters:
+        - text (str): The text to be tokenized.
+
+        Returns:
+        - list of str: The tokens to be lemmatized.
+        """
+        stop_words = self.stop_words
+        return [word for word in _WORDS.findall(_DIGITS.sub('', text.lower())) if word not in stop_words]
+
+    def tokenize(self, text):
+        """
+        Cleans and tokenizes the input text and removes its stopwords, the steps done before lemmatizing.
+
+        Parameters:
+        - text (str): The text to be tokenized.
+
+        Returns:
+        - list of str: The tokens to be lemmatized.
+        """
+        text = self.clean_text(text)
+        tokens = nltk_tokenize.word_tokenize(text)
+        return self.remove_stopwords(tokens)
+
+    @metrics.instrument("preprocess_texts")
+    def preprocess_texts(self, texts, batch_size=64, n_process=1, fast=None):
+        """
+        Preprocesses many texts at once, streaming them through Spacy in batches.
+
+        Parameters:
+        - texts (iterable of str): The texts to be preprocessed.
+        - batch_size (int): The number of texts Spacy processes per batch.
+        - n_process (int): The number of processes Spacy uses. -1 uses every CPU.
+        - fast (bool, optional): Whether to skip Spacy, see use_fast_path. Defaults to whether the lemma table is in use.
+
+        Returns:
+        - list of tuple: For each text, the preprocessed text as a string and the list of lemmatized tokens,
+          the same as preprocess_text.
+        """
+        if self.use_fast_path(fast):
+            return [self.preprocess_text(text, fast=True) for text in texts]
+        joined_tokens = (" ".join(self.tokenize(text)) for text in texts)
+        docs = self.nlp.pipe(joined_tokens, disable=self.disabled_components(self.LEMMATIZE_DISABLED), batch_size=batch_size, n_process=n_process)
+        results = []
+        for doc in docs:
+            lemmatized_tokens = [token.lemma_ for token in doc]
+            results.append((" ".join(lemmatized_tokens), lemmatized_tokens))
+        metrics.count("spacy_docs_parsed", len(results))
+        return results
+
+    @metrics.instrument("split_into_sentences")
     def split_into_sentences(self, text):
         """
         Splits the input text into sentences using Spacy.
@@ -88,9 +225,59 @@ class Preprocessor:
         Returns:
         - list of str: The sentences extracted from the text.
         """
-        doc = self.nlp(text)
+        if self.sentencizer is not None:
+            doc = self.sentencizer(text)
+        else:
+            doc = self.nlp(text, disable=self.disabled_components(self.SENTENCES_DISABLED))
+        metrics.count("spacy_docs_parsed")
         return [sent.text.strip() for sent in doc.sents]
 
+    @metrics.instrument("split_texts_into_sentences")
+    def split_texts_into_sentences(self, texts, batch_size=64, n_process=1):
+        """
+        Splits many texts into sentences at once, streaming them through Spacy in batches.
+
+        Parameters:
+        - texts (iterable of str): The texts to be split into sentences.
+        - batch_size (int): The number of texts Spacy processes per batch.
+        - n_process (int): The number of processes Spacy uses. -1 uses every CPU.
+
+        Returns:
+        - list of list of str: The sentences of each text, the same as split_into_sentences.
+        """
+        if self.sentencizer is not None:
+            docs = self.sentencizer.pipe(texts, batch_size=batch_size, n_process=n_process)
+        else:
+            docs = self.nlp.pipe(texts, disable=self.disabled_components(self.SENTENCES_DISABLED), batch_size=batch_size, n_process=n_process)
+        sentences = [[sent.text.strip() for sent in doc.sents] for doc in docs]
+        metrics.count("spacy_docs_parsed", len(sentences))
+        return sentences
+
+    def get_config(self):
+        """
+        Describes the preprocessing configuration, so cached results can be invalidated when it changes.
+
+        Returns:
+        - dict: The Spacy model name and version and a hash of the stopword list.
+        """
+        stopwords_hash = hashlib.sha1(" ".join(sorted(self.stop_words)).encode("utf-8")).hexdigest()
+        return {
+            "spacy_model": f"{self.nlp.meta.get('name')}-{self.nlp.meta.get('version')}",
+            "pipeline": list(self.nlp.pipe_names),
+            "stopwords": stopwords_hash,
+            "sentence_splitter": self.sentence_splitter,
+        }
+
+    def load_files(self):
+        """
+        Reads the documents of the specified directory one at a time: its .txt files, including the ones in
+        subdirectories, .tar.gz and .zip archives and JSONL dumps. See read_documents.
+
+        Returns:
+        - generator: Yields tuples with the filename and the text of each document.
+        """
+        return read_documents(self.directory)
+
     def load_and_preprocess_files(self):
         """
         Loads and preprocesses text files from the specified directory.
@@ -103,15 +290,12 @@ class Preprocessor:
         preprocessed_texts = []
         token_lists = []
 
-        for filename in os.listdir(self.directory):
-            if filename.endswith('.txt'):
-                filepath = os.path.join(self.directory, filename)
-                with open(filepath, 'r', encoding='utf-8') as file:
-                    text = file.read()
-                    original_texts.append(text)
-                    filenames.append(filename)
-                    preprocessed_text, tokens = self.preprocess_text(text)
-                    preprocessed_texts.append(preprocessed_text)
-                    token_lists.append(tokens)
+        for filename, text in self.load_files():
+            original_texts.append(text)
+            filenames.append(filename)
+
+        for preprocessed_text, tokens in self.preprocess_texts(original_texts):
+            preprocessed_texts.append(preprocessed_text)
+            token_lists.append(tokens)
 
         return original_texts, filenames, preprocessed_texts, token_lists
\ No newline at end of file
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread at a fixed interval from a background thread, so a single slow request
+    can be profiled in production without the overhead of a tracing profiler.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005, max_depth=64):
+        """
+        Initializes the profiler.
+
+        Parameters:
+        - thread_id (int): The identifier of the thread to sample. Defaults to the thread that creates the profiler.
+        - interval (float): The seconds between samples.
+        - max_depth (int): The maximum number of frames kept from the top of each stack.
+        """
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._start = None
+
+    @staticmethod
+    def _function(frame):
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        functions = []
+        while frame is not None and len(functions) < self.max_depth:
+            functions.append(self._function(frame))
+            frame = frame.f_back
+        self.stacks[";".join(reversed(functions))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """
+        Starts sampling.
+        """
+        self._stop.clear()
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops sampling and waits for the sampling thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.seconds += time.perf_counter() - self._start
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def report(self, top=20):
+        """
+        Summarizes the samples.
+
+        Parameters:
+        - top (int): The number of functions and stacks reported.
+
+        Returns:
+        - dict: The number of samples, the interval and the duration in milliseconds, the functions with the most
+          samples, in total (anywhere in the stack) and on their own (at the top of the stack), and the most
+          sampled stacks in the collapsed format of flame graph tools.
+        """
+        total = Counter()
+        own = Counter()
+        for stack, count in self.stacks.items():
+            functions = stack.split(";")
+            own[functions[-1]] += count
+            for function in set(functions):
+                total[function] += count
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "duration_ms": self.seconds * 1000,
+            "functions": [{"function": function, "total": count, "own": own[function]} for function, count in total.most_common(top)],
+            "stacks": [{"stack": stack, "samples": count} for stack, count in self.stacks.most_common(top)],
+        }
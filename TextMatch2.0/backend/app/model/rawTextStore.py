@@ -0,0 +1,70 @@
+import os
+import shutil
+import hashlib
+import numpy as np
+from app.model.sharedArrays import TextArray
+
+
+class RawTextStore(TextArray):
+    """
+    The raw texts of a corpus kept on disk: a file with their concatenated UTF-8 bytes and the offset where
+    every text starts. The file is memory-mapped, so a text is only read when a match has to be shown, and the
+    corpus never needs every raw text in memory at once.
+
+    Stores are written once, streaming the texts, into a directory named after their contents, so the same
+    texts are never written twice and processes reading an older store are not affected by a new one.
+    """
+
+    DATA_FILE = "texts.bin"
+    OFFSETS_FILE = "offsets.npy"
+
+    def __init__(self, directory):
+        """
+        Opens a store written by write.
+
+        Parameters:
+        - directory (str): The directory of the store.
+        """
+        offsets = np.load(os.path.join(directory, self.OFFSETS_FILE))
+        data_path = os.path.join(directory, self.DATA_FILE)
+        # Empty files cannot be memory-mapped
+        data = np.memmap(data_path, dtype=np.uint8, mode="r") if offsets[-1] > 0 else np.array([], dtype=np.uint8)
+        super().__init__(data, offsets)
+        self.directory = directory
+
+    @classmethod
+    def write(cls, store_dir, texts):
+        """
+        Writes texts into a new store, reading them one at a time.
+
+        Parameters:
+        - store_dir (str): The directory where the stores are kept.
+        - texts (iterable of str): The texts, e.g. a generator reading them from disk.
+
+        Returns:
+        - RawTextStore: The store with the texts.
+        """
+        os.makedirs(store_dir, exist_ok=True)
+        tmp_directory = os.path.join(store_dir, f"tmp-{os.getpid()}")
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+        offsets = [0]
+        digest = hashlib.sha1()
+        with open(os.path.join(tmp_directory, cls.DATA_FILE), "wb") as file:
+            for text in texts:
+                encoded = text.encode("utf-8")
+                file.write(encoded)
+                digest.update(encoded)
+                digest.update(b"\0")
+                offsets.append(offsets[-1] + len(encoded))
+        np.save(os.path.join(tmp_directory, cls.OFFSETS_FILE), np.array(offsets, dtype=np.int64))
+
+        directory = os.path.join(store_dir, f"texts-{digest.hexdigest()}")
+        try:
+            os.rename(tmp_directory, directory)
+        except OSError:
+            # Another process wrote the same texts first
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+            if not os.path.exists(directory):
+                raise
+        return cls(directory)
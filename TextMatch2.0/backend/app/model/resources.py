@@ -0,0 +1,123 @@
+import os
+import importlib
+import threading
+
+# The directory of the backend, so the default resource paths do not depend on the working directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# NLTK data shipped with the service, e.g. with: python -m nltk.downloader -d nltk_data punkt stopwords
+BUNDLED_NLTK_DATA = os.environ.get("TEXTMATCH_NLTK_DATA", os.path.join(BACKEND_DIR, "nltk_data"))
+
+# The NLTK resources the preprocessor uses, by package name and path in the NLTK data directories
+NLTK_RESOURCES = {"punkt": "tokenizers/punkt", "stopwords": "corpora/stopwords"}
+
+# Whether missing NLTK data may be downloaded. Off by default: hosts without network access would hang
+NLTK_DOWNLOAD = os.environ.get("TEXTMATCH_NLTK_DOWNLOAD", "0") == "1"
+
+_lazy_modules = []
+_nltk_checked = False
+_nltk_lock = threading.Lock()
+
+
+class LazyModule:
+    """
+    A placeholder for a module that is imported the first time one of its attributes is used, so importing
+    the service does not pay for Spacy, gensim, scikit-learn or NLTK until a code path needs them.
+    """
+
+    def __init__(self, name):
+        """
+        Initializes the LazyModule without importing anything.
+
+        Parameters:
+        - name (str): The full name of the module, e.g. "sklearn.preprocessing".
+        """
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'{' (loaded)' if self._module is not None else ''}>"
+
+
+def lazy_import(name):
+    """
+    Declares a module that is imported on first use.
+
+    Parameters:
+    - name (str): The full name of the module.
+
+    Returns:
+    - LazyModule: The placeholder to use instead of the module.
+    """
+    module = LazyModule(name)
+    _lazy_modules.append(module)
+    return module
+
+
+nltk = lazy_import("nltk")
+
+
+def preload_modules():
+    """
+    Imports every module declared with lazy_import, so the first request does not pay for it.
+
+    Returns:
+    - list of str: The names of the imported modules.
+    """
+    for module in _lazy_modules:
+        module._load()
+    return sorted({module._name for module in _lazy_modules})
+
+
+def missing_nltk_data():
+    """
+    Looks for the NLTK resources in the local NLTK data directories, including the bundled one, without
+    touching the network.
+
+    Returns:
+    - list of str: The names of the missing resources.
+    """
+    if os.path.isdir(BUNDLED_NLTK_DATA) and BUNDLED_NLTK_DATA not in nltk.data.path:
+        nltk.data.path.insert(0, BUNDLED_NLTK_DATA)
+    missing = []
+    for name, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(name)
+    return missing
+
+
+def require_nltk_data(download=None):
+    """
+    Checks once per process that the NLTK resources are installed locally. Missing resources are only
+    downloaded, into the bundled directory, when downloads are allowed.
+
+    Parameters:
+    - download (bool, optional): Whether to download the missing resources. Defaults to TEXTMATCH_NLTK_DOWNLOAD.
+
+    Raises:
+    - LookupError: If some resources are missing and cannot be downloaded.
+    """
+    global _nltk_checked
+    if _nltk_checked:
+        return
+    with _nltk_lock:
+        if _nltk_checked:
+            return
+        missing = missing_nltk_data()
+        if missing and (NLTK_DOWNLOAD if download is None else download):
+            for name in missing:
+                nltk.download(name, download_dir=BUNDLED_NLTK_DATA, quiet=True)
+            missing = missing_nltk_data()
+        if missing:
+            raise LookupError(f"Missing NLTK data: {', '.join(missing)}. Install it with: python -m nltk.downloader -d {BUNDLED_NLTK_DATA} {' '.join(missing)}")
+        _nltk_checked = True
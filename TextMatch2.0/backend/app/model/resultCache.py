@@ -0,0 +1,201 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from app.model.metrics import metrics
+
+
+class SQLiteResultStore:
+    """
+    Keeps cached results in a SQLite database, so they survive a restart and are shared by the worker
+    processes of the same machine.
+    """
+
+    def __init__(self, path, max_size=100000, housekeeping_interval=100):
+        """
+        Opens or creates the database.
+
+        Parameters:
+        - path (str): The database file.
+        - max_size (int): The maximum number of results kept. The oldest ones are removed first.
+        - housekeeping_interval (int): The number of stored results between removals of the expired and
+          the oldest results.
+        """
+        self.max_size = max_size
+        self.housekeeping_interval = housekeeping_interval
+        self._puts = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, corpus_version TEXT, created REAL, expires REAL, result TEXT)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+
+    def get(self, key, now=None):
+        """
+        Gets a result that has not expired.
+
+        Parameters:
+        - key (str): The key of the result.
+        - now (float, optional): The current time. Defaults to time.time().
+
+        Returns:
+        - tuple or None: The corpus version, the expiry time and the result, or None if there is none.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._connection.execute("SELECT corpus_version, expires, result FROM results WHERE key = ? AND expires > ?", (key, now)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def put(self, key, corpus_version, expires, result):
+        """
+        Stores a result, replacing any previous one with the same key.
+
+        Parameters:
+        - key (str): The key of the result.
+        - corpus_version (str): The version of the corpus the result was computed on.
+        - expires (float): The time the result expires.
+        - result (dict): The result, serializable to JSON.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO results (key, corpus_version, created, expires, result) VALUES (?, ?, ?, ?, ?)",
+                                     (key, corpus_version, time.time(), expires, json.dumps(result)))
+            self._puts += 1
+            if self._puts % self.housekeeping_interval == 0:
+                self._connection.execute("DELETE FROM results WHERE expires <= ?", (time.time(),))
+                self._connection.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created DESC, rowid DESC LIMIT -1 OFFSET ?)",
+                                         (self.max_size,))
+
+    def invalidate(self, corpus_version=None):
+        """
+        Removes the results of other corpus versions, or every result.
+
+        Parameters:
+        - corpus_version (str, optional): The version whose results are kept. None removes every result.
+        """
+        with self._lock, self._connection:
+            if corpus_version is None:
+                self._connection.execute("DELETE FROM results")
+            else:
+                self._connection.execute("DELETE FROM results WHERE corpus_version != ?", (corpus_version,))
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    """
+    A bounded, thread-safe LRU cache of plagiarism check results with a time to live, optionally backed by a
+    SQLiteResultStore.
+
+    Results are keyed by a hash of the normalized text, the corpus version, the model version and the options
+    of the check, so a changed corpus or model never serves an old result. Texts that only differ in case,
+    digits, punctuation or spacing share their result.
+    """
+
+    def __init__(self, max_size=1000, ttl=3600, store=None):
+        """
+        Initializes an empty ResultCache.
+
+        Parameters:
+        - max_size (int): The maximum number of results kept in memory. The least recently used ones are evicted.
+        - ttl (float, optional): The number of seconds a result is served. None keeps results until they are evicted.
+        - store (SQLiteResultStore, optional): The persistent store read on memory misses and written on every put.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(normalized_text, corpus_version, model_version, options=None):
+        """
+        Computes the cache key of a check.
+
+        Parameters:
+        - normalized_text (str): The text, normalized with Preprocessor.clean_text.
+        - corpus_version (str): The version of the corpus it is checked against.
+        - model_version (str): The fingerprint of the vector model.
+        - options (dict, optional): Anything else that changes the result, serializable to JSON.
+
+        Returns:
+        - str: A hex SHA-256 digest.
+        """
+        header = json.dumps([corpus_version, model_version, options], sort_keys=True)
+        return hashlib.sha256(f"{header}\n{' '.join(normalized_text.split())}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Gets a cached result, from memory or else from the store.
+
+        Parameters:
+        - key (str): The key of the result.
+
+        Returns:
+        - dict or None: A copy of the result, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.store is not None:
+            entry = self.store.get(key, now)
+            if entry is not None:
+                self._remember(key, entry)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.count("result_cache_misses" if entry is None else "result_cache_hits")
+        return dict(entry[2]) if entry is not None else None
+
+    def put(self, key, corpus_version, result):
+        """
+        Caches a result, evicting the least recently used one if the cache is full.
+
+        Parameters:
+        - key (str): The key of the result.
+        - corpus_version (str): The version of the corpus the result was computed on.
+        - result (dict): The result, serializable to JSON.
+        """
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        self._remember(key, (corpus_version, expires, dict(result)))
+        if self.store is not None:
+            self.store.put(key, corpus_version, expires if expires is not None else float("inf"), result)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, corpus_version=None):
+        """
+        Removes the results computed on other corpus versions, or every result, from memory and the store.
+
+        Parameters:
+        - corpus_version (str, optional): The version whose results are kept. None removes every result.
+        """
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if corpus_version is None or entry[0] != corpus_version]:
+                del self._entries[key]
+        if self.store is not None:
+            self.store.invalidate(corpus_version)
@@ -0,0 +1,166 @@
+import numpy as np
+from difflib import SequenceMatcher
+from app.model.metrics import metrics
+
+
+class SentenceMatcher:
+    """
+    A class to find similar sentence pairs between two documents with vectorized NumPy operations.
+
+    SequenceMatcher.ratio() is 2 * M / T, where M is the number of characters in matching blocks and T the total
+    length. Two upper bounds of M discard pairs that cannot reach the threshold before running SequenceMatcher:
+
+    1. The number of shared characters (difflib's quick_ratio), computed for all pairs at once from a matrix
+       of character counts per sentence.
+    2. The length of the longest common subsequence, since matching blocks never cross. It is computed for the
+       survivors of the first bound with a bit-parallel algorithm.
+
+    The few remaining pairs are verified with the exact ratio, so the results are the same as comparing every
+    pair with SequenceMatcher.
+    """
+
+    def __init__(self, threshold=0.7, verify=True, max_chunk_size=4000000):
+        """
+        Initializes the SentenceMatcher.
+
+        Parameters:
+        - threshold (float): The similarity above which two sentences are considered similar.
+        - verify (bool): Whether survivors are verified with SequenceMatcher. Without verification the longest
+          common subsequence bound is reported as the similarity, which is faster but may report false positives.
+        - max_chunk_size (int): The maximum number of elements of the temporary (pairs x characters) array,
+          to bound memory on very long documents.
+        """
+        self.threshold = threshold
+        self.verify = verify
+        self.max_chunk_size = max_chunk_size
+
+    @staticmethod
+    def encode(sentences, alphabet):
+        """
+        Counts the characters of each sentence.
+
+        Parameters:
+        - sentences (list of str): The sentences.
+        - alphabet (dict): Maps every character to its column.
+
+        Returns:
+        - numpy.ndarray: A (sentences x alphabet) matrix of character counts.
+        """
+        counts = np.zeros((len(sentences), len(alphabet)), dtype=np.int32)
+        for row, sentence in enumerate(sentences):
+            if sentence:
+                codes = np.fromiter((alphabet[char] for char in sentence), dtype=np.int64, count=len(sentence))
+                counts[row] = np.bincount(codes, minlength=len(alphabet))
+        return counts
+
+    def upper_bounds(self, sentences1, sentences2):
+        """
+        Computes difflib's quick_ratio for every pair of sentences.
+
+        Parameters:
+        - sentences1 (list of str): The sentences of the first document.
+        - sentences2 (list of str): The sentences of the second document.
+
+        Returns:
+        - numpy.ndarray: A (len(sentences1) x len(sentences2)) matrix of upper bounds of the similarity.
+        """
+        alphabet = {char: column for column, char in enumerate(sorted(set("".join(sentences1)) | set("".join(sentences2))))}
+        counts1 = self.encode(sentences1, alphabet)
+        counts2 = self.encode(sentences2, alphabet)
+        lengths1 = counts1.sum(axis=1)
+        lengths2 = counts2.sum(axis=1)
+
+        matches = np.zeros((len(sentences1), len(sentences2)), dtype=np.int64)
+        rows_per_chunk = max(1, self.max_chunk_size // max(1, len(sentences2) * len(alphabet)))
+        for start in range(0, len(sentences1), rows_per_chunk):
+            chunk = counts1[start:start + rows_per_chunk]
+            matches[start:start + rows_per_chunk] = np.minimum(chunk[:, None, :], counts2[None, :, :]).sum(axis=2)
+
+        totals = lengths1[:, None] + lengths2[None, :]
+        # Same formula as difflib: two empty sentences are identical
+        return np.where(totals > 0, 2.0 * matches / np.maximum(totals, 1), 1.0)
+
+    @staticmethod
+    def character_masks(sentence):
+        """
+        Builds the bit mask of the positions of every character of a sentence.
+
+        Parameters:
+        - sentence (str): The sentence.
+
+        Returns:
+        - dict: Maps every character to an integer with bit i set if sentence[i] is that character.
+        """
+        masks = {}
+        for position, char in enumerate(sentence):
+            masks[char] = masks.get(char, 0) | (1 << position)
+        return masks
+
+    @staticmethod
+    def lcs_length(length1, masks1, sentence2):
+        """
+        Computes the length of the longest common subsequence of two sentences with the bit-parallel
+        algorithm of Hyyro (2004), which processes one character of the second sentence per step.
+
+        Parameters:
+        - length1 (int): The length of the first sentence.
+        - masks1 (dict): The character masks of the first sentence, from character_masks.
+        - sentence2 (str): The second sentence.
+
+        Returns:
+        - int: The length of the longest common subsequence.
+        """
+        all_ones = (1 << length1) - 1
+        row = all_ones
+        for char in sentence2:
+            matches = row & masks1.get(char, 0)
+            row = ((row + matches) | (row - matches)) & all_ones
+        return length1 - row.bit_count()
+
+    def match(self, sentences1, sentences2, candidate_pairs=None):
+        """
+        Finds the similar sentence pairs between two documents.
+
+        Parameters:
+        - sentences1 (list of str): The sentences of the first document.
+        - sentences2 (list of str): The sentences of the second document.
+        - candidate_pairs (set, optional): The (index in sentences1, index in sentences2) pairs to consider.
+          Every pair is considered when omitted.
+
+        Returns:
+        - list: Tuples (i, j, sentence1, sentence2, similarity) in the order of i and then j.
+        """
+        if not sentences1 or not sentences2:
+            return []
+        bounds = self.upper_bounds(sentences1, sentences2)
+        rows, columns = np.nonzero(bounds > self.threshold)
+
+        similar_sentences = []
+        masks = {}
+        ratios = {}
+        bounded = 0
+        for i, j in zip(rows.tolist(), columns.tolist()):
+            if candidate_pairs is not None and (i, j) not in candidate_pairs:
+                continue
+            sent1, sent2 = sentences1[i], sentences2[j]
+            if i not in masks:
+                masks[i] = self.character_masks(sent1)
+            total = len(sent1) + len(sent2)
+            lcs_bound = 2.0 * self.lcs_length(len(sent1), masks[i], sent2) / total if total else 1.0
+            if lcs_bound <= self.threshold:
+                continue
+
+            bounded += 1
+            if not self.verify:
+                similarity = lcs_bound
+            elif (sent1, sent2) in ratios:
+                similarity = ratios[(sent1, sent2)]
+            else:
+                similarity = SequenceMatcher(None, sent1, sent2).ratio()
+                ratios[(sent1, sent2)] = similarity
+            if similarity > self.threshold:
+                similar_sentences.append((i, j, sent1, sent2, similarity))
+        metrics.count("sentence_pairs_considered", len(candidate_pairs) if candidate_pairs is not None else len(sentences1) * len(sentences2))
+        metrics.count("sentence_pairs_bounded", bounded)
+        metrics.count("sequence_matcher_calls", len(ratios))
+        return similar_sentences
@@ -0,0 +1,276 @@
+import os
+import numpy as np
+from app.model.documentSource import batched
+from app.model.documentVectors import DocumentVectors
+from app.model.sharedArrays import load_arrays, save_arrays
+from app.model.tokenArray import TokenArray
+
+
+class SentenceVectors:
+    """
+    An L2-normalized float32 matrix with one embedding per corpus sentence, so the sentences of a query can be
+    matched against every sentence of the corpus with a single matrix product instead of one comparison per
+    document. Unlike the document vectors, a paraphrased sentence is not diluted by the rest of its document.
+
+    Sentences are stored document after document; offsets maps every document to its first row, and doc_ids
+    and sentence_ids map every row back to its (document, sentence) pair.
+
+    The embedding of a sentence is the mean of its word vectors ("mean"), or the SIF embedding of Arora et al.
+    (2017) ("sif"): every word vector is weighted by a / (a + p(word)), where p is the frequency of the word in
+    the corpus, and the projection on the first principal component of the corpus sentences is removed. The
+    weights and the component are fitted when the matrix is built and reused for queries and updates.
+    """
+
+    WEIGHTINGS = ("mean", "sif")
+
+    def __init__(self, matrix, offsets, model_key, corpus_version, weighting="mean", word_weights=None, component=None):
+        """
+        Initializes the SentenceVectors from already computed embeddings.
+
+        Parameters:
+        - matrix (numpy.ndarray): The normalized (sentences x dimensions) float32 embeddings.
+        - offsets (numpy.ndarray): The int64 row of the first sentence of every document, followed by the number of rows.
+        - model_key (str): The fingerprint of the vector model the embeddings were computed with.
+        - corpus_version (str): The version of the corpus the embeddings were computed from.
+        - weighting (str): "mean" or "sif".
+        - word_weights (numpy.ndarray, optional): The SIF weight of every word of the model, in the order of its vectors.
+        - component (numpy.ndarray, optional): The unit principal component removed from every SIF embedding.
+
+        Raises:
+        - ValueError: If the weighting is unknown.
+        """
+        if weighting not in self.WEIGHTINGS:
+            raise ValueError(f"Unknown sentence weighting: {weighting}")
+        self.matrix = matrix
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.doc_ids = np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int64), np.diff(self.offsets))
+        self.sentence_ids = np.arange(len(self.doc_ids), dtype=np.int64) - self.offsets[self.doc_ids]
+        self.model_key = model_key
+        self.corpus_version = corpus_version
+        self.weighting = weighting
+        self.word_weights = word_weights
+        self.component = component
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def sif_weights(corpus, model, a=1e-3):
+        """
+        Computes the SIF weight a / (a + p(word)) of every word of a model from the token frequencies of a corpus.
+
+        Parameters:
+        - corpus (Corpus): The corpus the frequencies are counted on.
+        - model: A Word2Vec model or KeyedVectors.
+        - a (float): The smoothing parameter. Smaller values weigh frequent words down more.
+
+        Returns:
+        - numpy.ndarray: One float64 weight per word of the model. Words not in the corpus weigh 1.
+        """
+        wv = getattr(model, "wv", model)
+        token_lists = corpus.token_lists
+        counts = np.bincount(np.asarray(token_lists.ids), minlength=len(token_lists.vocabulary))
+        rows = np.array([wv.key_to_index.get(word, -1) for word in token_lists.vocabulary], dtype=np.int64)
+        frequencies = np.zeros(len(wv.index_to_key), dtype=np.float64)
+        known = rows >= 0
+        np.add.at(frequencies, rows[known], counts[known])
+        frequencies /= max(int(counts.sum()), 1)
+        return a / (a + frequencies)
+
+    @classmethod
+    def build(cls, corpus, model, preprocessor, vectorizer, weighting="mean", model_key=None, batch_size=64, n_process=1, shared_dir=None, sif_a=1e-3):
+        """
+        Preprocesses every corpus sentence and embeds it.
+
+        Parameters:
+        - corpus (Corpus): The precomputed corpus.
+        - model: The Word2Vec model or KeyedVectors.
+        - preprocessor (Preprocessor): The preprocessor used to lemmatize the sentences.
+        - vectorizer (Vectorizer): The vectorizer used to average word vectors.
+        - weighting (str): "mean" or "sif".
+        - model_key (str, optional): The fingerprint of the model. Computed when omitted.
+        - batch_size (int): The number of sentences Spacy processes per batch.
+        - n_process (int): The number of processes Spacy uses. -1 uses every CPU.
+        - shared_dir (str, optional): A directory where the embeddings are saved for every weighting, model and
+          corpus version. When given, they are opened from there, memory-mapped, and only built if they were not saved yet.
+        - sif_a (float): The SIF smoothing parameter.
+
+        Returns:
+        - SentenceVectors: The sentence embeddings.
+        """
+        if model_key is None:
+            model_key = DocumentVectors.model_fingerprint(model)
+        if shared_dir is not None and os.path.exists(cls.shared_path(shared_dir, weighting, model_key, corpus.version)):
+            return cls.load(cls.shared_path(shared_dir, weighting, model_key, corpus.version))
+
+        offsets = np.zeros(len(corpus) + 1, dtype=np.int64)
+        np.cumsum([len(sentences) for sentences in corpus.sentences], out=offsets[1:])
+        sentences = (sentence for doc_sentences in corpus.sentences for sentence in doc_sentences)
+        token_lists = TokenArray.from_lists(
+            tokens for chunk in batched(sentences, batch_size * 64)
+            for _, tokens in preprocessor.preprocess_texts(chunk, batch_size=batch_size, n_process=n_process, fast=False)
+        )
+
+        word_weights = cls.sif_weights(corpus, model, sif_a) if weighting == "sif" else None
+        vectors = vectorizer.get_token_array_vectors(token_lists, model, weights=word_weights)
+        component = None
+        if weighting == "sif" and len(vectors):
+            # The first right singular vector of the embeddings, from the small dimensions x dimensions Gram matrix
+            gram = vectors.T.astype(np.float64) @ vectors
+            component = np.linalg.eigh(gram)[1][:, -1].astype(np.float32)
+            vectors -= np.outer(vectors @ component, component)
+
+        sentence_vectors = cls(DocumentVectors.normalize(vectors), offsets, model_key, corpus.version, weighting, word_weights, component)
+        return sentence_vectors.share(shared_dir) if shared_dir is not None else sentence_vectors
+
+    def encode(self, token_lists, model, vectorizer):
+        """
+        Embeds sentences the same way as the corpus sentences.
+
+        Parameters:
+        - token_lists (list of list of str): The lemmatized tokens of every sentence.
+        - model: The Word2Vec model or KeyedVectors the corpus sentences were embedded with.
+        - vectorizer (Vectorizer): The vectorizer used to average word vectors.
+
+        Returns:
+        - numpy.ndarray: The normalized (sentences x dimensions) float32 embeddings.
+        """
+        vectors = vectorizer.get_token_array_vectors(TokenArray.from_lists(token_lists), model, weights=self.word_weights)
+        if self.component is not None:
+            vectors -= np.outer(vectors @ self.component, self.component)
+        return DocumentVectors.normalize(vectors)
+
+    def query(self, vectors, k, chunk_size=262144):
+        """
+        Finds the k corpus sentences most similar to every query sentence. Each chunk of corpus sentences is
+        scored against every query sentence with one matrix product.
+
+        Parameters:
+        - vectors (numpy.ndarray): The normalized (queries x dimensions) embeddings returned by encode.
+        - k (int): The number of sentences per query sentence.
+        - chunk_size (int): The number of corpus sentences scored at a time, which bounds the memory of the scores.
+
+        Returns:
+        - tuple: Two (queries x k) arrays, with fewer columns for a smaller corpus: the rows of the matches of
+          every query sentence, sorted by decreasing similarity, and their similarities. Rows map to documents
+          and sentences through doc_ids and sentence_ids.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.matrix.shape[1])
+        k = min(k, len(self))
+        best_rows = np.zeros((len(vectors), 0), dtype=np.int64)
+        best_scores = np.zeros((len(vectors), 0), dtype=np.float32)
+        if k <= 0 or len(vectors) == 0:
+            return best_rows, best_scores
+        for start in range(0, len(self), chunk_size):
+            scores = vectors @ self.matrix[start:start + chunk_size].T
+            top = min(k, scores.shape[1])
+            rows = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            best_rows = np.hstack([best_rows, rows + start])
+            best_scores = np.hstack([best_scores, np.take_along_axis(scores, rows, axis=1)])
+            if best_rows.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_rows, best_scores = np.take_along_axis(best_rows, keep, axis=1), np.take_along_axis(best_scores, keep, axis=1)
+        order = np.lexsort((best_rows, -best_scores), axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    @staticmethod
+    def shared_path(shared_dir, weighting, model_key, corpus_version):
+        """
+        Gets the directory where the embeddings of a weighting, model and corpus version are saved for the worker processes.
+
+        Parameters:
+        - shared_dir (str): The directory of the shared embeddings.
+        - weighting (str): "mean" or "sif".
+        - model_key (str): The fingerprint of the vector model.
+        - corpus_version (str): The version of the corpus.
+
+        Returns:
+        - str: The directory of the embeddings.
+        """
+        return os.path.join(shared_dir, f"sentences-{weighting}-{model_key[:16]}-{corpus_version[:16]}")
+
+    def share(self, shared_dir):
+        """
+        Saves the embeddings for the worker processes, unless another one already did, and opens them memory-mapped.
+
+        Parameters:
+        - shared_dir (str): The directory of the shared embeddings.
+
+        Returns:
+        - SentenceVectors: Equal embeddings backed by memory-mapped arrays.
+        """
+        path = self.shared_path(shared_dir, self.weighting, self.model_key, self.corpus_version)
+        self.save(path)
+        return SentenceVectors.load(path)
+
+    def save(self, directory):
+        """
+        Saves the embeddings, the offsets and the SIF weights as arrays that load memory-maps. An existing
+        directory is left as it is.
+
+        Parameters:
+        - directory (str): The directory to write.
+        """
+        arrays = {"matrix": self.matrix, "offsets": self.offsets}
+        if self.word_weights is not None:
+            arrays["word_weights"] = self.word_weights
+        if self.component is not None:
+            arrays["component"] = self.component
+        os.makedirs(os.path.dirname(directory) or ".", exist_ok=True)
+        save_arrays(directory, arrays, {"model_key": self.model_key, "corpus_version": self.corpus_version, "weighting": self.weighting})
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Opens the embeddings written by save, memory-mapped read-only.
+
+        Parameters:
+        - directory (str): The directory of the embeddings.
+
+        Returns:
+        - SentenceVectors: The sentence embeddings.
+        """
+        arrays, meta = load_arrays(directory)
+        return cls(arrays["matrix"], arrays["offsets"], meta["model_key"], meta["corpus_version"], meta["weighting"],
+                   arrays.get("word_weights"), arrays.get("component"))
+
+    def upsert(self, row, vectors, corpus_version):
+        """
+        Sets the sentence embeddings of a document, appending it when row is the number of documents.
+        The SentenceVectors itself is not modified.
+
+        Parameters:
+        - row (int): The index of the document, at most the number of documents.
+        - vectors (numpy.ndarray): The normalized embeddings of the sentences of the document, as returned by encode.
+        - corpus_version (str): The version of the corpus after the change.
+
+        Returns:
+        - SentenceVectors: The updated embeddings.
+        """
+        documents = len(self.offsets) - 1
+        stop = min(row + 1, documents)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.matrix.shape[1])
+        start, end = self.offsets[row], self.offsets[stop]
+        matrix = np.vstack([self.matrix[:start], vectors, self.matrix[end:]])
+        lengths = np.diff(self.offsets)
+        lengths = np.concatenate([lengths[:row], [len(vectors)], lengths[stop:]])
+        return self._with(matrix, lengths, corpus_version)
+
+    def delete(self, row, corpus_version):
+        """
+        Removes the sentence embeddings of a document. The SentenceVectors itself is not modified.
+
+        Parameters:
+        - row (int): The index of the document.
+        - corpus_version (str): The version of the corpus after the change.
+
+        Returns:
+        - SentenceVectors: The embeddings without the document.
+        """
+        matrix = np.delete(self.matrix, np.arange(self.offsets[row], self.offsets[row + 1]), axis=0)
+        return self._with(matrix, np.delete(np.diff(self.offsets), row), corpus_version)
+
+    def _with(self, matrix, lengths, corpus_version):
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return SentenceVectors(matrix, offsets, self.model_key, corpus_version, self.weighting, self.word_weights, self.component)
@@ -0,0 +1,233 @@
+import os
+import json
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app.model.annIndex import FlatIndex, _top_k
+
+# The shard owned by the current worker. Every worker runs in its own thread or process, so it only sees its own.
+_shard = threading.local()
+
+
+def _load_shard(source):
+    """
+    Loads the vectors of a shard in the worker that owns it.
+
+    Parameters:
+    - source (str or numpy.ndarray): The .npy file of the shard, or its vectors.
+    """
+    vectors = np.load(source) if isinstance(source, str) else source
+    # An empty shard keeps its empty matrix, since there is nothing to normalize
+    _shard.index = FlatIndex().build(vectors) if len(vectors) else None
+    _shard.empty = vectors if not len(vectors) else None
+
+
+def _shard_size():
+    return len(_shard.index) if _shard.index is not None else 0
+
+
+def _query_shard(vector, k):
+    if _shard.index is None:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+    return _shard.index.query(vector, k)
+
+
+def _shard_vectors():
+    return _shard.index.vectors if _shard.index is not None else _shard.empty
+
+
+class ShardedIndex:
+    """
+    An exact candidate index whose vectors are partitioned into shards, each owned by a worker that keeps
+    its own FlatIndex. A query is scattered to every shard, which returns its partial top k, and the
+    coordinator merges them, so scoring uses one core per shard and no process holds every vector.
+
+    When built with a directory, the shards are stored there as .npy files with a shard map, shards.json, that
+    lists the file of every shard and the file of the global document ids of its rows, so each worker loads its
+    shard on its own. Updates only restart the worker of the shard that owns the document, passing it the new
+    vectors directly: like the other indexes, the files keep the state of the build until the next one.
+    """
+
+    kind = "sharded"
+    MAP_FILE = "shards.json"
+    FORMAT_VERSION = 1
+
+    def __init__(self, n_shards=None, executor="process", directory=None):
+        """
+        Initializes an empty ShardedIndex.
+
+        Parameters:
+        - n_shards (int, optional): The number of shards. Defaults to the number of CPUs.
+        - executor (str): "process" runs every shard in its own process, "thread" in a thread of this process.
+        - directory (str, optional): The directory where the shards and the shard map are written. Without one,
+          the vectors are sent to the workers directly.
+        """
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Unknown executor: {executor}")
+        self.n_shards = n_shards or os.cpu_count() or 1
+        self.executor = executor
+        self.directory = directory
+        self.ids = []
+        self._workers = []
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.ids)
+
+    def _start_worker(self, source):
+        if self.executor == "process":
+            # Spawned workers start clean instead of inheriting the locks and threads of the web process
+            return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"), initializer=_load_shard, initargs=(source,))
+        return ThreadPoolExecutor(max_workers=1, initializer=_load_shard, initargs=(source,))
+
+    def _write(self, shards):
+        """
+        Writes the shards, their ids and the shard map. The map is written last and replaced atomically.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        files = [f"shard-{shard}.npy" for shard in range(len(shards))]
+        for filename, vectors in zip(files, shards):
+            np.save(os.path.join(self.directory, filename), vectors)
+        np.savez(os.path.join(self.directory, "ids.npz"), *self.ids)
+        shard_map = {"format": self.FORMAT_VERSION, "n_shards": len(files), "shards": files, "ids": "ids.npz"}
+        path = os.path.join(self.directory, self.MAP_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(shard_map, file)
+        os.replace(path + ".tmp", path)
+        return [os.path.join(self.directory, filename) for filename in files]
+
+    def _start(self, sources):
+        self._workers = [self._start_worker(source) for source in sources]
+        # Load every shard now, in parallel, so the first query does not wait and errors show up early
+        for future in [worker.submit(_shard_size) for worker in self._workers]:
+            future.result()
+        return self
+
+    def build(self, vectors):
+        """
+        Partitions a matrix of document vectors into shards, writes them and starts their workers.
+        Rows are assigned to the shards in turn, so the shards have the same size.
+
+        Parameters:
+        - vectors (numpy.ndarray): One row per document.
+
+        Returns:
+        - ShardedIndex: The index itself.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.ids = [np.arange(shard, len(vectors), self.n_shards, dtype=np.int64) for shard in range(self.n_shards)]
+        shards = [vectors[ids] for ids in self.ids]
+        return self._start(self._write(shards) if self.directory is not None else shards)
+
+    @classmethod
+    def load(cls, directory, executor="process"):
+        """
+        Starts the workers of an index written by build.
+
+        Parameters:
+        - directory (str): The directory of the shard map.
+        - executor (str): "process" or "thread".
+
+        Returns:
+        - ShardedIndex: The loaded index.
+
+        Raises:
+        - ValueError: If the shard map was written with another format.
+        """
+        with open(os.path.join(directory, cls.MAP_FILE), "r", encoding="utf-8") as file:
+            shard_map = json.load(file)
+        if shard_map.get("format") != cls.FORMAT_VERSION:
+            raise ValueError(f"Unsupported shard map format: {shard_map.get('format')}")
+        index = cls(shard_map["n_shards"], executor, directory)
+        with np.load(os.path.join(directory, shard_map["ids"])) as data:
+            index.ids = [data[f"arr_{shard}"] for shard in range(len(shard_map["shards"]))]
+        return index._start([os.path.join(directory, filename) for filename in shard_map["shards"]])
+
+    def query(self, vector, k):
+        """
+        Finds the k vectors most similar to a query across every shard.
+
+        Parameters:
+        - vector (numpy.ndarray): The query vector.
+        - k (int): The number of results.
+
+        Returns:
+        - tuple: The document ids and cosine similarities of the results, sorted by decreasing similarity.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        futures = [worker.submit(_query_shard, vector, k) for worker in self._workers]
+        ids, scores = [], []
+        for shard, future in enumerate(futures):
+            local_ids, local_scores = future.result()
+            ids.append(self.ids[shard][local_ids])
+            scores.append(local_scores)
+        if not ids:
+            return _top_k(np.array([], dtype=np.float32), np.array([], dtype=np.int64), k)
+        return _top_k(np.concatenate(scores), np.concatenate(ids), k)
+
+    def _owner(self, doc_id):
+        for shard, ids in enumerate(self.ids):
+            if np.any(ids == doc_id):
+                return shard
+        return None
+
+    def _replace_shard(self, shard, vectors, ids):
+        """
+        Creates a copy of the index where one shard has new vectors. The other shards keep their workers.
+        """
+        index = ShardedIndex(self.n_shards, self.executor, self.directory)
+        index.ids, index._workers = list(self.ids), list(self._workers)
+        index.ids[shard] = ids
+        index._workers[shard] = index._start_worker(np.asarray(vectors, dtype=np.float32))
+        index._workers[shard].submit(_shard_size).result()
+        return index
+
+    def upsert(self, doc_id, vector):
+        """
+        Sets the vector of a document, appending it to the smallest shard when doc_id is the number of indexed
+        documents. The index itself is not modified, so it can keep serving queries while the copy is built.
+
+        Parameters:
+        - doc_id (int): The id of the document, at most the number of indexed documents.
+        - vector (numpy.ndarray): The new vector of the document.
+
+        Returns:
+        - ShardedIndex: A new index with the document updated.
+        """
+        shard = self._owner(doc_id)
+        if shard is None:
+            shard = int(np.argmin([len(ids) for ids in self.ids]))
+        vectors = np.array(self._workers[shard].submit(_shard_vectors).result())
+        ids = self.ids[shard]
+        rows = np.nonzero(ids == doc_id)[0]
+        if len(rows):
+            vectors[rows[0]] = np.ravel(vector)
+        else:
+            vectors = np.vstack([vectors, np.reshape(vector, (1, -1))])
+            ids = np.append(ids, doc_id)
+        return self._replace_shard(shard, vectors, ids)
+
+    def delete(self, doc_id):
+        """
+        Removes a document. The ids of the following documents are shifted down by one, like the rows of the corpus.
+
+        Parameters:
+        - doc_id (int): The id of the document.
+
+        Returns:
+        - ShardedIndex: A new index without the document.
+        """
+        shard = self._owner(doc_id)
+        keep = self.ids[shard] != doc_id
+        vectors = self._workers[shard].submit(_shard_vectors).result()[keep]
+        index = self._replace_shard(shard, vectors, self.ids[shard][keep])
+        index.ids = [np.where(ids > doc_id, ids - 1, ids) for ids in index.ids]
+        return index
+
+    def close(self):
+        """
+        Stops the workers of the index. Copies made by upsert and delete share the workers of unchanged shards,
+        which otherwise stop once no index uses them.
+        """
+        for worker in self._workers:
+            worker.shutdown(wait=False)
@@ -0,0 +1,281 @@
+import os
+import json
+import shutil
+import numpy as np
+
+
+def save_arrays(directory, arrays, meta=None):
+    """
+    Writes arrays as .npy files and a meta.json file, so other processes can memory-map them. The directory is
+    written under a temporary name and renamed, so readers never see it half written. If another process wrote
+    it first, its copy is kept.
+
+    Parameters:
+    - directory (str): The directory to write.
+    - arrays (dict): Maps every name to a NumPy array.
+    - meta (dict, optional): JSON-serializable values stored with the arrays.
+    """
+    if os.path.exists(directory):
+        return
+    tmp_directory = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_directory, f"{name}.npy"), np.asarray(array))
+    with open(os.path.join(tmp_directory, "meta.json"), "w", encoding="utf-8") as file:
+        json.dump({"arrays": sorted(arrays), "meta": meta or {}}, file, ensure_ascii=False)
+    try:
+        os.rename(tmp_directory, directory)
+    except OSError:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        if not os.path.exists(directory):
+            raise
+
+
+def load_arrays(directory, mmap=True):
+    """
+    Loads the arrays written by save_arrays. Memory-mapped arrays are read-only and shared through the OS page
+    cache by every process that maps the same files.
+
+    Parameters:
+    - directory (str): The directory of the arrays.
+    - mmap (bool): Whether the arrays are memory-mapped instead of read into memory.
+
+    Returns:
+    - tuple: A dictionary with the arrays and the dictionary of meta values.
+    """
+    with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as file:
+        contents = json.load(file)
+    arrays = {}
+    for name in contents["arrays"]:
+        path = os.path.join(directory, f"{name}.npy")
+        try:
+            arrays[name] = np.load(path, mmap_mode="r" if mmap else None)
+        except ValueError:
+            # Empty arrays cannot be memory-mapped
+            arrays[name] = np.load(path)
+    return arrays, contents["meta"]
+
+
+class TextArray:
+    """
+    A read-only sequence of strings stored as one UTF-8 byte array and the offsets of every string.
+
+    Unlike a tuple of str, the two arrays can be memory-mapped, so every worker process reads the same pages.
+    Strings are decoded on access; slices return lists.
+    """
+
+    def __init__(self, data, offsets):
+        """
+        Initializes the TextArray from its arrays.
+
+        Parameters:
+        - data (numpy.ndarray): The concatenated UTF-8 bytes of the strings, as uint8.
+        - offsets (numpy.ndarray): The int64 start of every string in data, followed by the length of data.
+        """
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        """
+        Encodes strings into a TextArray.
+
+        Parameters:
+        - strings (iterable of str): The strings.
+
+        Returns:
+        - TextArray: The encoded strings.
+        """
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TextArray index out of range")
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def arrays(self, prefix):
+        """
+        Names the arrays of the TextArray for save_arrays.
+
+        Parameters:
+        - prefix (str): The prefix of the names.
+
+        Returns:
+        - dict: The data and offsets arrays.
+        """
+        return {f"{prefix}_data": self.data, f"{prefix}_offsets": self.offsets}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        """
+        Builds a TextArray from arrays named by the arrays method.
+
+        Parameters:
+        - arrays (dict): The arrays loaded with load_arrays.
+        - prefix (str): The prefix of the names.
+
+        Returns:
+        - TextArray: The strings.
+        """
+        return cls(arrays[f"{prefix}_data"], arrays[f"{prefix}_offsets"])
+
+
+class NestedTextArray:
+    """
+    A read-only sequence of tuples of strings, e.g. the sentences of every document, stored as a TextArray with
+    all the strings and the int64 offset of the first string of every tuple.
+    """
+
+    def __init__(self, texts, offsets, decode=None):
+        """
+        Initializes the NestedTextArray from its arrays.
+
+        Parameters:
+        - texts (TextArray): Every string, tuple after tuple.
+        - offsets (numpy.ndarray): The index in texts of the first string of every tuple, followed by the number of strings.
+        - decode (callable, optional): Converts every string when it is read.
+        """
+        self.texts = texts
+        self.offsets = offsets
+        self.decode = decode
+
+    @classmethod
+    def from_lists(cls, lists, encode=None, decode=None):
+        """
+        Encodes lists of strings into a NestedTextArray.
+
+        Parameters:
+        - lists (iterable of list): The lists.
+        - encode (callable, optional): Converts every item into a string before storing it.
+        - decode (callable, optional): The inverse of encode, applied when the items are read.
+
+        Returns:
+        - NestedTextArray: The encoded lists.
+        """
+        lists = [list(items) for items in lists]
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(items) for items in lists], out=offsets[1:])
+        strings = (encode(item) if encode is not None else item for items in lists for item in items)
+        return cls(TextArray.from_strings(strings), offsets, decode)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("NestedTextArray index out of range")
+        items = self.texts[int(self.offsets[index]):int(self.offsets[index + 1])]
+        return tuple(self.decode(item) for item in items) if self.decode is not None else tuple(items)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def arrays(self, prefix):
+        """
+        Names the arrays of the NestedTextArray for save_arrays.
+
+        Parameters:
+        - prefix (str): The prefix of the names.
+
+        Returns:
+        - dict: The arrays of the strings and the offsets of the tuples.
+        """
+        return dict(self.texts.arrays(prefix), **{f"{prefix}_groups": self.offsets})
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix, decode=None):
+        """
+        Builds a NestedTextArray from arrays named by the arrays method.
+
+        Parameters:
+        - arrays (dict): The arrays loaded with load_arrays.
+        - prefix (str): The prefix of the names.
+        - decode (callable, optional): Converts every string when it is read.
+
+        Returns:
+        - NestedTextArray: The lists.
+        """
+        return cls(TextArray.from_arrays(arrays, prefix), arrays[f"{prefix}_groups"], decode)
+
+
+class SplicedArray:
+    """
+    A read-only sequence that replaces, inserts or removes some items of a base sequence, such as a memory-mapped
+    TextArray, without copying or decoding the other items.
+
+    Every position maps either to an item of the base or to one of the extra items, so splicing a SplicedArray again
+    keeps the same base and only copies the int64 map, and the base stays memory-mapped however many times the
+    sequence is updated.
+    """
+
+    def __init__(self, base, rows, extra):
+        """
+        Initializes the SplicedArray from its parts.
+
+        Parameters:
+        - base (sequence): The items the sequence started from.
+        - rows (numpy.ndarray): The int64 source of every position, the index of an item of base when it is
+          non-negative, or -1 - i for the item i of extra.
+        - extra (tuple): The items that are not in base.
+        """
+        self.base = base
+        self.rows = rows
+        self.extra = extra
+
+    @classmethod
+    def splice(cls, sequence, start, stop, items):
+        """
+        Replaces the items from start to stop of a sequence with other items. The sequence itself is not modified.
+
+        Parameters:
+        - sequence (sequence): The sequence, e.g. a TextArray, a NestedTextArray, a tuple or a SplicedArray.
+        - start (int): The index of the first replaced item.
+        - stop (int): The index after the last replaced item. start inserts the items.
+        - items (list): The new items.
+
+        Returns:
+        - SplicedArray: The updated sequence.
+        """
+        if isinstance(sequence, SplicedArray):
+            base, rows, extra = sequence.base, sequence.rows, sequence.extra
+        else:
+            base, rows, extra = sequence, np.arange(len(sequence), dtype=np.int64), ()
+        new_rows = -1 - np.arange(len(extra), len(extra) + len(items), dtype=np.int64)
+        return cls(base, np.concatenate([rows[:start], new_rows, rows[stop:]]), extra + tuple(items))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SplicedArray index out of range")
+        row = int(self.rows[index])
+        return self.base[row] if row >= 0 else self.extra[-1 - row]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
@@ -0,0 +1,238 @@
+import os
+import re
+import json
+import random
+import shutil
+from collections import defaultdict
+
+# The kinds of plagiarism injected into the queries, besides "clean" queries written from scratch
+PLAGIARISM_KINDS = ("copy", "modification", "reordering")
+
+_SENTENCES = re.compile(r"(?<=[.!?])\s+")
+_TOKENS = re.compile(r"[\w'-]+|[.,;:!?]")
+_END = {".", "!", "?"}
+
+
+class SyntheticCorpus:
+    """
+    Generates any number of reference documents that read like a set of seed documents, and queries with a
+    controlled amount of plagiarism from them, so the detector can be measured at production scale.
+
+    Sentences are random walks on a Markov chain of the word bigrams of the seed documents, so they share
+    their vocabulary and the Word2Vec model trained on them. Every document is generated from its own seeded
+    random generator: the corpus is reproducible and any document can be regenerated without storing it.
+    """
+
+    def __init__(self, seed_documents, seed=1, sentence_count=(8, 20)):
+        """
+        Initializes the generator.
+
+        Parameters:
+        - seed_documents (list of tuple): The (filename, text) of the seed documents. They are the first
+          documents of the corpus and the source of the Markov chain.
+        - seed (int): The seed of every random choice.
+        - sentence_count (tuple): The minimum and maximum number of sentences of a generated document.
+        """
+        if not seed_documents:
+            raise ValueError("At least one seed document is needed")
+        self.seed_documents = list(seed_documents)
+        self.seed = seed
+        self.sentence_count = sentence_count
+        self.transitions = defaultdict(list)
+        for _, text in self.seed_documents:
+            for sentence in _SENTENCES.split(text):
+                tokens = [token.lower() for token in _TOKENS.findall(sentence)]
+                for previous, token in zip([None] + tokens, tokens + [None]):
+                    self.transitions[previous].append(token)
+        self.vocabulary = sorted({token for tokens in self.transitions.values() for token in tokens if token and token not in _END})
+
+    def _random(self, *key):
+        return random.Random(":".join(str(part) for part in (self.seed,) + key))
+
+    def sentence(self, rng, max_tokens=40):
+        """
+        Generates one sentence.
+
+        Parameters:
+        - rng (random.Random): The random generator.
+        - max_tokens (int): The maximum number of tokens before the sentence is ended.
+
+        Returns:
+        - str: The sentence.
+        """
+        tokens = []
+        token = rng.choice(self.transitions[None])
+        while token is not None and len(tokens) < max_tokens:
+            tokens.append(token)
+            if token in _END:
+                break
+            token = rng.choice(self.transitions[token])
+        if tokens and tokens[-1] in ",;:":
+            tokens.pop()
+        if not tokens or tokens[-1] not in _END:
+            tokens.append(".")
+        text = "".join(token if token in _END or token in ",;:" else " " + token for token in tokens).strip()
+        return text[:1].upper() + text[1:]
+
+    def sentences(self, rng, count):
+        return [self.sentence(rng) for _ in range(count)]
+
+    def filename(self, index):
+        """
+        Names a document of the corpus.
+
+        Parameters:
+        - index (int): The index of the document.
+
+        Returns:
+        - str: The filename of a seed document, or syn-<index>.txt for a generated one.
+        """
+        if index < len(self.seed_documents):
+            return self.seed_documents[index][0]
+        return f"syn-{index:06d}.txt"
+
+    def document(self, index):
+        """
+        Gets a document of the corpus. The same index always gives the same text.
+
+        Parameters:
+        - index (int): The index of the document.
+
+        Returns:
+        - str: The text of a seed document, or a generated one.
+        """
+        if index < len(self.seed_documents):
+            return self.seed_documents[index][1]
+        rng = self._random("document", index)
+        return " ".join(self.sentences(rng, rng.randint(*self.sentence_count)))
+
+    def query(self, index, documents, kind):
+        """
+        Generates a query text, plagiarising a random document of the corpus unless it is "clean".
+
+        Parameters:
+        - index (int): The index of the query.
+        - documents (int): The number of documents of the corpus.
+        - kind (str): "clean" or one of PLAGIARISM_KINDS.
+
+        Returns:
+        - dict: The "id", "kind" and "text" of the query and the "source" filename it plagiarises, or None.
+        """
+        rng = self._random("query", index)
+        text = self.sentences(rng, rng.randint(2, 5))
+        source = None
+        if kind != "clean":
+            source = rng.randrange(documents)
+            source_sentences = _SENTENCES.split(self.document(source))
+            length = min(len(source_sentences), rng.randint(3, 6))
+            start = rng.randrange(len(source_sentences) - length + 1)
+            copied = source_sentences[start:start + length]
+            if kind == "modification":
+                copied = [self.modify(rng, sentence) for sentence in copied]
+            elif kind == "reordering":
+                copied = copied[1:] + copied[:1]
+            position = rng.randint(0, len(text))
+            text[position:position] = copied
+            source = self.filename(source)
+        return {"id": f"query-{index:05d}", "kind": kind, "source": source, "text": " ".join(text)}
+
+    def modify(self, rng, sentence, rate=0.15):
+        """
+        Replaces some words of a sentence with random words of the vocabulary.
+
+        Parameters:
+        - rng (random.Random): The random generator.
+        - sentence (str): The sentence.
+        - rate (float): The probability of replacing each word.
+
+        Returns:
+        - str: The modified sentence.
+        """
+        return re.sub(r"[\w'-]+", lambda match: rng.choice(self.vocabulary) if rng.random() < rate else match.group(), sentence)
+
+    def queries(self, count, documents, plagiarism_rate=0.5):
+        """
+        Generates queries, a plagiarism_rate share of them plagiarising the corpus with every kind in turn.
+
+        Parameters:
+        - count (int): The number of queries.
+        - documents (int): The number of documents of the corpus.
+        - plagiarism_rate (float): The share of queries that plagiarise a document.
+
+        Returns:
+        - list of dict: The queries, see query.
+        """
+        plagiarised = round(count * plagiarism_rate)
+        kinds = [PLAGIARISM_KINDS[index % len(PLAGIARISM_KINDS)] for index in range(plagiarised)] + ["clean"] * (count - plagiarised)
+        self._random("kinds").shuffle(kinds)
+        return [self.query(index, documents, kind) for index, kind in enumerate(kinds)]
+
+    def write(self, directory, documents, queries=0, plagiarism_rate=0.5):
+        """
+        Writes a corpus and its queries, unless the directory already has the same ones. A different corpus
+        in the directory is replaced. The directory contains:
+
+        - files/: one .txt file per document, the directory the detector reads.
+        - queries.jsonl: one query per line, see query.
+        - manifest.json: the parameters of the corpus, written last.
+
+        Parameters:
+        - directory (str): The output directory.
+        - documents (int): The number of documents, seed documents included.
+        - queries (int): The number of queries.
+        - plagiarism_rate (float): The share of queries that plagiarise a document.
+
+        Returns:
+        - bool: True if the corpus was written, False if it already existed.
+        """
+        manifest = {"documents": documents, "queries": queries, "plagiarism_rate": plagiarism_rate, "seed": self.seed,
+                    "seed_documents": [filename for filename, _ in self.seed_documents]}
+        manifest_path = os.path.join(directory, "manifest.json")
+        if read_manifest(directory) == manifest:
+            return False
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        files = os.path.join(directory, "files")
+        shutil.rmtree(files, ignore_errors=True)
+        os.makedirs(files)
+        for index in range(documents):
+            with open(os.path.join(files, self.filename(index)), "w", encoding="utf-8") as file:
+                file.write(self.document(index))
+        with open(os.path.join(directory, "queries.jsonl"), "w", encoding="utf-8") as file:
+            for query in self.queries(queries, documents, plagiarism_rate):
+                file.write(json.dumps(query) + "\n")
+        with open(manifest_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2)
+        return True
+
+
+def read_manifest(directory):
+    """
+    Reads the parameters of a corpus written by SyntheticCorpus.write.
+
+    Parameters:
+    - directory (str): The directory of the corpus.
+
+    Returns:
+    - dict or None: The manifest, or None if the corpus is missing or incomplete.
+    """
+    try:
+        with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def read_queries(directory):
+    """
+    Reads the queries of a corpus written by SyntheticCorpus.write.
+
+    Parameters:
+    - directory (str): The directory of the corpus.
+
+    Returns:
+    - list of dict: The queries.
+    """
+    with open(os.path.join(directory, "queries.jsonl"), "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
@@ -0,0 +1,172 @@
+from array import array
+import numpy as np
+from app.model.sharedArrays import TextArray
+
+
+class TokenArray:
+    """
+    A read-only sequence of token lists stored as one stream of uint32 word ids, the offset where the tokens of
+    every document start, and the vocabulary the ids point to.
+
+    Every distinct word is stored once, so a corpus of token lists takes four bytes per token instead of a
+    Python string reference plus the strings. The id stream can be consumed directly, e.g. to average the word
+    vectors of every document at once; indexing still returns the tokens of a document as a tuple of str.
+    """
+
+    def __init__(self, ids, offsets, vocabulary):
+        """
+        Initializes the TokenArray from its arrays.
+
+        Parameters:
+        - ids (numpy.ndarray): The uint32 word id of every token, document after document.
+        - offsets (numpy.ndarray): The int64 index in ids of the first token of every document, followed by the number of tokens.
+        - vocabulary (tuple of str): The word of every id.
+        """
+        self.ids = ids
+        self.offsets = offsets
+        self.vocabulary = tuple(vocabulary)
+        self._word_ids = None
+
+    @classmethod
+    def from_lists(cls, token_lists, vocabulary=()):
+        """
+        Interns token lists into a TokenArray.
+
+        Parameters:
+        - token_lists (iterable of list of str): The tokens of every document.
+        - vocabulary (sequence of str): Words that keep their ids, e.g. the vocabulary of another TokenArray.
+
+        Returns:
+        - TokenArray: The interned tokens.
+        """
+        words = list(vocabulary)
+        word_ids = {word: word_id for word_id, word in enumerate(words)}
+        ids = array("I")
+        offsets = array("q", [0])
+        for tokens in token_lists:
+            for token in tokens:
+                word_id = word_ids.get(token)
+                if word_id is None:
+                    word_id = word_ids[token] = len(words)
+                    words.append(token)
+                ids.append(word_id)
+            offsets.append(len(ids))
+        token_array = cls(np.frombuffer(ids, dtype=np.uint32), np.frombuffer(offsets, dtype=np.int64), words)
+        token_array._word_ids = word_ids
+        return token_array
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TokenArray index out of range")
+        vocabulary = self.vocabulary
+        return tuple(vocabulary[word_id] for word_id in self.document_ids(index).tolist())
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def document_ids(self, index):
+        """
+        Gets the word ids of the tokens of a document without decoding them.
+
+        Parameters:
+        - index (int): The index of the document.
+
+        Returns:
+        - numpy.ndarray: A view of the uint32 ids.
+        """
+        return self.ids[self.offsets[index]:self.offsets[index + 1]]
+
+    def word_ids(self):
+        """
+        Maps every word of the vocabulary to its id. The mapping is built on first use.
+
+        Returns:
+        - dict: The id of every word.
+        """
+        if self._word_ids is None:
+            self._word_ids = {word: word_id for word_id, word in enumerate(self.vocabulary)}
+        return self._word_ids
+
+    def splice(self, start, stop, token_lists):
+        """
+        Replaces the documents from start to stop with other documents. New words are added to the end of the
+        vocabulary, so the ids of the other documents do not change. The TokenArray itself is not modified.
+
+        Parameters:
+        - start (int): The index of the first replaced document.
+        - stop (int): The index after the last replaced document. start inserts the documents.
+        - token_lists (list of list of str): The tokens of the new documents.
+
+        Returns:
+        - TokenArray: The updated tokens.
+        """
+        new = TokenArray.from_lists(token_lists, self.vocabulary)
+        first, last = self.offsets[start], self.offsets[stop]
+        ids = np.concatenate([self.ids[:first], new.ids, self.ids[last:]]).astype(np.uint32, copy=False)
+        offsets = np.concatenate([self.offsets[:start + 1], first + new.offsets[1:], self.offsets[stop + 1:] - last + first + new.offsets[-1]])
+        token_array = TokenArray(ids, offsets.astype(np.int64, copy=False), new.vocabulary)
+        token_array._word_ids = new._word_ids
+        return token_array
+
+    def arrays(self, prefix):
+        """
+        Names the arrays of the TokenArray for save_arrays.
+
+        Parameters:
+        - prefix (str): The prefix of the names.
+
+        Returns:
+        - dict: The ids, offsets and vocabulary arrays.
+        """
+        return dict(TextArray.from_strings(self.vocabulary).arrays(f"{prefix}_vocabulary"), **{f"{prefix}_ids": self.ids, f"{prefix}_offsets": self.offsets})
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        """
+        Builds a TokenArray from arrays named by the arrays method. The ids and offsets stay memory-mapped;
+        only the vocabulary is decoded.
+
+        Parameters:
+        - arrays (dict): The arrays loaded with load_arrays.
+        - prefix (str): The prefix of the names.
+
+        Returns:
+        - TokenArray: The tokens.
+        """
+        return cls(arrays[f"{prefix}_ids"], arrays[f"{prefix}_offsets"], TextArray.from_arrays(arrays, f"{prefix}_vocabulary"))
+
+
+class JoinedTokens:
+    """
+    A read-only view of the tokens of every document of a TokenArray joined with spaces, which is how the
+    preprocessor builds the preprocessed texts, so they do not need to be stored as well.
+    """
+
+    def __init__(self, token_lists):
+        """
+        Initializes the view.
+
+        Parameters:
+        - token_lists (TokenArray): The tokens of every document.
+        """
+        self.token_lists = token_lists
+
+    def __len__(self):
+        return len(self.token_lists)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [" ".join(tokens) for tokens in self.token_lists[index]]
+        return " ".join(self.token_lists[index])
+
+    def __iter__(self):
+        for tokens in self.token_lists:
+            yield " ".join(tokens)
@@ -9,9 +9,15 @@ class Vectorizer:
         preprocessor (Preprocessor): An instance of the Preprocessor class for text preprocessing.
     """
     
-    def __init__(self):
-        """Initializes the Vectorizer with a Preprocessor instance."""
-        self.preprocessor = Preprocessor()
+    def __init__(self, preprocessor=None):
+        """
+        Initializes the Vectorizer with a Preprocessor instance.
+
+        Args:
+            preprocessor (Preprocessor, optional): A shared Preprocessor to reuse. A new one
+            is created when omitted.
+        """
+        self.preprocessor = preprocessor if preprocessor is not None else Preprocessor()
 
     def get_sentence_vector(self, text, model):
         """
@@ -27,7 +33,67 @@ class Vectorizer:
             the same size as the model's vector size.
         """
         tokens = self.preprocessor.preprocess_text(text)[1]
-        word_vectors = [model.wv[word] for word in tokens if word in model.wv]
+        return self.get_tokens_vector(tokens, model)
+
+    def get_tokens_vector(self, tokens, model):
+        """
+        Averages the word vectors of already preprocessed tokens.
+        
+        Args:
+            tokens (list of str): The lemmatized tokens.
+            model: The word embedding model to use for vectorization, a Word2Vec model or KeyedVectors.
+            
+        Returns:
+            numpy.ndarray: The mean of the vectors of the known tokens, or a zero
+            vector of the model's vector size if none of them is known.
+        """
+        # Word2Vec models keep their vectors in wv; exported KeyedVectors are the vectors themselves
+        wv = getattr(model, "wv", model)
+        word_vectors = [wv[word] for word in tokens if word in wv]
         if not word_vectors:  
             return np.zeros(model.vector_size)
-        return np.mean(word_vectors, axis=0)
\ No newline at end of file
+        return np.mean(word_vectors, axis=0)
+
+    def get_token_array_vectors(self, token_array, model, chunk_size=1000000, weights=None):
+        """
+        Averages the word vectors of every document of a TokenArray at once, the same as calling
+        get_tokens_vector for each of them.
+
+        The model row of every vocabulary word is looked up once, and the vectors of the tokens are summed
+        per document with numpy, reading about chunk_size tokens at a time.
+
+        Args:
+            token_array (TokenArray): The interned tokens of the documents.
+            model: The word embedding model to use for vectorization, a Word2Vec model or KeyedVectors.
+            chunk_size (int): The approximate number of tokens summed at a time.
+            weights (numpy.ndarray, optional): A weight for every word of the model, in the order of its vectors,
+                which scales each word vector before it is averaged, e.g. SIF weights. None weighs them equally.
+
+        Returns:
+            numpy.ndarray: A (documents x vector size) float32 matrix with the mean of the vectors of the known
+            tokens of each document, or a zero row if none of them is known.
+        """
+        wv = getattr(model, "wv", model)
+        rows = np.array([wv.key_to_index.get(word, -1) for word in token_array.vocabulary], dtype=np.int64)
+        offsets = np.asarray(token_array.offsets)
+        vectors = np.zeros((len(token_array), model.vector_size), dtype=np.float32)
+        start = 0
+        while start < len(token_array):
+            # Whole documents, at least one, with about chunk_size tokens in total
+            stop = max(start + 1, int(np.searchsorted(offsets, offsets[start] + chunk_size, side="right")) - 1)
+            stop = min(stop, len(token_array))
+            token_rows = rows[np.asarray(token_array.ids[offsets[start]:offsets[stop]])]
+            documents = np.repeat(np.arange(stop - start), np.diff(offsets[start:stop + 1]))
+            known = token_rows >= 0
+            counts = np.bincount(documents[known], minlength=stop - start)
+            nonzero = np.flatnonzero(counts)
+            if len(nonzero):
+                # The known tokens are grouped by document, so every document with one is a contiguous run
+                firsts = (np.cumsum(counts) - counts)[nonzero]
+                known_vectors = wv.vectors[token_rows[known]].astype(np.float64)
+                if weights is not None:
+                    known_vectors *= weights[token_rows[known], None]
+                sums = np.add.reduceat(known_vectors, firsts, axis=0)
+                vectors[start + nonzero] = sums / counts[nonzero, None]
+            start = stop
+        return vectors
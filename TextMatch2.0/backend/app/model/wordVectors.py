@@ -0,0 +1,122 @@
+import os
+import json
+import hashlib
+import time
+from app.model.resources import BACKEND_DIR, lazy_import
+
+gensim = lazy_import("gensim")
+gensim_models = lazy_import("gensim.models")
+
+DEFAULT_VECTORS_PATH = os.path.join(BACKEND_DIR, "models", "word_vectors.kv")
+LEGACY_MODEL_PATH = os.path.join(BACKEND_DIR, "word2vec_model.bin")
+
+# The training parameters of the original inline model. A single worker and a fixed seed make training
+# reproducible, as long as PYTHONHASHSEED is fixed too.
+DEFAULT_TRAINING_CONFIG = {
+    "vector_size": 150,
+    "window": 2,
+    "min_count": 2,
+    "epochs": 5000,
+    "seed": 1,
+    "workers": 1,
+}
+
+
+def training_fingerprint(corpus, preprocessing_config, training_config):
+    """
+    Computes a fingerprint of everything a trained model depends on.
+
+    Parameters:
+    - corpus (Corpus): The corpus the model is trained on.
+    - preprocessing_config (dict): The preprocessing configuration that produced the tokens.
+    - training_config (dict): The Word2Vec parameters.
+
+    Returns:
+    - str: A hexadecimal digest that changes with the documents, the preprocessing or the parameters.
+    """
+    digest = hashlib.sha1()
+    digest.update(corpus.version.encode("ascii"))
+    digest.update(json.dumps(preprocessing_config, sort_keys=True).encode("utf-8"))
+    digest.update(json.dumps(training_config, sort_keys=True).encode("utf-8"))
+    digest.update(gensim.__version__.encode("ascii"))
+    return digest.hexdigest()
+
+
+def train_word_vectors(corpus, training_config=None):
+    """
+    Trains a Word2Vec model on the lemmatized tokens of a corpus.
+
+    Parameters:
+    - corpus (Corpus): The corpus.
+    - training_config (dict, optional): The Word2Vec parameters. Defaults to DEFAULT_TRAINING_CONFIG.
+
+    Returns:
+    - Word2Vec: The trained model.
+    """
+    config = dict(DEFAULT_TRAINING_CONFIG, **(training_config or {}))
+    # The TokenArray can be iterated again for every epoch, so the token lists are never all decoded at once
+    return gensim_models.Word2Vec(sentences=corpus.token_lists, **config)
+
+
+def metadata_path(path):
+    """
+    Gets the path of the metadata file stored next to exported vectors.
+
+    Parameters:
+    - path (str): The path of the exported vectors.
+
+    Returns:
+    - str: The path of the JSON metadata.
+    """
+    return path + ".json"
+
+
+def read_metadata(path):
+    """
+    Reads the metadata of exported vectors.
+
+    Parameters:
+    - path (str): The path of the exported vectors.
+
+    Returns:
+    - dict or None: The metadata, or None if it does not exist or cannot be read.
+    """
+    try:
+        with open(metadata_path(path), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def export_word_vectors(model, path, metadata):
+    """
+    Saves only the word vectors of a model, without its training state. The vector matrix is written to its
+    own .npy file so it can be memory-mapped.
+
+    Parameters:
+    - model (Word2Vec): The trained model.
+    - path (str): The destination file. The matrix is written to path + ".vectors.npy".
+    - metadata (dict): The description of the training, written to path + ".json" after the vectors.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    model.wv.save(path, separately=["vectors"])
+    metadata = dict(metadata, words=len(model.wv), vector_size=model.wv.vector_size, created=time.time())
+    tmp_path = metadata_path(path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(metadata, file, indent=2, sort_keys=True)
+    os.replace(tmp_path, metadata_path(path))
+
+
+def load_word_vectors(path, mmap="r"):
+    """
+    Loads exported word vectors. With mmap="r" the matrix is mapped read-only instead of read, so every
+    process that loads the same file shares its pages through the OS page cache.
+
+    Parameters:
+    - path (str): The exported vectors.
+    - mmap (str, optional): The mmap mode, or None to read the matrix into memory.
+
+    Returns:
+    - KeyedVectors: The word vectors.
+    """
+    return gensim_models.KeyedVectors.load(path, mmap=mmap)
@@ -1,27 +1,498 @@
+import os
+import hmac
+import json
+import time
+from contextlib import nullcontext
 from flask_cors import CORS
 from app import app
-from flask import request, jsonify
+from flask import Response, g, request, jsonify, stream_with_context
+from app.model.batchDetector import BatchDetector
+from app.model.cascadeDetector import CascadeDetector
+from app.model.detectorEngine import DetectorEngine
+from app.model.documentSource import ReadOnlyDocumentError
+from app.model.jobQueue import JobQueue, QueueFullError, SQLiteJobStore
+from app.model.metrics import metrics
 from app.model.plagarsimDetector import PlagiarismDetector
+from app.model.profiler import SamplingProfiler
+from app.model.resultCache import ResultCache, SQLiteResultStore
 
 CORS(app)
 
+# The engine reads its settings (index, candidates, prefilter, sentence embeddings, lemmatizer...) from the
+# TEXTMATCH_* variables listed in detectorEngine.ENVIRONMENT_SETTINGS. TEXTMATCH_REFIT_INTERVAL sets the seconds
+# between background refits after documents change through the admin routes
+engine = DetectorEngine.get_instance()
+
+# The admin endpoints require this value in the X-Admin-Token header, and are disabled when it is not set
+ADMIN_TOKEN = os.environ.get("TEXTMATCH_ADMIN_TOKEN")
+
+# The job queue is created on the first submission, so importing the routes does not start any worker
+JOB_WORKERS = int(os.environ.get("TEXTMATCH_JOB_WORKERS", "0")) or None
+JOB_QUEUE_SIZE = int(os.environ.get("TEXTMATCH_JOB_QUEUE_SIZE", "100"))
+JOB_EXECUTOR = os.environ.get("TEXTMATCH_JOB_EXECUTOR", "process")
+JOB_STORE = os.environ.get("TEXTMATCH_JOB_STORE")
+job_queue = None
+
+# Whether /plagarsim runs the cascade unless the request says otherwise
+CASCADE = os.environ.get("TEXTMATCH_CASCADE", "0") == "1"
+CASCADE_PARAMETERS = ("min_shared_fingerprints", "document_threshold", "sentence_threshold")
+
+# Whether the checks return a "timings" block unless the request says otherwise
+TIMINGS = os.environ.get("TEXTMATCH_TIMINGS", "0") == "1"
+# Whether a check can ask to be profiled with "profile": true
+PROFILING = os.environ.get("TEXTMATCH_PROFILING", "0") == "1"
+
+# The cache of /plagarsim results, created on first use. A size of 0 disables it, a TTL of 0 keeps results until
+# they are evicted, and a store path keeps them in SQLite across restarts
+RESULT_CACHE_SIZE = int(os.environ.get("TEXTMATCH_RESULT_CACHE_SIZE", "1000"))
+RESULT_CACHE_TTL = float(os.environ.get("TEXTMATCH_RESULT_CACHE_TTL", "3600")) or None
+RESULT_CACHE_STORE = os.environ.get("TEXTMATCH_RESULT_CACHE_STORE")
+result_cache = None
+engine_config = None
+
+metrics.gauge("engine_ready", lambda: int(engine.is_ready()))
+metrics.gauge("corpus_documents", lambda: len(engine.snapshot().corpus.filenames) if engine.is_ready() else 0)
+metrics.gauge("parse_cache_entries", lambda: len(engine.parse_cache) if engine.is_ready() else 0)
+metrics.gauge("result_cache_entries", lambda: len(result_cache) if result_cache is not None else 0)
+
+def get_job_queue():
+    """
+    Returns the job queue, creating it with the TEXTMATCH_JOB_* settings on first use.
+
+    Returns:
+    - JobQueue: The job queue of the process.
+    """
+    global job_queue
+    if job_queue is None:
+        store = SQLiteJobStore(JOB_STORE) if JOB_STORE else None
+        job_queue = JobQueue(max_workers=JOB_WORKERS, max_pending=JOB_QUEUE_SIZE, store=store, executor=JOB_EXECUTOR)
+    return job_queue
+
+def get_result_cache():
+    """
+    Returns the result cache, creating it with the TEXTMATCH_RESULT_CACHE_* settings on first use.
+
+    Returns:
+    - ResultCache or None: The result cache of the process, or None if it is disabled.
+    """
+    global result_cache
+    if result_cache is None and RESULT_CACHE_SIZE > 0:
+        store = SQLiteResultStore(RESULT_CACHE_STORE) if RESULT_CACHE_STORE else None
+        result_cache = ResultCache(max_size=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, store=store)
+    return result_cache
+
+def result_cache_key(cache, user_text, state, cascade):
+    """
+    Computes the result cache key of a check. The engine settings are only described once, since they do not
+    change while the process runs.
+
+    Parameters:
+    - cache (ResultCache): The result cache.
+    - user_text (str): The text to check.
+    - state (EngineState): The snapshot the text is checked against.
+    - cascade (dict or bool): The thresholds of the cascade, or False if it does not run.
+
+    Returns:
+    - str: The key.
+    """
+    global engine_config
+    if engine_config is None:
+        engine_config = engine.get_config()
+    return cache.key(engine.preprocessor.clean_text(user_text), state.corpus.version, state.document_vectors.model_key,
+                     {"cascade": cascade, "engine": engine_config})
+
+def corpus_changed():
+    """
+    Drops the cached results of the previous corpus after the corpus changed. The job workers follow the change
+    through the journal of the engine; without one, which has no cache directory, they are restarted instead.
+    """
+    if result_cache is not None:
+        result_cache.invalidate(engine.snapshot().corpus.version)
+    if job_queue is not None and engine.journal is None:
+        job_queue.restart()
+
+def request_profiler(data):
+    """
+    Creates the sampling profiler of a check that asks to be profiled, when profiling is enabled.
+
+    Parameters:
+    - data (dict): The body of the request.
+
+    Returns:
+    - SamplingProfiler or nullcontext: The profiler of the request thread, or a context that does nothing.
+    """
+    if PROFILING and data.get("profile"):
+        return SamplingProfiler()
+    return nullcontext()
+
+def instrumented(body, data, profiler):
+    """
+    Adds the timings and the profile of the request to the body of a check, when they were asked for.
+
+    Parameters:
+    - body (dict): The response body.
+    - data (dict): The body of the request.
+    - profiler (SamplingProfiler or None): The profiler of the request, if any.
+
+    Returns:
+    - dict: The response body.
+    """
+    timings = metrics.current_request()
+    if data.get("timings", TIMINGS) and timings is not None:
+        body["timings"] = timings.as_dict()
+    if isinstance(profiler, SamplingProfiler):
+        body["profile"] = profiler.report()
+    return body
+
+@app.before_request
+def begin_request_metrics():
+    g.metrics_token = metrics.begin_request()
+
+@app.before_request
+def sync_corpus():
+    # Another worker process may have changed the corpus since the last request
+    if engine.sync() and result_cache is not None:
+        result_cache.invalidate(engine.snapshot().corpus.version)
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    timings = metrics.current_request()
+    if timings is not None:
+        metrics.observe("request_seconds", time.perf_counter() - timings.start, endpoint=endpoint)
+    metrics.count("requests", endpoint=endpoint, method=request.method, status=str(response.status_code))
+    return response
+
+@app.teardown_request
+def end_request_metrics(exception=None):
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        try:
+            metrics.end_request(token)
+        except ValueError:
+            # The token was created in another context, e.g. by a streamed response
+            pass
+
+def admin_error():
+    """
+    Checks that an admin request is authorized and that the engine is ready.
+
+    Returns:
+    - tuple or None: The error response, or None if the request can proceed.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Las rutas de administración están desactivadas"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        return jsonify({"error": "No autorizado"}), 401
+    if not engine.is_ready():
+        engine.start()
+        return jsonify({"error": "El servicio se está iniciando, intenta de nuevo en unos segundos"}), 503
+    return None
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    if engine.is_ready():
+        return jsonify({"ready": True}), 200
+
+    engine.start()
+    response = {"ready": False}
+    if engine.error is not None:
+        response["error"] = str(engine.error)
+    return jsonify(response), 503
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.export(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.route("/plagarsim", methods=["POST"])
 def plagarsim():
+    if not engine.is_ready():
+        engine.start()
+        return jsonify({"error": "El servicio se está iniciando, intenta de nuevo en unos segundos"}), 503
+
     try:
         data = request.get_json()
 
         user_text = data['text']
 
-        detector = PlagiarismDetector()
+        with request_profiler(data) as profiler:
+            # "cascade" is true, false or an object with the thresholds of the stages
+            cascade = data.get("cascade", CASCADE)
+            parameters = {key: value for key, value in cascade.items() if key in CASCADE_PARAMETERS} if isinstance(cascade, dict) else {}
+
+            # Profiled checks always run, and "cache": false skips the cache
+            cache = get_result_cache() if data.get("cache", True) and not isinstance(profiler, SamplingProfiler) else None
+            body = None
+            if cache is not None:
+                state = engine.snapshot()
+                key = result_cache_key(cache, user_text, state, parameters if cascade else False)
+                body = cache.get(key)
+            cached = body is not None
+
+            if body is None and cascade:
+                results, report = CascadeDetector(engine, **parameters).detect(user_text)
+                body = dict(format_results(results), cascade=report)
+            elif body is None:
+                detector = PlagiarismDetector(engine)
+
+                detector.set_user_input(user_text)
 
-        detector.set_user_input(user_text)
+                body = format_results(detector.get_results())
 
-        results = detector.get_results()
+            # A result computed while the corpus changed may not match the version of its key
+            if cache is not None and not cached and engine.snapshot().corpus.version == state.corpus.version:
+                cache.put(key, state.corpus.version, body)
 
-        if results:
-            return jsonify({"plgarised_text": True, "results": results}), 200
+        headers = {"X-Result-Cache": "hit" if cached else "miss"} if cache is not None else {}
+        return jsonify(instrumented(body, data, profiler)), 200, headers
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/plagarsim/spans", methods=["POST"])
+def plagarsim_spans():
+    if not engine.is_ready():
+        engine.start()
+        return jsonify({"error": "El servicio se está iniciando, intenta de nuevo en unos segundos"}), 503
+
+    try:
+        data = request.get_json()
+
+        user_text = data['text']
+
+        state = engine.snapshot()
+        if state.fingerprint_index is None:
+            return jsonify({"error": "El índice de huellas está desactivado"}), 409
+
+        documents = []
+        for index, spans in state.fingerprint_index.spans(user_text).items():
+            documents.append({
+                "filename": state.corpus.filenames[index],
+                "spans": [{"start": start, "end": end, "document_start": document_start, "document_end": document_end, "text": user_text[start:end]}
+                          for start, end, document_start, document_end in spans],
+            })
+        return jsonify({"documents": documents}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/plagarsim/paraphrases", methods=["POST"])
+def plagarsim_paraphrases():
+    if not engine.is_ready():
+        engine.start()
+        return jsonify({"error": "El servicio se está iniciando, intenta de nuevo en unos segundos"}), 503
+
+    try:
+        data = request.get_json()
+
+        user_text = data['text']
+
+        detector = PlagiarismDetector(engine)
+        if detector.state.sentence_vectors is None:
+            return jsonify({"error": "Los embeddings de oraciones están desactivados"}), 409
+
+        detector.set_user_input(user_text, state=detector.state)
+        with request_profiler(data) as profiler:
+            paraphrases = detector.find_paraphrases(data.get("k"), data.get("threshold"))
+        sentences = []
+        for sentence, matches in zip(detector.get_user_sentences(), paraphrases):
+            sentences.append({
+                "sentence": sentence,
+                "matches": [{"filename": detector.filenames[index], "sentence_index": sentence_index,
+                             "sentence": detector.state.corpus.sentences[index][sentence_index], "similarity": similarity}
+                            for index, sentence_index, similarity in matches],
+            })
+        return jsonify(instrumented({"sentences": sentences}, data, profiler)), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def format_results(results):
+    """
+    Builds the response body of a plagiarism check.
+
+    Parameters:
+    - results (dict): The results of PlagiarismDetector.get_results.
+
+    Returns:
+    - dict: Whether the text is plagiarised and its results.
+    """
+    if results:
+        return {"plgarised_text": True, "results": results}
+    return {"plgarised_text": False, "results": "No hay plagio"}
+
+def read_batch_documents():
+    """
+    Reads the texts of a batch request: a JSON body {"documents": [{"id": ..., "text": ...}, ...]}, where
+    plain strings are also accepted, or a multipart upload of .txt files in the "files" field.
+
+    Returns:
+    - list: Tuples (id, text). Texts without an id are labelled with their position.
+
+    Raises:
+    - ValueError: If the request has no valid documents.
+    """
+    files = request.files.getlist("files")
+    if files:
+        return [(file.filename, file.read().decode("utf-8", errors="replace")) for file in files]
+
+    data = request.get_json(silent=True) or {}
+    documents = data.get("documents")
+    if not isinstance(documents, list) or not documents:
+        raise ValueError("Se esperaba una lista de documentos")
+    result = []
+    for position, document in enumerate(documents):
+        if isinstance(document, str):
+            document = {"text": document}
+        if not isinstance(document, dict) or not isinstance(document.get("text"), str):
+            raise ValueError(f"El documento {position} no tiene texto")
+        result.append((document.get("id", position), document["text"]))
+    return result
+
+@app.route("/plagarsim/batch", methods=["POST"])
+def plagarsim_batch():
+    if not engine.is_ready():
+        engine.start()
+        return jsonify({"error": "El servicio se está iniciando, intenta de nuevo en unos segundos"}), 503
+
+    try:
+        documents = read_batch_documents()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    batch_size = request.args.get("batch_size", 32, type=int)
+    detector = BatchDetector(engine, batch_size=max(1, batch_size))
+
+    def generate():
+        # One JSON object per line, sent as soon as the chunk of its document is checked
+        results = detector.detect(documents)
+        while True:
+            try:
+                document_id, document_results = next(results)
+            except StopIteration:
+                return
+            except Exception as e:
+                yield json.dumps({"error": str(e)}) + "\n"
+                return
+            yield json.dumps(dict(id=document_id, **format_results(document_results))) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    if not engine.is_ready():
+        engine.start()
+        return jsonify({"error": "El servicio se está iniciando, intenta de nuevo en unos segundos"}), 503
+
+    try:
+        data = request.get_json(silent=True) or {}
+        if isinstance(data.get("text"), str):
+            payload = {"text": data["text"]}
         else:
-            return jsonify({"plgarised_text": False, "results": "No hay plagio"} ), 200
+            payload = {"documents": [[document_id, text] for document_id, text in read_batch_documents()]}
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        job_id = get_job_queue().submit(payload)
+    except QueueFullError:
+        return jsonify({"error": "Hay demasiados trabajos en espera, intenta de nuevo más tarde"}), 429, {"Retry-After": "5"}
+
+    return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = get_job_queue().status(job_id)
+    if job is None:
+        return jsonify({"error": "El trabajo no existe"}), 404
+
+    job.pop("result")
+    return jsonify(job), 200
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = get_job_queue().status(job_id)
+    if job is None:
+        return jsonify({"error": "El trabajo no existe"}), 404
+    if job["status"] in ("queued", "running"):
+        return jsonify({"job_id": job_id, "status": job["status"]}), 202
+    if job["status"] == "failed":
+        return jsonify({"job_id": job_id, "status": job["status"], "error": job["error"]}), 500
+    if job["status"] == "cancelled":
+        return jsonify({"job_id": job_id, "status": job["status"]}), 409
+
+    if job["kind"] == "batch":
+        return jsonify({"job_id": job_id, "status": job["status"], "results": [dict(format_results(results), id=document_id) for document_id, results in job["result"]]}), 200
+    return jsonify(dict(format_results(job["result"]), job_id=job_id, status=job["status"])), 200
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    cancelled = get_job_queue().cancel(job_id)
+    if cancelled is None:
+        return jsonify({"error": "El trabajo no existe"}), 404
+
+    return jsonify({"job_id": job_id, "cancelled": cancelled}), 200
+
+@app.route("/admin/documents", methods=["GET"])
+def list_documents():
+    error = admin_error()
+    if error is not None:
+        return error
+
+    state = engine.snapshot()
+    return jsonify({"documents": list(state.corpus.filenames), "version": state.corpus.version, "pending_changes": engine.pending_changes}), 200
+
+@app.route("/admin/documents/<path:filename>", methods=["PUT"])
+def upsert_document(filename):
+    error = admin_error()
+    if error is not None:
+        return error
+
+    try:
+        data = request.get_json()
+
+        text = data['text']
+
+        created = engine.upsert_document(filename, text)
+        corpus_changed()
+
+        return jsonify({"filename": filename, "created": created, "version": engine.snapshot().corpus.version}), 201 if created else 200
+
+    except ReadOnlyDocumentError as e:
+        return jsonify({"error": f"Solo se pueden modificar los archivos .txt de un directorio: {e}"}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/admin/documents/<path:filename>", methods=["DELETE"])
+def delete_document(filename):
+    error = admin_error()
+    if error is not None:
+        return error
+
+    try:
+        if not engine.delete_document(filename):
+            return jsonify({"error": "El documento no existe"}), 404
+        corpus_changed()
+
+        return jsonify({"filename": filename, "version": engine.snapshot().corpus.version}), 200
+
+    except ReadOnlyDocumentError as e:
+        return jsonify({"error": f"Solo se pueden modificar los archivos .txt de un directorio: {e}"}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/admin/refit", methods=["POST"])
+def refit():
+    error = admin_error()
+    if error is not None:
+        return error
+
+    try:
+        engine.refit()
+
+        return jsonify({"version": engine.snapshot().corpus.version}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
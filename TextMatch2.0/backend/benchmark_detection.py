@@ -0,0 +1,225 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+from app.model.detectorEngine import DetectorEngine
+from app.model.documentSource import read_documents
+from app.model.plagarsimDetector import PlagiarismDetector
+from app.model.syntheticCorpus import SyntheticCorpus, read_queries
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STAGES = ("preprocess_text", "compare_sentences", "plagiarism_type", "evaluate_similarity", "get_results", "endpoint")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measures the latency, throughput and memory of the detector on a synthetic corpus.")
+    parser.add_argument("--dataset", default="dataset/synthetic", help="Directory of the synthetic corpus, generated if it does not match.")
+    parser.add_argument("--seed-directory", default="dataset/files", help="Directory of the documents the corpus is generated from.")
+    parser.add_argument("--documents", type=int, default=1000, help="Number of documents of the corpus, seed documents included.")
+    parser.add_argument("--queries", type=int, default=100, help="Number of queries.")
+    parser.add_argument("--plagiarism-rate", type=float, default=0.5, help="Share of the queries that plagiarise a document.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the corpus and the queries.")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated stages to measure, among {', '.join(STAGES)}.")
+    parser.add_argument("--cache-dir", help="Corpus cache directory. Defaults to a cache inside the dataset; an empty value disables it.")
+    parser.add_argument("--output", help="JSON file of the results. Defaults to benchmark_results/detection-<commit>.json.")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with.")
+    return parser.parse_args(argv)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb():
+    """
+    Gets the peak resident memory of the process.
+
+    Returns:
+    - float or None: The peak in megabytes, or None where the resource module is not available.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies):
+    """
+    Summarizes the latencies of a stage.
+
+    Parameters:
+    - latencies (list of float): The seconds of every call.
+
+    Returns:
+    - dict: The count, the mean and percentiles in milliseconds and the sequential calls per second.
+    """
+    milliseconds = np.asarray(latencies) * 1000
+    p50, p90, p95, p99 = np.percentile(milliseconds, [50, 90, 95, 99])
+    return {"count": len(latencies), "mean_ms": float(milliseconds.mean()), "p50_ms": float(p50), "p90_ms": float(p90), "p95_ms": float(p95),
+            "p99_ms": float(p99), "max_ms": float(milliseconds.max()), "throughput_per_s": len(latencies) / float(np.sum(latencies))}
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_queries(engine, queries, stages):
+    """
+    Runs every stage on every query, each one on a new detector so no stage reuses the work of another.
+
+    Parameters:
+    - engine (DetectorEngine): The warmed-up engine.
+    - queries (list of dict): The queries of the synthetic corpus.
+    - stages (list of str): The stages to measure.
+
+    Returns:
+    - tuple: The latencies of every stage and the results of get_results for every query, or None if it was not measured.
+    """
+    latencies = {stage: [] for stage in stages}
+    results = [] if "get_results" in stages else None
+    corpus = engine.snapshot().corpus
+    rows = {filename: row for row, filename in enumerate(corpus.filenames)}
+    client = None
+    if "endpoint" in stages:
+        import app.routes as routes
+        routes.engine = engine
+        client = routes.app.test_client()
+
+    for number, query in enumerate(queries):
+        text = query["text"]
+        if "preprocess_text" in stages:
+            latencies["preprocess_text"].append(timed(engine.preprocessor.preprocess_text, text)[1])
+        if "compare_sentences" in stages:
+            detector = PlagiarismDetector(engine)
+            detector.set_user_input(text)
+            row = rows.get(query["source"], number % len(corpus))
+            latencies["compare_sentences"].append(timed(detector.compare_sentences, corpus.sentences[row], detector.get_user_sentences())[1])
+        if "plagiarism_type" in stages or "evaluate_similarity" in stages:
+            detector = PlagiarismDetector(engine)
+            detector.set_user_input(text)
+            plagiarism_results, seconds = timed(detector.plagiarism_type)
+            if "plagiarism_type" in stages:
+                latencies["plagiarism_type"].append(seconds)
+            if "evaluate_similarity" in stages:
+                latencies["evaluate_similarity"].append(timed(detector.evaluate_similarity, engine.model, plagiarism_results)[1])
+        if "get_results" in stages:
+            detector = PlagiarismDetector(engine)
+            detector.set_user_input(text)
+            result, seconds = timed(detector.get_results)
+            latencies["get_results"].append(seconds)
+            results.append(result)
+        if "endpoint" in stages:
+            response, seconds = timed(client.post, "/plagarsim", json={"text": text})
+            if response.status_code != 200:
+                raise RuntimeError(f"/plagarsim answered {response.status_code}: {response.get_json()}")
+            latencies["endpoint"].append(seconds)
+    return latencies, results
+
+
+def detection_quality(queries, results):
+    """
+    Compares the results with the plagiarism injected into the queries.
+
+    Parameters:
+    - queries (list of dict): The queries with their kind and source.
+    - results (list of dict): The results of get_results for every query.
+
+    Returns:
+    - dict: The share of the plagiarising queries of every kind whose source was reported, and the share of
+      clean queries with any report.
+    """
+    quality = {}
+    for kind in sorted({query["kind"] for query in queries}):
+        pairs = [(query, result) for query, result in zip(queries, results) if query["kind"] == kind]
+        if kind == "clean":
+            quality["clean_false_positive_rate"] = sum(bool(result) for _, result in pairs) / len(pairs)
+        else:
+            quality[f"{kind}_recall"] = sum(query["source"] in result.get("original_files", {}) for query, result in pairs) / len(pairs)
+    return quality
+
+
+def compare(results, baseline):
+    """
+    Prints how the latencies and throughput of every stage changed since a previous run.
+
+    Parameters:
+    - results (dict): The results of this run.
+    - baseline (dict): The results of the previous run.
+    """
+    print(f"Comparación con {baseline['meta'].get('commit')} ({baseline['meta'].get('date')}):")
+    for stage, stats in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            continue
+        changes = ", ".join(f"{name} {previous[name]:.2f} -> {stats[name]:.2f} ({stats[name] / previous[name] - 1:+.0%})"
+                            for name in ("p50_ms", "p95_ms", "throughput_per_s") if previous[name])
+        print(f"  {stage}: {changes}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = [stage for stage in args.stages.split(",") if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        print(f"Etapas desconocidas: {', '.join(sorted(unknown))}")
+        return 1
+
+    start = time.perf_counter()
+    generator = SyntheticCorpus(list(read_documents(args.seed_directory)), seed=args.seed)
+    if generator.write(args.dataset, args.documents, args.queries, args.plagiarism_rate):
+        print(f"Corpus sintético de {args.documents} documentos generado en {time.perf_counter() - start:.2f} s")
+    queries = read_queries(args.dataset)
+
+    cache_dir = os.path.join(args.dataset, "cache") if args.cache_dir is None else args.cache_dir or None
+    engine = DetectorEngine(cache_dir=cache_dir, directory=os.path.join(args.dataset, "files"))
+    _, warm_up_seconds = timed(engine.warm_up)
+    after_warm_up = peak_rss_mb()
+    corpus = engine.snapshot().corpus
+    print(f"Motor listo con {len(corpus)} documentos en {warm_up_seconds:.2f} s")
+
+    latencies, query_results = run_queries(engine, queries, stages)
+    results = {
+        "meta": {"commit": git_commit(), "date": datetime.datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "platform": platform.platform(), "parameters": vars(args)},
+        "corpus": {"documents": len(corpus), "sentences": sum(len(sentences) for sentences in corpus.sentences), "queries": len(queries)},
+        "warm_up_seconds": warm_up_seconds,
+        "stages": {stage: summarize(latencies[stage]) for stage in stages if latencies[stage]},
+        "memory": {"after_warm_up_mb": after_warm_up, "peak_mb": peak_rss_mb()},
+    }
+    if query_results is not None and queries:
+        results["detection"] = detection_quality(queries, query_results)
+
+    output = args.output or os.path.join("benchmark_results", f"detection-{results['meta']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+    for stage, stats in results["stages"].items():
+        print(f"{stage}: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, {stats['throughput_per_s']:.1f}/s")
+    peak = results["memory"]["peak_mb"]
+    print(f"Memoria máxima: {peak:.1f} MB" if peak is not None else "Memoria máxima: no disponible")
+    if "detection" in results:
+        print("Detección: " + ", ".join(f"{name} {value:.0%}" for name, value in results["detection"].items()))
+    print(f"Resultados guardados en {output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            compare(results, json.load(file))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+import spacy
+from app.model.lemmaTable import LemmaTable
+from app.model.preprocessor import Preprocessor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compares the Spacy and the lemma table preprocessing of the corpus documents.")
+    parser.add_argument("--directory", default="dataset/files", help="Directory of the documents.")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of the documents left out of the lemma table, as unseen queries.")
+    parser.add_argument("--limit", type=int, help="Maximum number of documents to read.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    return parser.parse_args(argv)
+
+
+def timed(preprocessor, texts, fast):
+    start = time.perf_counter()
+    token_lists = [preprocessor.preprocess_text(text, fast=fast)[1] for text in texts]
+    return token_lists, time.perf_counter() - start
+
+
+def agreement(expected, actual):
+    """
+    Measures how many tokens two preprocessings of the same texts share.
+
+    Parameters:
+    - expected (list of list of str): The Spacy tokens of every text.
+    - actual (list of list of str): The lemma table tokens of every text.
+
+    Returns:
+    - tuple: The fraction of shared tokens and the fraction of texts with exactly the same tokens.
+    """
+    shared = sum(sum((Counter(a) & Counter(b)).values()) for a, b in zip(expected, actual))
+    total = sum(max(len(a), len(b)) for a, b in zip(expected, actual))
+    identical = sum(a == b for a, b in zip(expected, actual))
+    return shared / total if total else 1.0, identical / len(expected) if expected else 1.0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    preprocessor = Preprocessor(nlp=spacy.load('en_core_web_sm'), lemmatizer="table")
+    preprocessor.directory = args.directory
+    texts = [text for _, text in preprocessor.load_files()][:args.limit]
+    if not texts:
+        print(f"No hay documentos en {args.directory}")
+        return 1
+
+    split = len(texts) - int(len(texts) * args.holdout)
+    start = time.perf_counter()
+    table = LemmaTable()
+    table.update(preprocessor, {word for text in texts[:split] for word in preprocessor.fast_tokenize(text)})
+    build_seconds = time.perf_counter() - start
+    preprocessor.lemma_table = table
+
+    results = {"documents": len(texts), "table_words": len(table), "table_seconds": build_seconds}
+    for name, subset in (("seen", texts[:split]), ("unseen", texts[split:])):
+        if not subset:
+            continue
+        expected, spacy_seconds = timed(preprocessor, subset, fast=False)
+        actual, table_seconds = timed(preprocessor, subset, fast=True)
+        tokens, documents = agreement(expected, actual)
+        results[name] = {
+            "documents": len(subset),
+            "token_agreement": tokens,
+            "identical_documents": documents,
+            "spacy_docs_per_second": len(subset) / spacy_seconds,
+            "table_docs_per_second": len(subset) / table_seconds,
+            "speedup": spacy_seconds / table_seconds,
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"Tabla de lemas: {len(table)} palabras en {build_seconds:.2f} s")
+    for name, label in (("seen", "Documentos de la tabla"), ("unseen", "Documentos nuevos")):
+        if name in results:
+            result = results[name]
+            print(f"{label}: {result['documents']} documentos, {result['token_agreement']:.2%} de tokens iguales, "
+                  f"{result['identical_documents']:.2%} documentos idénticos, {result['spacy_docs_per_second']:.1f} -> "
+                  f"{result['table_docs_per_second']:.1f} documentos/s ({result['speedup']:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in a fresh interpreter and prints the time.time() of every startup milestone
+CHILD = """
+import json, sys, time
+stamps = {}
+from app import app
+import app.routes as routes
+stamps["import_app"] = time.time()
+client = app.test_client()
+client.get("/ready")
+stamps["first_response"] = time.time()
+while client.get("/ready").status_code != 200:
+    if routes.engine.error is not None:
+        raise routes.engine.error
+    time.sleep(0.01)
+stamps["ready"] = time.time()
+response = client.post("/plagarsim", json={"text": sys.argv[1]})
+if response.status_code != 200:
+    raise RuntimeError(response.get_json())
+stamps["first_check"] = time.time()
+print(json.dumps(stamps))
+"""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measures how long a new instance of the service takes to import, answer and serve its first check.")
+    parser.add_argument("--runs", type=int, default=3, help="Number of fresh processes measured.")
+    parser.add_argument("--text", default="The quick brown fox jumps over the lazy dog.", help="Text of the first plagiarism check.")
+    parser.add_argument("--preload", action="store_true", help="Runs run.py --preload first, so the caches are warm.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    return parser.parse_args(argv)
+
+
+def measure(text):
+    """
+    Starts the service in a new interpreter and times its startup milestones.
+
+    Parameters:
+    - text (str): The text of the first plagiarism check.
+
+    Returns:
+    - dict: The seconds from the launch of the process to importing app, the first response, the engine being
+      ready and the first check.
+    """
+    start = time.time()
+    output = subprocess.run([sys.executable, "-c", CHILD, text], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+    stamps = json.loads(output.strip().splitlines()[-1])
+    return {name: stamp - start for name, stamp in stamps.items()}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.preload:
+        subprocess.run([sys.executable, "run.py", "--preload"], cwd=BACKEND_DIR, check=True)
+
+    runs = [measure(args.text) for _ in range(args.runs)]
+    results = {"runs": runs, "median": {name: statistics.median(run[name] for run in runs) for name in runs[0]}}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    labels = {"import_app": "import app", "first_response": "Primera respuesta", "ready": "Motor listo", "first_check": "Primera consulta"}
+    for name, label in labels.items():
+        print(f"{label}: {results['median'][name]:.2f} s (mediana de {len(runs)}, de {min(run[name] for run in runs):.2f} a {max(run[name] for run in runs):.2f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import argparse
+import sys
+import time
+from app.model.documentSource import read_documents
+from app.model.syntheticCorpus import SyntheticCorpus
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generates a synthetic corpus like dataset/files, with queries that plagiarise it.")
+    parser.add_argument("--output", default="dataset/synthetic", help="Output directory: files/, queries.jsonl and manifest.json.")
+    parser.add_argument("--seed-directory", default="dataset/files", help="Directory of the documents the corpus is generated from.")
+    parser.add_argument("--documents", type=int, default=1000, help="Number of documents, seed documents included.")
+    parser.add_argument("--queries", type=int, default=100, help="Number of queries.")
+    parser.add_argument("--plagiarism-rate", type=float, default=0.5, help="Share of the queries that plagiarise a document.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the corpus and the queries.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    generator = SyntheticCorpus(list(read_documents(args.seed_directory)), seed=args.seed)
+    if not generator.write(args.output, args.documents, args.queries, args.plagiarism_rate):
+        print(f"El corpus {args.output} ya está generado")
+        return 0
+    print(f"Corpus de {args.documents} documentos y {args.queries} consultas generado en {args.output} ({time.perf_counter() - start:.2f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,49 @@
+import argparse
+import sys
+import time
 from app import app
+from app.model.detectorEngine import DetectorEngine
+from app.model.resources import preload_modules, require_nltk_data
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Runs the plagiarism detection service.")
+    parser.add_argument("--preload", action="store_true",
+                        help="Imports the libraries, warms the engine and saves its caches, then exits without serving.")
+    parser.add_argument("--background", action="store_true",
+                        help="Serves immediately and warms the engine in the background; /ready answers 503 until it is done.")
+    return parser.parse_args(argv)
+
+
+def preload():
+    start = time.perf_counter()
+    try:
+        require_nltk_data()
+    except LookupError as e:
+        print(f"Faltan recursos locales: {e}")
+        return 1
+    modules = preload_modules()
+    print(f"{len(modules)} módulos importados en {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    engine = DetectorEngine.get_instance().warm_up()
+    print(f"Motor listo con {len(engine.snapshot().corpus)} documentos en {time.perf_counter() - start:.2f} s")
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.preload:
+        return preload()
+
+    if args.background:
+        DetectorEngine.get_instance().start()
+    else:
+        # Warm the corpus before accepting traffic
+        DetectorEngine.get_instance().warm_up()
+    app.run()
+    return 0
+
 
 if __name__ == "__main__":
-    app.run() 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+from app.model.batchDetector import BatchDetector
+from app.model.detectorEngine import DetectorEngine
+from app.model.plagarsimDetector import PlagiarismDetector
+
+class TestBatchDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.batch_detector = BatchDetector(batch_size=2)
+        with open("dataset/files/org-022.txt", "r", encoding="utf-8") as file:
+            original = file.read()
+        self.texts = [
+            original,
+            "Hello world.",
+            " ".join(reversed(original.split(". "))),
+            "",
+            original[:300],
+        ]
+
+    def test_results_match_single_detector(self):
+        expected = []
+        for text in self.texts:
+            detector = PlagiarismDetector(self.batch_detector.engine)
+            detector.set_user_input(text)
+            expected.append(detector.get_results())
+        results = list(self.batch_detector.detect(enumerate(self.texts)))
+        self.assertEqual([document_id for document_id, _ in results], list(range(len(self.texts))))
+        self.assertEqual([result for _, result in results], expected)
+
+    def test_empty_input(self):
+        self.assertEqual(list(self.batch_detector.detect([])), [])
+
+    def test_paraphrases_match_single_detector(self):
+        directory = tempfile.mkdtemp()
+        try:
+            corpus = ["The old dog eats fresh meat every single day in the garden. The house is big.",
+                      "Rivers flow quickly into the cold sea during the long winter."]
+            for number, text in enumerate(corpus):
+                with open(os.path.join(directory, f"d{number}.txt"), "w", encoding="utf-8") as file:
+                    file.write(text)
+            engine = DetectorEngine(cache_dir=None, directory=directory, sentence_weighting="mean", paraphrase_threshold=0.8).warm_up()
+            texts = ["Every single day in the garden the old dog eats fresh meat.",
+                     "During the long winter the rivers flow quickly into the cold sea.",
+                     "Nothing here."]
+            expected = []
+            for text in texts:
+                detector = PlagiarismDetector(engine)
+                detector.set_user_input(text)
+                expected.append(detector.get_results())
+            self.assertIn("d0.txt", expected[0]["original_files"])
+            results = list(BatchDetector(engine, batch_size=2).detect(enumerate(texts)))
+            self.assertEqual([result for _, result in results], expected)
+        finally:
+            shutil.rmtree(directory)
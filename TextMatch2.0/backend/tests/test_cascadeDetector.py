@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+from app.model.cascadeDetector import CascadeDetector
+from app.model.detectorEngine import DetectorEngine
+from app.model.plagarsimDetector import PlagiarismDetector
+
+class TestCascadeDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.cascade = CascadeDetector()
+        with open("dataset/files/org-022.txt", "r", encoding="utf-8") as file:
+            self.original = file.read()
+
+    def test_copied_text_runs_every_stage(self):
+        results, report = self.cascade.detect(self.original)
+        self.assertIn("org-022.txt", results["original_files"])
+        self.assertIn("plagiarism_type", results)
+        self.assertIsNone(report["exit_stage"])
+        self.assertEqual([stage["stage"] for stage in report["stages"]], ["fingerprint", "document_score", "sentence_alignment", "classification"])
+
+    def test_original_text_exits_early(self):
+        results, report = self.cascade.detect("Zebras juggle quantum marmalade.")
+        self.assertEqual(results, {})
+        self.assertEqual(report["exit_stage"], "fingerprint")
+        self.assertEqual(len(report["stages"]), 1)
+        self.assertEqual(report["stages"][0]["survivors"], 0)
+
+    def test_reports_the_same_files_as_the_full_check(self):
+        text = self.original[:300]
+        detector = PlagiarismDetector(self.cascade.engine)
+        detector.set_user_input(text)
+        expected = detector.get_results()
+        results, _ = self.cascade.detect(text)
+        # The cascade only prunes documents, it never reports one the full check does not
+        self.assertLessEqual(set(results["original_files"]), set(expected["original_files"]))
+        self.assertIn("org-022.txt", results["original_files"])
+
+    def test_paraphrases_match_the_full_check(self):
+        directory = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(directory, "d0.txt"), "w", encoding="utf-8") as file:
+                file.write("The old dog eats fresh meat every single day in the garden. The house is big.")
+            engine = DetectorEngine(cache_dir=None, directory=directory, sentence_weighting="mean", paraphrase_threshold=0.8).warm_up()
+            text = "Every single day in the garden the old dog eats fresh meat."
+            detector = PlagiarismDetector(engine)
+            detector.set_user_input(text)
+            expected = detector.get_results()
+            self.assertIn("plagiarism_type", expected)
+            results, report = CascadeDetector(engine).detect(text)
+            self.assertEqual(results, expected)
+            self.assertIsNone(report["exit_stage"])
+        finally:
+            shutil.rmtree(directory)
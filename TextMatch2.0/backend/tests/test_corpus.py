@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from app.model.corpus import Corpus
+from app.model.parseCache import SentenceSignature
+
+class TestCorpus(unittest.TestCase):
+    def setUp(self):
+        self.corpus = Corpus(
+            ["First text. Second sentence.", "Another text."],
+            ["a.txt", "b.txt"],
+            ["first text second sentence", "another text"],
+            [["first", "text", "second", "sentence"], ["another", "text"]],
+            [["First text.", "Second sentence."], ["Another text."]],
+        )
+
+    def test_length(self):
+        self.assertEqual(len(self.corpus), 2)
+
+    def test_data_is_stored_in_tuples(self):
+        self.assertIsInstance(self.corpus.filenames, tuple)
+        self.assertIsInstance(self.corpus.token_lists[0], tuple)
+        self.assertIsInstance(self.corpus.sentences[0], tuple)
+
+    def test_version_is_stable(self):
+        other = Corpus(self.corpus.original_texts, self.corpus.filenames, self.corpus.preprocessed_texts, self.corpus.token_lists, self.corpus.sentences)
+        self.assertEqual(self.corpus.version, other.version)
+
+    def test_version_changes_with_content(self):
+        other = Corpus(["First text. Changed.", "Another text."], self.corpus.filenames, self.corpus.preprocessed_texts, self.corpus.token_lists, self.corpus.sentences)
+        self.assertNotEqual(self.corpus.version, other.version)
+
+    def test_upsert_appends_new_document(self):
+        entry = {"preprocessed_text": "new text", "tokens": ["new", "text"], "sentences": ["New text."], "signatures": [((), ())]}
+        corpus, index = self.corpus.upsert("c.txt", "New text.", entry)
+        self.assertEqual(index, 2)
+        self.assertEqual(corpus.filenames, ("a.txt", "b.txt", "c.txt"))
+        self.assertEqual(corpus.sentences[2], ("New text.",))
+        self.assertEqual(len(self.corpus), 2)
+
+    def test_upsert_replaces_existing_document(self):
+        entry = {"preprocessed_text": "changed", "tokens": ["changed"], "sentences": ["Changed."], "signatures": [((), ())]}
+        corpus, index = self.corpus.upsert("a.txt", "Changed.", entry)
+        self.assertEqual(index, 0)
+        self.assertEqual(corpus.filenames, self.corpus.filenames)
+        self.assertEqual(corpus.token_lists[0], ("changed",))
+        self.assertNotEqual(corpus.version, self.corpus.version)
+
+    def test_delete(self):
+        corpus, index = self.corpus.delete("a.txt")
+        self.assertEqual(index, 0)
+        self.assertEqual(corpus.filenames, ("b.txt",))
+        self.assertEqual(corpus.document_keys, self.corpus.document_keys[1:])
+        self.assertEqual(self.corpus.delete("missing.txt"), (None, None))
+
+    def test_share_memory_maps_the_corpus(self):
+        corpus = Corpus(
+            self.corpus.original_texts, self.corpus.filenames, self.corpus.preprocessed_texts, self.corpus.token_lists, self.corpus.sentences,
+            [[(("VBD",), ("PRP",)), ((), ())], [(("VBZ", "VBN"), ())]],
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            shared = corpus.share(directory)
+            self.assertTrue(os.path.exists(Corpus.shared_path(directory, corpus.version)))
+            self.assertEqual(shared.version, corpus.version)
+            self.assertEqual(list(shared.original_texts), list(corpus.original_texts))
+            self.assertEqual(list(shared.token_lists), list(corpus.token_lists))
+            self.assertEqual(list(shared.sentences), list(corpus.sentences))
+            self.assertEqual(shared.signatures[1][0], SentenceSignature(("VBZ", "VBN"), ()))
+            entry = {"preprocessed_text": "new text", "tokens": ["new", "text"], "sentences": ["New text."], "signatures": [((), ())]}
+            updated, index = shared.upsert("a.txt", "New text.", entry)
+            self.assertEqual((index, updated.sentences[0], updated.sentences[1]), (0, ("New text.",), ("Another text.",)))
+            deleted, _ = shared.delete("a.txt")
+            self.assertEqual(deleted.filenames, ("b.txt",))
@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from app.model.corpusCache import CorpusCache
+
+class TestCorpusCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config = {"spacy_model": "test-1.0", "stopwords": "abc"}
+        self.cache = CorpusCache(self.directory, self.config)
+        self.key = CorpusCache.content_hash("Some text. Another one.")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_entries_survive_reload(self):
+        self.cache.put(self.key, "text another", ["text", "another"], ["Some text.", "Another one."], [((), ()), (("VBD",), ("PRP",))])
+        self.cache.save()
+        entry = CorpusCache(self.directory, self.config).get(self.key)
+        self.assertEqual(entry["tokens"], ["text", "another"])
+        self.assertEqual(entry["sentences"], ["Some text.", "Another one."])
+        self.assertEqual(entry["signatures"], [[[], []], [["VBD"], ["PRP"]]])
+
+    def test_config_change_invalidates_entries(self):
+        self.cache.put(self.key, "text another", ["text", "another"], ["Some text.", "Another one."], [((), ()), (("VBD",), ("PRP",))])
+        self.cache.save()
+        other = CorpusCache(self.directory, {"spacy_model": "test-2.0", "stopwords": "abc"})
+        self.assertIsNone(other.get(self.key))
+
+    def test_prune_removes_stale_entries(self):
+        self.cache.put(self.key, "text", ["text"], ["Some text."], [((), ())])
+        self.cache.prune([])
+        self.assertIsNone(self.cache.get(self.key))
+
+    def test_save_without_changes_writes_nothing(self):
+        self.cache.save()
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "manifest.json")))
+
+    def test_vectors_round_trip(self):
+        vectors = np.arange(6, dtype=np.float32).reshape(2, 3)
+        self.cache.save_vectors("model", ["a", "b"], vectors)
+        loaded = self.cache.load_vectors("model", ["b", "a"])
+        self.assertTrue(np.array_equal(loaded, vectors[[1, 0]]))
+        self.assertIsNone(self.cache.load_vectors("model", ["a", "c"]))
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from app.model.corpusJournal import CorpusJournal
+
+class TestCorpusJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.journal = CorpusJournal(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_reset_keeps_previous_base(self):
+        self.assertIsNone(self.journal.read())
+        self.assertIsNone(self.journal.stamp())
+        self.journal.reset("v1")
+        self.journal.append_delete("a.txt", "v2")
+        pointer = self.journal.reset("v2")
+        self.assertEqual(pointer, {"base": "v2", "previous": "v1", "version": "v2", "changes": []})
+        self.assertEqual(self.journal.reset("v2")["previous"], "v1")
+        self.assertEqual(self.journal.read(), pointer)
+
+    def test_changes_round_trip(self):
+        self.journal.reset("v1")
+        stamp = self.journal.stamp()
+        entry = {"tokens": ["dog", "eat"], "sentences": ["The dog eats."], "signatures": [(("eat",), ("it",))], "preprocessed_text": "dog eat"}
+        with self.journal.lock():
+            self.journal.append_upsert("a.txt", "The dog eats.", entry, np.ones(3), np.zeros((1, 3)), "v2")
+            pointer = self.journal.append_delete("b.txt", "v3")
+        self.assertNotEqual(self.journal.stamp(), stamp)
+        self.assertEqual(pointer["version"], "v3")
+        self.assertEqual([change["operation"] for change in pointer["changes"]], ["upsert", "delete"])
+
+        text, document, vector, sentence_vectors = self.journal.load_payload(pointer["changes"][0])
+        self.assertEqual(text, "The dog eats.")
+        self.assertEqual(document, entry)
+        self.assertTrue(np.array_equal(vector, np.ones(3)))
+        self.assertTrue(np.array_equal(sentence_vectors, np.zeros((1, 3))))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, pointer["changes"][0]["payload"])))
+
+    def test_payload_without_sentence_vectors(self):
+        self.journal.reset("v1")
+        entry = {"tokens": [], "sentences": [], "signatures": [], "preprocessed_text": ""}
+        pointer = self.journal.append_upsert("a.txt", "", entry, np.zeros(3), None, "v2")
+        self.assertIsNone(self.journal.load_payload(pointer["changes"][0])[3])
+
+    def test_payloads_are_never_overwritten(self):
+        self.journal.reset("v1")
+        entry = {"tokens": ["dog"], "sentences": ["Dog."], "signatures": [((), ())], "preprocessed_text": "dog"}
+        first = self.journal.append_upsert("a.txt", "Dog.", entry, np.ones(3), None, "v2")["changes"][0]
+        self.journal.append_delete("a.txt", "v1")
+        # A refit back to the same version starts the list of changes again
+        self.journal.reset("v1")
+        second = self.journal.append_upsert("b.txt", "Cat.", dict(entry, tokens=["cat"]), np.zeros(3), None, "v3")["changes"][0]
+        self.assertNotEqual(first["payload"], second["payload"])
+        self.assertEqual(self.journal.load_payload(first)[0], "Dog.")
+        self.assertEqual(self.journal.load_payload(second)[0], "Cat.")
@@ -0,0 +1,121 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from app.model.corpus import Corpus
+from app.model.detectorEngine import DetectorEngine
+from app.model.documentSource import ReadOnlyDocumentError
+
+TEXTS = [
+    "The dog eats meat every day. The house is big and old.",
+    "A cat sleeps on the warm sofa. Nobody wakes it up.",
+    "Rivers flow into the sea. The water is cold in winter.",
+    "Students read many books at school. They write essays too.",
+]
+
+class TestDetectorEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.corpus_dir = os.path.join(self.directory, "corpus")
+        os.makedirs(self.corpus_dir)
+        for number, text in enumerate(TEXTS):
+            with open(os.path.join(self.corpus_dir, f"d{number}.txt"), "w", encoding="utf-8") as file:
+                file.write(text)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def engine(self, cache="cache"):
+        return DetectorEngine(cache_dir=os.path.join(self.directory, cache), directory=self.corpus_dir, index_type="ivf", candidate_count=2,
+                              prefilter_threshold=0.3, sentence_weighting="mean").warm_up()
+
+    def test_from_environment(self):
+        engine = DetectorEngine.from_environment({
+            "TEXTMATCH_INDEX_TYPE": "ivf",
+            "TEXTMATCH_INDEX_PARAMS": '{"n_probe": 4}',
+            "TEXTMATCH_CANDIDATE_COUNT": "20",
+            "TEXTMATCH_PREFILTER_THRESHOLD": "0.2",
+            "TEXTMATCH_SENTENCE_WEIGHTING": "sif",
+            "TEXTMATCH_LEMMATIZER": "table",
+            "TEXTMATCH_CACHE_DIR": "none",
+            "TEXTMATCH_FINGERPRINT_SIZE": "",
+            "TEXTMATCH_REFIT_INTERVAL": "300",
+        })
+        self.assertEqual((engine.index_type, engine.index_params, engine.candidate_count), ("ivf", {"n_probe": 4}, 20))
+        self.assertEqual((engine.prefilter_threshold, engine.sentence_weighting, engine.lemmatizer), (0.2, "sif", "table"))
+        self.assertIsNone(engine.cache_dir)
+        self.assertEqual(engine.fingerprint_size, 3)
+        self.assertEqual(engine.refit_interval, 300.0)
+
+    def test_from_environment_defaults_and_errors(self):
+        engine = DetectorEngine.from_environment({})
+        self.assertEqual((engine.index_type, engine.candidate_count, engine.sentence_weighting), ("flat", None, None))
+        with self.assertRaisesRegex(ValueError, "TEXTMATCH_CANDIDATE_COUNT"):
+            DetectorEngine.from_environment({"TEXTMATCH_CANDIDATE_COUNT": "many"})
+
+    def test_updates_and_refit_match_fresh_build(self):
+        engine = self.engine()
+        self.assertTrue(engine.upsert_document("nested/new.txt", "Birds sing in the morning. The sky is blue."))
+        self.assertFalse(engine.upsert_document("d0.txt", "The dog eats meat every night. The house is small."))
+        self.assertTrue(engine.delete_document("d1.txt"))
+        self.assertFalse(engine.delete_document("d1.txt"))
+        self.assertEqual(engine.pending_changes, 3)
+        self.assertTrue(os.path.exists(os.path.join(self.corpus_dir, "nested", "new.txt")))
+        self.assertFalse(os.path.exists(os.path.join(self.corpus_dir, "d1.txt")))
+        engine.refit()
+        self.assertEqual(engine.pending_changes, 0)
+
+        updated, fresh = engine.snapshot(), self.engine("fresh").snapshot()
+        self.assertEqual(updated.corpus.version, fresh.corpus.version)
+        self.assertEqual(list(updated.corpus.filenames), list(fresh.corpus.filenames))
+        self.assertEqual(list(updated.corpus.original_texts), list(fresh.corpus.original_texts))
+        self.assertEqual(list(updated.corpus.sentences), list(fresh.corpus.sentences))
+        self.assertTrue(np.allclose(updated.document_vectors.matrix, fresh.document_vectors.matrix))
+        self.assertTrue(np.allclose(updated.sentence_vectors.matrix, fresh.sentence_vectors.matrix))
+        for row in range(len(fresh.corpus)):
+            vector = fresh.document_vectors.matrix[row]
+            self.assertEqual(engine.candidate_documents(vector, engine.model, updated).tolist(),
+                             engine.candidate_documents(vector, engine.model, fresh).tolist())
+
+    def test_invalid_and_read_only_documents(self):
+        engine = self.engine()
+        for filename in ("../outside.txt", "notes.md", ".hidden/a.txt"):
+            with self.assertRaises(ValueError):
+                engine.upsert_document(filename, "Some text.")
+        dump = os.path.join(self.directory, "dump.jsonl")
+        with open(dump, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"id": 1, "text": TEXTS[0]}) + "\n")
+        engine = DetectorEngine(cache_dir=None, directory=dump).warm_up()
+        with self.assertRaises(ReadOnlyDocumentError):
+            engine.upsert_document("dump.jsonl/2", "Some text.")
+        with self.assertRaises(ReadOnlyDocumentError):
+            engine.delete_document("dump.jsonl/1")
+
+    def test_workers_follow_published_changes(self):
+        writer, reader = self.engine(), self.engine()
+        self.assertFalse(reader.sync())
+        writer.upsert_document("new.txt", "Birds sing in the morning. The sky is blue.")
+        writer.delete_document("d2.txt")
+        self.assertTrue(reader.sync())
+        self.assertEqual(reader.snapshot().corpus.version, writer.snapshot().corpus.version)
+        self.assertTrue(np.allclose(reader.snapshot().document_vectors.matrix, writer.snapshot().document_vectors.matrix))
+
+        reader.upsert_document("d3.txt", "Students read few books at home.")
+        writer.refit()
+        self.assertEqual(writer.snapshot().corpus.filenames, reader.snapshot().corpus.filenames)
+        self.assertFalse(reader.sync())
+        self.assertEqual(reader.pending_changes, 0)
+
+        writer.delete_document("new.txt")
+        writer.refit()
+        self.assertTrue(reader.sync())
+        self.assertEqual(reader.snapshot().corpus.version, writer.snapshot().corpus.version)
+        # Only the current and the previous refit are kept
+        pointer = writer.journal.read()
+        shared = sorted(name for name in os.listdir(writer._shared_dir()) if name.startswith("corpus-"))
+        self.assertEqual(shared, sorted(os.path.basename(Corpus.shared_path(writer._shared_dir(), version))
+                                        for version in (pointer["base"], pointer["previous"])))
+        self.assertEqual(len(os.listdir(writer._store_dir())), 2)
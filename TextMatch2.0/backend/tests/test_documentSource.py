@@ -0,0 +1,66 @@
+import io
+import os
+import json
+import tarfile
+import zipfile
+import tempfile
+import unittest
+from app.model.documentSource import ReadOnlyDocumentError, batched, document_path, read_documents
+
+class TestDocumentSource(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def test_reads_directories_recursively(self):
+        self.write("b.txt", "Second.")
+        self.write("a.txt", "First.")
+        self.write("nested/c.txt", "Third.")
+        self.write("notes.md", "Ignored.")
+        self.assertEqual(list(read_documents(self.root)), [("a.txt", "First."), ("b.txt", "Second."), ("nested/c.txt", "Third.")])
+
+    def test_reads_archives(self):
+        with tarfile.open(os.path.join(self.root, "texts.tar.gz"), "w:gz") as archive:
+            data = "Compressed text.".encode("utf-8")
+            member = tarfile.TarInfo("docs/a.txt")
+            member.size = len(data)
+            archive.addfile(member, io.BytesIO(data))
+        with zipfile.ZipFile(os.path.join(self.root, "texts.zip"), "w") as archive:
+            archive.writestr("b.txt", "Zipped text.")
+            archive.writestr("image.png", "Ignored.")
+        self.assertEqual(list(read_documents(self.root)), [("texts.tar.gz/docs/a.txt", "Compressed text."), ("texts.zip/b.txt", "Zipped text.")])
+
+    def test_reads_jsonl(self):
+        records = [{"id": 7, "text": "First."}, {"filename": "b.txt", "text": "Second."}, {"text": "Third."}]
+        self.write("dump.jsonl", "\n".join(json.dumps(record) for record in records) + "\n\n")
+        self.assertEqual(list(read_documents(os.path.join(self.root, "dump.jsonl"))), [("dump.jsonl/7", "First."), ("dump.jsonl/b.txt", "Second."), ("dump.jsonl/3", "Third.")])
+
+    def test_rejects_jsonl_without_text(self):
+        self.write("dump.jsonl", json.dumps({"id": 1}))
+        with self.assertRaises(ValueError):
+            list(read_documents(self.root))
+
+    def test_document_path(self):
+        self.write("dump.jsonl", json.dumps({"id": 42, "text": "Dumped."}) + "\n")
+        self.assertEqual(document_path(self.root, "nested/a.txt"), os.path.join(self.root, "nested", "a.txt"))
+        for name in ("../a.txt", "/a.txt", "nested//a.txt", ".hidden.txt", "a.md"):
+            with self.assertRaises(ValueError):
+                document_path(self.root, name)
+        with self.assertRaises(ReadOnlyDocumentError):
+            document_path(self.root, "dump.jsonl/42")
+        with self.assertRaises(ReadOnlyDocumentError):
+            document_path(os.path.join(self.root, "dump.jsonl"), "a.txt")
+
+    def test_batched(self):
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(batched([], 2)), [])
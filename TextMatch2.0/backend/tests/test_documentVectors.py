@@ -0,0 +1,49 @@
+import tempfile
+import unittest
+import numpy as np
+from app.model.documentVectors import DocumentVectors
+
+class TestDocumentVectors(unittest.TestCase):
+    def setUp(self):
+        vectors = np.array([[1.0, 0.0], [0.0, 2.0], [1.0, 1.0], [0.0, 0.0]], dtype=np.float32)
+        self.document_vectors = DocumentVectors(vectors, "model", "corpus")
+
+    def test_rows_are_normalized(self):
+        norms = np.linalg.norm(self.document_vectors.matrix, axis=1)
+        self.assertTrue(np.allclose(norms, [1.0, 1.0, 1.0, 0.0]))
+
+    def test_similarities(self):
+        scores = self.document_vectors.similarities(np.array([3.0, 0.0]))
+        self.assertTrue(np.allclose(scores, [1.0, 0.0, np.sqrt(0.5), 0.0]))
+
+    def test_above_threshold(self):
+        indices, similarities = self.document_vectors.above_threshold(np.array([1.0, 0.2]), 0.7)
+        self.assertEqual(indices.tolist(), [0, 2])
+        self.assertTrue(np.all(similarities > 0.7))
+
+    def test_top_k(self):
+        indices, similarities = self.document_vectors.top_k(np.array([0.1, 1.0]), 2)
+        self.assertEqual(indices.tolist(), [1, 2])
+        self.assertGreaterEqual(similarities[0], similarities[1])
+
+    def test_zero_query_has_no_matches(self):
+        indices, _ = self.document_vectors.above_threshold(np.zeros(2), 0.7)
+        self.assertEqual(len(indices), 0)
+
+    def test_upsert_and_delete_match_rebuild(self):
+        updated = self.document_vectors.upsert(4, np.array([2.0, 2.0]), "v2").upsert(0, np.array([0.0, 3.0]), "v3").delete(1, "v4")
+        expected = DocumentVectors(np.array([[0.0, 3.0], [1.0, 1.0], [0.0, 0.0], [2.0, 2.0]]), "model", "v4")
+        self.assertTrue(np.allclose(updated.vectors, expected.vectors))
+        self.assertTrue(np.allclose(updated.matrix, expected.matrix))
+        self.assertEqual(updated.corpus_version, "v4")
+        self.assertEqual(len(self.document_vectors), 4)
+
+    def test_share_memory_maps_the_vectors(self):
+        with tempfile.TemporaryDirectory() as directory:
+            shared = self.document_vectors.share(directory)
+            self.assertIsInstance(shared.matrix, np.memmap)
+            self.assertEqual((shared.model_key, shared.corpus_version), ("model", "corpus"))
+            self.assertTrue(np.array_equal(shared.matrix, self.document_vectors.matrix))
+            indices, _ = shared.top_k(np.array([0.1, 1.0]), 2)
+            self.assertEqual(indices.tolist(), [1, 2])
+            self.assertEqual(len(shared.upsert(4, np.array([1.0, 0.0]), "changed")), 5)
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from app.model.corpus import Corpus
+from app.model.fingerprintIndex import FingerprintIndex
+
+class TestFingerprintIndex(unittest.TestCase):
+    def setUp(self):
+        self.corpus = Corpus(
+            ["The cat sat on the mat today.", "Stock markets fell sharply on monday.", "The cat sat on the sofa."],
+            ["a.txt", "b.txt", "c.txt"],
+            ["", "", ""],
+            [[], [], []],
+            [[], [], []],
+        )
+        self.index = FingerprintIndex(ngram_size=3, window=1).build(self.corpus)
+
+    def test_shared_counts(self):
+        counts = self.index.shared_counts("yesterday the cat sat on the mat")
+        np.testing.assert_array_equal(counts, [4, 0, 3])
+
+    def test_unrelated_text_shares_nothing(self):
+        np.testing.assert_array_equal(self.index.shared_counts("completely different words here"), [0, 0, 0])
+        np.testing.assert_array_equal(self.index.shared_counts(""), [0, 0, 0])
+
+    def test_upsert_and_delete(self):
+        updated = self.index.upsert(1, "the cat sat on the mat today.")
+        np.testing.assert_array_equal(updated.shared_counts("the cat sat on the mat today."), [5, 5, 3])
+        np.testing.assert_array_equal(self.index.shared_counts("the cat sat on the mat today."), [5, 0, 3])
+
+        added = self.index.upsert(3, "stock markets fell")
+        np.testing.assert_array_equal(added.shared_counts("stock markets fell"), [0, 1, 0, 1])
+
+        deleted = self.index.delete(0)
+        np.testing.assert_array_equal(deleted.shared_counts("the cat sat on the sofa."), [0, 4])
+
+    def test_empty_corpus(self):
+        index = FingerprintIndex(ngram_size=3, window=1).build(Corpus([], [], [], [], []))
+        self.assertEqual(len(index.shared_counts("the cat sat on the mat")), 0)
+        np.testing.assert_array_equal(index.upsert(0, "the cat sat").shared_counts("the cat sat"), [1])
+
+    def test_winnowing_keeps_one_fingerprint_per_window(self):
+        index = FingerprintIndex(ngram_size=3, window=4)
+        text = " ".join(f"w{i}" for i in range(200))
+        positions = index.fingerprints(text).positions
+        self.assertLess(len(positions), 198)
+        self.assertTrue(np.all(np.diff(positions) <= 4))
+
+    def test_spans_have_character_offsets(self):
+        document = "Intro words here. " + " ".join(f"word{i}" for i in range(40)) + " and the end."
+        copied = " ".join(f"word{i}" for i in range(5, 30))
+        query = "Some new opening, then " + copied + " and a new ending."
+        corpus = Corpus([document, "Nothing in common at all."], ["a.txt", "b.txt"], ["", ""], [[], []], [[], []])
+        index = FingerprintIndex(ngram_size=3, window=4).build(corpus)
+        spans = index.spans(query)
+        self.assertEqual(list(spans), [0])
+        self.assertEqual(len(spans[0]), 1)
+        start, end, document_start, document_end = spans[0][0]
+        self.assertEqual(query[start:end], document[document_start:document_end])
+        self.assertIn(query[start:end], copied)
+        self.assertGreater(end - start, len(copied) // 2)
+
+    def test_save_and_load_memory_mapped(self):
+        index = FingerprintIndex(ngram_size=3, window=2).build(self.corpus)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "fingerprints")
+            index.save(path)
+            loaded = FingerprintIndex.load(path)
+            self.assertIsInstance(loaded.hashes, np.memmap)
+            self.assertEqual((loaded.ngram_size, loaded.window, loaded.n_documents), (3, 2, 3))
+            np.testing.assert_array_equal(loaded.shared_counts("the cat sat on the mat"), index.shared_counts("the cat sat on the mat"))
+            self.assertEqual(loaded.spans("the cat sat on the mat"), index.spans("the cat sat on the mat"))
+            np.testing.assert_array_equal(loaded.delete(0).shared_counts("the cat sat on the sofa"), index.delete(0).shared_counts("the cat sat on the sofa"))
@@ -0,0 +1,76 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from app.model.jobQueue import JobQueue, MemoryJobStore, QueueFullError, SQLiteJobStore
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = JobQueue(max_workers=1, max_pending=2, executor="thread")
+        self.release = threading.Event()
+        # Keep the only worker busy so submitted jobs stay queued
+        self.queue._get_executor().submit(self.release.wait)
+
+    def tearDown(self):
+        self.release.set()
+        self.queue.shutdown()
+
+    def wait(self, job_id):
+        while self.queue.status(job_id)["status"] in ("queued", "running"):
+            time.sleep(0.05)
+        return self.queue.status(job_id)
+
+    def test_job_runs_in_background(self):
+        job_id = self.queue.submit({"text": "Hello world. This is a test."})
+        self.assertEqual(self.queue.status(job_id)["status"], "queued")
+        self.release.set()
+        job = self.wait(job_id)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"], {})
+
+    def test_queue_is_bounded(self):
+        self.queue.submit({"text": "First."})
+        self.queue.submit({"text": "Second."})
+        with self.assertRaises(QueueFullError):
+            self.queue.submit({"text": "Third."})
+
+    def test_cancel_queued_job(self):
+        job_id = self.queue.submit({"text": "Hello."})
+        self.assertTrue(self.queue.cancel(job_id))
+        self.assertEqual(self.queue.status(job_id)["status"], "cancelled")
+        self.assertEqual(self.queue.pending(), 0)
+        self.assertIsNone(self.queue.cancel("missing"))
+
+    def test_batch_job(self):
+        job_id = self.queue.submit({"documents": [["a", "Hello."], ["b", "World."]]})
+        self.release.set()
+        job = self.wait(job_id)
+        self.assertEqual(job["kind"], "batch")
+        self.assertEqual(job["result"], [["a", {}], ["b", {}]])
+
+class TestJobStores(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "jobs.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_stores(self):
+        for store in (MemoryJobStore(), SQLiteJobStore(self.path)):
+            store.create("job", "check")
+            store.update("job", status="done", result={"original_files": {"a.txt": "0.9"}}, finished=10.0)
+            job = store.get("job")
+            self.assertEqual(job["status"], "done")
+            self.assertEqual(job["result"], {"original_files": {"a.txt": "0.9"}})
+            store.purge(finished_before=20.0)
+            self.assertIsNone(store.get("job"))
+
+    def test_sqlite_fails_unfinished_jobs_on_restart(self):
+        SQLiteJobStore(self.path).create("job", "check")
+        job = SQLiteJobStore(self.path).get("job")
+        self.assertEqual(job["status"], "failed")
@@ -0,0 +1,35 @@
+import os
+import shutil
+import tempfile
+import unittest
+from app.model.lemmaTable import LemmaTable
+from app.model.preprocessor import Preprocessor
+
+class TestLemmaTable(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.preprocessor = Preprocessor()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_lemmatize_tokens(self):
+        table = LemmaTable({"cats": "cat", "gonna": "go to"})
+        self.assertEqual(table.lemmatize_tokens(["cats", "gonna", "running"]), ["cat", "go", "to", "run"])
+
+    def test_update_matches_spacy(self):
+        table = LemmaTable()
+        words = ["cats", "dogs", "barking"]
+        self.assertEqual(table.update(self.preprocessor, words + ["cats"]), 3)
+        self.assertEqual(table.lemmatize_tokens(words), self.preprocessor.lemmatize_tokens(words))
+        self.assertEqual(table.update(self.preprocessor, words), 0)
+
+    def test_save_and_load(self):
+        path = LemmaTable.path(self.directory, self.preprocessor.get_config())
+        LemmaTable({"cats": "cat"}).save(path)
+        self.assertEqual(LemmaTable.load(path).lemmas, {"cats": "cat"})
+        self.assertEqual(len(LemmaTable.load(os.path.join(self.directory, "missing.json"))), 0)
+
+    def test_path_depends_on_config(self):
+        config = self.preprocessor.get_config()
+        self.assertNotEqual(LemmaTable.path(self.directory, config), LemmaTable.path(self.directory, dict(config, spacy_model="other")))
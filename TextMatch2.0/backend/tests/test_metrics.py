@@ -0,0 +1,66 @@
+import unittest
+from app.model.metrics import Metrics
+from app.model.sentenceMatcher import SentenceMatcher
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics(buckets=(0.1, 1.0))
+
+    def test_counters_are_exported_with_labels(self):
+        self.metrics.count("requests", endpoint="/plagarsim", status="200")
+        self.metrics.count("requests", 2, endpoint="/plagarsim", status="200")
+        self.metrics.count("spacy_docs_parsed", 5)
+        text = self.metrics.export()
+        self.assertIn('textmatch_requests_total{endpoint="/plagarsim",status="200"} 3', text)
+        self.assertIn("textmatch_spacy_docs_parsed_total 5", text)
+        self.assertIn("# TYPE textmatch_requests counter", text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        for seconds in (0.05, 0.5, 5.0):
+            self.metrics.observe("stage_seconds", seconds, stage="load_model")
+        text = self.metrics.export()
+        self.assertIn('textmatch_stage_seconds_bucket{stage="load_model",le="0.1"} 1', text)
+        self.assertIn('textmatch_stage_seconds_bucket{stage="load_model",le="1.0"} 2', text)
+        self.assertIn('textmatch_stage_seconds_bucket{stage="load_model",le="+Inf"} 3', text)
+        self.assertIn('textmatch_stage_seconds_count{stage="load_model"} 3', text)
+        self.assertIn('textmatch_stage_seconds_sum{stage="load_model"} 5.55', text)
+
+    def test_failing_gauge_is_skipped(self):
+        self.metrics.gauge("corpus_documents", lambda: 7)
+        self.metrics.gauge("broken", lambda: 1 / 0)
+        text = self.metrics.export()
+        self.assertIn("textmatch_corpus_documents 7", text)
+        self.assertNotIn("broken", text)
+
+    def test_request_timings(self):
+        @self.metrics.instrument("compare")
+        def compare():
+            self.metrics.count("sequence_matcher_calls", 4)
+
+        self.assertIsNone(self.metrics.current_request())
+        token = self.metrics.begin_request()
+        compare()
+        compare()
+        timings = self.metrics.current_request().as_dict()
+        self.metrics.end_request(token)
+
+        self.assertEqual(timings["stages"]["compare"]["calls"], 2)
+        self.assertEqual(timings["counters"], {"sequence_matcher_calls": 8})
+        self.assertGreaterEqual(timings["total_ms"], timings["stages"]["compare"]["ms"])
+        self.assertIsNone(self.metrics.current_request())
+        self.assertIn('textmatch_stage_seconds_count{stage="compare"} 2', self.metrics.export())
+
+    def test_stage_is_recorded_when_it_raises(self):
+        with self.assertRaises(KeyError):
+            with self.metrics.stage("failing"):
+                raise KeyError("x")
+        self.assertIn('textmatch_stage_seconds_count{stage="failing"} 1', self.metrics.export())
+
+    def test_sentence_matcher_counts_pairs(self):
+        from app.model.metrics import metrics
+        token = metrics.begin_request()
+        SentenceMatcher().match(["The cat sat on the mat.", "Nothing alike here."], ["The cat sat on a mat."])
+        counters = metrics.current_request().as_dict()["counters"]
+        metrics.end_request(token)
+        self.assertEqual(counters["sentence_pairs_considered"], 2)
+        self.assertEqual(counters["sequence_matcher_calls"], 1)
@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+from app.model.corpus import Corpus
+from app.model.minHash import MinHasher, MinHashLSH, ShingleIndex
+
+class TestMinHash(unittest.TestCase):
+    def setUp(self):
+        self.hasher = MinHasher(num_perm=128, shingle_size=2)
+
+    def test_identical_texts_have_equal_signatures(self):
+        words = "the quick brown fox jumps".split()
+        signature = self.hasher.signature(self.hasher.shingles(words))
+        self.assertEqual(MinHasher.jaccard(signature, signature), 1.0)
+
+    def test_jaccard_estimate(self):
+        words1 = [f"w{i}" for i in range(100)]
+        words2 = [f"w{i}" for i in range(50, 150)]
+        estimate = MinHasher.jaccard(self.hasher.signature(self.hasher.shingles(words1)), self.hasher.signature(self.hasher.shingles(words2)))
+        self.assertAlmostEqual(estimate, 49 / 149, delta=0.12)
+
+    def test_lsh_query(self):
+        texts = ["the quick brown fox jumps over the lazy dog", "a completely different sentence about cats", "the quick brown fox jumps over the dog"]
+        signatures = [self.hasher.signature(self.hasher.shingles(text.split())) for text in texts]
+        lsh = MinHashLSH(0.5).build(signatures)
+        matches, similarities = lsh.query(signatures[0])
+        self.assertIn(0, matches)
+        self.assertNotIn(1, matches)
+        self.assertTrue(np.all(similarities >= 0.5))
+
+    def test_optimal_bands_are_below_threshold(self):
+        bands, rows = MinHashLSH.optimal_bands(0.5, 128)
+        self.assertEqual(bands * rows, 128)
+        self.assertLessEqual((1.0 / bands) ** (1.0 / rows), 0.5)
+
+    def test_shingle_index_candidates(self):
+        corpus = Corpus(
+            ["The cat sat on the mat today. Dogs bark at night. Birds sing loudly every single morning in spring.", "Stock markets fell sharply on monday."],
+            ["a.txt", "b.txt"],
+            ["", ""],
+            [[], []],
+            [["The cat sat on the mat today.", "Dogs bark at night.", "Birds sing loudly every single morning in spring."], ["Stock markets fell sharply on monday."]],
+        )
+        index = ShingleIndex(threshold=0.3).build(corpus)
+        query_sentences = ["Something completely unrelated is written here instead.", "The cat sat on the mat today."]
+        candidates = index.candidates(" ".join(query_sentences), query_sentences)
+        self.assertEqual(list(candidates), [0])
+        self.assertEqual(candidates[0], {(0, 1)})
+
+    def test_shingle_index_upsert_and_delete(self):
+        corpus = Corpus(
+            ["Stock markets fell sharply on monday.", "The cat sat on the mat today."],
+            ["a.txt", "b.txt"],
+            ["", ""],
+            [[], []],
+            [["Stock markets fell sharply on monday."], ["The cat sat on the mat today."]],
+        )
+        index = ShingleIndex(threshold=0.3).build(corpus)
+        sentences = ["The cat sat on the mat today."]
+        updated = index.upsert(0, "The cat sat on the mat today.", sentences).delete(1)
+        self.assertEqual(updated.candidates(sentences[0], sentences), {0: None})
+        self.assertEqual(index.candidates(sentences[0], sentences), {1: None})
+        self.assertEqual(updated.delete(0).candidates(sentences[0], sentences), {})
@@ -0,0 +1,33 @@
+import unittest
+from app.model.preprocessor import Preprocessor
+from app.model.parseCache import ParseCache, SentenceSignature, parse_signatures
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.preprocessor = Preprocessor()
+        self.cache = ParseCache(self.preprocessor, max_size=2)
+
+    def test_signature_matches_direct_parse(self):
+        sentence = "The dogs were barking at night."
+        self.assertEqual(self.cache.signature(sentence), parse_signatures(self.preprocessor, [sentence])[0])
+
+    def test_repeated_sentence_is_parsed_once(self):
+        self.cache.signature("Cats are running.")
+        self.cache.signature("Cats are running.")
+        self.assertEqual(self.cache.misses, 1)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.put("a", SentenceSignature(("VBZ",), ()))
+        self.cache.put("b", SentenceSignature((), ("PRP",)))
+        self.cache.signature("a")
+        self.cache.put("c", SentenceSignature((), ()))
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.signature("a"), SentenceSignature(("VBZ",), ()))
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_signatures_batch(self):
+        sentences = ["He wrote the letter.", "The letter was written by him.", "He wrote the letter."]
+        expected = [self.cache.signature(sentence) for sentence in sentences]
+        cache = ParseCache(self.preprocessor)
+        self.assertEqual(cache.signatures(sentences), expected)
@@ -1,4 +1,5 @@
 import unittest
+from app.model.lemmaTable import LemmaTable
 from app.model.preprocessor import Preprocessor
 
 class TestCleanText(unittest.TestCase):
@@ -18,4 +19,57 @@ class TestCleanText(unittest.TestCase):
         self.assertEqual(self.preprocessor.clean_text(""), "")
 
     def test_mixed_input(self):
-        self.assertEqual(self.preprocessor.clean_text("Hello World! 123"), "hello world ")
\ No newline at end of file
+        self.assertEqual(self.preprocessor.clean_text("Hello World! 123"), "hello world ")
+
+    def test_clean_tokens_match_clean_text(self):
+        text = "Hello, World! It's 2024: re-use ab1cd_x 42"
+        tokens = self.preprocessor.clean_tokens(text)
+        self.assertEqual([word for word, _, _ in tokens], self.preprocessor.clean_text(text).split())
+        self.assertEqual([text[start:end] for _, start, end in tokens[:2]], ["Hello", "World"])
+
+class TestBatchPreprocessing(unittest.TestCase):
+    def setUp(self):
+        self.preprocessor = Preprocessor()
+        self.texts = ["Hello, World! This is a test. Cats are running.", "The dogs were barking at night.", ""]
+
+    def test_preprocess_texts_matches_preprocess_text(self):
+        expected = [self.preprocessor.preprocess_text(text) for text in self.texts]
+        self.assertEqual(self.preprocessor.preprocess_texts(self.texts, batch_size=2), expected)
+
+    def test_split_texts_matches_split_into_sentences(self):
+        expected = [self.preprocessor.split_into_sentences(text) for text in self.texts]
+        self.assertEqual(self.preprocessor.split_texts_into_sentences(self.texts, batch_size=2), expected)
+
+    def test_sentencizer(self):
+        preprocessor = Preprocessor(nlp=self.preprocessor.nlp, sentence_splitter="sentencizer")
+        self.assertEqual(preprocessor.split_into_sentences("First sentence. Second one!"), ["First sentence.", "Second one!"])
+
+    def test_unknown_sentence_splitter(self):
+        with self.assertRaises(ValueError):
+            Preprocessor(nlp=self.preprocessor.nlp, sentence_splitter="unknown")
+
+class TestFastPreprocessing(unittest.TestCase):
+    def setUp(self):
+        self.preprocessor = Preprocessor(lemmatizer="table")
+        self.texts = ["Hello, World! This is a test. Cats are running.", "The dogs were barking at night 42 times.", ""]
+
+    def test_fast_tokenize_matches_tokenize(self):
+        for text in self.texts:
+            self.assertEqual(self.preprocessor.fast_tokenize(text), self.preprocessor.tokenize(text))
+
+    def test_spacy_until_table_is_set(self):
+        self.assertFalse(self.preprocessor.use_fast_path())
+        with self.assertRaises(ValueError):
+            self.preprocessor.preprocess_text("Cats", fast=True)
+
+    def test_table_lemmatizes_without_spacy(self):
+        self.preprocessor.lemma_table = LemmaTable({"cats": "cat", "running": "run"})
+        self.assertTrue(self.preprocessor.use_fast_path())
+        self.assertEqual(self.preprocessor.preprocess_text("Cats running barking"), ("cat run bark", ["cat", "run", "bark"]))
+        self.assertEqual(self.preprocessor.preprocess_texts(["Cats", "running"]), [("cat", ["cat"]), ("run", ["run"])])
+        tokens = self.preprocessor.lemmatize_tokens(self.preprocessor.tokenize("Cats running"))
+        self.assertEqual(self.preprocessor.preprocess_text("Cats running", fast=False), (" ".join(tokens), tokens))
+
+    def test_unknown_lemmatizer(self):
+        with self.assertRaises(ValueError):
+            Preprocessor(nlp=self.preprocessor.nlp, lemmatizer="unknown")
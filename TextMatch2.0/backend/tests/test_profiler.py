@@ -0,0 +1,30 @@
+import time
+import unittest
+from app.model.profiler import SamplingProfiler
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_samples_the_current_thread(self):
+        with SamplingProfiler(interval=0.001) as profiler:
+            busy_loop(0.2)
+        report = profiler.report(top=100)
+        self.assertGreater(report["samples"], 0)
+        self.assertGreater(report["duration_ms"], 0)
+        functions = {function["function"]: function for function in report["functions"]}
+        self.assertIn("test_profiler.py:busy_loop", functions)
+        self.assertTrue(any(stack["stack"].endswith("busy_loop") for stack in report["stacks"]))
+
+    def test_report_limits_the_functions(self):
+        profiler = SamplingProfiler()
+        profiler.stacks.update({"a.py:main;a.py:f": 3, "a.py:main;a.py:g": 1})
+        profiler.samples = 4
+        report = profiler.report(top=2)
+        self.assertEqual(report["functions"][0], {"function": "a.py:main", "total": 4, "own": 0})
+        self.assertEqual(report["functions"][1], {"function": "a.py:f", "total": 3, "own": 3})
+        self.assertEqual(len(report["stacks"]), 2)
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from app.model.corpus import Corpus
+from app.model.rawTextStore import RawTextStore
+
+class TestRawTextStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.texts = ["First text.", "", "Ünïcödé — text"]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_write_streams_the_texts(self):
+        store = RawTextStore.write(self.directory.name, iter(self.texts))
+        self.assertEqual(len(store), 3)
+        self.assertEqual(list(store), self.texts)
+        self.assertEqual(store[2], self.texts[2])
+        reopened = RawTextStore(store.directory)
+        self.assertEqual(list(reopened), self.texts)
+
+    def test_same_texts_share_a_store(self):
+        first = RawTextStore.write(self.directory.name, self.texts)
+        second = RawTextStore.write(self.directory.name, self.texts)
+        other = RawTextStore.write(self.directory.name, ["First text.", "Changed."])
+        self.assertEqual(first.directory, second.directory)
+        self.assertNotEqual(first.directory, other.directory)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), sorted({os.path.basename(first.directory), os.path.basename(other.directory)}))
+
+    def test_empty_store(self):
+        store = RawTextStore.write(self.directory.name, [])
+        self.assertEqual(list(store), [])
+
+    def test_shared_corpus_points_to_the_store(self):
+        store = RawTextStore.write(os.path.join(self.directory.name, "texts"), ["Some text.", "Other text."])
+        corpus = Corpus(store, ["a.txt", "b.txt"], ["text", "text"], [["text"], ["text"]], [["Some text."], ["Other text."]])
+        self.assertIs(corpus.original_texts, store)
+        shared = corpus.share(os.path.join(self.directory.name, "shared"))
+        self.assertNotIn("original_texts_data.npy", os.listdir(Corpus.shared_path(os.path.join(self.directory.name, "shared"), corpus.version)))
+        self.assertEqual(list(shared.original_texts), ["Some text.", "Other text."])
+        self.assertEqual(shared.version, corpus.version)
+
+    def test_updated_corpus_keeps_and_moves_to_a_store(self):
+        store = RawTextStore.write(os.path.join(self.directory.name, "texts"), ["Some text.", "Other text."])
+        shared_dir = os.path.join(self.directory.name, "shared")
+        corpus = Corpus(store, ["a.txt", "b.txt"], ["text", "text"], [["text"], ["text"]], [["Some text."], ["Other text."]]).share(shared_dir)
+        entry = {"preprocessed_text": "new text", "tokens": ["new", "text"], "sentences": ["New text."], "signatures": [((), ())]}
+        updated, _ = corpus.upsert("c.txt", "New text.", entry)
+        self.assertIs(updated.original_texts.base, corpus.original_texts)
+        self.assertIs(updated.sentences.base, corpus.sentences)
+        shared = updated.share(shared_dir, os.path.join(self.directory.name, "texts"))
+        self.assertIsInstance(shared.original_texts, RawTextStore)
+        self.assertNotIn("original_texts_data.npy", os.listdir(Corpus.shared_path(shared_dir, updated.version)))
+        self.assertEqual(list(shared.original_texts), ["Some text.", "Other text.", "New text."])
+        self.assertEqual(list(shared.sentences), [("Some text.",), ("Other text.",), ("New text.",)])
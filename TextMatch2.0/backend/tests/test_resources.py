@@ -0,0 +1,35 @@
+import sys
+import unittest
+from unittest import mock
+from app.model import resources
+from app.model.resources import LazyModule, lazy_import, preload_modules, require_nltk_data
+
+class TestLazyModule(unittest.TestCase):
+    def test_imports_on_first_use(self):
+        sys.modules.pop("colorsys", None)
+        module = LazyModule("colorsys")
+        self.assertNotIn("colorsys", sys.modules)
+        self.assertEqual(module.rgb_to_hsv(0, 0, 0), (0, 0, 0))
+        self.assertIn("colorsys", sys.modules)
+
+    def test_preload_modules(self):
+        module = lazy_import("json.decoder")
+        self.assertIn("json.decoder", preload_modules())
+        self.assertIsNotNone(module._module)
+
+    def test_app_import_is_lazy(self):
+        self.assertIsInstance(resources.nltk, LazyModule)
+        from app.model import annIndex, detectorEngine, preprocessor
+        self.assertIsInstance(detectorEngine.spacy, LazyModule)
+        self.assertIsInstance(preprocessor.nltk_tokenize, LazyModule)
+        self.assertIsInstance(annIndex.preprocessing, LazyModule)
+
+class TestRequireNltkData(unittest.TestCase):
+    def test_missing_data_is_not_downloaded(self):
+        with mock.patch.object(resources, "_nltk_checked", False), \
+             mock.patch.object(resources, "NLTK_RESOURCES", {"missing": "corpora/textmatch-missing-resource"}), \
+             mock.patch.object(resources.nltk, "download") as download:
+            self.assertEqual(resources.missing_nltk_data(), ["missing"])
+            with self.assertRaises(LookupError):
+                require_nltk_data(download=False)
+            download.assert_not_called()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from app.model.resultCache import ResultCache, SQLiteResultStore
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResultCache(max_size=2, ttl=60)
+
+    def test_key_normalizes_spacing_and_depends_on_versions(self):
+        key = ResultCache.key("the dog barked ", "v1", "m1")
+        self.assertEqual(key, ResultCache.key(" the  dog barked", "v1", "m1"))
+        self.assertNotEqual(key, ResultCache.key("the dog barked", "v2", "m1"))
+        self.assertNotEqual(key, ResultCache.key("the dog barked", "v1", "m2"))
+        self.assertNotEqual(key, ResultCache.key("the dog barked", "v1", "m1", {"cascade": False}))
+
+    def test_put_and_get_copy(self):
+        self.cache.put("a", "v1", {"plgarised_text": False})
+        result = self.cache.get("a")
+        result["timings"] = {}
+        self.assertEqual(self.cache.get("a"), {"plgarised_text": False})
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.put("a", "v1", {"result": 1})
+        self.cache.put("b", "v1", {"result": 2})
+        self.cache.get("a")
+        self.cache.put("c", "v1", {"result": 3})
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), {"result": 1})
+
+    def test_expired_results_are_not_served(self):
+        with mock.patch("app.model.resultCache.time.time", return_value=1000.0):
+            self.cache.put("a", "v1", {"result": 1})
+        with mock.patch("app.model.resultCache.time.time", return_value=1059.0):
+            self.assertEqual(self.cache.get("a"), {"result": 1})
+        with mock.patch("app.model.resultCache.time.time", return_value=1061.0):
+            self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate_keeps_current_version(self):
+        self.cache.put("a", "v1", {"result": 1})
+        self.cache.put("b", "v2", {"result": 2})
+        self.cache.invalidate("v2")
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("b"), {"result": 2})
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+class TestSQLiteResultStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_results_survive_a_restart(self):
+        ResultCache(store=SQLiteResultStore(self.path)).put("a", "v1", {"results": {"original_files": {"a.txt": "0.9"}}})
+        cache = ResultCache(store=SQLiteResultStore(self.path))
+        self.assertEqual(cache.get("a"), {"results": {"original_files": {"a.txt": "0.9"}}})
+        self.assertEqual(len(cache), 1)
+
+    def test_results_without_ttl_do_not_expire(self):
+        ResultCache(ttl=None, store=SQLiteResultStore(self.path)).put("a", "v1", {"result": 1})
+        self.assertEqual(ResultCache(store=SQLiteResultStore(self.path)).get("a"), {"result": 1})
+
+    def test_invalidate_and_housekeeping(self):
+        store = SQLiteResultStore(self.path, max_size=2, housekeeping_interval=1)
+        store.put("expired", "v1", 0.0, {"result": 0})
+        self.assertIsNone(store.get("expired"))
+        for key in ("a", "b", "c"):
+            store.put(key, "v1", float("inf"), {"result": key})
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get("a"))
+        store.put("d", "v2", float("inf"), {"result": "d"})
+        store.invalidate("v2")
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.get("d"), ("v2", float("inf"), {"result": "d"}))
@@ -0,0 +1,77 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from app import app
+from app import routes
+from app.model.detectorEngine import DetectorEngine
+
+TOKEN = "s3cret"
+
+class RestartCounter:
+    def __init__(self):
+        self.restarts = 0
+
+    def restart(self):
+        self.restarts += 1
+
+class TestAdminRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.corpus_dir = os.path.join(self.directory, "corpus")
+        os.makedirs(self.corpus_dir)
+        with open(os.path.join(self.corpus_dir, "a.txt"), "w", encoding="utf-8") as file:
+            file.write("The dog eats meat. The house is big.")
+        self.original = routes.engine, routes.ADMIN_TOKEN, routes.job_queue
+        routes.engine = DetectorEngine(cache_dir=os.path.join(self.directory, "cache"), directory=self.corpus_dir).warm_up()
+        routes.ADMIN_TOKEN = TOKEN
+        self.client = app.test_client()
+        self.headers = {"X-Admin-Token": TOKEN}
+
+    def tearDown(self):
+        routes.engine, routes.ADMIN_TOKEN, routes.job_queue = self.original
+        shutil.rmtree(self.directory)
+
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get("/admin/documents", headers={"X-Admin-Token": "wrong"}).status_code, 401)
+        self.assertEqual(self.client.get("/admin/documents").status_code, 401)
+        routes.ADMIN_TOKEN = None
+        self.assertEqual(self.client.get("/admin/documents", headers=self.headers).status_code, 403)
+        self.assertEqual(self.client.post("/admin/refit", headers=self.headers).status_code, 403)
+
+    def test_update_documents(self):
+        response = self.client.put("/admin/documents/nested/b.txt", json={"text": "A cat sleeps."}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()["version"], routes.engine.snapshot().corpus.version)
+        self.assertEqual(self.client.put("/admin/documents/nested/b.txt", json={"text": "A cat runs."}, headers=self.headers).status_code, 200)
+        self.assertEqual(self.client.put("/admin/documents/b.md", json={"text": "A cat runs."}, headers=self.headers).status_code, 400)
+
+        documents = self.client.get("/admin/documents", headers=self.headers).get_json()
+        self.assertEqual(documents["documents"], ["a.txt", "nested/b.txt"])
+        self.assertEqual(documents["pending_changes"], 2)
+
+        self.assertEqual(self.client.delete("/admin/documents/a.txt", headers=self.headers).status_code, 200)
+        self.assertEqual(self.client.delete("/admin/documents/a.txt", headers=self.headers).status_code, 404)
+        response = self.client.post("/admin/refit", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/admin/documents", headers=self.headers).get_json(),
+                         {"documents": ["nested/b.txt"], "version": response.get_json()["version"], "pending_changes": 0})
+
+    def test_dump_is_read_only(self):
+        dump = os.path.join(self.directory, "dump.jsonl")
+        with open(dump, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"id": 42, "text": "The dog eats meat."}) + "\n")
+        routes.engine = DetectorEngine(cache_dir=None, directory=dump).warm_up()
+        self.assertEqual(self.client.put("/admin/documents/dump.jsonl/43", json={"text": "A cat."}, headers=self.headers).status_code, 409)
+        self.assertEqual(self.client.delete("/admin/documents/dump.jsonl/42", headers=self.headers).status_code, 409)
+        self.assertEqual(self.client.get("/admin/documents", headers=self.headers).get_json()["documents"], ["dump.jsonl/42"])
+
+    def test_job_workers_follow_the_journal(self):
+        routes.job_queue = RestartCounter()
+        self.client.put("/admin/documents/b.txt", json={"text": "A cat sleeps."}, headers=self.headers)
+        self.assertEqual(routes.job_queue.restarts, 0)
+        routes.engine = DetectorEngine(cache_dir=None, directory=self.corpus_dir).warm_up()
+        self.client.delete("/admin/documents/b.txt", headers=self.headers)
+        self.assertEqual(routes.job_queue.restarts, 1)
@@ -0,0 +1,38 @@
+import unittest
+from difflib import SequenceMatcher
+from app.model.sentenceMatcher import SentenceMatcher
+
+class TestSentenceMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = SentenceMatcher()
+        self.sentences1 = ["This is a test.", "Another test sentence.", "The cat sat on the mat.", ""]
+        self.sentences2 = ["This is a test.", "Yet another sentence for testing.", "The cat was sitting on the mat.", "Another test sentence!", ""]
+
+    def brute_force(self, sentences1, sentences2):
+        result = []
+        for i, sent1 in enumerate(sentences1):
+            for j, sent2 in enumerate(sentences2):
+                similarity = SequenceMatcher(None, sent1, sent2).ratio()
+                if similarity > 0.7:
+                    result.append((i, j, sent1, sent2, similarity))
+        return result
+
+    def test_matches_sequence_matcher(self):
+        self.assertEqual(self.matcher.match(self.sentences1, self.sentences2), self.brute_force(self.sentences1, self.sentences2))
+
+    def test_candidate_pairs(self):
+        result = self.matcher.match(self.sentences1, self.sentences2, candidate_pairs={(1, 3)})
+        self.assertEqual([(i, j) for i, j, _, _, _ in result], [(1, 3)])
+
+    def test_lcs_length(self):
+        masks = SentenceMatcher.character_masks("ABCBDAB")
+        self.assertEqual(SentenceMatcher.lcs_length(7, masks, "BDCABA"), 4)
+
+    def test_upper_bounds_are_quick_ratio(self):
+        bounds = self.matcher.upper_bounds(self.sentences1[:3], self.sentences2[:3])
+        for i, sent1 in enumerate(self.sentences1[:3]):
+            for j, sent2 in enumerate(self.sentences2[:3]):
+                self.assertAlmostEqual(bounds[i, j], SequenceMatcher(None, sent1, sent2).quick_ratio())
+
+    def test_empty_documents(self):
+        self.assertEqual(self.matcher.match([], self.sentences2), [])
@@ -0,0 +1,84 @@
+import tempfile
+import unittest
+import numpy as np
+from gensim.models import KeyedVectors
+from app.model.corpus import Corpus
+from app.model.sentenceVectors import SentenceVectors
+from app.model.vectorizer import Vectorizer
+
+class WordPreprocessor:
+    def preprocess_texts(self, texts, batch_size=64, n_process=1, fast=None):
+        return [(text.lower(), text.lower().replace(".", "").split()) for text in texts]
+
+class TestSentenceVectors(unittest.TestCase):
+
+    def setUp(self):
+        self.words = ["cat", "dog", "sit", "run", "mat", "park", "the"]
+        self.model = KeyedVectors(vector_size=8)
+        self.model.add_vectors(self.words, np.random.default_rng(0).normal(size=(len(self.words), 8)).astype(np.float32))
+        self.preprocessor = WordPreprocessor()
+        self.vectorizer = Vectorizer(preprocessor=self.preprocessor)
+        sentences = [["The cat sit.", "The dog run."], ["The cat run park."], [], ["Dog sit mat.", "The the cat.", "Park."]]
+        self.corpus = self.make_corpus(sentences)
+
+    def make_corpus(self, sentences):
+        texts = [" ".join(doc_sentences) for doc_sentences in sentences]
+        tokens = [self.preprocessor.preprocess_texts([text])[0][1] for text in texts]
+        return Corpus(texts, [f"{i}.txt" for i in range(len(texts))], None, tokens, sentences)
+
+    def test_mean_embeddings(self):
+        vectors = SentenceVectors.build(self.corpus, self.model, self.preprocessor, self.vectorizer)
+        self.assertEqual(vectors.matrix.shape, (6, 8))
+        self.assertEqual(vectors.offsets.tolist(), [0, 2, 3, 3, 6])
+        self.assertEqual(vectors.doc_ids.tolist(), [0, 0, 1, 3, 3, 3])
+        self.assertEqual(vectors.sentence_ids.tolist(), [0, 1, 0, 0, 1, 2])
+        expected = self.vectorizer.get_tokens_vector(["dog", "sit", "mat"], self.model)
+        self.assertTrue(np.allclose(vectors.matrix[3], expected / np.linalg.norm(expected), atol=1e-6))
+
+    def test_sif_removes_the_common_component(self):
+        vectors = SentenceVectors.build(self.corpus, self.model, self.preprocessor, self.vectorizer, weighting="sif")
+        weights = vectors.word_weights
+        self.assertLess(weights[self.model.key_to_index["the"]], weights[self.model.key_to_index["mat"]])
+        self.assertTrue(np.allclose(vectors.matrix @ vectors.component, 0, atol=1e-5))
+        encoded = vectors.encode([["dog", "sit", "mat"]], self.model, self.vectorizer)
+        self.assertTrue(np.allclose(encoded[0], vectors.matrix[3], atol=1e-5))
+
+    def test_query_matches_brute_force(self):
+        vectors = SentenceVectors.build(self.corpus, self.model, self.preprocessor, self.vectorizer)
+        queries = vectors.encode([["cat", "sit"], ["park"], ["unknown"]], self.model, self.vectorizer)
+        rows, scores = vectors.query(queries, 3, chunk_size=2)
+        expected = queries @ vectors.matrix.T
+        self.assertEqual(rows.shape, (3, 3))
+        for query in range(2):
+            order = np.argsort(-expected[query], kind="stable")[:3]
+            self.assertTrue(np.allclose(scores[query], expected[query][order], atol=1e-6))
+        self.assertEqual(rows[1, 0], 5)
+        self.assertTrue(np.allclose(scores[2], 0))
+
+    def test_upsert_and_delete_match_rebuild(self):
+        vectors = SentenceVectors.build(self.corpus, self.model, self.preprocessor, self.vectorizer)
+        new_sentences = ["The dog sit park.", "Cat."]
+        encoded = vectors.encode([tokens for _, tokens in self.preprocessor.preprocess_texts(new_sentences)], self.model, self.vectorizer)
+        upserted = vectors.upsert(1, encoded, "v2")
+        rebuilt = SentenceVectors.build(self.make_corpus([["The cat sit.", "The dog run."], new_sentences, [], ["Dog sit mat.", "The the cat.", "Park."]]),
+                                        self.model, self.preprocessor, self.vectorizer)
+        self.assertEqual(upserted.offsets.tolist(), rebuilt.offsets.tolist())
+        self.assertTrue(np.allclose(upserted.matrix, rebuilt.matrix, atol=1e-6))
+        appended = vectors.upsert(4, encoded[:1], "v3")
+        self.assertEqual((len(appended), appended.doc_ids[-1], appended.sentence_ids[-1]), (7, 4, 0))
+        deleted = vectors.delete(0, "v4")
+        self.assertEqual(deleted.offsets.tolist(), [0, 1, 1, 4])
+        self.assertTrue(np.array_equal(deleted.matrix, vectors.matrix[2:]))
+
+    def test_share_memory_maps_the_embeddings(self):
+        vectors = SentenceVectors.build(self.corpus, self.model, self.preprocessor, self.vectorizer, weighting="sif")
+        with tempfile.TemporaryDirectory() as directory:
+            shared = SentenceVectors.build(self.corpus, self.model, self.preprocessor, self.vectorizer, weighting="sif", shared_dir=directory)
+            self.assertIsInstance(shared.matrix, np.memmap)
+            self.assertTrue(np.allclose(shared.matrix, vectors.matrix))
+            self.assertTrue(np.allclose(shared.component, vectors.component))
+            self.assertEqual(shared.weighting, "sif")
+
+    def test_unknown_weighting(self):
+        with self.assertRaises(ValueError):
+            SentenceVectors(np.zeros((0, 8), dtype=np.float32), [0], "model", "version", weighting="max")
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from app.model.annIndex import FlatIndex
+from app.model.shardedIndex import ShardedIndex
+
+class TestShardedIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(101, 16)).astype(np.float32)
+        self.queries = rng.normal(size=(10, 16)).astype(np.float32)
+        self.reference = FlatIndex().build(self.vectors)
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = ShardedIndex(n_shards=3, executor="thread", directory=self.directory.name).build(self.vectors)
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def assert_same_results(self, index, reference):
+        for query in self.queries:
+            ids, scores = index.query(query, 5)
+            expected_ids, expected_scores = reference.query(query, 5)
+            self.assertEqual(ids.tolist(), expected_ids.tolist())
+            self.assertTrue(np.allclose(scores, expected_scores, atol=1e-6))
+
+    def test_query_matches_flat_index(self):
+        self.assertEqual(len(self.index), 101)
+        self.assertEqual(sorted(np.concatenate(self.index.ids).tolist()), list(range(101)))
+        self.assert_same_results(self.index, self.reference)
+
+    def test_load_from_shard_map(self):
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, ShardedIndex.MAP_FILE)))
+        loaded = ShardedIndex.load(self.directory.name, executor="thread")
+        self.assertEqual(loaded.n_shards, 3)
+        self.assert_same_results(loaded, self.reference)
+        loaded.close()
+
+    def test_more_shards_than_documents(self):
+        index = ShardedIndex(n_shards=4, executor="thread").build(self.vectors[:2])
+        ids, _ = index.query(self.vectors[1], 5)
+        self.assertEqual(ids.tolist()[0], 1)
+        self.assertEqual(len(ids), 2)
+        index.close()
+
+    def test_upsert_and_delete_match_flat_index(self):
+        vector = self.queries[0]
+        updated = self.index.upsert(10, vector).upsert(101, self.queries[1]).delete(0)
+        reference = self.reference.upsert(10, vector).upsert(101, self.queries[1]).delete(0)
+        self.assertEqual(len(updated), 101)
+        self.assert_same_results(updated, reference)
+        # The original index is not modified
+        self.assert_same_results(self.index, self.reference)
+        updated.close()
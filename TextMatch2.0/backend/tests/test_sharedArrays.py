@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from app.model.sharedArrays import NestedTextArray, SplicedArray, TextArray, load_arrays, save_arrays
+
+class TestSharedArrays(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "arrays")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_text_array(self):
+        strings = ["First text.", "", "Ünïcödé — text"]
+        texts = TextArray.from_strings(strings)
+        self.assertEqual(len(texts), 3)
+        self.assertEqual(list(texts), strings)
+        self.assertEqual(texts[-1], strings[-1])
+        self.assertEqual(texts[1:], strings[1:])
+        with self.assertRaises(IndexError):
+            texts[3]
+
+    def test_nested_text_array(self):
+        lists = [["a", "b"], [], ["c"]]
+        nested = NestedTextArray.from_lists(lists, encode=str.upper, decode=str.lower)
+        self.assertEqual(list(nested), [("a", "b"), (), ("c",)])
+        self.assertEqual(nested.texts[0], "A")
+
+    def test_spliced_array(self):
+        texts = TextArray.from_strings(["a", "b", "c"])
+        spliced = SplicedArray.splice(texts, 1, 2, ["B", "B2"])
+        self.assertEqual(list(spliced), ["a", "B", "B2", "c"])
+        spliced = SplicedArray.splice(SplicedArray.splice(spliced, 0, 1, []), 3, 3, ["d"])
+        self.assertEqual(list(spliced), ["B", "B2", "c", "d"])
+        self.assertIs(spliced.base, texts)
+        self.assertEqual((spliced[-1], spliced[1:3]), ("d", ["B2", "c"]))
+        self.assertEqual(list(texts), ["a", "b", "c"])
+        with self.assertRaises(IndexError):
+            spliced[4]
+
+    def test_save_and_load_memory_mapped(self):
+        texts = TextArray.from_strings(["one", "two"])
+        save_arrays(self.path, dict(texts.arrays("texts"), empty=np.zeros(0)), {"name": "test"})
+        arrays, meta = load_arrays(self.path)
+        self.assertEqual(meta, {"name": "test"})
+        self.assertIsInstance(arrays["texts_data"], np.memmap)
+        self.assertEqual(list(TextArray.from_arrays(arrays, "texts")), ["one", "two"])
+        self.assertEqual(len(arrays["empty"]), 0)
+
+    def test_existing_directory_is_kept(self):
+        save_arrays(self.path, {"values": np.arange(3)})
+        save_arrays(self.path, {"values": np.arange(5)})
+        arrays, _ = load_arrays(self.path)
+        self.assertEqual(len(arrays["values"]), 3)
+        self.assertEqual([name for name in os.listdir(self.directory.name)], ["arrays"])
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+import unittest
+from app.model.syntheticCorpus import PLAGIARISM_KINDS, SyntheticCorpus, read_manifest, read_queries
+
+SEED_DOCUMENTS = [
+    ("org-001.txt", "Artificial intelligence changes education. Students use chatbots to learn faster. Teachers adapt their methods."),
+    ("org-002.txt", "Deep learning models recognize emotions. The models are trained on large datasets. Results improve every year."),
+]
+
+class TestSyntheticCorpus(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.generator = SyntheticCorpus(SEED_DOCUMENTS, seed=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_documents_are_reproducible(self):
+        self.assertEqual(self.generator.document(0), SEED_DOCUMENTS[0][1])
+        self.assertEqual(self.generator.filename(5), "syn-000005.txt")
+        self.assertEqual(self.generator.document(5), SyntheticCorpus(SEED_DOCUMENTS, seed=3).document(5))
+        self.assertNotEqual(self.generator.document(5), self.generator.document(6))
+        self.assertTrue(set(self.generator.document(5).lower().replace(".", "").split()) <= set(self.generator.vocabulary))
+
+    def test_queries_inject_plagiarism(self):
+        queries = self.generator.queries(12, 10, plagiarism_rate=0.5)
+        self.assertEqual(sum(query["kind"] == "clean" for query in queries), 6)
+        self.assertEqual({query["kind"] for query in queries}, set(PLAGIARISM_KINDS) | {"clean"})
+        for query in queries:
+            if query["kind"] == "copy":
+                source = self.generator.document([self.generator.filename(index) for index in range(10)].index(query["source"]))
+                self.assertTrue(any(sentence in query["text"] for sentence in source.split(". ")))
+            elif query["kind"] == "clean":
+                self.assertIsNone(query["source"])
+
+    def test_write(self):
+        self.assertTrue(self.generator.write(self.directory, 5, queries=4))
+        self.assertEqual(sorted(os.listdir(os.path.join(self.directory, "files"))), ["org-001.txt", "org-002.txt", "syn-000002.txt", "syn-000003.txt", "syn-000004.txt"])
+        self.assertEqual(len(read_queries(self.directory)), 4)
+        self.assertEqual(read_manifest(self.directory)["documents"], 5)
+        self.assertFalse(self.generator.write(self.directory, 5, queries=4))
+        self.assertTrue(self.generator.write(self.directory, 3, queries=4))
+        self.assertEqual(len(os.listdir(os.path.join(self.directory, "files"))), 3)
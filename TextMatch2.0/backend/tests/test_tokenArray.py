@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from app.model.sharedArrays import load_arrays, save_arrays
+from app.model.tokenArray import JoinedTokens, TokenArray
+
+class TestTokenArray(unittest.TestCase):
+
+    def setUp(self):
+        self.token_lists = [["cat", "sit", "mat"], [], ["dog", "sit"]]
+        self.tokens = TokenArray.from_lists(self.token_lists)
+
+    def test_interns_every_word_once(self):
+        self.assertEqual(self.tokens.vocabulary, ("cat", "sit", "mat", "dog"))
+        self.assertEqual(self.tokens.ids.dtype, np.uint32)
+        self.assertEqual(self.tokens.ids.tolist(), [0, 1, 2, 3, 1])
+        self.assertEqual(self.tokens.document_ids(2).tolist(), [3, 1])
+
+    def test_sequence(self):
+        self.assertEqual(len(self.tokens), 3)
+        self.assertEqual(list(self.tokens), [tuple(tokens) for tokens in self.token_lists])
+        self.assertEqual(self.tokens[-1], ("dog", "sit"))
+        self.assertEqual(self.tokens[1:], [(), ("dog", "sit")])
+        with self.assertRaises(IndexError):
+            self.tokens[3]
+
+    def test_splice_keeps_the_ids_of_other_documents(self):
+        replaced = self.tokens.splice(0, 1, [["bird", "sit"]])
+        self.assertEqual(list(replaced), [("bird", "sit"), (), ("dog", "sit")])
+        self.assertEqual(replaced.vocabulary[:4], self.tokens.vocabulary)
+        appended = self.tokens.splice(3, 3, [["cat"]])
+        self.assertEqual(appended[3], ("cat",))
+        removed = self.tokens.splice(1, 2, [])
+        self.assertEqual(list(removed), [("cat", "sit", "mat"), ("dog", "sit")])
+        self.assertEqual(list(self.tokens), [tuple(tokens) for tokens in self.token_lists])
+
+    def test_arrays_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tokens")
+            save_arrays(path, self.tokens.arrays("tokens"))
+            arrays, _ = load_arrays(path)
+            loaded = TokenArray.from_arrays(arrays, "tokens")
+            self.assertIsInstance(loaded.ids, np.memmap)
+            self.assertEqual(list(loaded), list(self.tokens))
+
+    def test_joined_tokens(self):
+        joined = JoinedTokens(self.tokens)
+        self.assertEqual(list(joined), ["cat sit mat", "", "dog sit"])
+        self.assertEqual(joined[2], "dog sit")
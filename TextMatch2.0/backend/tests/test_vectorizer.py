@@ -1,6 +1,8 @@
 import unittest
 import numpy as np
 from unittest.mock import MagicMock
+from gensim.models import KeyedVectors
+from app.model.tokenArray import TokenArray
 from app.model.vectorizer import Vectorizer
 
 class TestVectorizer(unittest.TestCase):
@@ -32,4 +34,13 @@ class TestVectorizer(unittest.TestCase):
         
     def test_vector_size_consistency(self):
         vector = self.vectorizer.get_sentence_vector("hello", self.mock_model)
-        self.assertEqual(len(vector), self.mock_model.vector_size)
\ No newline at end of file
+        self.assertEqual(len(vector), self.mock_model.vector_size)
+
+    def test_token_array_vectors_match_per_document_vectors(self):
+        model = KeyedVectors(vector_size=4)
+        model.add_vectors(["hello", "world", "again"], np.random.default_rng(0).random((3, 4)).astype(np.float32))
+        documents = [["hello", "world"], [], ["xyz"], ["again", "xyz", "again"], ["world"]]
+        vectors = self.vectorizer.get_token_array_vectors(TokenArray.from_lists(documents), model, chunk_size=3)
+        expected = np.array([self.vectorizer.get_tokens_vector(tokens, model) for tokens in documents])
+        self.assertEqual(vectors.shape, (5, 4))
+        self.assertTrue(np.allclose(vectors, expected, atol=1e-6))
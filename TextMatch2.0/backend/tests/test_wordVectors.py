@@ -0,0 +1,42 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from app.model.corpus import Corpus
+from app.model.wordVectors import export_word_vectors, load_word_vectors, read_metadata, train_word_vectors, training_fingerprint
+
+class TestWordVectors(unittest.TestCase):
+
+    def setUp(self):
+        tokens = [["cat", "sit", "mat"], ["dog", "sit", "mat"], ["cat", "chase", "dog"]]
+        self.corpus = Corpus([" ".join(t) for t in tokens], ["a.txt", "b.txt", "c.txt"], [" ".join(t) for t in tokens], tokens, [[" ".join(t)] for t in tokens])
+        self.config = {"vector_size": 8, "min_count": 1, "epochs": 5}
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "word_vectors.kv")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_export_and_mmap_load(self):
+        model = train_word_vectors(self.corpus, self.config)
+        export_word_vectors(model, self.path, {"fingerprint": "abc"})
+        vectors = load_word_vectors(self.path)
+        self.assertIsInstance(vectors.vectors, np.memmap)
+        self.assertTrue(np.array_equal(vectors["cat"], model.wv["cat"]))
+        self.assertEqual(read_metadata(self.path)["fingerprint"], "abc")
+        self.assertEqual(read_metadata(self.path)["vector_size"], 8)
+
+    def test_training_is_reproducible(self):
+        first = train_word_vectors(self.corpus, self.config)
+        second = train_word_vectors(self.corpus, self.config)
+        self.assertTrue(np.array_equal(first.wv.vectors, second.wv.vectors))
+
+    def test_fingerprint(self):
+        fingerprint = training_fingerprint(self.corpus, {"spacy_model": "x"}, self.config)
+        self.assertEqual(fingerprint, training_fingerprint(self.corpus, {"spacy_model": "x"}, dict(self.config)))
+        self.assertNotEqual(fingerprint, training_fingerprint(self.corpus, {"spacy_model": "x"}, dict(self.config, epochs=6)))
+        self.assertNotEqual(fingerprint, training_fingerprint(self.corpus, {"spacy_model": "y"}, self.config))
+
+    def test_missing_metadata(self):
+        self.assertIsNone(read_metadata(self.path))
@@ -0,0 +1,54 @@
+import argparse
+import json
+import sys
+import spacy
+from app.model.corpus import Corpus
+from app.model.corpusCache import CorpusCache
+from app.model.preprocessor import Preprocessor
+from app.model.wordVectors import DEFAULT_TRAINING_CONFIG, DEFAULT_VECTORS_PATH, export_word_vectors, read_metadata, train_word_vectors, training_fingerprint
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Trains the Word2Vec model offline and exports its KeyedVectors for the service.")
+    parser.add_argument("--output", default=DEFAULT_VECTORS_PATH, help="Path of the exported KeyedVectors.")
+    parser.add_argument("--config", help="JSON file with Word2Vec parameters, e.g. {\"epochs\": 100}.")
+    parser.add_argument("--cache-dir", default="cache/corpus", help="Directory of the corpus cache.")
+    parser.add_argument("--force", action="store_true", help="Train even if the output matches the corpus and configuration.")
+    for name, value in DEFAULT_TRAINING_CONFIG.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name, help=f"Word2Vec {name} (default {value}).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = dict(DEFAULT_TRAINING_CONFIG)
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as file:
+            config.update(json.load(file))
+    config.update({name: getattr(args, name) for name in DEFAULT_TRAINING_CONFIG if getattr(args, name) is not None})
+
+    preprocessor = Preprocessor(nlp=spacy.load('en_core_web_sm'))
+    cache = CorpusCache(args.cache_dir, preprocessor.get_config()) if args.cache_dir else None
+    corpus = Corpus.build(preprocessor, cache)
+    fingerprint = training_fingerprint(corpus, preprocessor.get_config(), config)
+
+    metadata = read_metadata(args.output)
+    if not args.force and metadata is not None and metadata.get("fingerprint") == fingerprint:
+        print(f"El modelo {args.output} ya está actualizado ({fingerprint[:12]})")
+        return 0
+
+    print(f"Entrenando Word2Vec con {len(corpus)} documentos: {json.dumps(config, sort_keys=True)}")
+    model = train_word_vectors(corpus, config)
+    export_word_vectors(model, args.output, {
+        "fingerprint": fingerprint,
+        "corpus_version": corpus.version,
+        "documents": len(corpus),
+        "preprocessing": preprocessor.get_config(),
+        "training": config,
+    })
+    print(f"Vectores exportados en {args.output} ({fingerprint[:12]})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
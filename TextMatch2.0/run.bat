@@ -4,6 +4,8 @@ REM Navegar al directorio del backend y iniciar el servidor Flask
 echo Iniciando servidor backend Flask...
 cd backend
 pip install -r requirements.txt
+REM Los datos de NLTK no se descargan al ejecutar, así que se instalan junto al backend antes de iniciarlo
+python -m nltk.downloader -d nltk_data punkt stopwords
 set FLASK_APP=app.py  REM Ajustar según el nombre de tu archivo principal de Flask si es diferente
 start cmd /k flask run
 set BACKEND_PID=%ERRORLEVEL%
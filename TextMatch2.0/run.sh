@@ -4,6 +4,8 @@
 echo "Starting Flask backend server..."
 cd backend
 pip install -r requirements.txt
+# The NLTK data is not downloaded at runtime, so it is installed next to the backend before starting it
+python -m nltk.downloader -d nltk_data punkt stopwords
 export FLASK_APP=app.py  # Adjust this to the name of your Flask app file if different
 flask run &
 BACKEND_PID=$!